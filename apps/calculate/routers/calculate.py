@@ -1,232 +1,96 @@
 # apps/calculate/routers/calculate.py
 """Calculate API routes for importing financial data."""
 
-from typing import List
-from ninja import Router, Schema
+from typing import List, Optional
+from ninja import Router
 from ninja.errors import HttpError
-import time
-from django.db import transaction
-from apps.calculate.services.financial_service import CalculateService
 from apps.calculate.services.query_financial_service import QueryFinancialService
 from apps.calculate.dtos.cash_flow_dto import CashFlowOut
 from apps.calculate.dtos.income_statement_dto import InComeOut
 from apps.calculate.dtos.blance_sheet_dto import BalanceSheetOut
 from apps.calculate.dtos.ratio_dto import RatioOut
+from apps.jobs.handlers import (
+    CALCULATE_IMPORT_ALL_COMPLETE,
+    CALCULATE_IMPORT_SHARDED,
+    RESUMABLE_IMPORT_MAX_ATTEMPTS,
+    import_dedupe_key,
+)
+from apps.jobs.router import JobAcceptedOut, job_accepted
+from apps.jobs.services import JobService
 router = Router(tags=["calculate"])
 
 
-# Output schemas  
-class ImportResultSchema(Schema):
-    symbol: str
-    success: bool
-    balance_sheets: int = 0
-    income_statements: int = 0
-    cash_flows: int = 0
-    errors: List[str] = []
+def _enqueue_import(request, kind: str, payload: dict, dedupe_key: Optional[str] = None, max_attempts: int = 1):
+    user_id = getattr(getattr(request, "user", None), "id", None)
+    job, created = JobService().enqueue(
+        kind, payload, dedupe_key=dedupe_key or kind, max_attempts=max_attempts, created_by_id=user_id
+    )
+    return job_accepted(job, created)
 
 
-class ImportSummarySchema(Schema):
-    total_symbols: int
-    successful_imports: int
-    failed_imports: int
-    total_balance_sheets: int
-    total_income_statements: int
-    total_cash_flows: int
-    processing_time: float
-    results: List[ImportResultSchema]
+@router.post("/import/balance/all", response={202: JobAcceptedOut})
+def import_all_financials(request):
+    """Enqueue import financial data for ALL symbols in database; poll GET /api/jobs/{job_id}."""
+    return _enqueue_import(request, "calculate.import_balance", {})
 
 
-@router.post("/import/balance/all", response=ImportSummarySchema)
-def import_all_financials(request):
-    """Import financial data for ALL symbols in database."""
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_all_financials()
-        processing_time = time.time() - start_time
-        
-        return ImportSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-        
-    except Exception as e:
-        raise HttpError(500, f"Error importing all financials: {str(e)}")
-
-
-@router.post("/import/income/all", response=ImportSummarySchema)
+@router.post("/import/income/all", response={202: JobAcceptedOut})
 def import_income_all(request):
-    """Import only income statements for ALL symbols in database."""
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_income_statements_all()
-        processing_time = time.time() - start_time
-
-        return ImportSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-    except Exception as e:
-        raise HttpError(500, f"Error importing income statements: {str(e)}")
-
-
-@router.post("/import/cashflow/all", response=ImportSummarySchema)
+    """Enqueue import only income statements for ALL symbols in database."""
+    return _enqueue_import(request, "calculate.import_income", {})
+
+
+@router.post("/import/cashflow/all", response={202: JobAcceptedOut})
 def import_cashflow_all(request):
-    """Import only cash flows for ALL symbols in database."""
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_cash_flows_all()
-        processing_time = time.time() - start_time
-
-        return ImportSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-    except Exception as e:
-        raise HttpError(500, f"Error importing cash flows: {str(e)}")
-
-
-@router.post("/import/ratio/all", response=ImportSummarySchema)
+    """Enqueue import only cash flows for ALL symbols in database."""
+    return _enqueue_import(request, "calculate.import_cashflow", {})
+
+
+@router.post("/import/ratio/all", response={202: JobAcceptedOut})
 def import_ratio_all(request):
-    """Import only ratios for ALL symbols in database."""
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_ratios_all()
-        processing_time = time.time() - start_time
-
-        return ImportSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-    except Exception as e:
-        raise HttpError(500, f"Error importing ratios: {str(e)}")
-
-
-class ImportCompleteResultSchema(Schema):
-    symbol: str
-    success: bool
-    balance_sheets: int = 0
-    income_statements: int = 0
-    cash_flows: int = 0
-    ratios: int = 0
-    errors: List[str] = []
-
-
-class ImportCompleteSummarySchema(Schema):
-    total_symbols: int
-    successful_imports: int
-    failed_imports: int
-    total_balance_sheets: int
-    total_income_statements: int
-    total_cash_flows: int
-    total_ratios: int
-    processing_time: float
-    results: List[ImportCompleteResultSchema]
-
-
-@router.post("/import/all-complete", response=ImportCompleteSummarySchema)
-def import_all_complete(request, force_update: bool = False):
+    """Enqueue import only ratios for ALL symbols in database."""
+    return _enqueue_import(request, "calculate.import_ratio", {})
+
+
+@router.post("/import/all-complete", response={202: JobAcceptedOut})
+def import_all_complete(request, force_update: bool = False, resume_run_id: Optional[int] = None):
     """
-    Import ALL financial data (balance sheet, income statement, cash flow, ratio)
-    for ALL symbols in database with detailed logging for each table.
+    Enqueue import ALL financial data (balance sheet, income statement, cash flow, ratio)
+    for ALL symbols in database, tracked by an ImportRun.
 
     Query Parameters:
     - force_update (bool):
         - False (default): Resume mode - only import symbols missing data
         - True: Force update mode - re-import all symbols to get latest data
+    - resume_run_id (int): Continue an unfinished run from its last checkpoint
+
+    Poll GET /api/jobs/{job_id}; progress.run_id points to GET /api/stocks/import/runs/{run_id}.
+    """
+    return _enqueue_import(
+        request,
+        CALCULATE_IMPORT_ALL_COMPLETE,
+        {"force_update": force_update, "resume_run_id": resume_run_id},
+        dedupe_key=import_dedupe_key(
+            CALCULATE_IMPORT_ALL_COMPLETE, force_update=force_update, resume_run_id=resume_run_id
+        ),
+        max_attempts=RESUMABLE_IMPORT_MAX_ATTEMPTS,
+    )
+
+
+@router.post("/import/all-complete/sharded", response={202: JobAcceptedOut})
+def import_all_complete_sharded(request, force_update: bool = False, shards: int = 4, workers: Optional[int] = None):
+    """
+    Enqueue import ALL financial data chia theo shard (khoảng Symbol.id); mỗi shard được một
+    worker process claim qua lease và commit độc lập. Tiến độ: GET /api/stocks/import/runs/{run_id}.
     """
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_all_complete(force_update=force_update)
-        processing_time = time.time() - start_time
-
-        return ImportCompleteSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            total_ratios=result["total_ratios"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportCompleteResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    ratios=detail["ratios"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-    except Exception as e:
-        raise HttpError(500, f"Error importing all complete data: {str(e)}")
+    if not 1 <= shards <= 64:
+        raise HttpError(400, "shards must be between 1 and 64")
+    return _enqueue_import(
+        request,
+        CALCULATE_IMPORT_SHARDED,
+        {"force_update": force_update, "shards": shards, "workers": workers},
+        dedupe_key=import_dedupe_key(CALCULATE_IMPORT_SHARDED, force_update=force_update),
+    )
 
 
 @router.get("/cashflows/{symbol_id}", response=List[CashFlowOut])
@@ -1,7 +1,8 @@
-from typing import Optional, Dict, List, Any
+from typing import Any, Callable, Dict, List, Optional
 import os
 import logging
 import time
+from contextlib import nullcontext
 import pandas as pd
 
 from django.db import transaction
@@ -13,7 +14,9 @@ from apps.calculate.repositories import (
 )
 from apps.calculate.vnstock import VNStock
 from apps.calculate.models import BalanceSheet, IncomeStatement, CashFlow, Ratio
-from apps.stock.models import Symbol
+from apps.stock.models import ImportRun, ImportShard, Symbol
+from apps.stock.services.import_run_service import ImportRunTracker
+from apps.stock.services.import_shard_service import plan_shards
 from apps.stock.utils.safe import safe_int, safe_decimal, safe_str
 
 
@@ -193,16 +196,82 @@ class CalculateService:
 
         return result
 
-    def import_all_complete(self, force_update: bool = False) -> Dict[str, Any]:
+    def import_all_complete(
+        self,
+        force_update: bool = False,
+        resume_run_id: Optional[int] = None,
+        checkpoint_every: int = 25,
+        on_checkpoint: Optional[Callable[[ImportRun], None]] = None,
+    ) -> Dict[str, Any]:
         """
         Import ALL financial tables (balance sheet, income statement, cash flow, ratio)
-        for all symbols in database with detailed logging for each table.
+        for all symbols in database, tracked by an ImportRun.
 
         Args:
             force_update: If False (default), skip symbols that already have data.
                          If True, re-import all symbols (to get latest data from vnstock).
+            resume_run_id: Continue an unfinished ImportRun from its last checkpoint.
+            checkpoint_every: Persist progress every N symbols.
+            on_checkpoint: Called with the ImportRun after each checkpoint (job progress).
+
+        Returns a compact summary (counts, failed symbols, per-stage timings) instead of
+        one dict per symbol; the same data is readable mid-run from the ImportRun row.
         """
-        symbols = Symbol.objects.all().order_by('name')
+        tracker = ImportRunTracker.start_or_resume(
+            ImportRun.Kind.FINANCIAL,
+            params={"force_update": force_update},
+            resume_run_id=resume_run_id,
+            checkpoint_every=checkpoint_every,
+            on_checkpoint=on_checkpoint,
+        )
+        force_update = tracker.run.params.get("force_update", force_update)
+        mode_text = (
+            "FORCE UPDATE MODE: Re-importing all symbols"
+            if force_update
+            else "RESUME MODE: Importing only incomplete symbols"
+        )
+        logger.info(f"[IMPORT ALL COMPLETE] run={tracker.run.pk} {mode_text}")
+
+        try:
+            self._import_complete_tracked(Symbol.objects.all(), force_update, tracker)
+        except BaseException as e:
+            tracker.finish(error=f"Run aborted: {e!r}")
+            raise
+
+        tracker.finish()
+        summary = tracker.summary()
+        row_counts = summary["row_counts"]
+
+        logger.info(
+            f"[IMPORT ALL COMPLETE] run={tracker.run.pk} finished: "
+            f"{summary['processed'] - summary['failed']}/{summary['total_symbols']} successful"
+        )
+
+        return {
+            **summary,
+            "successful_symbols": summary["processed"] - summary["failed"],
+            "total_balance_sheets": row_counts.get("balance_sheet", 0),
+            "total_income_statements": row_counts.get("income_statement", 0),
+            "total_cash_flows": row_counts.get("cash_flow", 0),
+            "total_ratios": row_counts.get("ratio", 0),
+        }
+
+    def plan_sharded_import(self, force_update: bool = False, shard_count: int = 4) -> ImportRun:
+        """Chia Symbol.id thành `shard_count` khoảng để nhiều worker process import song song."""
+        return plan_shards(
+            ImportRun.Kind.FINANCIAL,
+            {"force_update": force_update},
+            Symbol.objects.values_list("id", flat=True),
+            shard_count,
+        )
+
+    def import_financial_shard(self, shard: ImportShard, tracker: ImportRunTracker) -> None:
+        """Import 4 bảng tài chính cho các symbol trong khoảng id của shard."""
+        symbols = Symbol.objects.filter(id__gte=shard.id_from, id__lte=shard.id_to)
+        self._import_complete_tracked(symbols, shard.run.params.get("force_update", False), tracker)
+
+    def _import_complete_tracked(self, symbols, force_update: bool, tracker: ImportRunTracker) -> None:
+        symbols = symbols.order_by('name')
 
         # Filter symbols based on force_update flag
         if not force_update:
@@ -219,128 +288,38 @@ class CalculateService:
                     symbols_to_import.append(symbol)
 
             symbols = symbols_to_import
-            mode_text = "RESUME MODE: Importing only incomplete symbols"
-        else:
-            mode_text = "FORCE UPDATE MODE: Re-importing all symbols"
 
+        symbols = tracker.pending(symbols)
         total_symbols = len(symbols)
 
-        result = {
-            "total_symbols": total_symbols,
-            "successful_symbols": 0,
-            "failed_symbols": 0,
-            "skipped_symbols": 0,
-            "total_balance_sheets": 0,
-            "total_income_statements": 0,
-            "total_cash_flows": 0,
-            "total_ratios": 0,
-            "errors": [],
-            "details": []
-        }
-
-        logger.info(f"[IMPORT ALL COMPLETE] {mode_text} - {total_symbols} symbols")
-        print(f"\n{'='*60}")
-        print(f"{mode_text}")
-        print(f"Total symbols to process: {total_symbols}")
-        print(f"{'='*60}\n")
-
         for idx, symbol in enumerate(symbols, 1):
-            symbol_detail = {
-                "symbol": symbol.name,
-                "success": False,
-                "balance_sheets": 0,
-                "income_statements": 0,
-                "cash_flows": 0,
-                "ratios": 0,
-                "errors": []
-            }
-
-            print(f"[{idx}/{total_symbols}] Processing: {symbol.name}")
-            logger.info(f"[IMPORT ALL COMPLETE] [{idx}/{total_symbols}] Processing symbol: {symbol.name}")
-
+            error_msg = None
             try:
-                # Fetch data from vnstock
-                fetch_success, bundle = self.vnstock_client.get_full_financial_data(symbol.name)
+                with tracker.stage("fetch", "financial_bundle"):
+                    fetch_success, bundle = self.vnstock_client.get_full_financial_data(symbol.name)
 
                 if not fetch_success or not bundle:
-                    error_msg = f"Failed to fetch data from vnstock"
-                    symbol_detail["errors"].append(error_msg)
-                    logger.error(f"[IMPORT ALL COMPLETE] {symbol.name} - {error_msg}")
-                    print(f"  ✗ FAILED: {error_msg}\n")
-                    result["failed_symbols"] += 1
+                    error_msg = "Failed to fetch data from vnstock"
                 else:
                     # Import all tables in transaction
                     with transaction.atomic():
-                        # 1. Import Balance Sheets
-                        print(f"  → Importing Balance Sheets...", end=" ")
-                        balance_count = self._import_balance_sheets(symbol, bundle)
-                        symbol_detail["balance_sheets"] = balance_count
-                        result["total_balance_sheets"] += balance_count
-                        print(f"✓ SUCCESS ({balance_count} records)")
-                        logger.info(f"[IMPORT ALL COMPLETE] {symbol.name} - Balance Sheets: {balance_count} records imported")
-
-                        # 2. Import Income Statements
-                        print(f"  → Importing Income Statements...", end=" ")
-                        income_count = self._import_income_statements(symbol, bundle)
-                        symbol_detail["income_statements"] = income_count
-                        result["total_income_statements"] += income_count
-                        print(f"✓ SUCCESS ({income_count} records)")
-                        logger.info(f"[IMPORT ALL COMPLETE] {symbol.name} - Income Statements: {income_count} records imported")
-
-                        # 3. Import Cash Flows
-                        print(f"  → Importing Cash Flows...", end=" ")
-                        cashflow_count = self._import_cash_flows(symbol, bundle)
-                        symbol_detail["cash_flows"] = cashflow_count
-                        result["total_cash_flows"] += cashflow_count
-                        print(f"✓ SUCCESS ({cashflow_count} records)")
-                        logger.info(f"[IMPORT ALL COMPLETE] {symbol.name} - Cash Flows: {cashflow_count} records imported")
-
-                        # 4. Import Ratios
-                        print(f"  → Importing Ratios...", end=" ")
-                        ratio_count = self._import_ratios(symbol, bundle)
-                        symbol_detail["ratios"] = ratio_count
-                        result["total_ratios"] += ratio_count
-                        print(f"✓ SUCCESS ({ratio_count} records)")
-                        logger.info(f"[IMPORT ALL COMPLETE] {symbol.name} - Ratios: {ratio_count} records imported")
-
-                        symbol_detail["success"] = True
-                        result["successful_symbols"] += 1
-
-                        print(f"  ✓ COMPLETED: All tables imported successfully\n")
-                        logger.info(f"[IMPORT ALL COMPLETE] {symbol.name} - All tables imported successfully")
+                        self._import_balance_sheets(symbol, bundle, tracker)
+                        self._import_income_statements(symbol, bundle, tracker)
+                        self._import_cash_flows(symbol, bundle, tracker)
+                        self._import_ratios(symbol, bundle, tracker)
 
             except Exception as e:
                 error_msg = f"Import error: {str(e)}"
-                symbol_detail["errors"].append(error_msg)
-                result["failed_symbols"] += 1
-                logger.error(f"[IMPORT ALL COMPLETE] {symbol.name} - {error_msg}")
-                print(f"  ✗ FAILED: {error_msg}\n")
 
-            finally:
-                result["details"].append(symbol_detail)
+            if error_msg:
+                logger.error(f"[IMPORT ALL COMPLETE] {symbol.name} - {error_msg}")
+            tracker.symbol_done(symbol.name, ok=error_msg is None, error=error_msg)
 
-                # Sleep between symbols to avoid rate limiting
-                if self.sleep_between_symbols > 0 and idx < total_symbols:
+            # Sleep between symbols to avoid rate limiting
+            if self.sleep_between_symbols > 0 and idx < total_symbols:
+                with tracker.stage("sleep"):
                     time.sleep(self.sleep_between_symbols)
 
-        # Final summary
-        print(f"\n{'='*60}")
-        print(f"IMPORT COMPLETE SUMMARY")
-        print(f"{'='*60}")
-        print(f"Mode:                 {'FORCE UPDATE' if force_update else 'RESUME'}")
-        print(f"Total Symbols:        {result['total_symbols']}")
-        print(f"Successful:           {result['successful_symbols']}")
-        print(f"Failed:               {result['failed_symbols']}")
-        print(f"Balance Sheets:       {result['total_balance_sheets']} records")
-        print(f"Income Statements:    {result['total_income_statements']} records")
-        print(f"Cash Flows:           {result['total_cash_flows']} records")
-        print(f"Ratios:               {result['total_ratios']} records")
-        print(f"{'='*60}\n")
-
-        logger.info(f"[IMPORT ALL COMPLETE] Finished: {result['successful_symbols']}/{result['total_symbols']} successful")
-
-        return result
-
     def _import_symbol_data(self, symbol) -> Dict[str, Any]:
         """Import financial data for a single symbol."""
         symbol_result = {
@@ -380,81 +359,63 @@ class CalculateService:
         
         return symbol_result
 
-    def _import_balance_sheets(self, symbol, bundle) -> int:
-        """Import balance sheet data for a symbol."""
-        count = 0
-        balance_sheet_df = bundle.get('balance_sheet_df', pd.DataFrame())
-        
-        if balance_sheet_df.empty:
-            return count
-            
-        for _, row in balance_sheet_df.iterrows():
-            try:
-                mapped_data = self._map_balance_sheet_data(symbol, row.to_dict())
-                if mapped_data:
-                    upsert_balance_sheet(mapped_data)
-                    count += 1
-            except Exception as e:
-                logger.error(f"Error importing balance sheet for {symbol.name}: {str(e)}")
-        
-        return count
+    def _import_table(self, symbol, df, mapper, upsert, table: str, tracker=None) -> int:
+        """Map hết các dòng rồi mới ghi, để đo riêng thời gian map và write theo bảng."""
+        if df is None or df.empty:
+            return 0
 
-    def _import_income_statements(self, symbol, bundle) -> int:
-        """Import income statement data for a symbol."""
-        count = 0
-        income_df = bundle.get('income_statement_df', pd.DataFrame())
-        
-        if income_df.empty:
-            return count
-            
-        for _, row in income_df.iterrows():
-            try:
-                mapped_data = self._map_income_statement_data(symbol, row.to_dict())
-                if mapped_data:
-                    upsert_income_statement(mapped_data)
-                    count += 1
-            except Exception as e:
-                logger.error(f"Error importing income statement for {symbol.name}: {str(e)}")
-        
-        return count
+        stage = tracker.stage if tracker else (lambda *args: nullcontext())
+
+        mapped_rows = []
+        with stage("map", table):
+            for _, row in df.iterrows():
+                try:
+                    mapped_data = mapper(symbol, row.to_dict())
+                    if mapped_data:
+                        mapped_rows.append(mapped_data)
+                except Exception as e:
+                    logger.error(f"Error mapping {table} for {symbol.name}: {str(e)}")
 
-    def _import_cash_flows(self, symbol, bundle) -> int:
-        """Import cash flow data for a symbol."""
         count = 0
-        cash_flow_df = bundle.get('cash_flow_df', pd.DataFrame())
-        
-        if cash_flow_df.empty:
-            return count
-            
-        for _, row in cash_flow_df.iterrows():
-            try:
-                mapped_data = self._map_cash_flow_data(symbol, row.to_dict())
-                if mapped_data:
-                    upsert_cash_flow(mapped_data)
+        with stage("write", table):
+            for mapped_data in mapped_rows:
+                try:
+                    upsert(mapped_data)
                     count += 1
-            except Exception as e:
-                logger.error(f"Error importing cash flow for {symbol.name}: {str(e)}")
-        
+                except Exception as e:
+                    logger.error(f"Error importing {table} for {symbol.name}: {str(e)}")
+
+        if tracker:
+            tracker.add_rows(table, count)
         return count
 
-    def _import_ratios(self, symbol, bundle) -> int:
-        """Import ratio data for a symbol."""
-        count = 0
-        ratio_df = bundle.get('ratios_df', pd.DataFrame())
+    def _import_balance_sheets(self, symbol, bundle, tracker=None) -> int:
+        """Import balance sheet data for a symbol."""
+        return self._import_table(
+            symbol, bundle.get('balance_sheet_df'), self._map_balance_sheet_data,
+            upsert_balance_sheet, "balance_sheet", tracker,
+        )
 
-        if ratio_df.empty:
-            return count
+    def _import_income_statements(self, symbol, bundle, tracker=None) -> int:
+        """Import income statement data for a symbol."""
+        return self._import_table(
+            symbol, bundle.get('income_statement_df'), self._map_income_statement_data,
+            upsert_income_statement, "income_statement", tracker,
+        )
 
-        for _, row in ratio_df.iterrows():
-            try:
-                mapped_data = self._map_ratio_data(symbol, row.to_dict())
-                if mapped_data:
-                    upsert_ratio(mapped_data)
-                    count += 1
-            except Exception as e:
-                logger.error(f"Error importing ratio for {symbol.name}: {str(e)}")
+    def _import_cash_flows(self, symbol, bundle, tracker=None) -> int:
+        """Import cash flow data for a symbol."""
+        return self._import_table(
+            symbol, bundle.get('cash_flow_df'), self._map_cash_flow_data,
+            upsert_cash_flow, "cash_flow", tracker,
+        )
 
-        return count
+    def _import_ratios(self, symbol, bundle, tracker=None) -> int:
+        """Import ratio data for a symbol."""
+        return self._import_table(
+            symbol, bundle.get('ratios_df'), self._map_ratio_data,
+            upsert_ratio, "ratio", tracker,
+        )
 
     def _map_balance_sheet_data(self, symbol, data) -> Dict[str, Any]:
         """Map vnstock balance sheet data theo mapping chính xác"""
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.jobs"
+    verbose_name = "Background Jobs"
+
+    def ready(self):
+        # Đăng ký các job handler (chỉ import nhẹ, service nặng được import lazy trong handler)
+        from apps.jobs import handlers  # noqa: F401
@@ -0,0 +1,211 @@
+"""
+Job handler cho các import dài. Service được import lazy để app khởi động không phải
+load vnstock/pandas; handler chỉ giữ lại kết quả gọn (không lưu danh sách dict theo symbol).
+"""
+from typing import Any, Dict, List, Optional
+
+from apps.jobs.registry import register
+from apps.jobs.services import JobService
+
+STOCK_IMPORT_ALL = "stock.import_all"
+STOCK_IMPORT_STEPS = {
+    "symbols": "import_all_symbols_from_vnstock",
+    "companies": "import_companies_from_vnstock",
+    "industries": "import_industries_for_symbols",
+    "shareholders": "import_shareholders_for_all_symbols",
+    "officers": "import_officers_for_all_symbols",
+    "events": "import_events_for_all_symbols",
+    "sub_companies": "import_sub_companies_for_all_symbols",
+}
+# Các step cần tham số exchange
+STOCK_STEPS_WITH_EXCHANGE = {"symbols", "companies"}
+
+CALCULATE_IMPORT_ALL_COMPLETE = "calculate.import_all_complete"
+CALCULATE_IMPORT_SHARDED = "calculate.import_all_complete_sharded"
+STOCK_IMPORT_SHARDED = "stock.import_sharded"
+IMPORT_SHARD_WORKER = "import.shard_worker"
+# Import có ImportRun: worker chết giữa chừng thì job được requeue và resume từ run_id trong progress
+RESUMABLE_IMPORT_MAX_ATTEMPTS = 3
+
+NOTIFICATION_SIGNAL_FANOUT = "notification.signal_fanout"
+NOTIFICATION_BACKTEST_FORWARD = "notification.backtest_forward"
+SEPAY_PROCESS_WEBHOOKS = "seapay.process_webhooks"
+CALCULATE_IMPORT_TABLES = {
+    "balance": "import_all_financials",
+    "income": "import_income_statements_all",
+    "cashflow": "import_cash_flows_all",
+    "ratio": "import_ratios_all",
+}
+
+
+def import_dedupe_key(kind: str, *scope: Any, force_update: bool = False, resume_run_id: Optional[int] = None) -> str:
+    """Dedupe key của job import: request force/resume không bị gộp vào job thường đang chờ"""
+    parts = [kind, *(str(s) for s in scope)]
+    if force_update:
+        parts.append("force")
+    if resume_run_id:
+        parts.append(f"run{resume_run_id}")
+    return ":".join(parts)
+
+
+def _run_progress(ctx):
+    """Đẩy checkpoint của ImportRun thành progress của job."""
+
+    def on_checkpoint(run):
+        ctx.progress(
+            force=True,
+            run_id=run.pk,
+            total=run.total_symbols,
+            processed=run.processed_count,
+            failed=run.failed_count,
+            last_symbol=run.last_symbol,
+        )
+
+    return on_checkpoint
+
+
+def _compact(result: Dict[str, Any]) -> Dict[str, Any]:
+    compact = {k: v for k, v in result.items() if k not in ("details", "errors", "results")}
+    details: List[Dict[str, Any]] = result.get("details") or []
+    compact["failed_symbols"] = [
+        {"symbol": d.get("symbol"), "errors": d.get("errors", [])[:3]} for d in details if not d.get("success")
+    ][:200]
+    return compact
+
+
+@register(STOCK_IMPORT_ALL)
+def stock_import_all(ctx) -> Dict[str, Any]:
+    from apps.stock.services.symbol_service import SymbolService
+
+    return SymbolService().import_all_symbols(
+        exchange=ctx.payload.get("exchange", "HSX"),
+        force_update=ctx.payload.get("force_update", False),
+        resume_run_id=ctx.payload.get("resume_run_id") or ctx.job.progress.get("run_id"),
+        on_checkpoint=_run_progress(ctx),
+    )
+
+
+def _stock_step_handler(step: str, method_name: str):
+    def handler(ctx) -> Dict[str, Any]:
+        from apps.stock.services.vnstock_import_service import VnstockImportService
+
+        method = getattr(VnstockImportService(), method_name)
+        if step in STOCK_STEPS_WITH_EXCHANGE:
+            results = method(ctx.payload.get("exchange", "HSX"))
+        else:
+            results = method()
+        return {"step": step, "processed": len(results or [])}
+
+    return handler
+
+
+for _step, _method in STOCK_IMPORT_STEPS.items():
+    register(f"stock.import_{_step}")(_stock_step_handler(_step, _method))
+
+
+@register(CALCULATE_IMPORT_ALL_COMPLETE)
+def calculate_import_all_complete(ctx) -> Dict[str, Any]:
+    from apps.calculate.services.financial_service import CalculateService
+
+    return CalculateService().import_all_complete(
+        force_update=ctx.payload.get("force_update", False),
+        resume_run_id=ctx.payload.get("resume_run_id") or ctx.job.progress.get("run_id"),
+        on_checkpoint=_run_progress(ctx),
+    )
+
+
+def _calculate_table_handler(method_name: str):
+    def handler(ctx) -> Dict[str, Any]:
+        from apps.calculate.services.financial_service import CalculateService
+
+        return _compact(getattr(CalculateService(), method_name)())
+
+    return handler
+
+
+for _table, _method in CALCULATE_IMPORT_TABLES.items():
+    register(f"calculate.import_{_table}")(_calculate_table_handler(_method))
+
+
+def _enqueue_shard_workers(run, workers=None) -> Dict[str, Any]:
+    """Mỗi job worker claim shard cho đến khi run xong; các job được worker process khác nhau nhận."""
+    shard_count = run.params.get("shard_count", 0)
+    count = min(workers or shard_count, shard_count)
+    service = JobService()
+    job_ids = [
+        service.enqueue(IMPORT_SHARD_WORKER, {"run_id": run.pk}, dedupe_key=f"{IMPORT_SHARD_WORKER}:{run.pk}:{i}")[0].pk
+        for i in range(count)
+    ]
+    return {"run_id": run.pk, "shard_count": shard_count, "worker_jobs": job_ids}
+
+
+@register(STOCK_IMPORT_SHARDED)
+def stock_import_sharded(ctx) -> Dict[str, Any]:
+    from apps.stock.services.symbol_service import SymbolService
+
+    run = SymbolService().plan_sharded_import(
+        exchange=ctx.payload.get("exchange", "HSX"),
+        force_update=ctx.payload.get("force_update", False),
+        shard_count=ctx.payload.get("shards", 4),
+    )
+    return _enqueue_shard_workers(run, ctx.payload.get("workers"))
+
+
+@register(CALCULATE_IMPORT_SHARDED)
+def calculate_import_sharded(ctx) -> Dict[str, Any]:
+    from apps.calculate.services.financial_service import CalculateService
+
+    run = CalculateService().plan_sharded_import(
+        force_update=ctx.payload.get("force_update", False),
+        shard_count=ctx.payload.get("shards", 4),
+    )
+    return _enqueue_shard_workers(run, ctx.payload.get("workers"))
+
+
+@register(IMPORT_SHARD_WORKER)
+def import_shard_worker(ctx) -> Dict[str, Any]:
+    from apps.stock.models import ImportRun
+    from apps.stock.services.import_shard_service import ShardWorker
+
+    run = ImportRun.objects.get(pk=ctx.payload["run_id"])
+    if run.kind == ImportRun.Kind.STOCK:
+        from apps.stock.services.symbol_service import SymbolService
+
+        process_shard = SymbolService().import_symbol_shard
+    else:
+        from apps.calculate.services.financial_service import CalculateService
+
+        process_shard = CalculateService().import_financial_shard
+
+    def on_checkpoint(shard):
+        ctx.progress(
+            force=True,
+            run_id=run.pk,
+            shard_index=shard.shard_index,
+            processed=shard.processed_count,
+            failed=shard.failed_count,
+            last_symbol=shard.last_symbol,
+        )
+
+    return ShardWorker(run.pk, ctx.worker_id, process_shard, on_checkpoint=on_checkpoint).run()
+
+
+@register(NOTIFICATION_SIGNAL_FANOUT)
+def notification_signal_fanout(ctx) -> Dict[str, Any]:
+    from apps.notification.services.webhook_service import fan_out_signal
+
+    return fan_out_signal(ctx.payload["webhook_id"], ctx.payload["signal"])
+
+
+@register(NOTIFICATION_BACKTEST_FORWARD)
+def notification_backtest_forward(ctx) -> Dict[str, Any]:
+    from apps.notification.services.webhook_service import forward_to_backtest
+
+    return forward_to_backtest(ctx.payload["metadata"])
+
+
+@register(SEPAY_PROCESS_WEBHOOKS)
+def sepay_process_webhooks(ctx) -> Dict[str, Any]:
+    from apps.seapay.services.webhook_inbox_service import SepayWebhookInboxService
+
+    return SepayWebhookInboxService().process_pending()
@@ -0,0 +1,86 @@
+"""
+Scheduler cho các job định kỳ khai báo trong apps.jobs.schedules (thay cho cron).
+Chạy: python manage.py run_scheduler
+      python manage.py run_scheduler --list
+      python manage.py run_scheduler --once --only seapay.expire_licenses
+Có thể chạy nhiều instance để dự phòng: chỉ instance giữ advisory lock (leader) fire job.
+"""
+import os
+import signal
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.jobs.scheduler import Scheduler, jitter_for, slot_for
+from apps.jobs.schedules import SCHEDULES
+
+
+class Command(BaseCommand):
+    help = 'Run periodic jobs (leader-elected scheduler, replaces cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', type=str, default=None, help='Comma-separated schedule names to run')
+        parser.add_argument('--once', action='store_true', help='Run one tick inline and exit')
+        parser.add_argument('--list', action='store_true', help='Print schedules with their next slot and exit')
+        parser.add_argument(
+            '--tick',
+            type=float,
+            default=None,
+            help='Seconds between schedule checks (default: SCHEDULER_TICK_SECONDS)'
+        )
+
+    def handle(self, *args, **options):
+        schedules = [s for s in SCHEDULES if s.name not in settings.SCHEDULER_DISABLED]
+        if options['only']:
+            names = {name.strip() for name in options['only'].split(',')}
+            unknown = names - {s.name for s in SCHEDULES}
+            if unknown:
+                raise CommandError(f'Unknown schedule(s): {", ".join(sorted(unknown))}')
+            schedules = [s for s in schedules if s.name in names]
+
+        if options['list']:
+            now = timezone.now()
+            for schedule in schedules:
+                slot = slot_for(schedule, now) + timedelta(seconds=schedule.every_seconds)
+                self.stdout.write(
+                    f'{schedule.name:32} every {schedule.every_seconds}s (jitter {schedule.jitter_seconds}s), '
+                    f'next at {slot + jitter_for(schedule, slot):%Y-%m-%d %H:%M:%S}'
+                )
+            return
+
+        owner = f'{socket.gethostname()}:{os.getpid()}'
+        scheduler = Scheduler(schedules, owner=owner, inline=options['once'])
+
+        if options['once']:
+            for run in scheduler.tick():
+                self.stdout.write(f'{run.name} -> {run.status} ({run.duration_ms}ms)')
+            scheduler.release_leadership()
+            return
+
+        tick = options['tick'] or settings.SCHEDULER_TICK_SECONDS
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write('Stopping scheduler after running jobs finish...')
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(f'Scheduler {owner} started: {[s.name for s in schedules]}')
+        try:
+            while not stop_event.is_set():
+                for run in scheduler.tick():
+                    self.stdout.write(f'[{owner}] fired {run.name} for slot {run.scheduled_for:%Y-%m-%d %H:%M:%S}')
+                stop_event.wait(tick)
+            scheduler.wait_for_running()
+        finally:
+            scheduler.release_leadership()
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Scheduler {owner} stopped'))
@@ -0,0 +1,94 @@
+"""
+Worker xử lý job nền từ bảng jobs (SELECT ... FOR UPDATE SKIP LOCKED)
+Chạy: python manage.py run_worker --concurrency 4
+      python manage.py run_worker --kinds stock.import_all,calculate.import_all_complete
+Có thể chạy nhiều process worker song song trên nhiều máy, không worker nào lấy trùng job.
+"""
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from apps.jobs.registry import registered_kinds
+from apps.jobs.services import JobService
+
+STALE_SWEEP_INTERVAL_SECONDS = 30
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers (DB queue, no external broker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Worker threads in this process (default: 1)')
+        parser.add_argument('--kinds', type=str, default=None, help='Comma-separated job kinds to process (default: all)')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Seconds to sleep when the queue is empty (default: JOB_POLL_INTERVAL_SECONDS)'
+        )
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        kinds = [k.strip() for k in options['kinds'].split(',')] if options['kinds'] else None
+        poll_interval = options['poll_interval'] or settings.JOB_POLL_INTERVAL_SECONDS
+        concurrency = max(options['concurrency'], 1)
+        self.stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write('Stopping after current jobs finish...')
+            self.stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        base_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(
+            f'Worker {base_id} started: concurrency={concurrency}, kinds={kinds or registered_kinds()}'
+        )
+
+        threads = [
+            threading.Thread(
+                target=self._work,
+                args=(f'{base_id}:{i}', kinds, poll_interval, options['burst'], i == 0),
+                daemon=True,
+            )
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        # join có timeout để main thread vẫn nhận được signal
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {base_id} stopped'))
+
+    def _work(self, worker_id, kinds, poll_interval, burst, sweeps_stale):
+        service = JobService()
+        last_sweep = 0.0
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                if sweeps_stale and time.monotonic() - last_sweep >= STALE_SWEEP_INTERVAL_SECONDS:
+                    stale = service.requeue_stale()
+                    if stale['requeued'] or stale['failed']:
+                        self.stdout.write(
+                            f"Stale jobs: {stale['requeued']} requeued, {stale['failed']} failed (no attempts left)"
+                        )
+                    last_sweep = time.monotonic()
+
+                job = service.run_next(worker_id, kinds)
+                if job is None:
+                    if burst:
+                        return
+                    self.stop_event.wait(poll_interval)
+                    continue
+                self.stdout.write(f'[{worker_id}] job {job.pk} {job.kind} -> {job.status}')
+        finally:
+            connection.close()
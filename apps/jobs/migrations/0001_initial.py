@@ -0,0 +1,124 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:06
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        db_comment="Tên handler đã đăng ký, ví dụ stock.import_all",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "payload",
+                    models.JSONField(
+                        blank=True,
+                        db_comment="Tham số truyền cho handler",
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "priority",
+                    models.IntegerField(db_comment="Số lớn hơn được chạy trước", default=0),
+                ),
+                (
+                    "dedupe_key",
+                    models.CharField(
+                        blank=True,
+                        db_comment="Chỉ một job queued/running cho mỗi key, tránh 2 worker import cùng dữ liệu",
+                        max_length=200,
+                        null=True,
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0)),
+                ("max_attempts", models.IntegerField(default=1)),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        db_comment="Không claim trước thời điểm này (dùng cho retry backoff)"
+                    ),
+                ),
+                ("locked_by", models.CharField(blank=True, max_length=100, null=True)),
+                ("heartbeat_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "progress",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                (
+                    "result",
+                    models.JSONField(
+                        blank=True,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                    ),
+                ),
+                ("error", models.TextField(blank=True, null=True)),
+                ("created_by_id", models.BigIntegerField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "jobs",
+                "db_table_comment": "Background job queue",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "queued")),
+                        fields=["-priority", "run_after", "id"],
+                        name="idx_jobs_claimable",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "running")),
+                        fields=["heartbeat_at"],
+                        name="idx_jobs_running_heartbeat",
+                    ),
+                    models.Index(fields=["kind", "-created_at"], name="idx_jobs_kind_created"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status__in", ["queued", "running"])),
+                        fields=("dedupe_key",),
+                        name="uniq_jobs_active_dedupe_key",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:31
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduledRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        db_comment="Tên schedule trong apps.jobs.schedules",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "scheduled_for",
+                    models.DateTimeField(db_comment="Slot theo lịch (chưa cộng jitter)"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="running",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "owner",
+                    models.CharField(
+                        db_comment="host:pid của scheduler đã chạy slot này",
+                        max_length=100,
+                    ),
+                ),
+                ("started_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("duration_ms", models.IntegerField(blank=True, null=True)),
+                (
+                    "result",
+                    models.JSONField(
+                        blank=True,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                    ),
+                ),
+                ("error", models.TextField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "scheduled_runs",
+                "db_table_comment": "Run history of periodic schedules",
+                "indexes": [
+                    models.Index(
+                        fields=["name", "-scheduled_for"],
+                        name="idx_sched_runs_name_slot",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("name", "scheduled_for"),
+                        name="uniq_sched_runs_name_slot",
+                    )
+                ],
+            },
+        ),
+    ]
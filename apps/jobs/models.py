@@ -0,0 +1,109 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+
+
+ACTIVE_JOB_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class Job(models.Model):
+    """
+    Hàng đợi job nền lưu trong Postgres (không cần broker).
+    Worker claim job bằng SELECT ... FOR UPDATE SKIP LOCKED nên nhiều worker chạy song song
+    không bao giờ lấy trùng một job.
+    """
+    kind = models.CharField(max_length=100, db_comment="Tên handler đã đăng ký, ví dụ stock.import_all")
+    payload = models.JSONField(
+        default=dict, blank=True, encoder=DjangoJSONEncoder, db_comment="Tham số truyền cho handler"
+    )
+    status = models.CharField(max_length=20, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    priority = models.IntegerField(default=0, db_comment="Số lớn hơn được chạy trước")
+    dedupe_key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        db_comment="Chỉ một job queued/running cho mỗi key, tránh 2 worker import cùng dữ liệu",
+    )
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=1)
+    run_after = models.DateTimeField(db_comment="Không claim trước thời điểm này (dùng cho retry backoff)")
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    progress = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(null=True, blank=True)
+    created_by_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "jobs"
+        db_table_comment = "Background job queue"
+        indexes = [
+            # Index cho truy vấn claim: job queued đến hạn, ưu tiên cao trước, cũ trước
+            models.Index(
+                fields=["-priority", "run_after", "id"],
+                name="idx_jobs_claimable",
+                condition=models.Q(status="queued"),
+            ),
+            models.Index(
+                fields=["heartbeat_at"],
+                name="idx_jobs_running_heartbeat",
+                condition=models.Q(status="running"),
+            ),
+            models.Index(fields=["kind", "-created_at"], name="idx_jobs_kind_created"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="uniq_jobs_active_dedupe_key",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class ScheduledRunStatus(models.TextChoices):
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+
+
+class ScheduledRun(models.Model):
+    """
+    Lịch sử chạy của scheduler (run_scheduler). Mỗi schedule chỉ có một row cho mỗi slot
+    (name, scheduled_for) nên một slot không bao giờ chạy hai lần, kể cả khi có nhiều scheduler.
+    """
+    name = models.CharField(max_length=100, db_comment="Tên schedule trong apps.jobs.schedules")
+    scheduled_for = models.DateTimeField(db_comment="Slot theo lịch (chưa cộng jitter)")
+    status = models.CharField(
+        max_length=20, choices=ScheduledRunStatus.choices, default=ScheduledRunStatus.RUNNING
+    )
+    owner = models.CharField(max_length=100, db_comment="host:pid của scheduler đã chạy slot này")
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.IntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        db_table = "scheduled_runs"
+        db_table_comment = "Run history of periodic schedules"
+        indexes = [
+            models.Index(fields=["name", "-scheduled_for"], name="idx_sched_runs_name_slot"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["name", "scheduled_for"], name="uniq_sched_runs_name_slot"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.scheduled_for:%Y-%m-%d %H:%M:%S} ({self.status})"
@@ -0,0 +1,24 @@
+"""
+Registry tên job -> handler. Handler nhận JobContext và trả về dict kết quả (JSON được).
+"""
+from typing import Any, Callable, Dict, Optional
+
+JobHandler = Callable[..., Optional[Dict[str, Any]]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register(kind: str) -> Callable[[JobHandler], JobHandler]:
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def get_handler(kind: str) -> Optional[JobHandler]:
+    return _handlers.get(kind)
+
+
+def registered_kinds():
+    return sorted(_handlers)
@@ -0,0 +1,138 @@
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.jobs.models import ACTIVE_JOB_STATUSES, Job, JobStatus
+
+
+def enqueue_job(
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    priority: int = 0,
+    max_attempts: int = 1,
+    dedupe_key: Optional[str] = None,
+    created_by_id: Optional[int] = None,
+) -> tuple[Job, bool]:
+    """
+    Tạo job mới; nếu đã có job queued/running cùng dedupe_key thì trả lại job đó.
+    Trả về (job, created).
+    """
+    if dedupe_key:
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status__in=ACTIVE_JOB_STATUSES).first()
+        if existing:
+            return existing, False
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                kind=kind,
+                payload=payload or {},
+                priority=priority,
+                max_attempts=max_attempts,
+                dedupe_key=dedupe_key,
+                created_by_id=created_by_id,
+                run_after=timezone.now(),
+            )
+        return job, True
+    except IntegrityError:
+        # Request khác vừa enqueue cùng key giữa lúc check và insert
+        return Job.objects.get(dedupe_key=dedupe_key, status__in=ACTIVE_JOB_STATUSES), False
+
+
+def claim_next_job(worker_id: str, kinds: Optional[Iterable[str]] = None) -> Optional[Job]:
+    """
+    Claim một job queued đến hạn. SKIP LOCKED bỏ qua các row worker khác đang khoá nên
+    các worker không chờ nhau và không lấy trùng job; UPDATE có điều kiện status giữ
+    đúng cả trên backend không hỗ trợ FOR UPDATE (SQLite khi test).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = Job.objects.filter(status=JobStatus.QUEUED, run_after__lte=now)
+        if kinds:
+            candidates = candidates.filter(kind__in=list(kinds))
+        job = (
+            candidates.select_for_update(skip_locked=True)
+            .order_by("-priority", "run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        claimed = Job.objects.filter(pk=job.pk, status=JobStatus.QUEUED).update(
+            status=JobStatus.RUNNING,
+            locked_by=worker_id,
+            heartbeat_at=now,
+            started_at=now,
+            attempts=job.attempts + 1,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def heartbeat(job_id: int, worker_id: str, progress: Optional[Dict[str, Any]] = None) -> bool:
+    """Cập nhật heartbeat (và progress nếu có); False nếu job không còn thuộc worker này."""
+    fields = {"heartbeat_at": timezone.now()}
+    if progress is not None:
+        fields["progress"] = progress
+    return bool(
+        Job.objects.filter(pk=job_id, status=JobStatus.RUNNING, locked_by=worker_id).update(**fields)
+    )
+
+
+def mark_succeeded(job_id: int, worker_id: str, result: Optional[Dict[str, Any]]) -> bool:
+    return bool(
+        Job.objects.filter(pk=job_id, status=JobStatus.RUNNING, locked_by=worker_id).update(
+            status=JobStatus.SUCCEEDED,
+            result=result,
+            error=None,
+            finished_at=timezone.now(),
+            locked_by=None,
+        )
+    )
+
+
+def mark_failed(job: Job, worker_id: str, error: str, retry_backoff_seconds: int = 30) -> bool:
+    """Còn lượt thì trả lại hàng đợi với backoff luỹ thừa, hết lượt thì đánh dấu failed."""
+    now = timezone.now()
+    running = Job.objects.filter(pk=job.pk, status=JobStatus.RUNNING, locked_by=worker_id)
+    if job.attempts < job.max_attempts:
+        delay = retry_backoff_seconds * (2 ** (job.attempts - 1))
+        return bool(
+            running.update(
+                status=JobStatus.QUEUED,
+                error=error,
+                run_after=now + timedelta(seconds=delay),
+                locked_by=None,
+            )
+        )
+    return bool(
+        running.update(status=JobStatus.FAILED, error=error, finished_at=now, locked_by=None)
+    )
+
+
+def requeue_stale_jobs(stale_seconds: int) -> Dict[str, int]:
+    """
+    Job running của worker đã chết (quá hạn heartbeat): còn lượt thì trả về hàng đợi, hết lượt
+    (attempts >= max_attempts) thì failed, để job làm sập worker không bị chạy lại mãi.
+    Returns: requeued, failed
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=JobStatus.RUNNING, heartbeat_at__lt=now - timedelta(seconds=stale_seconds))
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=JobStatus.FAILED,
+        locked_by=None,
+        finished_at=now,
+        error="Failed after worker heartbeat timeout (no attempts left)",
+    )
+    requeued = stale.filter(attempts__lt=F("max_attempts")).update(
+        status=JobStatus.QUEUED,
+        locked_by=None,
+        run_after=now,
+        error="Requeued after worker heartbeat timeout",
+    )
+    return {"requeued": requeued, "failed": failed}
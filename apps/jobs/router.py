@@ -0,0 +1,71 @@
+"""Job status / progress API."""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from ninja import Router, Schema
+from ninja.errors import HttpError
+
+from apps.jobs.models import Job
+from apps.jobs.services import JobService
+from core.jwt_auth import JWTAuth
+
+router = Router(tags=["jobs"])
+
+
+class JobOut(Schema):
+    id: int
+    kind: str
+    status: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    progress: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    locked_by: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobAcceptedOut(Schema):
+    job_id: int
+    kind: str
+    status: str
+    created: bool
+    status_url: str
+
+
+def job_accepted(job: Job, created: bool):
+    """Response 202 chung cho các endpoint chỉ enqueue job."""
+    return 202, {
+        "job_id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "created": created,
+        "status_url": f"/api/jobs/{job.pk}",
+    }
+
+
+def _require_staff(request) -> None:
+    # payload/error của job chứa tín hiệu TradingView, traceback và tên host worker
+    if not getattr(request.auth, "is_staff", False):
+        raise HttpError(403, "Staff only")
+
+
+@router.get("/{job_id}", response=JobOut, auth=JWTAuth())
+def get_job(request, job_id: int):
+    """Trạng thái và progress của một job"""
+    _require_staff(request)
+    job = JobService().get_job(job_id)
+    if job is None:
+        raise HttpError(404, f"Job {job_id} not found")
+    return job
+
+
+@router.get("", response=List[JobOut], auth=JWTAuth())
+def list_jobs(request, kind: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    """Danh sách job gần nhất, lọc theo kind/status"""
+    _require_staff(request)
+    return JobService().list_jobs(kind=kind, status=status, limit=min(max(limit, 1), 200))
@@ -0,0 +1,170 @@
+"""
+Scheduler cho các job định kỳ (apps.jobs.schedules), chạy bằng management command run_scheduler.
+
+- Leader election: chỉ process giữ được pg_try_advisory_lock (session lock trên connection của
+  main thread) mới fire job; các instance khác chờ, tự lên thay khi leader chết/mất connection.
+- Mỗi slot (name, scheduled_for) là một row ScheduledRun unique nên một slot chỉ chạy một lần.
+- Jitter tính từ hash(name, slot) nên mọi instance cùng đồng ý thời điểm fire của một slot.
+- Overlap: schedule còn run RUNNING thì slot mới bị bỏ qua (gộp vào lần chạy sau).
+"""
+import logging
+import math
+import random
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional
+
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+
+from apps.jobs.models import ScheduledRun, ScheduledRunStatus
+from apps.jobs.schedules import Schedule
+
+logger = logging.getLogger("app.jobs")
+
+# Key advisory lock dùng chung cho mọi instance run_scheduler
+SCHEDULER_LOCK_KEY = 7_210_401
+
+
+def slot_for(schedule: Schedule, now: datetime) -> datetime:
+    """Slot gần nhất <= now của schedule, căn theo epoch + offset"""
+    ts = now.timestamp() - schedule.offset_seconds
+    slot = math.floor(ts / schedule.every_seconds) * schedule.every_seconds + schedule.offset_seconds
+    return datetime.fromtimestamp(slot, tz=dt_timezone.utc)
+
+
+def jitter_for(schedule: Schedule, slot: datetime) -> timedelta:
+    if not schedule.jitter_seconds:
+        return timedelta(0)
+    rng = random.Random(f"{schedule.name}:{int(slot.timestamp())}")
+    return timedelta(seconds=rng.uniform(0, schedule.jitter_seconds))
+
+
+class Scheduler:
+    def __init__(self, schedules: Iterable[Schedule], owner: str, inline: bool = False):
+        self.schedules = list(schedules)
+        self.owner = owner
+        # inline=True: chạy target ngay trong thread gọi tick() (run_scheduler --once, test)
+        self.inline = inline
+        self.is_leader = False
+        self._fired: Dict[str, datetime] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+
+    # ---- leader election ----
+
+    def ensure_leadership(self) -> bool:
+        """Giữ/giành advisory lock. DB không phải Postgres (dev/test) thì coi như luôn là leader"""
+        if connection.vendor != "postgresql":
+            self.is_leader = True
+            return True
+        try:
+            if self.is_leader and connection.connection is not None and connection.is_usable():
+                return True
+            if self.is_leader:
+                logger.warning("Scheduler %s lost its database session, re-electing", self.owner)
+                connection.close()
+                self.is_leader = False
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [SCHEDULER_LOCK_KEY])
+                acquired = cursor.fetchone()[0]
+        except DatabaseError as e:
+            logger.warning(f"Scheduler leader election failed: {e}")
+            connection.close()
+            self.is_leader = False
+            return False
+
+        if acquired:
+            logger.info("Scheduler %s is now leader", self.owner)
+            self._recover_orphaned_runs()
+        self.is_leader = acquired
+        return acquired
+
+    def release_leadership(self) -> None:
+        if self.is_leader and connection.vendor == "postgresql" and connection.connection is not None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [SCHEDULER_LOCK_KEY])
+        self.is_leader = False
+
+    def _recover_orphaned_runs(self) -> None:
+        """Run RUNNING khi vừa lên leader là của leader cũ đã chết: đánh FAILED để không chặn overlap"""
+        now = timezone.now()
+        orphaned = ScheduledRun.objects.filter(status=ScheduledRunStatus.RUNNING).exclude(owner=self.owner)
+        count = orphaned.update(
+            status=ScheduledRunStatus.FAILED, finished_at=now, error="Scheduler leader changed before finish"
+        )
+        if count:
+            logger.warning(f"Marked {count} orphaned scheduled run(s) as failed")
+
+    # ---- firing ----
+
+    def tick(self, now: Optional[datetime] = None) -> List[ScheduledRun]:
+        """Fire các schedule tới hạn. Returns: các run đã bắt đầu trong tick này"""
+        if not self.ensure_leadership():
+            return []
+        now = now or timezone.now()
+        started = []
+        for schedule in self.schedules:
+            slot = slot_for(schedule, now)
+            if self._fired.get(schedule.name) == slot or now < slot + jitter_for(schedule, slot):
+                continue
+            if self._is_running(schedule.name):
+                logger.info(f"Scheduled job {schedule.name} still running, skipping slot {slot:%H:%M:%S}")
+                continue
+            run = self._claim(schedule, slot, now)
+            self._fired[schedule.name] = slot
+            if run is None:
+                continue
+            started.append(run)
+            if self.inline:
+                self._execute(schedule, run)
+            else:
+                thread = threading.Thread(target=self._execute_in_thread, args=(schedule, run), daemon=True)
+                self._threads[schedule.name] = thread
+                thread.start()
+        return started
+
+    def _is_running(self, name: str) -> bool:
+        thread = self._threads.get(name)
+        if thread is not None and thread.is_alive():
+            return True
+        return ScheduledRun.objects.filter(name=name, status=ScheduledRunStatus.RUNNING).exists()
+
+    def _claim(self, schedule: Schedule, slot: datetime, now: datetime) -> Optional[ScheduledRun]:
+        try:
+            with transaction.atomic():
+                return ScheduledRun.objects.create(
+                    name=schedule.name,
+                    scheduled_for=slot,
+                    owner=self.owner,
+                    started_at=now,
+                )
+        except IntegrityError:
+            # Slot đã được fire (instance khác, hoặc trước khi restart)
+            return None
+
+    def _execute(self, schedule: Schedule, run: ScheduledRun) -> None:
+        t0 = time.monotonic()
+        try:
+            result = schedule.target()
+            run.status = ScheduledRunStatus.SUCCEEDED
+            run.result = result if isinstance(result, dict) else {"value": result}
+        except Exception as e:
+            logger.exception(f"Scheduled job {schedule.name} failed")
+            run.status = ScheduledRunStatus.FAILED
+            run.error = f"{e}\n{traceback.format_exc()}"[-4000:]
+        run.finished_at = timezone.now()
+        run.duration_ms = int((time.monotonic() - t0) * 1000)
+        run.save(update_fields=["status", "result", "error", "finished_at", "duration_ms"])
+        logger.info(f"Scheduled job {schedule.name} -> {run.status} in {run.duration_ms}ms")
+
+    def _execute_in_thread(self, schedule: Schedule, run: ScheduledRun) -> None:
+        try:
+            self._execute(schedule, run)
+        finally:
+            connection.close()
+
+    def wait_for_running(self, timeout: Optional[float] = None) -> None:
+        for thread in list(self._threads.values()):
+            thread.join(timeout)
@@ -0,0 +1,123 @@
+"""
+Khai báo các job định kỳ cho run_scheduler (thay cho các dòng cron gọi management command).
+Slot của mỗi schedule căn theo epoch: every_seconds=3600, offset_seconds=0 -> đầu mỗi giờ UTC.
+Target là callable không tham số, import service lazy để scheduler khởi động nhẹ.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from apps.jobs.handlers import RESUMABLE_IMPORT_MAX_ATTEMPTS, STOCK_IMPORT_ALL, import_dedupe_key
+
+
+@dataclass(frozen=True)
+class Schedule:
+    name: str
+    target: Callable[[], Any]
+    every_seconds: int
+    jitter_seconds: int = 0
+    offset_seconds: int = 0
+
+
+def send_pending_notifications() -> Dict[str, Any]:
+    from apps.notification.services.delivery_service import DeliveryService
+
+    return {"sent": DeliveryService().send_pending_deliveries(limit=500)}
+
+
+def retry_failed_notifications() -> Dict[str, Any]:
+    from apps.notification.services.delivery_service import DeliveryService
+
+    return {"sent": DeliveryService().retry_failed_deliveries(limit=500)}
+
+
+def reap_stale_notifications() -> Dict[str, Any]:
+    from apps.notification.services.delivery_service import DeliveryService
+
+    return {"reaped": DeliveryService().reap_stale_sending()}
+
+
+def relay_notification_outbox() -> Dict[str, Any]:
+    from apps.notification.services.outbox_service import NotificationOutboxService
+
+    return {"relayed": NotificationOutboxService().relay_all()}
+
+
+def run_autorenew() -> Dict[str, Any]:
+    from apps.setting.services.subscription_service import SymbolAutoRenewService
+
+    return SymbolAutoRenewService().run_due_subscriptions()
+
+
+def expire_licenses() -> Dict[str, Any]:
+    from apps.seapay.services.license_expiry_service import LicenseExpiryService
+
+    return LicenseExpiryService().expire_due()
+
+
+def expire_payment_intents() -> Dict[str, Any]:
+    from apps.seapay.services.intent_expiry_service import IntentExpiryService
+
+    return IntentExpiryService().expire_due()
+
+
+def wallet_checkpoints() -> Dict[str, Any]:
+    from apps.seapay.services.wallet_ledger_service import WalletLedgerService
+
+    service = WalletLedgerService()
+    result = service.create_checkpoints()
+    result["discrepancies"] = len(service.reconcile()["discrepancies"])
+    return result
+
+
+def process_sepay_webhooks() -> Dict[str, Any]:
+    """Lưới an toàn: event bị bỏ sót khi job processor đang chạy dở lúc ingest (dedupe) hoặc lỗi tạm thời"""
+    from apps.seapay.services.webhook_inbox_service import SepayWebhookInboxService
+
+    return SepayWebhookInboxService().process_pending()
+
+
+def reconcile_sepay_statement() -> Dict[str, Any]:
+    from apps.seapay.services.statement_reconciliation_service import StatementReconciliationService
+
+    result = StatementReconciliationService().reconcile()
+    result["unmatched"] = len(result["unmatched"])
+    return result
+
+
+def enqueue_stock_import() -> Dict[str, Any]:
+    """Import dài chạy trong run_worker; scheduler chỉ enqueue (dedupe nếu lần trước chưa xong)"""
+    from apps.jobs.services import JobService
+
+    job, created = JobService().enqueue(
+        STOCK_IMPORT_ALL,
+        {"exchange": "HSX"},
+        dedupe_key=import_dedupe_key(STOCK_IMPORT_ALL, "HSX"),
+        max_attempts=RESUMABLE_IMPORT_MAX_ATTEMPTS,
+    )
+    return {"job_id": job.pk, "created": created}
+
+
+SCHEDULES: List[Schedule] = [
+    Schedule("notifications.send_pending", send_pending_notifications, every_seconds=60, jitter_seconds=5),
+    Schedule("notifications.retry_failed", retry_failed_notifications, every_seconds=120, jitter_seconds=15),
+    Schedule("notifications.reap_stale_sending", reap_stale_notifications, every_seconds=300, jitter_seconds=30),
+    Schedule("notifications.relay_outbox", relay_notification_outbox, every_seconds=60, jitter_seconds=5),
+    Schedule("seapay.expire_licenses", expire_licenses, every_seconds=300, jitter_seconds=30),
+    Schedule("seapay.expire_intents", expire_payment_intents, every_seconds=300, jitter_seconds=30),
+    Schedule("setting.autorenew", run_autorenew, every_seconds=300, jitter_seconds=30),
+    Schedule("seapay.process_webhooks", process_sepay_webhooks, every_seconds=30, jitter_seconds=5),
+    Schedule("seapay.reconcile_statement", reconcile_sepay_statement, every_seconds=3600, jitter_seconds=300),
+    Schedule("seapay.wallet_checkpoints", wallet_checkpoints, every_seconds=3600, jitter_seconds=300),
+    # 19:00 UTC = 02:00 giờ VN, sau khi thị trường đóng cửa
+    Schedule(
+        "stock.import_all",
+        enqueue_stock_import,
+        every_seconds=86400,
+        jitter_seconds=600,
+        offset_seconds=19 * 3600,
+    ),
+]
+
+
+def get_schedule(name: str) -> Optional[Schedule]:
+    return next((schedule for schedule in SCHEDULES if schedule.name == name), None)
@@ -0,0 +1,124 @@
+"""
+Enqueue và thực thi job nền. Worker (management command run_worker) gọi JobService.run_next
+trong vòng lặp; endpoint chỉ enqueue rồi trả job id ngay.
+"""
+import logging
+import threading
+import time
+import traceback
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from apps.jobs import repositories as repo
+from apps.jobs.models import Job
+from apps.jobs.registry import get_handler
+
+logger = logging.getLogger("app.jobs")
+
+
+class JobContext:
+    """Truyền cho handler: đọc payload và báo progress (ghi DB có giới hạn tần suất)."""
+
+    def __init__(self, job: Job, worker_id: str, min_progress_interval: float = 2.0):
+        self.job = job
+        self.worker_id = worker_id
+        self.payload = job.payload or {}
+        self.min_progress_interval = min_progress_interval
+        self._progress: Dict[str, Any] = dict(job.progress or {})
+        self._last_write = 0.0
+
+    def progress(self, force: bool = False, **data) -> None:
+        self._progress.update(data)
+        now = time.monotonic()
+        if force or now - self._last_write >= self.min_progress_interval:
+            repo.heartbeat(self.job.pk, self.worker_id, progress=self._progress)
+            self._last_write = now
+
+
+class _Heartbeat(threading.Thread):
+    """Giữ heartbeat cho job đang chạy kể cả khi handler không báo progress."""
+
+    def __init__(self, job_id: int, worker_id: str, interval: float):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(self.interval):
+                repo.heartbeat(self.job_id, self.worker_id)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class JobService:
+    def enqueue(
+        self,
+        kind: str,
+        payload: Optional[Dict[str, Any]] = None,
+        *,
+        dedupe_key: Optional[str] = None,
+        priority: int = 0,
+        max_attempts: int = 1,
+        created_by_id: Optional[int] = None,
+    ) -> tuple[Job, bool]:
+        if get_handler(kind) is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        return repo.enqueue_job(
+            kind,
+            payload,
+            priority=priority,
+            max_attempts=max_attempts,
+            dedupe_key=dedupe_key,
+            created_by_id=created_by_id,
+        )
+
+    def get_job(self, job_id: int) -> Optional[Job]:
+        return Job.objects.filter(pk=job_id).first()
+
+    def list_jobs(self, kind: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+        jobs = Job.objects.order_by("-created_at", "-id")
+        if kind:
+            jobs = jobs.filter(kind=kind)
+        if status:
+            jobs = jobs.filter(status=status)
+        return list(jobs[:limit])
+
+    def run_next(self, worker_id: str, kinds: Optional[Iterable[str]] = None) -> Optional[Job]:
+        """Claim và chạy một job; trả về job đã chạy hoặc None nếu hàng đợi trống."""
+        job = repo.claim_next_job(worker_id, kinds)
+        if job is None:
+            return None
+
+        handler = get_handler(job.kind)
+        heartbeat = _Heartbeat(job.pk, worker_id, interval=max(settings.JOB_STALE_SECONDS / 3, 1))
+        heartbeat.start()
+        logger.info(f"Job {job.pk} ({job.kind}) started by {worker_id}, attempt {job.attempts}")
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind {job.kind}")
+            result = handler(JobContext(job, worker_id)) or {}
+        except Exception as e:
+            heartbeat.stop()
+            error = f"{e}\n{traceback.format_exc(limit=20)}"
+            repo.mark_failed(job, worker_id, error)
+            logger.error(f"Job {job.pk} ({job.kind}) failed: {e}")
+        else:
+            heartbeat.stop()
+            repo.mark_succeeded(job.pk, worker_id, result)
+            logger.info(f"Job {job.pk} ({job.kind}) succeeded")
+        finally:
+            heartbeat.join(timeout=5)
+
+        job.refresh_from_db()
+        return job
+
+    def requeue_stale(self) -> Dict[str, int]:
+        return repo.requeue_stale_jobs(settings.JOB_STALE_SECONDS)
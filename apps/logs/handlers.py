@@ -8,6 +8,8 @@ from django.conf import settings
 from django.db import DatabaseError, connection
 from django.utils import timezone
 
+from apps.logs.utils import context_user_id
+
 
 class DatabaseLogHandler(logging.Handler):
     """Logging handler that persists records to the `logs` table."""
@@ -21,8 +23,8 @@ class DatabaseLogHandler(logging.Handler):
 
                 with connection.cursor() as cursor:
                     cursor.execute("""
-                        INSERT INTO logs (level, channel, message, context, extra, environment, created_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        INSERT INTO logs (level, channel, message, context, extra, environment, user_id, created_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                     """, [
                         record.levelname.lower(),
                         getattr(record, "channel", record.name),
@@ -30,6 +32,7 @@ class DatabaseLogHandler(logging.Handler):
                         json.dumps(context),
                         json.dumps(extra_data),
                         environment,
+                        context_user_id(context),
                         timezone.now()
                     ])
             except DatabaseError:
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:49
+
+from django.db import migrations, models
+
+
+BACKFILL_USER_ID_SQL = r"""
+UPDATE logs
+SET user_id = (context->>'user_id')::bigint
+WHERE user_id IS NULL
+  AND context->>'user_id' ~ '^[0-9]+$'
+"""
+
+
+def backfill_user_id(apps, schema_editor):
+    """Tách context.user_id sang cột user_id cho các log cũ (chỉ PostgreSQL)."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(BACKFILL_USER_ID_SQL)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("logs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="logentry",
+            name="idx_logs_created_at",
+        ),
+        migrations.AddField(
+            model_name="logentry",
+            name="user_id",
+            field=models.BigIntegerField(
+                blank=True,
+                db_comment="user_id tách từ context lúc ghi, dùng để lọc có index",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_user_id, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="logentry",
+            index=models.Index(fields=["-created_at", "-id"], name="idx_logs_created_id"),
+        ),
+        migrations.AddIndex(
+            model_name="logentry",
+            index=models.Index(
+                fields=["user_id", "-created_at", "-id"], name="idx_logs_user_created"
+            ),
+        ),
+    ]
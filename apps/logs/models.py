@@ -28,12 +28,18 @@ class LogEntry(models.Model):
         blank=True,
         db_comment="Environment: production, staging, local"
     )
+    user_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        db_comment="user_id tách từ context lúc ghi, dùng để lọc có index"
+    )
 
     class Meta:
         db_table = "logs"
         db_table_comment = "System logs for auditing and debugging"
         indexes = [
-            models.Index(fields=["-created_at"], name="idx_logs_created_at"),
+            models.Index(fields=["-created_at", "-id"], name="idx_logs_created_id"),
+            models.Index(fields=["user_id", "-created_at", "-id"], name="idx_logs_user_created"),
             models.Index(fields=["level"], name="idx_logs_level"),
             models.Index(fields=["channel"], name="idx_logs_channel"),
             GinIndex(fields=["context"], name="idx_logs_context_gin"),
@@ -43,11 +49,6 @@ class LogEntry(models.Model):
     def __str__(self) -> str:
         return f"[{self.created_at}] {self.level.upper()} - {self.channel}: {self.message[:50]}"
 
-    @property
-    def user_id(self):
-        """Helper để lấy user_id từ context"""
-        return self.context.get('user_id') if self.context else None
-
     @property
     def request_id(self):
         """Helper để lấy request_id từ context"""
@@ -56,7 +57,7 @@ class LogEntry(models.Model):
     @classmethod
     def get_by_user(cls, user_id):
         """Lấy logs theo user_id"""
-        return cls.objects.filter(context__user_id=user_id)
+        return cls.objects.filter(user_id=user_id)
 
     @classmethod
     def get_by_level(cls, level):
@@ -1,11 +1,22 @@
+import base64
+import json
 import logging
 import re
-from typing import Any, Dict, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 import jwt
 from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 from ninja import Router, Schema
+from ninja.errors import HttpError
+from ninja.throttling import SimpleRateThrottle
+from pydantic import ValidationError
+
+from apps.logs.models import LogEntry
+from apps.logs.utils import context_user_id
+from core.jwt_auth import JWTAuth
 
 router = Router(tags=["logs"])
 logger = logging.getLogger("app")
@@ -24,6 +35,47 @@ class LogCreateResponse(Schema):
     message: str
 
 
+class LogEntryOut(Schema):
+    id: int
+    created_at: datetime
+    level: str
+    channel: str
+    message: str
+    user_id: Optional[int] = None
+    context: Dict[str, Any]
+    extra: Dict[str, Any]
+    environment: Optional[str] = None
+
+
+class LogSearchResponse(Schema):
+    results: List[LogEntryOut]
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+
+class LogBatchResponse(Schema):
+    success: bool
+    accepted: int
+
+
+LOG_SEARCH_MAX_LIMIT = 500
+LOG_LEVELS = {"debug", "info", "warning", "error", "critical"}
+
+
+class LogIngestThrottle(SimpleRateThrottle):
+    """
+    Giới hạn số request ingest theo user (JWT) hoặc IP của client.
+    IP lấy qua get_ident của ninja (chỉ tin X-Forwarded-For khi có NINJA_NUM_PROXIES), tránh client tự đổi IP.
+    """
+
+    scope = "log_ingest"
+
+    def get_cache_key(self, request) -> str:
+        user_id = _get_user_id_from_jwt(request)
+        ident = f"user:{user_id}" if user_id else f"ip:{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
 def _get_user_id_from_jwt(request) -> int | None:
     """Extract user_id from JWT token in Authorization header or cookie."""
     auth_header = request.META.get("HTTP_AUTHORIZATION")
@@ -87,8 +139,8 @@ def create_log(request, payload: LogCreateRequest):
 
         with connection.cursor() as cursor:
             cursor.execute("""
-                INSERT INTO logs (level, channel, message, context, extra, environment, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO logs (level, channel, message, context, extra, environment, user_id, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             """, [
                 payload.level.lower(),
                 payload.channel,
@@ -96,6 +148,7 @@ def create_log(request, payload: LogCreateRequest):
                 __import__('json').dumps(context),
                 __import__('json').dumps(payload.extra_data or {}),
                 getattr(settings, "APP_ENV", "local"),
+                context_user_id(context),
                 timezone.now()
             ])
 
@@ -104,3 +157,159 @@ def create_log(request, payload: LogCreateRequest):
     except Exception as e:
         logger.error(f"Failed to create log: {str(e)}")
         return LogCreateResponse(success=False, message=f"Failed to create log: {str(e)}")
+
+
+def _parse_batch_body(request) -> List[Any]:
+    """Đọc body dạng JSON array hoặc NDJSON (mỗi dòng một record)."""
+    try:
+        body = request.body.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        raise HttpError(400, "Body must be UTF-8")
+    if not body:
+        return []
+
+    if body.startswith("["):
+        try:
+            items = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise HttpError(400, f"Invalid JSON array: {e}")
+        return items
+
+    items = []
+    for line_no, line in enumerate(body.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise HttpError(400, f"Invalid NDJSON at line {line_no}: {e}")
+    return items
+
+
+def _validate_batch(items: List[Any]) -> tuple[List[LogCreateRequest], List[Dict[str, Any]]]:
+    """Validate toàn bộ batch trong một lượt, gom tất cả lỗi theo index."""
+    records: List[LogCreateRequest] = []
+    errors: List[Dict[str, Any]] = []
+    for index, item in enumerate(items):
+        try:
+            record = LogCreateRequest.model_validate(item)
+        except ValidationError as e:
+            errors.append({"index": index, "error": e.errors(include_url=False)[0]["msg"]})
+            continue
+        if record.level.lower() not in LOG_LEVELS:
+            errors.append({"index": index, "error": f"Invalid level: {record.level}"})
+            continue
+        records.append(record)
+    return records, errors
+
+
+def _encode_cursor(created_at: datetime, log_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{log_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at_raw, log_id_raw = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at_raw), int(log_id_raw)
+    except Exception:
+        raise HttpError(400, "Invalid cursor")
+
+
+@router.post(
+    "/logs/batch",
+    response={200: LogBatchResponse, 400: dict, 413: dict},
+    throttle=[LogIngestThrottle()],
+)
+def create_logs_batch(request):
+    """
+    Ghi nhiều log trong một request: body là JSON array hoặc NDJSON.
+    Cả batch được validate trước, lỗi ở bất kỳ record nào thì không ghi record nào;
+    hợp lệ thì ghi bằng một lệnh bulk insert.
+    """
+    max_records = getattr(settings, "LOG_BATCH_MAX_RECORDS", 500)
+
+    items = _parse_batch_body(request)
+    if not isinstance(items, list):
+        return 400, {"error": "Body must be a JSON array or NDJSON"}
+    if not items:
+        return 400, {"error": "Empty batch"}
+    if len(items) > max_records:
+        return 413, {"error": f"Batch too large: {len(items)} > {max_records} records"}
+
+    records, errors = _validate_batch(items)
+    if errors:
+        return 400, {"error": "Invalid records", "errors": errors}
+
+    user_id = _get_user_id_from_jwt(request)
+    environment = getattr(settings, "APP_ENV", "local")
+    entries = []
+    for record in records:
+        context = record.context or {}
+        if user_id:
+            context["user_id"] = user_id
+        entries.append(
+            LogEntry(
+                level=record.level.lower(),
+                channel=record.channel,
+                message=record.message,
+                context=context,
+                extra=record.extra_data or {},
+                environment=environment,
+                user_id=context_user_id(context),
+            )
+        )
+
+    LogEntry.objects.bulk_create(entries)
+    return 200, LogBatchResponse(success=True, accepted=len(entries))
+
+
+@router.get("/logs/search", response=LogSearchResponse, auth=JWTAuth())
+def search_logs(
+    request,
+    from_time: Optional[datetime] = None,
+    to_time: Optional[datetime] = None,
+    level: Optional[str] = None,
+    channel: Optional[str] = None,
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+):
+    """
+    Tìm kiếm logs, mới nhất trước, phân trang keyset theo (created_at, id).
+    Truyền `next_cursor` của trang trước vào `cursor` để lấy trang tiếp theo.
+    """
+    if not getattr(request.auth, "is_staff", False):
+        raise HttpError(403, "Staff only")
+
+    limit = max(1, min(limit, LOG_SEARCH_MAX_LIMIT))
+
+    qs = LogEntry.objects.all()
+    if from_time:
+        qs = qs.filter(created_at__gte=from_time)
+    if to_time:
+        qs = qs.filter(created_at__lt=to_time)
+    if level:
+        qs = qs.filter(level=level.lower())
+    if channel:
+        qs = qs.filter(channel=channel)
+    if user_id is not None:
+        qs = qs.filter(user_id=user_id)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        qs = qs.filter(
+            Q(created_at__lt=cursor_created_at)
+            | Q(created_at=cursor_created_at, id__lt=cursor_id)
+        )
+
+    rows = list(qs.order_by("-created_at", "-id")[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return LogSearchResponse(results=rows, next_cursor=next_cursor, has_more=has_more)
@@ -25,3 +25,19 @@ def log_event(
             "environment": getattr(settings, "APP_ENV", "local"),
         },
     )
+
+
+def context_user_id(context: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Lấy user_id (int) từ context để ghi vào cột `logs.user_id`.
+
+    JWT lưu `sub` dạng chuỗi nên cần ép kiểu; giá trị không hợp lệ trả về None.
+    """
+    if not context:
+        return None
+    value = context.get("user_id")
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
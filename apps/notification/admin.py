@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserEndpoint, NotificationEvent, NotificationDelivery, WebhookLog
+from .models import UserEndpoint, NotificationEvent, NotificationDelivery, NotificationOutbox, WebhookLog
 
 
 @admin.register(UserEndpoint)
@@ -33,6 +33,15 @@ class NotificationDeliveryAdmin(admin.ModelAdmin):
     get_user.short_description = 'User'
 
 
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'event_type', 'processed_at', 'attempts', 'created_at']
+    list_filter = ['event_type', 'created_at']
+    search_fields = ['user__email', 'subject_id', 'last_error']
+    readonly_fields = ['created_at', 'payload']
+    ordering = ['-id']
+
+
 @admin.register(WebhookLog)
 class WebhookLogAdmin(admin.ModelAdmin):
     list_display = ['webhook_id', 'source', 'symbol', 'status_code', 'users_notified', 'created_at']
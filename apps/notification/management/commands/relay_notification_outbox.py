@@ -0,0 +1,28 @@
+"""
+Management command relay notification outbox còn pending (dự phòng cho relay on_commit bị lỗi)
+Dùng để chạy cronjob
+"""
+from django.core.management.base import BaseCommand
+from apps.notification.services.outbox_service import NotificationOutboxService, OUTBOX_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Relay pending notification outbox entries into events and deliveries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help=f'Outbox rows per transaction (default: {OUTBOX_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(f'Relaying notification outbox (batch size: {batch_size})...')
+
+        relayed = NotificationOutboxService().relay_all(batch_size=batch_size)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully relayed {relayed} outbox entries')
+        )
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("symbol_signal", "Symbol Signal"),
+                            ("payment_success", "Payment Success"),
+                            ("payment_failed", "Payment Failed"),
+                            ("order_created", "Order Created"),
+                            ("order_filled", "Order Filled"),
+                            ("subscription_expiring", "Subscription Expiring"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("subject_id", models.UUIDField(blank=True, null=True)),
+                ("payload", models.JSONField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "processed_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Thời điểm relay đã tạo event; null = chờ relay",
+                        null=True,
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0)),
+                ("last_error", models.TextField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notification_outbox",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "pay_notification_outbox",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("processed_at__isnull", True)),
+                        fields=["id"],
+                        name="idx_notif_outbox_pending",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:22
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_existing_failures(apps, schema_editor):
+    """Deliveries failed/retrying cũ được tính là đã thử một lần và tới hạn retry ngay"""
+    NotificationDelivery = apps.get_model("notification", "NotificationDelivery")
+    NotificationDelivery.objects.filter(status__in=["failed", "retrying"]).update(
+        status="failed", attempts=1, next_attempt_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0002_notification_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationdelivery",
+            name="attempts",
+            field=models.IntegerField(default=0, help_text="Số lần đã gửi (kể cả lần đầu)"),
+        ),
+        migrations.AddField(
+            model_name="notificationdelivery",
+            name="next_attempt_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Thời điểm retry tiếp theo khi status=failed",
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="notificationdelivery",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("queued", "Queued"),
+                    ("sending", "Sending"),
+                    ("sent", "Sent"),
+                    ("failed", "Failed"),
+                    ("retrying", "Retrying"),
+                    ("dead", "Dead letter"),
+                ],
+                default="queued",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationdelivery",
+            index=models.Index(
+                condition=models.Q(("status", "failed")),
+                fields=["next_attempt_at"],
+                name="idx_notif_delivery_due",
+            ),
+        ),
+        migrations.RunPython(schedule_existing_failures, migrations.RunPython.noop),
+    ]
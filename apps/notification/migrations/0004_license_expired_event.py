@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:28
+
+from django.db import migrations, models
+
+EVENT_TYPE_CHOICES = [
+    ("symbol_signal", "Symbol Signal"),
+    ("payment_success", "Payment Success"),
+    ("payment_failed", "Payment Failed"),
+    ("order_created", "Order Created"),
+    ("order_filled", "Order Filled"),
+    ("subscription_expiring", "Subscription Expiring"),
+    ("license_expired", "License Expired"),
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0003_delivery_retry"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notificationevent",
+            name="event_type",
+            field=models.CharField(
+                choices=EVENT_TYPE_CHOICES,
+                help_text="Loại sự kiện nghiệp vụ cần gửi thông báo",
+                max_length=50,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="notificationoutbox",
+            name="event_type",
+            field=models.CharField(choices=EVENT_TYPE_CHOICES, max_length=50),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0004_license_expired_event"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationdelivery",
+            name="claimed_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Thời điểm dispatcher claim (chuyển sang sending)",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationdelivery",
+            index=models.Index(
+                condition=models.Q(("status", "sending")),
+                fields=["claimed_at"],
+                name="idx_notif_delivery_sending",
+            ),
+        ),
+    ]
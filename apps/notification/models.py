@@ -16,6 +16,7 @@ class AppEventType(models.TextChoices):
     ORDER_CREATED = 'order_created', 'Order Created'
     ORDER_FILLED = 'order_filled', 'Order Filled'
     SUBSCRIPTION_EXPIRING = 'subscription_expiring', 'Subscription Expiring'
+    LICENSE_EXPIRED = 'license_expired', 'License Expired'
 
 
 class DeliveryStatus(models.TextChoices):
@@ -24,6 +25,7 @@ class DeliveryStatus(models.TextChoices):
     SENT = 'sent', 'Sent'
     FAILED = 'failed', 'Failed'
     RETRYING = 'retrying', 'Retrying'
+    DEAD = 'dead', 'Dead letter'
 
 
 class UserEndpoint(models.Model):
@@ -102,6 +104,43 @@ class NotificationEvent(models.Model):
         return f"{self.event_type} - {self.user.email} ({self.event_id})"
 
 
+class NotificationOutbox(models.Model):
+    """
+    Outbox: ghi trong cùng transaction với nghiệp vụ (một INSERT nhỏ), relay chuyển thành
+    NotificationEvent + deliveries sau khi commit
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notification_outbox'
+    )
+    event_type = models.CharField(max_length=50, choices=AppEventType.choices)
+    subject_id = models.UUIDField(null=True, blank=True)
+    payload = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Thời điểm relay đã tạo event; null = chờ relay'
+    )
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'pay_notification_outbox'
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='idx_notif_outbox_pending',
+                condition=models.Q(processed_at__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} - user {self.user_id} ({self.id})"
+
+
 class NotificationDelivery(models.Model):
     """Nhật ký gửi tin theo từng endpoint. Dùng để retry/thống kê"""
     delivery_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -128,6 +167,17 @@ class NotificationDelivery(models.Model):
         help_text='Phản hồi từ API Telegram/Zalo/Email'
     )
     error_message = models.TextField(null=True, blank=True)
+    attempts = models.IntegerField(default=0, help_text='Số lần đã gửi (kể cả lần đầu)')
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Thời điểm retry tiếp theo khi status=failed'
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Thời điểm dispatcher claim (chuyển sang sending)'
+    )
 
     class Meta:
         db_table = 'pay_notification_deliveries'
@@ -135,6 +185,16 @@ class NotificationDelivery(models.Model):
             models.Index(fields=['event']),
             models.Index(fields=['endpoint']),
             models.Index(fields=['status', 'sent_at']),
+            models.Index(
+                fields=['next_attempt_at'],
+                name='idx_notif_delivery_due',
+                condition=models.Q(status='failed')
+            ),
+            models.Index(
+                fields=['claimed_at'],
+                name='idx_notif_delivery_sending',
+                condition=models.Q(status='sending')
+            ),
         ]
 
     def __str__(self):
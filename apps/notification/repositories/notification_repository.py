@@ -1,12 +1,15 @@
 """Repository layer cho notification - xử lý database operations"""
 import logging
-from typing import Optional, List
+from typing import Iterable, Optional, List
 from django.contrib.auth import get_user_model
-from django.db.models import QuerySet
+from django.db import transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
 
 from apps.notification.models import (
     NotificationEvent,
     NotificationDelivery,
+    NotificationOutbox,
     UserEndpoint,
     DeliveryStatus,
     WebhookLog,
@@ -39,6 +42,11 @@ class NotificationEventRepository:
         logger.info(f"Created notification event {event.event_id} for user {user.email}")
         return event
 
+    @staticmethod
+    def bulk_create(events: List[NotificationEvent], batch_size: int = 1000) -> List[NotificationEvent]:
+        """Insert nhiều events (event_id sinh sẵn ở Python nên dùng được ngay làm FK)"""
+        return NotificationEvent.objects.bulk_create(events, batch_size=batch_size)
+
     @staticmethod
     def get_by_id(event_id: str) -> Optional[NotificationEvent]:
         """Lấy event theo ID"""
@@ -111,6 +119,100 @@ class NotificationDeliveryRepository:
             status=DeliveryStatus.QUEUED
         ).select_related('event', 'endpoint')[:limit]
 
+    @staticmethod
+    def bulk_create(deliveries: List[NotificationDelivery], batch_size: int = 1000) -> List[NotificationDelivery]:
+        """Insert nhiều deliveries trong một lần (status=queued)"""
+        return NotificationDelivery.objects.bulk_create(deliveries, batch_size=batch_size)
+
+    @staticmethod
+    def claim_pending_deliveries(
+        limit: int = 100,
+        delivery_ids: Optional[Iterable] = None
+    ) -> List[NotificationDelivery]:
+        """
+        Lấy các deliveries pending (giới hạn trong delivery_ids nếu có) và chuyển sang sending
+        trong cùng transaction. SKIP LOCKED để hai dispatcher chạy song song không gửi trùng.
+        """
+        with transaction.atomic():
+            queryset = NotificationDelivery.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                status=DeliveryStatus.QUEUED
+            )
+            if delivery_ids is not None:
+                queryset = queryset.filter(delivery_id__in=list(delivery_ids))
+            deliveries = list(queryset.select_related('event', 'endpoint')[:limit])
+            claimed_at = timezone.now()
+            NotificationDelivery.objects.filter(
+                delivery_id__in=[d.delivery_id for d in deliveries]
+            ).update(status=DeliveryStatus.SENDING, claimed_at=claimed_at)
+        for delivery in deliveries:
+            delivery.status = DeliveryStatus.SENDING
+            delivery.claimed_at = claimed_at
+        return deliveries
+
+    @staticmethod
+    def claim_due_retries(
+        now,
+        limit: int = 100,
+        exclude_channels: Iterable[str] = ()
+    ) -> List[NotificationDelivery]:
+        """
+        Claim các deliveries FAILED đã tới next_attempt_at (partial index idx_notif_delivery_due),
+        SKIP LOCKED + chuyển sang sending trong cùng transaction như claim_pending_deliveries
+        """
+        with transaction.atomic():
+            queryset = NotificationDelivery.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                status=DeliveryStatus.FAILED,
+                next_attempt_at__lte=now
+            ).exclude(channel__in=list(exclude_channels))
+            deliveries = list(queryset.select_related('event', 'endpoint').order_by('next_attempt_at')[:limit])
+            NotificationDelivery.objects.filter(
+                delivery_id__in=[d.delivery_id for d in deliveries]
+            ).update(status=DeliveryStatus.SENDING, claimed_at=now)
+        for delivery in deliveries:
+            delivery.status = DeliveryStatus.SENDING
+            delivery.claimed_at = now
+        return deliveries
+
+    @staticmethod
+    def reap_stale_sending(cutoff, now) -> int:
+        """
+        Deliveries kẹt ở sending (dispatcher chết sau khi claim) từ trước `cutoff` được trả về FAILED,
+        tới hạn retry ngay. Row sending chưa có claimed_at (trước khi có cột) cũng tính là kẹt.
+        """
+        return NotificationDelivery.objects.filter(
+            Q(claimed_at__lt=cutoff) | Q(claimed_at__isnull=True),
+            status=DeliveryStatus.SENDING
+        ).update(
+            status=DeliveryStatus.FAILED,
+            next_attempt_at=now,
+            error_message='Dispatcher did not finish sending (stale claim)'
+        )
+
+    @staticmethod
+    def defer(deliveries: List[NotificationDelivery], until) -> int:
+        """Trả deliveries đã claim về FAILED, chưa tính attempt, hẹn lại lúc `until`"""
+        return NotificationDelivery.objects.filter(
+            delivery_id__in=[d.delivery_id for d in deliveries]
+        ).update(status=DeliveryStatus.FAILED, next_attempt_at=until)
+
+    @staticmethod
+    def defer_channel(channel: str, now, until) -> int:
+        """Circuit mở: dời mọi delivery FAILED đã tới hạn của channel sang `until`"""
+        return NotificationDelivery.objects.filter(
+            status=DeliveryStatus.FAILED,
+            channel=channel,
+            next_attempt_at__lte=now
+        ).update(next_attempt_at=until)
+
+    @staticmethod
+    def defer_endpoint(endpoint_id, until) -> int:
+        """Probe của endpoint lỗi: dời các delivery FAILED khác của endpoint tới `until` (không kéo sớm lại)"""
+        return NotificationDelivery.objects.filter(
+            status=DeliveryStatus.FAILED,
+            endpoint_id=endpoint_id,
+            next_attempt_at__lt=until
+        ).update(next_attempt_at=until)
+
     @staticmethod
     def update_status(
         delivery: NotificationDelivery,
@@ -134,6 +236,50 @@ class NotificationDeliveryRepository:
         delivery.save(update_fields=update_fields)
 
 
+class NotificationOutboxRepository:
+    """Repository cho NotificationOutbox"""
+
+    @staticmethod
+    def add(
+        user_id: int,
+        event_type: str,
+        payload: dict,
+        subject_id: Optional[str] = None
+    ) -> NotificationOutbox:
+        """Một INSERT, không đọc User (chạy bên trong transaction nghiệp vụ)"""
+        return NotificationOutbox.objects.create(
+            user_id=user_id,
+            event_type=event_type,
+            subject_id=subject_id,
+            payload=payload
+        )
+
+    @staticmethod
+    def bulk_add(entries: List[NotificationOutbox], batch_size: int = 1000) -> List[NotificationOutbox]:
+        return NotificationOutbox.objects.bulk_create(entries, batch_size=batch_size)
+
+    @staticmethod
+    def lock_pending(limit: int, max_attempts: int) -> List[NotificationOutbox]:
+        """Khóa một batch chưa relay theo thứ tự ghi; SKIP LOCKED để nhiều relay chạy song song"""
+        return list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+                processed_at__isnull=True,
+                attempts__lt=max_attempts
+            ).order_by('id')[:limit]
+        )
+
+    @staticmethod
+    def mark_processed(ids: List[int], processed_at) -> int:
+        return NotificationOutbox.objects.filter(id__in=ids).update(processed_at=processed_at)
+
+    @staticmethod
+    def mark_failed(ids: List[int], error: str) -> int:
+        return NotificationOutbox.objects.filter(id__in=ids, processed_at__isnull=True).update(
+            attempts=F('attempts') + 1,
+            last_error=error
+        )
+
+
 class UserEndpointRepository:
     """Repository cho UserEndpoint model"""
 
@@ -145,6 +291,14 @@ class UserEndpointRepository:
             verified=True
         )
 
+    @staticmethod
+    def get_verified_endpoints_for_users(user_ids: Iterable[int]) -> QuerySet:
+        """Endpoints đã verified của nhiều users trong một query"""
+        return UserEndpoint.objects.filter(
+            user_id__in=list(user_ids),
+            verified=True
+        )
+
     @staticmethod
     def get_by_user(user_id: int) -> QuerySet:
         """Lấy tất cả endpoints của user"""
@@ -0,0 +1,206 @@
+"""
+Gửi deliveries song song bằng asyncio + aiohttp.
+
+- Mỗi channel một ClientSession (connection pool riêng) nên các tin sau dùng lại kết nối TCP/TLS.
+- Semaphore giới hạn số request đồng thời theo channel.
+- Rate limiter theo provider (Telegram bot tối đa ~30 msg/s).
+- Kết quả ghi lại NotificationDelivery bằng bulk_update sau khi gửi, không save từng row;
+  lần thất bại được hẹn retry theo retry_policy.
+
+ORM chỉ dùng ở phần sync (trước và sau event loop); coroutine chỉ làm HTTP.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+import aiohttp
+from django.conf import settings
+from django.utils import timezone
+
+from apps.notification.models import NotificationChannel, NotificationDelivery
+from apps.notification.services.handlers import HttpNotificationHandler, get_handler
+from apps.notification.services.retry_policy import record_attempt
+
+logger = logging.getLogger('app')
+
+STATUS_UPDATE_FIELDS = ['status', 'sent_at', 'response_raw', 'error_message', 'attempts', 'next_attempt_at']
+STATUS_UPDATE_BATCH_SIZE = 500
+
+
+@dataclass(frozen=True)
+class ChannelLimits:
+    concurrency: int
+    per_second: Optional[float] = None
+
+
+DEFAULT_CHANNEL_LIMITS = {
+    NotificationChannel.TELEGRAM: ChannelLimits(concurrency=20, per_second=30),
+    NotificationChannel.ZALO: ChannelLimits(concurrency=10, per_second=10),
+    NotificationChannel.EMAIL: ChannelLimits(concurrency=4),
+}
+FALLBACK_LIMITS = ChannelLimits(concurrency=4)
+
+
+def channel_limits() -> Dict[str, ChannelLimits]:
+    """Giới hạn mặc định, ghi đè được bằng settings.NOTIFICATION_CHANNEL_LIMITS = {channel: {...}}"""
+    limits = dict(DEFAULT_CHANNEL_LIMITS)
+    for channel, override in (getattr(settings, 'NOTIFICATION_CHANNEL_LIMITS', None) or {}).items():
+        limits[channel] = ChannelLimits(**override)
+    return limits
+
+
+class AsyncRateLimiter:
+    """Giãn đều các request: tối đa `per_second` lần acquire mỗi giây."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@dataclass
+class DispatchResult:
+    sent: int = 0
+    failed: int = 0
+    by_channel: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # User có ít nhất một delivery gửi thành công / thất bại
+    sent_user_ids: Set[int] = field(default_factory=set)
+    failed_user_ids: Set[int] = field(default_factory=set)
+
+    def record(self, channel: str, ok: bool, user_id: Optional[int] = None) -> None:
+        counts = self.by_channel.setdefault(channel, {'sent': 0, 'failed': 0})
+        key = 'sent' if ok else 'failed'
+        counts[key] += 1
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        if user_id is not None:
+            (self.sent_user_ids if ok else self.failed_user_ids).add(user_id)
+
+    @property
+    def users_sent(self) -> int:
+        return len(self.sent_user_ids)
+
+    @property
+    def users_failed(self) -> int:
+        """User không nhận được tin nào (mọi delivery đều lỗi)"""
+        return len(self.failed_user_ids - self.sent_user_ids)
+
+    def merge(self, other: "DispatchResult") -> None:
+        self.sent += other.sent
+        self.failed += other.failed
+        self.sent_user_ids |= other.sent_user_ids
+        self.failed_user_ids |= other.failed_user_ids
+        for channel, counts in other.by_channel.items():
+            merged = self.by_channel.setdefault(channel, {'sent': 0, 'failed': 0})
+            merged['sent'] += counts['sent']
+            merged['failed'] += counts['failed']
+
+
+class _ChannelSender:
+    """Session + semaphore + rate limiter của một channel, sống trong một lần dispatch."""
+
+    def __init__(self, channel: str, limits: ChannelLimits, timeout: float):
+        self.channel = channel
+        self.handler = get_handler(channel)
+        self.semaphore = asyncio.Semaphore(limits.concurrency)
+        self.rate_limiter = AsyncRateLimiter(limits.per_second) if limits.per_second else None
+        self.session: Optional[aiohttp.ClientSession] = None
+        if isinstance(self.handler, HttpNotificationHandler):
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=limits.concurrency, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            )
+
+    async def send(self, delivery: NotificationDelivery) -> bool:
+        if self.handler is None:
+            delivery.error_message = f"No handler for channel {delivery.channel}"
+            return False
+
+        async with self.semaphore:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+            if self.session is None:
+                # Kênh không có HTTP API (email/SMTP): chạy handler sync trong thread
+                return await asyncio.to_thread(self.handler.send, delivery)
+            return await self._send_http(delivery)
+
+    async def _send_http(self, delivery: NotificationDelivery) -> bool:
+        error = self.handler.config_error()
+        if error:
+            delivery.error_message = error
+            return False
+        try:
+            request = self.handler.build_request(delivery)
+            async with self.session.post(
+                request['url'], json=request['json'], headers=request.get('headers')
+            ) as response:
+                data = await response.json(content_type=None)
+                return self.handler.handle_response(delivery, response.status, data or {})
+        except Exception as e:
+            logger.error(f"Error sending {self.channel} delivery {delivery.delivery_id}: {e!r}")
+            delivery.error_message = str(e) or repr(e)
+            return False
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+
+class AsyncDeliveryDispatcher:
+    """Gửi một lô deliveries đã claim (status=sending) và ghi kết quả theo batch."""
+
+    def __init__(self, limits: Optional[Dict[str, ChannelLimits]] = None, timeout: float = 10):
+        self.limits = limits or channel_limits()
+        self.timeout = timeout
+
+    def dispatch(self, deliveries: Iterable[NotificationDelivery]) -> DispatchResult:
+        deliveries = list(deliveries)
+        result = DispatchResult()
+        if not deliveries:
+            return result
+
+        outcomes = asyncio.run(self._dispatch(deliveries))
+
+        now = timezone.now()
+        for delivery, ok in zip(deliveries, outcomes):
+            record_attempt(delivery, ok, now)
+            result.record(delivery.channel, ok, delivery.event.user_id)
+        NotificationDelivery.objects.bulk_update(
+            deliveries, STATUS_UPDATE_FIELDS, batch_size=STATUS_UPDATE_BATCH_SIZE
+        )
+        return result
+
+    async def _dispatch(self, deliveries: List[NotificationDelivery]) -> List[bool]:
+        senders: Dict[str, _ChannelSender] = {}
+        for delivery in deliveries:
+            if delivery.channel not in senders:
+                limits = self.limits.get(delivery.channel, FALLBACK_LIMITS)
+                senders[delivery.channel] = _ChannelSender(delivery.channel, limits, self.timeout)
+        try:
+            outcomes = await asyncio.gather(
+                *(senders[delivery.channel].send(delivery) for delivery in deliveries),
+                return_exceptions=True,
+            )
+        finally:
+            await asyncio.gather(*(sender.close() for sender in senders.values()))
+
+        results = []
+        for delivery, outcome in zip(deliveries, outcomes):
+            if isinstance(outcome, BaseException):
+                delivery.error_message = str(outcome) or repr(outcome)
+                results.append(False)
+            else:
+                results.append(bool(outcome))
+        return results
@@ -1,14 +1,32 @@
 """Service layer cho notification deliveries - xử lý gửi notifications"""
 import logging
+from datetime import timedelta
+from typing import List
+from django.conf import settings
 from django.utils import timezone
 
 from apps.notification.models import DeliveryStatus
 from apps.notification.repositories.notification_repository import (
     NotificationDeliveryRepository
 )
+from apps.notification.services.async_dispatcher import (
+    STATUS_UPDATE_FIELDS,
+    AsyncDeliveryDispatcher,
+    DispatchResult,
+)
+from apps.notification.services.retry_policy import record_attempt
 
 logger = logging.getLogger('app')
 
+# Số deliveries mỗi lần claim + dispatch khi fan-out
+DISPATCH_BATCH_SIZE = 500
+
+# Retry: circuit breaker theo channel trong một lần chạy, probe một delivery mỗi endpoint
+CIRCUIT_MIN_SAMPLES = 10
+CIRCUIT_FAILURE_RATIO = 0.5
+CIRCUIT_COOLDOWN_SECONDS = 300
+ENDPOINT_PROBE_DEFER_SECONDS = 60
+
 
 class DeliveryService:
     """Service để gửi notifications qua các kênh khác nhau"""
@@ -26,76 +44,140 @@ class DeliveryService:
             return False
 
         try:
-            self.delivery_repo.update_status(delivery, DeliveryStatus.SENDING)
+            delivery.status = DeliveryStatus.SENDING
+            delivery.claimed_at = timezone.now()
+            delivery.save(update_fields=['status', 'claimed_at'])
 
             from apps.notification.services.handlers import get_handler
             handler = get_handler(delivery.channel)
 
             if handler:
                 success = handler.send(delivery)
-                if success:
-                    self.delivery_repo.update_status(
-                        delivery,
-                        DeliveryStatus.SENT,
-                        sent_at=timezone.now()
-                    )
-                else:
-                    self.delivery_repo.update_status(
-                        delivery,
-                        DeliveryStatus.FAILED
-                    )
-                return success
             else:
                 logger.error(f"No handler found for channel {delivery.channel}")
-                self.delivery_repo.update_status(
-                    delivery,
-                    DeliveryStatus.FAILED,
-                    error_message=f"No handler for channel {delivery.channel}"
-                )
-                return False
+                delivery.error_message = f"No handler for channel {delivery.channel}"
+                success = False
+            # Thất bại cũng qua record_attempt để có next_attempt_at (retry) hoặc DEAD
+            record_attempt(delivery, success, timezone.now())
+            delivery.save(update_fields=STATUS_UPDATE_FIELDS)
+            return success
 
         except Exception as e:
             logger.exception(f"Error sending delivery {delivery_id}: {e}")
             try:
                 delivery = self.delivery_repo.get_by_id(delivery_id)
                 if delivery:
-                    self.delivery_repo.update_status(
-                        delivery,
-                        DeliveryStatus.FAILED,
-                        error_message=str(e)
-                    )
+                    delivery.error_message = str(e)
+                    record_attempt(delivery, False, timezone.now())
+                    delivery.save(update_fields=STATUS_UPDATE_FIELDS)
             except:
                 pass
             return False
 
-    def retry_failed_deliveries(self, limit: int = 100) -> int:
+    def retry_failed_deliveries(self, limit: int = 100, batch_size: int = DISPATCH_BATCH_SIZE) -> int:
         """
-        Retry các deliveries bị failed
-        Returns: số deliveries được retry
+        Retry các deliveries FAILED đã tới next_attempt_at, theo batch (claim SKIP LOCKED):
+        - mỗi endpoint chỉ gửi một delivery (probe) mỗi batch, các delivery còn lại của endpoint bị dời;
+          probe lỗi thì cả endpoint chờ tới next_attempt_at (backoff) của probe
+        - channel có tỉ lệ lỗi cao thì mở circuit: không claim thêm trong lần chạy này và dời
+          các delivery tới hạn của channel thêm CIRCUIT_COOLDOWN_SECONDS
+        Returns: số deliveries retry thành công
         """
-        failed_deliveries = self.delivery_repo.get_failed_deliveries(limit)
-
-        retried = 0
-        for delivery in failed_deliveries:
-            self.delivery_repo.update_status(delivery, DeliveryStatus.RETRYING)
+        dispatcher = AsyncDeliveryDispatcher()
+        result = DispatchResult()
+        open_channels = set()
+        remaining = limit
+
+        while remaining > 0:
+            now = timezone.now()
+            claimed = self.delivery_repo.claim_due_retries(
+                now, limit=min(batch_size, remaining), exclude_channels=open_channels
+            )
+            if not claimed:
+                break
+            remaining -= len(claimed)
+
+            probes, deferred, seen_endpoints = [], [], set()
+            for delivery in claimed:
+                (deferred if delivery.endpoint_id in seen_endpoints else probes).append(delivery)
+                seen_endpoints.add(delivery.endpoint_id)
+            if deferred:
+                self.delivery_repo.defer(deferred, now + timedelta(seconds=ENDPOINT_PROBE_DEFER_SECONDS))
+
+            result.merge(dispatcher.dispatch(probes))
+            self._defer_failed_endpoints(probes)
+
+            for channel, counts in result.by_channel.items():
+                attempted = counts['sent'] + counts['failed']
+                if channel in open_channels or attempted < CIRCUIT_MIN_SAMPLES:
+                    continue
+                if counts['failed'] / attempted >= CIRCUIT_FAILURE_RATIO:
+                    open_channels.add(channel)
+                    now = timezone.now()
+                    postponed = self.delivery_repo.defer_channel(
+                        channel, now, now + timedelta(seconds=CIRCUIT_COOLDOWN_SECONDS)
+                    )
+                    logger.warning(
+                        f"Circuit open for {channel}: {counts['failed']}/{attempted} retries failed, "
+                        f"postponed {postponed} deliveries by {CIRCUIT_COOLDOWN_SECONDS}s"
+                    )
 
-            if self.send_delivery(str(delivery.delivery_id)):
-                retried += 1
+        logger.info(f"Retried {result.sent + result.failed} deliveries: {result.sent} sent (by channel: {result.by_channel})")
+        return result.sent
 
-        logger.info(f"Retried {retried} failed deliveries")
-        return retried
+    def _defer_failed_endpoints(self, probes: List) -> None:
+        """
+        Probe lỗi thì các delivery còn lại của endpoint chờ theo backoff của probe (lưu trong DB),
+        để endpoint chết không bị probe lại mỗi lần schedule chạy
+        """
+        for probe in probes:
+            if probe.status == DeliveryStatus.SENT:
+                continue
+            until = probe.next_attempt_at or timezone.now() + timedelta(
+                seconds=settings.NOTIFICATION_RETRY_MAX_DELAY_SECONDS
+            )
+            self.delivery_repo.defer_endpoint(probe.endpoint_id, until)
 
     def send_pending_deliveries(self, limit: int = 100) -> int:
         """
-        Gửi các deliveries đang pending
+        Gửi các deliveries đang pending song song theo channel (AsyncDeliveryDispatcher)
         Returns: số deliveries được gửi thành công
         """
-        pending_deliveries = self.delivery_repo.get_pending_deliveries(limit)
+        pending_deliveries = self.delivery_repo.claim_pending_deliveries(limit)
+        if not pending_deliveries:
+            return 0
+
+        result = AsyncDeliveryDispatcher().dispatch(pending_deliveries)
 
-        sent_count = 0
-        for delivery in pending_deliveries:
-            if self.send_delivery(str(delivery.delivery_id)):
-                sent_count += 1
+        logger.info(
+            f"Sent {result.sent}/{len(pending_deliveries)} pending deliveries "
+            f"(by channel: {result.by_channel})"
+        )
+        return result.sent
 
-        logger.info(f"Sent {sent_count}/{len(pending_deliveries)} pending deliveries")
-        return sent_count
+    def reap_stale_sending(self) -> int:
+        """
+        Trả các deliveries kẹt ở sending quá NOTIFICATION_SENDING_STALE_SECONDS về FAILED để retry
+        Returns: số deliveries được trả về
+        """
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=settings.NOTIFICATION_SENDING_STALE_SECONDS)
+        reaped = self.delivery_repo.reap_stale_sending(cutoff, now)
+        if reaped:
+            logger.warning(f"Reaped {reaped} deliveries stuck in sending since before {cutoff.isoformat()}")
+        return reaped
+
+    def send_deliveries(self, delivery_ids: List, batch_size: int = DISPATCH_BATCH_SIZE) -> DispatchResult:
+        """
+        Gửi các deliveries theo id, mỗi batch một lần claim + một lần dispatch
+        Returns: DispatchResult cộng dồn của các batch
+        """
+        dispatcher = AsyncDeliveryDispatcher()
+        result = DispatchResult()
+        for start in range(0, len(delivery_ids), batch_size):
+            batch = delivery_ids[start:start + batch_size]
+            deliveries = self.delivery_repo.claim_pending_deliveries(limit=len(batch), delivery_ids=batch)
+            result.merge(dispatcher.dispatch(deliveries))
+
+        logger.info(f"Sent {result.sent}/{len(delivery_ids)} deliveries (by channel: {result.by_channel})")
+        return result
@@ -1,6 +1,7 @@
 import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, Dict, Optional
 import requests
 from django.conf import settings
 
@@ -8,6 +9,16 @@ from apps.notification.models import NotificationDelivery, NotificationChannel
 
 logger = logging.getLogger('app')
 
+_local = threading.local()
+
+
+def _http_session() -> requests.Session:
+    """Session theo thread để các lần gửi sync dùng lại kết nối TCP/TLS"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
 
 class NotificationHandler(ABC):
     """Base class cho các notification handlers"""
@@ -26,49 +37,82 @@ class NotificationHandler(ABC):
         pass
 
 
-class TelegramHandler(NotificationHandler):
-    """Handler để gửi notification qua Telegram"""
+class HttpNotificationHandler(NotificationHandler):
+    """
+    Handler gửi qua HTTP API. Tách build_request / handle_response khỏi send để
+    AsyncDeliveryDispatcher gửi cùng request qua aiohttp với session dùng chung.
+    """
 
-    def __init__(self):
-        self.bot_token = getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+    timeout = 10
+
+    def config_error(self) -> Optional[str]:
+        """Lý do không gửi được (thiếu token...), None nếu đã cấu hình"""
+        return None
+
+    @abstractmethod
+    def build_request(self, delivery: NotificationDelivery) -> Dict[str, Any]:
+        """Trả về dict gồm url, json và headers (tuỳ chọn)"""
+
+    @abstractmethod
+    def handle_response(self, delivery: NotificationDelivery, status_code: int, data: Dict[str, Any]) -> bool:
+        """Ghi response_raw / error_message vào delivery, True nếu thành công"""
 
     def send(self, delivery: NotificationDelivery) -> bool:
-        if not self.bot_token:
-            logger.error("TELEGRAM_BOT_TOKEN not configured")
-            delivery.error_message = "TELEGRAM_BOT_TOKEN not configured"
+        error = self.config_error()
+        if error:
+            logger.error(error)
+            delivery.error_message = error
             return False
 
         try:
-            chat_id = delivery.endpoint.address
-            message = self.format_message(delivery)
-
-            response = requests.post(
-                f"{self.base_url}/sendMessage",
-                json={
-                    "chat_id": chat_id,
-                    "text": message,
-                    "parse_mode": "HTML"
-                },
-                timeout=10
+            request = self.build_request(delivery)
+            response = _http_session().post(
+                request["url"],
+                json=request["json"],
+                headers=request.get("headers"),
+                timeout=self.timeout
             )
-
-            delivery.response_raw = response.json()
-
-            if response.status_code == 200 and response.json().get('ok'):
-                logger.info(f"Sent Telegram notification to {chat_id}")
-                return True
-            else:
-                error_msg = response.json().get('description', 'Unknown error')
-                logger.error(f"Failed to send Telegram notification: {error_msg}")
-                delivery.error_message = error_msg
-                return False
+            return self.handle_response(delivery, response.status_code, response.json())
 
         except Exception as e:
-            logger.exception(f"Error sending Telegram notification: {e}")
+            logger.exception(f"Error sending {delivery.channel} notification: {e}")
             delivery.error_message = str(e)
             return False
 
+
+class TelegramHandler(HttpNotificationHandler):
+    """Handler để gửi notification qua Telegram"""
+
+    def __init__(self):
+        self.bot_token = getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
+        api_base = getattr(settings, 'TELEGRAM_API_BASE_URL', 'https://api.telegram.org')
+        self.base_url = f"{api_base}/bot{self.bot_token}"
+
+    def config_error(self) -> Optional[str]:
+        return None if self.bot_token else "TELEGRAM_BOT_TOKEN not configured"
+
+    def build_request(self, delivery: NotificationDelivery) -> Dict[str, Any]:
+        return {
+            "url": f"{self.base_url}/sendMessage",
+            "json": {
+                "chat_id": delivery.endpoint.address,
+                "text": self.format_message(delivery),
+                "parse_mode": "HTML"
+            },
+        }
+
+    def handle_response(self, delivery: NotificationDelivery, status_code: int, data: Dict[str, Any]) -> bool:
+        delivery.response_raw = data
+
+        if status_code == 200 and data.get('ok'):
+            logger.info(f"Sent Telegram notification to {delivery.endpoint.address}")
+            return True
+
+        error_msg = data.get('description', 'Unknown error')
+        logger.error(f"Failed to send Telegram notification: {error_msg}")
+        delivery.error_message = error_msg
+        return False
+
     def format_message(self, delivery: NotificationDelivery) -> str:
         """Format message cho Telegram (HTML format)"""
         event = delivery.event
@@ -104,55 +148,44 @@ Mã giao dịch: {payload.get('transaction_id', 'N/A')}
         return message.strip()
 
 
-class ZaloHandler(NotificationHandler):
+class ZaloHandler(HttpNotificationHandler):
     """Handler để gửi notification qua Zalo OA"""
 
     def __init__(self):
         self.oa_access_token = getattr(settings, 'ZALO_OA_ACCESS_TOKEN', None)
-        self.base_url = "https://openapi.zalo.me/v3.0/oa"
-
-    def send(self, delivery: NotificationDelivery) -> bool:
-        if not self.oa_access_token:
-            logger.error("ZALO_OA_ACCESS_TOKEN not configured")
-            delivery.error_message = "ZALO_OA_ACCESS_TOKEN not configured"
-            return False
-
-        try:
-            user_id = delivery.endpoint.address
-            message = self.format_message(delivery)
-
-            response = requests.post(
-                f"{self.base_url}/message/cs",
-                headers={
-                    "access_token": self.oa_access_token,
-                    "Content-Type": "application/json"
+        self.base_url = getattr(settings, 'ZALO_API_BASE_URL', 'https://openapi.zalo.me/v3.0/oa')
+
+    def config_error(self) -> Optional[str]:
+        return None if self.oa_access_token else "ZALO_OA_ACCESS_TOKEN not configured"
+
+    def build_request(self, delivery: NotificationDelivery) -> Dict[str, Any]:
+        return {
+            "url": f"{self.base_url}/message/cs",
+            "headers": {
+                "access_token": self.oa_access_token,
+                "Content-Type": "application/json"
+            },
+            "json": {
+                "recipient": {
+                    "user_id": delivery.endpoint.address
                 },
-                json={
-                    "recipient": {
-                        "user_id": user_id
-                    },
-                    "message": {
-                        "text": message
-                    }
-                },
-                timeout=10
-            )
+                "message": {
+                    "text": self.format_message(delivery)
+                }
+            },
+        }
 
-            delivery.response_raw = response.json()
+    def handle_response(self, delivery: NotificationDelivery, status_code: int, data: Dict[str, Any]) -> bool:
+        delivery.response_raw = data
 
-            if response.status_code == 200 and response.json().get('error') == 0:
-                logger.info(f"Sent Zalo notification to {user_id}")
-                return True
-            else:
-                error_msg = response.json().get('message', 'Unknown error')
-                logger.error(f"Failed to send Zalo notification: {error_msg}")
-                delivery.error_message = error_msg
-                return False
+        if status_code == 200 and data.get('error') == 0:
+            logger.info(f"Sent Zalo notification to {delivery.endpoint.address}")
+            return True
 
-        except Exception as e:
-            logger.exception(f"Error sending Zalo notification: {e}")
-            delivery.error_message = str(e)
-            return False
+        error_msg = data.get('message', 'Unknown error')
+        logger.error(f"Failed to send Zalo notification: {error_msg}")
+        delivery.error_message = error_msg
+        return False
 
     def format_message(self, delivery: NotificationDelivery) -> str:
         """Format message cho Zalo"""
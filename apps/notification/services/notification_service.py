@@ -1,8 +1,10 @@
 """Service layer cho notification events - xử lý business logic"""
 import logging
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from django.db import transaction
 
+from apps.notification.models import NotificationDelivery, NotificationEvent
+
 from apps.notification.repositories.notification_repository import (
     NotificationEventRepository,
     NotificationDeliveryRepository,
@@ -85,6 +87,41 @@ class NotificationService:
         deliveries_count = self.process_event(str(event.event_id))
         return event, deliveries_count
 
+    @transaction.atomic
+    def bulk_create_events(
+        self,
+        recipients: Dict[int, List[Tuple[str, str]]],
+        event_type: str,
+        payload: dict,
+        subject_id: Optional[str] = None
+    ) -> List:
+        """
+        Fan-out một event cho nhiều users: recipients = {user_id: [(endpoint_id, channel), ...]}.
+        Tạo events (processed=True) và deliveries bằng bulk_create thay vì create + process_event
+        từng user. Returns: danh sách delivery_id đã tạo
+        """
+        events = []
+        deliveries = []
+        for user_id, endpoints in recipients.items():
+            event = NotificationEvent(
+                user_id=user_id,
+                event_type=event_type,
+                subject_id=subject_id,
+                payload=payload,
+                processed=True
+            )
+            events.append(event)
+            deliveries.extend(
+                NotificationDelivery(event=event, endpoint_id=endpoint_id, channel=channel)
+                for endpoint_id, channel in endpoints
+            )
+
+        self.event_repo.bulk_create(events)
+        self.delivery_repo.bulk_create(deliveries)
+
+        logger.info(f"Fan-out {event_type}: created {len(events)} events, {len(deliveries)} deliveries")
+        return [delivery.delivery_id for delivery in deliveries]
+
     def get_event(self, event_id: str):
         """Lấy event theo ID"""
         return self.event_repo.get_by_id(event_id)
@@ -3,7 +3,8 @@ Utility functions để gửi notification cho symbol signals
 CHỈ GỬI CHO USER CÓ LICENSE ACTIVE
 """
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+from django.db.models import FilteredRelation, Q
 from django.utils import timezone
 
 from apps.notification.models import AppEventType
@@ -41,6 +42,63 @@ def get_users_with_active_license(symbol_id: int) -> List[int]:
     return user_ids
 
 
+def get_signal_recipients(symbol_id: int) -> Dict[int, List[Tuple[str, str]]]:
+    """
+    Users có license ACTIVE cho symbol kèm các endpoint đã verified, trong MỘT query
+    (license JOIN user LEFT JOIN endpoint verified).
+
+    Returns:
+        {user_id: [(endpoint_id, channel), ...]} - user không có endpoint vẫn có key với list rỗng
+    """
+    from apps.seapay.models import PayUserSymbolLicense, LicenseStatus
+
+    now = timezone.now()
+
+    rows = PayUserSymbolLicense.objects.filter(
+        symbol_id=symbol_id,
+        status=LicenseStatus.ACTIVE
+    ).filter(
+        Q(end_at__isnull=True) | Q(end_at__gt=now)
+    ).annotate(
+        verified_endpoint=FilteredRelation(
+            'user__notification_endpoints',
+            condition=Q(user__notification_endpoints__verified=True)
+        )
+    ).values_list(
+        'user_id', 'verified_endpoint__endpoint_id', 'verified_endpoint__channel'
+    ).distinct()
+
+    recipients: Dict[int, List[Tuple[str, str]]] = {}
+    for user_id, endpoint_id, channel in rows:
+        endpoints = recipients.setdefault(user_id, [])
+        if endpoint_id is not None:
+            endpoints.append((endpoint_id, channel))
+
+    logger.info(f"Found {len(recipients)} users with active license for symbol_id={symbol_id}")
+    return recipients
+
+
+def _signal_payload(
+    symbol: str,
+    signal_type: str,
+    price: str,
+    timestamp: str,
+    description: str = "",
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    payload = {
+        'symbol': symbol,
+        'signal_type': signal_type,
+        'price': price,
+        'timestamp': timestamp,
+        'description': description or f"Tín hiệu {signal_type} cho {symbol}"
+    }
+
+    if metadata:
+        payload['metadata'] = metadata
+    return payload
+
+
 def send_symbol_signal_notification(
     user_id: int,
     symbol: str,
@@ -66,27 +124,8 @@ def send_symbol_signal_notification(
         True nếu gửi thành công, False nếu thất bại
     """
     try:
-        payload = {
-            'symbol': symbol,
-            'signal_type': signal_type,
-            'price': price,
-            'timestamp': timestamp,
-            'description': description or f"Tín hiệu {signal_type} cho {symbol}"
-        }
-
-        if metadata:
-            payload['metadata'] = metadata
-
-        notification_service = NotificationService()
-        event, deliveries_count = notification_service.create_and_process_event(
-            user_id=user_id,
-            event_type=AppEventType.SYMBOL_SIGNAL,
-            payload=payload
-        )
-
-        logger.info(
-            f"Created symbol signal notification for user {user_id}: "
-            f"{symbol} {signal_type} - {deliveries_count} deliveries"
+        deliveries_count = _create_symbol_signal_event(
+            user_id, symbol, signal_type, price, timestamp, description, metadata
         )
 
         if deliveries_count > 0:
@@ -100,6 +139,32 @@ def send_symbol_signal_notification(
         return False
 
 
+def _create_symbol_signal_event(
+    user_id: int,
+    symbol: str,
+    signal_type: str,
+    price: str,
+    timestamp: str,
+    description: str = "",
+    metadata: Optional[Dict[str, Any]] = None
+) -> int:
+    """Tạo event + deliveries (chưa gửi) cho một user; trả về số deliveries"""
+    payload = _signal_payload(symbol, signal_type, price, timestamp, description, metadata)
+
+    notification_service = NotificationService()
+    event, deliveries_count = notification_service.create_and_process_event(
+        user_id=user_id,
+        event_type=AppEventType.SYMBOL_SIGNAL,
+        payload=payload
+    )
+
+    logger.info(
+        f"Created symbol signal notification for user {user_id}: "
+        f"{symbol} {signal_type} - {deliveries_count} deliveries"
+    )
+    return deliveries_count
+
+
 def send_symbol_signal_to_subscribers(
     symbol_id: int,
     symbol_name: str,
@@ -124,12 +189,12 @@ def send_symbol_signal_to_subscribers(
     Returns:
         Dict với thông tin:
         - total_users: Tổng số users có license
-        - sent_count: Số notifications gửi thành công
-        - failed_count: Số thất bại
+        - sent_count: Số users nhận được ít nhất một notification
+        - failed_count: Số users có delivery nhưng không delivery nào gửi thành công
     """
-    user_ids = get_users_with_active_license(symbol_id)
+    recipients = get_signal_recipients(symbol_id)
 
-    if not user_ids:
+    if not recipients:
         logger.warning(f"No users with active license for symbol {symbol_name} (id={symbol_id})")
         return {
             'total_users': 0,
@@ -138,38 +203,26 @@ def send_symbol_signal_to_subscribers(
             'message': 'No subscribed users'
         }
 
-    sent_count = 0
-    failed_count = 0
-
-    for user_id in user_ids:
-        try:
-            success = send_symbol_signal_notification(
-                user_id=user_id,
-                symbol=symbol_name,
-                signal_type=signal_type,
-                price=price,
-                timestamp=timestamp,
-                description=description,
-                metadata=metadata
-            )
-
-            if success:
-                sent_count += 1
-            else:
-                failed_count += 1
-
-        except Exception as e:
-            logger.error(f"Error sending signal to user {user_id}: {e}")
-            failed_count += 1
+    # Bulk fan-out: một lần bulk_create events + deliveries, rồi gửi theo batch delivery id
+    payload = _signal_payload(symbol_name, signal_type, price, timestamp, description, metadata)
+    delivery_ids = NotificationService().bulk_create_events(
+        recipients,
+        event_type=AppEventType.SYMBOL_SIGNAL,
+        payload=payload
+    )
+    dispatch = DeliveryService().send_deliveries(delivery_ids)
 
     logger.info(
-        f"Sent {sent_count}/{len(user_ids)} symbol signal notifications for {symbol_name}"
+        f"Fan-out symbol signal {symbol_name} to {len(recipients)} users: "
+        f"{dispatch.sent}/{len(delivery_ids)} deliveries sent, {dispatch.users_sent} users notified"
     )
 
     return {
-        'total_users': len(user_ids),
-        'sent_count': sent_count,
-        'failed_count': failed_count,
+        'total_users': len(recipients),
+        'sent_count': dispatch.users_sent,
+        'failed_count': dispatch.users_failed,
+        'deliveries_sent': dispatch.sent,
+        'deliveries_failed': dispatch.failed,
         'symbol': symbol_name,
         'symbol_id': symbol_id
     }
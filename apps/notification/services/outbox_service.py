@@ -0,0 +1,124 @@
+"""
+Transactional outbox cho notification phát sinh trong transaction nghiệp vụ (order/payment).
+
+- add(): chỉ INSERT một row NotificationOutbox trong transaction hiện tại, đăng ký relay on_commit.
+- relay(): sau commit (hoặc cron relay_notification_outbox) chuyển một batch outbox thành
+  NotificationEvent + deliveries bằng bulk_create. Transaction thanh toán không giữ lock
+  trong lúc ghi notification, và lỗi notification không làm rollback thanh toán.
+"""
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.notification.models import NotificationDelivery, NotificationEvent, NotificationOutbox
+from apps.notification.repositories.notification_repository import (
+    NotificationDeliveryRepository,
+    NotificationEventRepository,
+    NotificationOutboxRepository,
+    UserEndpointRepository,
+)
+
+logger = logging.getLogger('app')
+
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_MAX_ATTEMPTS = 5
+
+
+class NotificationOutboxService:
+    def __init__(self):
+        self.outbox_repo = NotificationOutboxRepository()
+        self.event_repo = NotificationEventRepository()
+        self.delivery_repo = NotificationDeliveryRepository()
+        self.endpoint_repo = UserEndpointRepository()
+
+    def add(
+        self,
+        user_id: int,
+        event_type: str,
+        payload: dict,
+        subject_id: Optional[str] = None
+    ):
+        """Ghi outbox trong transaction hiện tại; relay chạy sau khi transaction commit"""
+        entry = self.outbox_repo.add(
+            user_id=user_id,
+            event_type=event_type,
+            payload=payload,
+            subject_id=subject_id
+        )
+        transaction.on_commit(_relay_after_commit)
+        return entry
+
+    def add_many(self, entries: List[Dict[str, Any]]) -> int:
+        """Như add() cho nhiều entries (dict user_id/event_type/payload/subject_id), một bulk INSERT"""
+        if not entries:
+            return 0
+        self.outbox_repo.bulk_add([NotificationOutbox(**entry) for entry in entries])
+        transaction.on_commit(_relay_after_commit)
+        return len(entries)
+
+    def relay(self, limit: int = OUTBOX_BATCH_SIZE) -> int:
+        """
+        Relay một batch outbox: tạo events (processed=True) + deliveries queued cho endpoints
+        đã verified. Returns: số outbox rows đã relay
+        """
+        locked_ids = []
+        try:
+            with transaction.atomic():
+                entries = self.outbox_repo.lock_pending(limit, OUTBOX_MAX_ATTEMPTS)
+                if not entries:
+                    return 0
+                locked_ids = [entry.id for entry in entries]
+
+                endpoints_by_user = defaultdict(list)
+                for endpoint in self.endpoint_repo.get_verified_endpoints_for_users(
+                    {entry.user_id for entry in entries}
+                ):
+                    endpoints_by_user[endpoint.user_id].append(endpoint)
+
+                events = []
+                deliveries = []
+                for entry in entries:
+                    event = NotificationEvent(
+                        user_id=entry.user_id,
+                        event_type=entry.event_type,
+                        subject_id=entry.subject_id,
+                        payload=entry.payload,
+                        processed=True
+                    )
+                    events.append(event)
+                    deliveries.extend(
+                        NotificationDelivery(event=event, endpoint=endpoint, channel=endpoint.channel)
+                        for endpoint in endpoints_by_user[entry.user_id]
+                    )
+
+                self.event_repo.bulk_create(events)
+                self.delivery_repo.bulk_create(deliveries)
+                self.outbox_repo.mark_processed(locked_ids, timezone.now())
+        except Exception as e:
+            if locked_ids:
+                self.outbox_repo.mark_failed(locked_ids, str(e))
+            logger.error(f"Notification outbox relay failed: {e}")
+            raise
+
+        logger.info(f"Relayed {len(events)} outbox entries: {len(deliveries)} deliveries queued")
+        return len(events)
+
+    def relay_all(self, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+        """Relay tới khi hết outbox pending (cron)"""
+        total = 0
+        while True:
+            relayed = self.relay(limit=batch_size)
+            total += relayed
+            if relayed < batch_size:
+                return total
+
+
+def _relay_after_commit() -> None:
+    """on_commit: lỗi relay chỉ log, outbox còn nguyên để cron relay lại"""
+    try:
+        NotificationOutboxService().relay()
+    except Exception:
+        pass
@@ -0,0 +1,33 @@
+"""
+Chính sách retry cho NotificationDelivery: mỗi lần gửi tăng attempts; thất bại thì hẹn
+next_attempt_at theo backoff lũy thừa có jitter, hết số lần thì chuyển DEAD (dead letter).
+"""
+import random
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from apps.notification.models import DeliveryStatus, NotificationDelivery
+
+
+def retry_delay(attempts: int) -> float:
+    """Số giây chờ sau lần thất bại thứ `attempts`: base * 2^(n-1), tối đa cap, jitter [50%, 100%]"""
+    base = settings.NOTIFICATION_RETRY_BASE_SECONDS
+    cap = settings.NOTIFICATION_RETRY_MAX_DELAY_SECONDS
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return random.uniform(delay / 2, delay)
+
+
+def record_attempt(delivery: NotificationDelivery, ok: bool, now: datetime) -> None:
+    """Cập nhật status/attempts/next_attempt_at trên instance (chưa save)"""
+    delivery.attempts += 1
+    if ok:
+        delivery.status = DeliveryStatus.SENT
+        delivery.sent_at = now
+        delivery.next_attempt_at = None
+    elif delivery.attempts >= settings.NOTIFICATION_RETRY_MAX_ATTEMPTS:
+        delivery.status = DeliveryStatus.DEAD
+        delivery.next_attempt_at = None
+    else:
+        delivery.status = DeliveryStatus.FAILED
+        delivery.next_attempt_at = now + timedelta(seconds=retry_delay(delivery.attempts))
@@ -0,0 +1,172 @@
+"""
+Xử lý webhook TradingView theo 2 bước:
+- accept(): chạy trong request, chỉ lưu WebhookLog và enqueue job rồi trả về ngay.
+- fan_out_signal() / forward_to_backtest(): chạy trong worker (apps.jobs), có retry.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+from apps.jobs.handlers import NOTIFICATION_BACKTEST_FORWARD, NOTIFICATION_SIGNAL_FANOUT
+from apps.jobs.services import JobService
+from apps.notification.models import WebhookLog, WebhookSource
+from apps.notification.repositories.notification_repository import WebhookLogRepository
+from apps.notification.schemas import TradingViewWebhookSchema
+
+logger = logging.getLogger('app')
+
+# Tín hiệu cần tới user nhanh, ưu tiên hơn các job import
+SIGNAL_FANOUT_PRIORITY = 10
+BACKTEST_FORWARD_MAX_ATTEMPTS = 5
+
+
+def build_signal(payload: TradingViewWebhookSchema, symbol_id: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Trả về (tham số cho send_symbol_signal_to_subscribers, metadata gửi backtest)"""
+    timestamp_str = datetime.fromtimestamp(payload.CheckDate / 1000).strftime('%Y-%m-%d %H:%M:%S')
+
+    description_parts = [
+        f"Bot: {payload.botName}",
+        f"Action: {payload.Action}",
+    ]
+
+    if payload.Direction:
+        description_parts.append(f"Direction: {payload.Direction}")
+    if payload.TP:
+        description_parts.append(f"TP: {payload.TP}")
+    if payload.SL:
+        description_parts.append(f"SL: {payload.SL}")
+    if payload.Profit is not None:
+        description_parts.append(f"Profit: {payload.Profit}")
+    if payload.WinLossStatus:
+        description_parts.append(f"Status: {payload.WinLossStatus}")
+
+    metadata = {
+        "raw_payload": payload.dict(),
+        "trans_id": payload.TransId,
+        "bot_name": payload.botName,
+        "action": payload.Action,
+        "type": payload.Type,
+        "direction": payload.Direction,
+        "max_price": payload.MaxPrice,
+        "min_price": payload.MinPrice,
+        "tp": payload.TP,
+        "sl": payload.SL,
+        "exit_price": payload.ExitPrice,
+        "position_size": payload.PositionSize,
+        "profit": payload.Profit,
+        "max_drawdown": payload.MaxDrawdown,
+        "trade_duration": payload.TradeDuration,
+        "win_loss_status": payload.WinLossStatus,
+        "distance_to_sl": payload.DistanceToSL,
+        "distance_to_tp": payload.DistanceToTP,
+        "volatility_adjusted_profit": payload.VolatilityAdjustedProfit,
+    }
+
+    signal = {
+        "symbol_id": symbol_id,
+        "symbol_name": payload.Symbol.upper(),
+        "signal_type": payload.Type.lower(),
+        "price": str(payload.Price),
+        "timestamp": timestamp_str,
+        "description": " | ".join(description_parts),
+        "metadata": metadata,
+    }
+    return signal, metadata
+
+
+class TradingViewWebhookService:
+    def __init__(self):
+        self.webhook_repo = WebhookLogRepository()
+        self.job_service = JobService()
+
+    def accept(self, payload: TradingViewWebhookSchema) -> Tuple[int, Dict[str, Any]]:
+        """
+        Lưu WebhookLog và enqueue fan-out + forward backtest trong một transaction.
+        Không gọi HTTP ra ngoài và không lặp qua subscriber trong request của TradingView.
+        """
+        from apps.stock.models import Symbol
+
+        symbol_name = payload.Symbol.upper()
+        symbol_id = Symbol.objects.filter(name=symbol_name).values_list('id', flat=True).first()
+        if symbol_id is None:
+            error = f"Symbol {symbol_name} not found in database"
+            self.webhook_repo.create(
+                source=WebhookSource.TRADINGVIEW,
+                symbol=symbol_name,
+                payload=payload.dict(),
+                status_code=404,
+                error_message=error,
+                users_notified=0
+            )
+            return 404, {"error": error}
+
+        signal, metadata = build_signal(payload, symbol_id)
+        with transaction.atomic():
+            webhook_log = self.webhook_repo.create(
+                source=WebhookSource.TRADINGVIEW,
+                symbol=symbol_name,
+                payload=payload.dict(),
+                status_code=202,
+                users_notified=0
+            )
+            fanout_job, _ = self.job_service.enqueue(
+                NOTIFICATION_SIGNAL_FANOUT,
+                {"webhook_id": str(webhook_log.webhook_id), "signal": signal},
+                priority=SIGNAL_FANOUT_PRIORITY,
+            )
+            self.job_service.enqueue(
+                NOTIFICATION_BACKTEST_FORWARD,
+                {"webhook_id": str(webhook_log.webhook_id), "metadata": metadata},
+                max_attempts=BACKTEST_FORWARD_MAX_ATTEMPTS,
+            )
+
+        return 202, {
+            "success": True,
+            "accepted": True,
+            "webhook_id": str(webhook_log.webhook_id),
+            "symbol": symbol_name,
+            "signal_type": payload.Type,
+            "job_id": fanout_job.pk,
+        }
+
+
+def fan_out_signal(webhook_id: str, signal: Dict[str, Any]) -> Dict[str, Any]:
+    """Gửi tín hiệu cho subscribers (worker) và ghi kết quả vào WebhookLog"""
+    from apps.notification.services.notification_utils import send_symbol_signal_to_subscribers
+
+    try:
+        result = send_symbol_signal_to_subscribers(**signal)
+    except Exception as e:
+        WebhookLog.objects.filter(webhook_id=webhook_id).update(error_message=str(e))
+        raise
+
+    response_data = {
+        "success": True,
+        "symbol": signal["symbol_name"],
+        "signal_type": signal["signal_type"],
+        "total_users": result['total_users'],
+        "sent_count": result['sent_count'],
+        "failed_count": result['failed_count'],
+        "message": f"Sent to {result['sent_count']} users"
+    }
+    WebhookLog.objects.filter(webhook_id=webhook_id).update(
+        response_data=response_data,
+        users_notified=result['sent_count']
+    )
+    return response_data
+
+
+def forward_to_backtest(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """POST metadata sang backtest; lỗi/timeout raise để job queue retry với backoff"""
+    response = requests.post(
+        settings.BACKTEST_WEBHOOK_URL,
+        json=metadata,
+        headers={"Content-Type": "application/json"},
+        timeout=10
+    )
+    response.raise_for_status()
+    return {"status_code": response.status_code, "body": response.text[:500]}
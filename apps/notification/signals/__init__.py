@@ -8,7 +8,7 @@ from django.dispatch import receiver
 from apps.seapay.models import PaySymbolOrder, OrderStatus
 
 from apps.notification.models import AppEventType
-from apps.notification.services.notification_service import NotificationService
+from apps.notification.services.outbox_service import NotificationOutboxService
 
 logger = logging.getLogger('app')
 
@@ -16,14 +16,16 @@ logger = logging.getLogger('app')
 @receiver(post_save, sender=PaySymbolOrder)
 def send_order_notification(sender, instance, created, **kwargs):
     """
-    Gửi notification khi order được tạo hoặc status thay đổi
+    Gửi notification khi order được tạo hoặc status thay đổi.
+    Handler chạy bên trong transaction thanh toán nên chỉ ghi outbox (một INSERT);
+    event + deliveries được tạo sau commit bởi NotificationOutboxService.relay
     """
     try:
-        service = NotificationService()
+        service = NotificationOutboxService()
 
         if created:
-            service.create_and_process_event(
-                user_id=instance.user.id,
+            service.add(
+                user_id=instance.user_id,
                 event_type=AppEventType.ORDER_CREATED,
                 payload={
                     'order_id': str(instance.order_id),
@@ -33,11 +35,11 @@ def send_order_notification(sender, instance, created, **kwargs):
                 },
                 subject_id=str(instance.order_id)
             )
-            logger.info(f"Created notification event for new order {instance.order_id}")
+            logger.info(f"Queued notification outbox for new order {instance.order_id}")
 
         elif instance.status == OrderStatus.PAID:
-            service.create_and_process_event(
-                user_id=instance.user.id,
+            service.add(
+                user_id=instance.user_id,
                 event_type=AppEventType.PAYMENT_SUCCESS,
                 payload={
                     'order_id': str(instance.order_id),
@@ -47,11 +49,11 @@ def send_order_notification(sender, instance, created, **kwargs):
                 },
                 subject_id=str(instance.order_id)
             )
-            logger.info(f"Created notification event for paid order {instance.order_id}")
+            logger.info(f"Queued notification outbox for paid order {instance.order_id}")
 
         elif instance.status == OrderStatus.FAILED:
-            service.create_and_process_event(
-                user_id=instance.user.id,
+            service.add(
+                user_id=instance.user_id,
                 event_type=AppEventType.PAYMENT_FAILED,
                 payload={
                     'order_id': str(instance.order_id),
@@ -60,7 +62,7 @@ def send_order_notification(sender, instance, created, **kwargs):
                 },
                 subject_id=str(instance.order_id)
             )
-            logger.info(f"Created notification event for failed order {instance.order_id}")
+            logger.info(f"Queued notification outbox for failed order {instance.order_id}")
 
     except Exception as e:
         logger.error(f"Error creating notification for order {instance.order_id}: {e}")
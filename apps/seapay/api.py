@@ -2,7 +2,7 @@ import logging
 from decimal import Decimal
 from typing import List, Optional
 
-from django.http import HttpRequest, JsonResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.utils import timezone
 from ninja import Router
 from ninja.errors import HttpError
@@ -15,6 +15,8 @@ from apps.seapay.schemas import (
     CreatePaymentIntentResponse,
     PaymentIntentDetailResponse,
     WalletResponse,
+    WalletLedgerEntryOut,
+    PaginatedWalletLedger,
     PaymentCallbackResponse,
     FallbackCallbackResponse,
     PaymentIntentOut,
@@ -30,21 +32,29 @@ from apps.seapay.schemas import (
     ProcessWalletPaymentResponse,
     CreateSepayPaymentResponse,
     SymbolAccessCheckResponse,
+    SymbolAccessBatchRequest,
+    SymbolAccessBatchResponse,
     SymbolOrderItemResponse,
     UserSymbolLicenseResponse,
     PaginatedSymbolOrderHistory,
 )
 from apps.seapay.services.payment_service import PaymentService
+from apps.seapay.services.wallet_ledger_service import WalletLedgerService
 from apps.seapay.services.wallet_topup_service import WalletTopupService
 from apps.seapay.services.symbol_purchase_service import SymbolPurchaseService
+from apps.seapay.services.webhook_inbox_service import SepayWebhookInboxService
 from apps.stock.models import Symbol
 
 logger = logging.getLogger(__name__)
 
+SYMBOL_ACCESS_BATCH_MAX = 500
+
 router = Router()
 payment_service = PaymentService()
 topup_service = WalletTopupService()
 symbol_purchase_service = SymbolPurchaseService()
+wallet_ledger_service = WalletLedgerService()
+webhook_inbox_service = SepayWebhookInboxService()
 
 
 @router.post("/create-intent", response=CreatePaymentIntentResponse, auth=JWTAuth())
@@ -74,12 +84,11 @@ def create_payment_intent(request: HttpRequest, data: CreatePaymentIntentRequest
 
 @router.post("/webhook/", response=SepayWebhookResponse)
 def sepay_webhook(request: HttpRequest, payload: SepayWebhookRequest):
-    result = payment_service.process_sepay_webhook(payload.dict())
-    status = "success" if result.get("success") else "error"
+    """Ghi inbox rồi ack ngay; seapay.process_webhooks áp dụng giao dịch ở worker"""
+    result = webhook_inbox_service.ingest(payload.dict())
     return SepayWebhookResponse(
-        status=status,
-        message=result.get("message", ""),
-        payment_id=result.get("payment_id"),
+        status="success",
+        message="Received" if result["accepted"] else "Duplicate",
         processed_at=timezone.now().isoformat(),
     )
 
@@ -117,6 +126,9 @@ def sepay_callback(request: HttpRequest):
     logger.info(f"Callback payload: {payload}")
 
     try:
+        if payload.get("id"):
+            result = webhook_inbox_service.ingest(payload)
+            return PaymentCallbackResponse(message="Received" if result["accepted"] else "Duplicate")
         if payload.get("content", "").startswith("TOPUP"):
             logger.info(f"Processing TOPUP webhook with content: {payload.get('content')}")
             result = topup_service.process_webhook_event(payload)
@@ -164,6 +176,36 @@ def get_wallet(request: HttpRequest):
     )
 
 
+@router.get("/wallet/ledger", response=PaginatedWalletLedger, auth=JWTAuth())
+def get_wallet_ledger(request: HttpRequest, limit: int = 20, cursor: Optional[str] = None):
+    wallet = payment_service.get_or_create_wallet(request.auth)
+    try:
+        page = wallet_ledger_service.history(wallet, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HttpError(400, str(exc))
+
+    return PaginatedWalletLedger(
+        results=[
+            WalletLedgerEntryOut(
+                ledger_id=str(entry.ledger_id),
+                tx_type=entry.tx_type,
+                amount=entry.amount,
+                is_credit=entry.is_credit,
+                balance_before=entry.balance_before,
+                balance_after=entry.balance_after,
+                note=entry.note,
+                order_id=str(entry.order_id) if entry.order_id else None,
+                payment_id=str(entry.payment_id) if entry.payment_id else None,
+                created_at=entry.created_at,
+            )
+            for entry in page["results"]
+        ],
+        total=page["total"],
+        limit=page["limit"],
+        next_cursor=page["next_cursor"],
+    )
+
+
 @router.get("/payments/user", response=PaginatedPaymentIntent, auth=JWTAuth())
 def list_user_payments(
     request: HttpRequest,
@@ -172,6 +214,7 @@ def list_user_payments(
     search: Optional[str] = None,
     status: Optional[str] = None,
     purpose: Optional[str] = None,
+    cursor: Optional[str] = None,
 ):
     user = request.auth
 
@@ -182,14 +225,18 @@ def list_user_payments(
     elif resolved_status not in valid_statuses:
         raise HttpError(400, "Invalid status")
 
-    result = payment_service.get_paginated_payment_intents(
-        user=user,
-        page=page,
-        limit=limit,
-        search=search,
-        status=resolved_status,
-        purpose=purpose,
-    )
+    try:
+        result = payment_service.get_paginated_payment_intents(
+            user=user,
+            page=page,
+            limit=limit,
+            search=search,
+            status=resolved_status,
+            purpose=purpose,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HttpError(400, str(exc))
 
     intents: List[PaymentIntentOut] = []
     for intent in result["results"]:
@@ -221,6 +268,7 @@ def list_user_payments(
             date_joined=user.date_joined,
         ),
         results=intents,
+        next_cursor=result["next_cursor"],
     )
 
 
@@ -389,7 +437,9 @@ def get_order_history(
     page: int = 1,
     limit: int = 20,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
 ):
+    """page giữ cho client cũ; truyền next_cursor của trang trước để mọi trang tốn như trang đầu"""
     user = request.auth
 
     if limit > 100:
@@ -408,7 +458,10 @@ def get_order_history(
             page=page,
             limit=limit,
             status=status,
+            cursor=cursor,
         )
+    except ValueError as exc:
+        raise HttpError(400, str(exc))
     except Exception as exc:  # pragma: no cover - defensive
         raise HttpError(500, f"Failed to get order history: {exc}")
 
@@ -455,14 +508,38 @@ def check_symbol_access(request: HttpRequest, symbol_id: int):
         raise HttpError(500, f"Failed to check access: {exc}")
 
 
+@router.post("/symbol/access/batch", response=SymbolAccessBatchResponse, auth=JWTAuth())
+def check_symbols_access(request: HttpRequest, data: SymbolAccessBatchRequest):
+    """Kiểm tra quyền nhiều symbol trong một request (đọc cùng entry cache quyền của user)"""
+    if len(data.symbol_ids) > SYMBOL_ACCESS_BATCH_MAX:
+        raise HttpError(400, f"Too many symbols: {len(data.symbol_ids)} > {SYMBOL_ACCESS_BATCH_MAX}")
+    results = symbol_purchase_service.check_symbols_access(request.auth, data.symbol_ids)
+    return SymbolAccessBatchResponse(results=[SymbolAccessCheckResponse(**result) for result in results])
+
+
 @router.get("/symbol/licenses", response=List[UserSymbolLicenseResponse], auth=JWTAuth())
-def get_user_symbol_licenses(request: HttpRequest, page: int = 1, limit: int = 20):
+def get_user_symbol_licenses(
+    request: HttpRequest,
+    response: HttpResponse,
+    page: int = 1,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+):
+    """Body vẫn là list; next_cursor và total trả qua header X-Next-Cursor / X-Total-Count"""
     try:
-        licenses_data = symbol_purchase_service.get_user_symbol_licenses(request.auth, page, limit)
-        return [UserSymbolLicenseResponse(**license) for license in licenses_data["results"]]
+        licenses_data = symbol_purchase_service.get_user_symbol_licenses(
+            request.auth, page, limit, cursor=cursor
+        )
+    except ValueError as exc:
+        raise HttpError(400, str(exc))
     except Exception as exc: 
         raise HttpError(500, f"Failed to get licenses: {exc}")
 
+    response["X-Total-Count"] = str(licenses_data["total"])
+    if licenses_data["next_cursor"]:
+        response["X-Next-Cursor"] = licenses_data["next_cursor"]
+    return [UserSymbolLicenseResponse(**license) for license in licenses_data["results"]]
+
 
 @router.get("/fallback", response=FallbackCallbackResponse)
 def fallback_endpoint(request: HttpRequest):
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SeapayConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.seapay'
+
+    def ready(self):
+
+        import apps.seapay.signals
@@ -0,0 +1,25 @@
+"""
+Management command expire các symbol license đã quá end_at và gửi thông báo hết hạn
+Dùng để chạy cronjob / scheduler
+"""
+from django.core.management.base import BaseCommand
+from apps.seapay.services.license_expiry_service import EXPIRY_BATCH_SIZE, LicenseExpiryService
+
+
+class Command(BaseCommand):
+    help = 'Expire symbol licenses whose end_at has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EXPIRY_BATCH_SIZE,
+            help=f'Licenses expired per UPDATE (default: {EXPIRY_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        result = LicenseExpiryService().expire_due(batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Expired {result['expired']} licenses in {result['batches']} batches")
+        )
@@ -0,0 +1,28 @@
+"""
+Management command expire các payment intent đang chờ đã quá expires_at
+Dùng để chạy cronjob / scheduler
+"""
+from django.core.management.base import BaseCommand
+from apps.seapay.services.intent_expiry_service import INTENT_EXPIRY_BATCH_SIZE, IntentExpiryService
+
+
+class Command(BaseCommand):
+    help = 'Expire pending payment intents whose expires_at has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=INTENT_EXPIRY_BATCH_SIZE,
+            help=f'Intents expired per UPDATE (default: {INTENT_EXPIRY_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        result = IntentExpiryService().expire_due(batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Expired {result['expired']} payment intents ({result['attempts']} attempts) "
+                f"in {result['batches']} batches"
+            )
+        )
@@ -0,0 +1,25 @@
+"""
+Management command xử lý các webhook SePay đang chờ trong inbox (pay_sepay_webhook_events)
+Bình thường job seapay.process_webhooks / run_scheduler làm việc này; dùng khi cần chạy tay
+"""
+from django.core.management.base import BaseCommand
+from apps.seapay.services.webhook_inbox_service import WEBHOOK_BATCH_SIZE, SepayWebhookInboxService
+
+
+class Command(BaseCommand):
+    help = 'Process pending SePay webhook events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=WEBHOOK_BATCH_SIZE,
+            help=f'Maximum events to process (default: {WEBHOOK_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        result = SepayWebhookInboxService().process_pending(limit=options['limit'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {result['processed']} webhook events, {result['failed']} failed")
+        )
@@ -0,0 +1,49 @@
+"""
+Management command đối soát lịch sử giao dịch SePay với các giao dịch đã ghi nhận
+Giao dịch thiếu mà khớp intent đang chờ được replay qua inbox webhook
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.seapay.services.statement_reconciliation_service import StatementReconciliationService
+from apps.seapay.services.webhook_inbox_service import SepayWebhookInboxService
+
+
+class Command(BaseCommand):
+    help = 'Reconcile SePay transaction history against recorded bank transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=None,
+            help='Lookback window in hours (default: SEPAY_RECONCILE_LOOKBACK_HOURS)'
+        )
+        parser.add_argument(
+            '--process',
+            action='store_true',
+            help='Apply replayed transactions now instead of leaving them to the webhook job'
+        )
+
+    def handle(self, *args, **options):
+        from_date = None
+        if options['hours']:
+            from_date = timezone.now() - timedelta(hours=options['hours'])
+
+        result = StatementReconciliationService().reconcile(from_date=from_date)
+        self.stdout.write(
+            f"Fetched {result['fetched']} transactions, {result['missing']} missing, "
+            f"{result['replayed']} replayed"
+        )
+        if result['unmatched']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(result['unmatched'])} incoming transactions match no intent: "
+                f"{', '.join(str(tx_id) for tx_id in result['unmatched'][:50])}"
+            ))
+        if options['process'] and result['replayed']:
+            processed = SepayWebhookInboxService().process_pending()
+            self.stdout.write(f"Processed {processed['processed']} webhook events, {processed['failed']} failed")
+
+        self.stdout.write(self.style.SUCCESS("Statement reconciliation completed"))
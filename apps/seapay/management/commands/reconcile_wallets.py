@@ -0,0 +1,42 @@
+"""
+Management command đối soát pay_wallets.balance với sổ cái (pay_wallet_ledger) cho tất cả ví
+Dùng: python manage.py reconcile_wallets [--checkpoint] [--fail-on-drift]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from apps.seapay.services.wallet_ledger_service import WalletLedgerService
+
+
+class Command(BaseCommand):
+    help = 'Verify wallet balances against the ledger (one grouped query from the latest checkpoints)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--checkpoint',
+            action='store_true',
+            help='Create new balance checkpoints before reconciling'
+        )
+        parser.add_argument(
+            '--fail-on-drift',
+            action='store_true',
+            help='Exit with an error when any wallet drifts from its ledger'
+        )
+
+    def handle(self, *args, **options):
+        service = WalletLedgerService()
+        if options['checkpoint']:
+            created = service.create_checkpoints()['checkpoints']
+            self.stdout.write(f'Created {created} checkpoints')
+
+        result = service.reconcile()
+        for row in result['discrepancies']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Wallet {row['wallet_id']} (user {row['user_id']}): balance {row['balance']} "
+                    f"!= ledger {row['ledger_balance']} (diff {row['difference']})"
+                )
+            )
+
+        summary = f"Checked {result['checked']} wallets, {len(result['discrepancies'])} discrepancies"
+        if result['discrepancies'] and options['fail_on_drift']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
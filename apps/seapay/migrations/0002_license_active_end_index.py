@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("seapay", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payusersymbollicense",
+            index=models.Index(
+                condition=models.Q(("end_at__isnull", False), ("status", "active")),
+                fields=["end_at"],
+                name="idx_symbol_lic_active_end",
+            ),
+        ),
+    ]
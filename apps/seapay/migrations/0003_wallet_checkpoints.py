@@ -0,0 +1,70 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("seapay", "0002_license_active_end_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PayWalletCheckpoint",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "ledger_created_at",
+                    models.DateTimeField(db_comment="created_at của ledger cuối cùng đã tính"),
+                ),
+                (
+                    "ledger_id",
+                    models.UUIDField(db_comment="ledger_id của ledger cuối cùng đã tính (tie-break)"),
+                ),
+                (
+                    "balance",
+                    models.DecimalField(
+                        db_comment="Số dư theo ledger tính tới cursor (không lấy từ pay_wallets.balance)",
+                        decimal_places=2,
+                        max_digits=18,
+                    ),
+                ),
+                (
+                    "entry_count",
+                    models.BigIntegerField(db_comment="Tổng số ledger tính tới cursor"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        db_comment="Ví được snapshot",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkpoints",
+                        to="seapay.paywallet",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "pay_wallet_checkpoints",
+                "db_table_comment": "Checkpoint số dư theo sổ cái, dùng cho đối soát nhanh",
+                "indexes": [
+                    models.Index(
+                        fields=["wallet", "-ledger_created_at", "-ledger_id"],
+                        name="idx_wallet_checkpoint_latest",
+                    )
+                ],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="paywalletledger",
+            name="idx_ledger_wallet_created",
+        ),
+        migrations.AddIndex(
+            model_name="paywalletledger",
+            index=models.Index(
+                fields=["wallet", "created_at", "ledger_id"],
+                name="idx_ledger_wallet_cursor",
+            ),
+        ),
+    ]
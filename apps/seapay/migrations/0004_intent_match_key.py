@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:40
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_match_keys(apps, schema_editor):
+    """match_key = order_code bỏ ký tự phân cách, viết hoa (như normalize_match_key)"""
+    PayPaymentIntent = apps.get_model("seapay", "PayPaymentIntent")
+    separators = re.compile(r"[^0-9A-Z]")
+    batch = []
+    for intent in PayPaymentIntent.objects.filter(match_key__isnull=True).only("intent_id", "order_code").iterator():
+        intent.match_key = separators.sub("", intent.order_code.upper())
+        batch.append(intent)
+        if len(batch) >= 1000:
+            PayPaymentIntent.objects.bulk_update(batch, ["match_key"])
+            batch = []
+    if batch:
+        PayPaymentIntent.objects.bulk_update(batch, ["match_key"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("seapay", "0003_wallet_checkpoints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paypaymentintent",
+            name="match_key",
+            field=models.CharField(
+                blank=True,
+                db_comment="order_code chuẩn hóa (bỏ phân cách, viết hoa) để khớp nội dung CK bằng một lookup",
+                max_length=255,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_match_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="paypaymentintent",
+            index=models.Index(fields=["match_key"], name="idx_pay_intents_match_key"),
+        ),
+        migrations.AddIndex(
+            model_name="paypaymentintent",
+            index=models.Index(fields=["reference_code"], name="idx_pay_intents_reference"),
+        ),
+        migrations.AddConstraint(
+            model_name="paypaymentintent",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["requires_payment_method", "processing"])),
+                fields=("match_key",),
+                name="uniq_pay_intents_pending_key",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("seapay", "0004_intent_match_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paysepaywebhookevent",
+            name="attempts",
+            field=models.IntegerField(
+                db_comment="Số lần processor đã thử xử lý (lỗi thì thử lại tới giới hạn)",
+                default=0,
+            ),
+        ),
+        migrations.AddField(
+            model_name="paysepaywebhookevent",
+            name="processed_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_comment="Thời điểm processor xử lý xong",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paysepaywebhookevent",
+            index=models.Index(
+                condition=models.Q(("processed", False)),
+                fields=["received_at", "sepay_tx_id"],
+                name="idx_sepay_webhooks_pending",
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:47
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("seapay", "0005_webhook_event_processing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaySepayStatementLine",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("run_id", models.UUIDField(db_comment="Lần đối soát đã nạp dòng này")),
+                ("sepay_tx_id", models.BigIntegerField(db_comment="ID giao dịch SePay")),
+                ("transaction_date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "amount_in",
+                    models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=20),
+                ),
+                ("content", models.TextField(blank=True, null=True)),
+                ("reference_number", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "match_key",
+                    models.CharField(
+                        blank=True,
+                        db_comment="Mã CK chuẩn hóa trích từ nội dung (khớp PayPaymentIntent.match_key)",
+                        max_length=255,
+                        null=True,
+                    ),
+                ),
+                (
+                    "payload",
+                    models.JSONField(db_comment="Giao dịch ở dạng payload webhook, dùng để replay"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "pay_sepay_statement_lines",
+                "db_table_comment": "Staging lịch sử giao dịch SePay cho đối soát sao kê",
+                "indexes": [
+                    models.Index(fields=["run_id", "match_key"], name="idx_statement_run_key")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(fields=("run_id", "sepay_tx_id"), name="uniq_statement_run_tx")
+                ],
+            },
+        ),
+    ]
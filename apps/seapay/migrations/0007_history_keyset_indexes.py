@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("seapay", "0006_statement_lines"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="paypaymentintent",
+            index=models.Index(
+                fields=["user", "-created_at", "-intent_id"],
+                name="idx_pay_intents_user_hist",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paysymbolorder",
+            index=models.Index(
+                fields=["user", "status", "-created_at", "-order_id"],
+                name="idx_symbol_orders_user_hist",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payusersymbollicense",
+            index=models.Index(
+                fields=["user", "-created_at", "-license_id"],
+                name="idx_symbol_lic_user_created",
+            ),
+        ),
+    ]
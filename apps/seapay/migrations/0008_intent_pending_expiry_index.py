@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("seapay", "0007_history_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="paypaymentintent",
+            index=models.Index(
+                condition=models.Q(
+                    ("expires_at__isnull", False),
+                    ("status__in", ["requires_payment_method", "processing"]),
+                ),
+                fields=["expires_at"],
+                name="idx_pay_intents_pending_exp",
+            ),
+        ),
+    ]
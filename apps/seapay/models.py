@@ -4,6 +4,8 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from decimal import Decimal
 
+from apps.seapay.utils.match_key import normalize_match_key
+
 User = get_user_model()
 
 class IntentPurpose(models.TextChoices):
@@ -225,7 +227,8 @@ class PayWalletLedger(models.Model):
         db_table = "pay_wallet_ledger"
         db_table_comment = "Quy tắc: deposit phải có payment_id (SePay); purchase phải có order_id. Sổ cái là nguồn sự thật để tính balance."
         indexes = [
-            models.Index(fields=['wallet', 'created_at'], name='idx_ledger_wallet_created'),
+            # Cursor (created_at, ledger_id) cho checkpoint và phân trang keyset
+            models.Index(fields=['wallet', 'created_at', 'ledger_id'], name='idx_ledger_wallet_cursor'),
             models.Index(fields=['payment'], name='idx_ledger_payment'),
             models.Index(fields=['tx_type'], name='idx_ledger_tx_type'),
             models.Index(fields=['order'], name='idx_ledger_order'),
@@ -249,6 +252,39 @@ class PayWalletLedger(models.Model):
         super().save(*args, **kwargs)
 
 
+class PayWalletCheckpoint(models.Model):
+    """
+    Snapshot số dư ví theo ledger tại một cursor (created_at, ledger_id). Đối soát chỉ cần cộng
+    các ledger sau cursor của checkpoint mới nhất thay vì toàn bộ sổ cái.
+    """
+    id = models.BigAutoField(primary_key=True)
+    wallet = models.ForeignKey(
+        PayWallet,
+        on_delete=models.CASCADE,
+        related_name='checkpoints',
+        db_comment="Ví được snapshot"
+    )
+    ledger_created_at = models.DateTimeField(db_comment="created_at của ledger cuối cùng đã tính")
+    ledger_id = models.UUIDField(db_comment="ledger_id của ledger cuối cùng đã tính (tie-break)")
+    balance = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        db_comment="Số dư theo ledger tính tới cursor (không lấy từ pay_wallets.balance)"
+    )
+    entry_count = models.BigIntegerField(db_comment="Tổng số ledger tính tới cursor")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "pay_wallet_checkpoints"
+        db_table_comment = "Checkpoint số dư theo sổ cái, dùng cho đối soát nhanh"
+        indexes = [
+            models.Index(fields=['wallet', '-ledger_created_at', '-ledger_id'], name='idx_wallet_checkpoint_latest'),
+        ]
+
+    def __str__(self):
+        return f"Checkpoint {self.wallet_id} @ {self.ledger_created_at}: {self.balance}"
+
+
 class PayPaymentIntent(models.Model):
     """
     Một yêu cầu thu tiền. Provider cố định là SePay (chính sách hệ thống).
@@ -287,6 +323,12 @@ class PayPaymentIntent(models.Model):
         unique=True,
         db_comment="Chuỗi đối soát CK (nội dung chuyển khoản). Cần duy nhất để match."
     )
+    match_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        db_comment="order_code chuẩn hóa (bỏ phân cách, viết hoa) để khớp nội dung CK bằng một lookup"
+    )
     reference_code = models.CharField(
         max_length=255,
         null=True,
@@ -332,11 +374,34 @@ class PayPaymentIntent(models.Model):
         indexes = [
             models.Index(fields=['user', 'status'], name='idx_pay_intents_user_status'),
             models.Index(fields=['order'], name='idx_pay_intents_order'),
+            models.Index(fields=['match_key'], name='idx_pay_intents_match_key'),
+            models.Index(fields=['reference_code'], name='idx_pay_intents_reference'),
+            # Lịch sử intent của user: seek theo (created_at, intent_id)
+            models.Index(fields=['user', '-created_at', '-intent_id'], name='idx_pay_intents_user_hist'),
+            # Cho expire sweeper: intent đang chờ có hạn, quét theo expires_at
+            models.Index(
+                fields=['expires_at'],
+                name='idx_pay_intents_pending_exp',
+                condition=models.Q(status__in=['requires_payment_method', 'processing'], expires_at__isnull=False)
+            ),
+        ]
+        constraints = [
+            # Mỗi mã chuyển khoản chỉ khớp một intent đang chờ thanh toán
+            models.UniqueConstraint(
+                fields=['match_key'],
+                condition=models.Q(status__in=['requires_payment_method', 'processing']),
+                name='uniq_pay_intents_pending_key',
+            ),
         ]
 
     def __str__(self):
         return f"Intent {self.intent_id} - {self.status} - {self.amount}"
 
+    def save(self, *args, **kwargs):
+        if not self.match_key and self.order_code:
+            self.match_key = normalize_match_key(self.order_code)
+        super().save(*args, **kwargs)
+
     def is_expired(self):
         if not self.expires_at:
             return False
@@ -541,6 +606,15 @@ class PaySepayWebhookEvent(models.Model):
         blank=True,
         db_comment="Thông tin lỗi nếu xử lý thất bại"
     )
+    attempts = models.IntegerField(
+        default=0,
+        db_comment="Số lần processor đã thử xử lý (lỗi thì thử lại tới giới hạn)"
+    )
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_comment="Thời điểm processor xử lý xong"
+    )
 
     class Meta:
         db_table = "pay_sepay_webhook_events"
@@ -549,6 +623,12 @@ class PaySepayWebhookEvent(models.Model):
             models.Index(fields=['sepay_tx_id'], name='idx_sepay_webhooks_tx_id'),
             models.Index(fields=['processed'], name='idx_sepay_webhooks_processed'),
             models.Index(fields=['received_at'], name='idx_sepay_webhooks_received'),
+            # Processor claim các event chưa xử lý theo thứ tự nhận
+            models.Index(
+                fields=['received_at', 'sepay_tx_id'],
+                name='idx_sepay_webhooks_pending',
+                condition=models.Q(processed=False),
+            ),
         ]
 
     def __str__(self):
@@ -635,6 +715,41 @@ class PayBankTransaction(models.Model):
         return f"Bank TX {self.sepay_tx_id} - {self.amount_in} - {self.account_number}"
 
 
+class PaySepayStatementLine(models.Model):
+    """
+    Staging cho đối soát sao kê: mỗi lần chạy bulk-load lịch sử giao dịch SePay vào đây (theo run_id)
+    rồi anti-join với pay_sepay_webhook_events / pay_bank_transactions / intent đang chờ bằng SQL.
+    """
+    id = models.BigAutoField(primary_key=True)
+    run_id = models.UUIDField(db_comment="Lần đối soát đã nạp dòng này")
+    sepay_tx_id = models.BigIntegerField(db_comment="ID giao dịch SePay")
+    transaction_date = models.DateTimeField(null=True, blank=True)
+    amount_in = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0.00'))
+    content = models.TextField(null=True, blank=True)
+    reference_number = models.CharField(max_length=100, null=True, blank=True)
+    match_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        db_comment="Mã CK chuẩn hóa trích từ nội dung (khớp PayPaymentIntent.match_key)"
+    )
+    payload = models.JSONField(db_comment="Giao dịch ở dạng payload webhook, dùng để replay")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "pay_sepay_statement_lines"
+        db_table_comment = "Staging lịch sử giao dịch SePay cho đối soát sao kê"
+        constraints = [
+            models.UniqueConstraint(fields=['run_id', 'sepay_tx_id'], name='uniq_statement_run_tx'),
+        ]
+        indexes = [
+            models.Index(fields=['run_id', 'match_key'], name='idx_statement_run_key'),
+        ]
+
+    def __str__(self):
+        return f"Statement line {self.sepay_tx_id} - {self.amount_in}"
+
+
 class SeapayOrder(models.Model):
     """Legacy model - use PayPaymentIntent instead"""
     STATUS_CHOICES = [
@@ -706,6 +821,8 @@ class PaySymbolOrder(models.Model):
             models.Index(fields=['user', 'status'], name='idx_symbol_orders_user_status'),
             models.Index(fields=['status'], name='idx_symbol_orders_status'),
             models.Index(fields=['created_at'], name='idx_symbol_orders_created'),
+            # Lịch sử đơn luôn lọc theo một status: seek theo (created_at, order_id)
+            models.Index(fields=['user', 'status', '-created_at', '-order_id'], name='idx_symbol_orders_user_hist'),
         ]
 
     def __str__(self):
@@ -840,6 +957,14 @@ class PayUserSymbolLicense(models.Model):
             models.Index(fields=['user', 'symbol_id'], name='idx_symbol_lic_user_symbol'),
             models.Index(fields=['status'], name='idx_symbol_lic_status'),
             models.Index(fields=['end_at'], name='idx_symbol_lic_end_at'),
+            # Cho expire sweeper: license active có hạn, quét theo end_at
+            models.Index(
+                fields=['end_at'],
+                name='idx_symbol_lic_active_end',
+                condition=models.Q(status='active', end_at__isnull=False)
+            ),
+            # Danh sách license của user: seek theo (created_at, license_id)
+            models.Index(fields=['user', '-created_at', '-license_id'], name='idx_symbol_lic_user_created'),
         ]
         unique_together = [('user', 'symbol_id', 'start_at')]
 
@@ -1,10 +1,13 @@
 from typing import Optional, List, Tuple
 from decimal import Decimal
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from apps.seapay.models import PayWallet, PayPaymentIntent, SeapayOrder
+from apps.seapay.repositories.wallet_repository import WalletRepository
+from apps.seapay.utils.match_key import extract_match_keys
+from apps.seapay.utils.pagination import cached_count, keyset_page
 
 User = get_user_model()
 
@@ -85,6 +88,24 @@ class PaymentRepository:
         except PayPaymentIntent.DoesNotExist:
             return None
     
+    @staticmethod
+    def find_intent_by_transfer_content(*texts: Optional[str]) -> Optional[PayPaymentIntent]:
+        """
+        Khớp nội dung CK (mọi định dạng của order_code) với intent qua một lookup
+        match_key IN (...) OR reference_code IN (...), cả hai cột đều có index.
+        Ưu tiên intent đang chờ thanh toán; nếu không có thì trả intent đã xử lý (webhook gửi lại).
+        """
+        keys = extract_match_keys(*texts)
+        references = [text.strip() for text in texts if text and text.strip()]
+        if not keys and not references:
+            return None
+        candidates = list(
+            PayPaymentIntent.objects.filter(Q(match_key__in=keys) | Q(reference_code__in=references))
+            .order_by("-created_at")[:10]
+        )
+        pending = [intent for intent in candidates if intent.is_pending()]
+        return (pending or candidates or [None])[0]
+
     @staticmethod
     def get_payment_intent_by_id(intent_id: str, user: User) -> Optional[PayPaymentIntent]:
         """Tìm payment intent theo ID và user"""
@@ -95,10 +116,10 @@ class PaymentRepository:
     
     @staticmethod
     def update_wallet_balance(wallet: PayWallet, amount: Decimal) -> None:
-        """Cập nhật balance của wallet"""
-        with transaction.atomic():
-            wallet.balance += amount
-            wallet.save(update_fields=['balance', 'updated_at'])
+        """Cộng balance của wallet bằng UPDATE nguyên tử (không ghi ledger, ưu tiên WalletService.credit)"""
+        balance = WalletRepository.apply_balance_delta(wallet.pk, amount, is_credit=True)
+        if balance is not None:
+            wallet.balance = balance
     
     @staticmethod
     def update_payment_intent_status(
@@ -149,8 +170,12 @@ class PaymentRepository:
         search: Optional[str] = None,
         status: Optional[str] = None,
         purpose: Optional[str] = None,
-    ) -> Tuple[int, List[PayPaymentIntent]]:
-        """Lấy payment intents của user với phân trang và filter"""
+        cursor: Optional[str] = None,
+    ) -> Tuple[int, List[PayPaymentIntent], Optional[str]]:
+        """
+        Lấy payment intents của user với phân trang và filter.
+        Returns: (total gần đúng, intents, next_cursor). Raises ValueError nếu cursor sai
+        """
         page = page or 1
         limit = limit or 10
         
@@ -165,12 +190,10 @@ class PaymentRepository:
         if purpose:
             qs = qs.filter(purpose=purpose)
 
-        total = qs.count()
-
-        offset = (page - 1) * limit
-        items = qs.order_by("-created_at")[offset : offset + limit]
+        items, next_cursor = keyset_page(qs, limit, cursor, page)
+        total = cached_count(qs, "intents", user.pk, search, status, purpose)
 
-        return total, list(items)
+        return total, items, next_cursor
 
     
         
@@ -0,0 +1,42 @@
+from decimal import Decimal
+from typing import Optional
+
+from django.db import connection
+from django.utils import timezone
+
+from apps.seapay.models import PayWallet
+
+
+class WalletRepository:
+    """Cập nhật số dư ví bằng một câu UPDATE có điều kiện, không read-modify-write trong Python"""
+
+    @staticmethod
+    def apply_balance_delta(wallet_id, amount: Decimal, is_credit: bool) -> Optional[Decimal]:
+        """
+        UPDATE pay_wallets SET balance = balance ± amount WHERE id = ... [AND balance >= amount]
+        RETURNING balance. Returns: số dư sau cập nhật, None nếu không đủ tiền (hoặc không có ví).
+        Row lock chỉ giữ từ câu UPDATE tới khi transaction của caller commit.
+        """
+        meta = PayWallet._meta
+        balance_field = meta.get_field("balance")
+        params = [
+            balance_field.get_db_prep_value(amount, connection),
+            meta.get_field("updated_at").get_db_prep_value(timezone.now(), connection),
+            meta.pk.get_db_prep_value(wallet_id, connection),
+        ]
+        sign = "+" if is_credit else "-"
+        condition = ""
+        if not is_credit:
+            condition = " AND balance >= %s"
+            params.append(params[0])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {meta.db_table} SET balance = balance {sign} %s, updated_at = %s "
+                f"WHERE id = %s{condition} RETURNING balance",
+                params,
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return balance_field.to_python(row[0]).quantize(Decimal("0.01"))
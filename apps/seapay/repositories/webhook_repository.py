@@ -0,0 +1,82 @@
+import json
+import uuid
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+
+from apps.seapay.models import PayBankTransaction, PaySepayWebhookEvent
+
+
+class WebhookEventRepository:
+    """Inbox webhook SePay: ghi nhận idempotent theo sepay_tx_id, claim event chưa xử lý bằng SKIP LOCKED"""
+
+    @staticmethod
+    def insert_if_new(sepay_tx_id: int, payload: Dict[str, Any]) -> bool:
+        """
+        INSERT ... ON CONFLICT (sepay_tx_id) DO NOTHING. Returns: True nếu là event mới.
+        Retry của SePay không chờ lock hay bắt IntegrityError như get_or_create.
+        """
+        meta = PaySepayWebhookEvent._meta
+        payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+        params = [
+            meta.pk.get_db_prep_value(uuid.uuid4(), connection),
+            meta.get_field("sepay_tx_id").get_db_prep_value(sepay_tx_id, connection),
+            meta.get_field("received_at").get_db_prep_value(timezone.now(), connection),
+            meta.get_field("payload").get_db_prep_value(payload, connection),
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {meta.db_table} "
+                "(webhook_event_id, sepay_tx_id, received_at, payload, processed, attempts) "
+                "VALUES (%s, %s, %s, %s, FALSE, 0) "
+                "ON CONFLICT (sepay_tx_id) DO NOTHING RETURNING webhook_event_id",
+                params,
+            )
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def insert_many_if_new(payloads: List[Dict[str, Any]]) -> None:
+        """Bulk INSERT ... ON CONFLICT DO NOTHING cho nhiều event (replay từ đối soát sao kê)"""
+        PaySepayWebhookEvent.objects.bulk_create(
+            [
+                PaySepayWebhookEvent(
+                    sepay_tx_id=payload["id"],
+                    payload=json.loads(json.dumps(payload, cls=DjangoJSONEncoder)),
+                )
+                for payload in payloads
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def lock_next_pending(max_attempts: int) -> Optional[PaySepayWebhookEvent]:
+        """Event chưa xử lý cũ nhất mà worker khác chưa giữ; gọi trong transaction.atomic()"""
+        return (
+            PaySepayWebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed=False, attempts__lt=max_attempts)
+            .order_by("received_at", "sepay_tx_id")
+            .first()
+        )
+
+    @staticmethod
+    def store_bank_transaction(sepay_tx_id: int, data: Dict[str, Any]) -> PayBankTransaction:
+        PayBankTransaction.objects.bulk_create(
+            [
+                PayBankTransaction(
+                    sepay_tx_id=sepay_tx_id,
+                    transaction_date=timezone.now(),
+                    account_number=data.get("accountNumber", ""),
+                    amount_in=Decimal(str(data.get("transferAmount", 0))),
+                    amount_out=Decimal("0.00"),
+                    content=data.get("content", ""),
+                    reference_number=data.get("referenceCode", ""),
+                    bank_code=data.get("gateway", ""),
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        return PayBankTransaction.objects.get(sepay_tx_id=sepay_tx_id)
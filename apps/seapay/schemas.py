@@ -76,6 +76,26 @@ class WalletResponse(Schema):
     updated_at: str
 
 
+class WalletLedgerEntryOut(Schema):
+    ledger_id: str
+    tx_type: str
+    amount: Decimal
+    is_credit: bool
+    balance_before: Decimal
+    balance_after: Decimal
+    note: str
+    order_id: Optional[str] = None
+    payment_id: Optional[str] = None
+    created_at: datetime
+
+
+class PaginatedWalletLedger(Schema):
+    results: List[WalletLedgerEntryOut]
+    total: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
 class PaymentCallbackResponse(Schema):
     message: str
     intent_id: Optional[str] = None
@@ -116,6 +136,7 @@ class PaginatedPaymentIntent(Schema):
     page_size: int
     user: UserResponse  
     results: List[PaymentIntentOut]
+    next_cursor: Optional[str] = None
 
 
 # Wallet Topup Schemas
@@ -262,6 +283,14 @@ class SymbolAccessCheckResponse(Schema):
     expired_at: Optional[str] = None
 
 
+class SymbolAccessBatchRequest(Schema):
+    symbol_ids: List[int]
+
+
+class SymbolAccessBatchResponse(Schema):
+    results: List[SymbolAccessCheckResponse]
+
+
 class SubscriptionInfo(Schema):
     subscription_id: str
     status: str
@@ -309,3 +338,4 @@ class PaginatedSymbolOrderHistory(Schema):
     page: int
     limit: int
     total_pages: int
+    next_cursor: Optional[str] = None
@@ -0,0 +1,125 @@
+"""
+Cache quyền truy cập symbol theo user: check_symbol_access được frontend gọi cho mỗi lần xem symbol.
+
+Mỗi user một entry trong Django cache: {symbol_id: (end_us | None, start_us, license_id, symbol_name)},
+thời điểm tính bằng microsecond từ epoch, nạp bằng một query (license active + tên symbol qua subquery).
+Hết hạn so end_us với now lúc đọc nên entry vẫn đúng khi license qua end_at.
+
+Chỉ kết quả "có quyền" được phục vụ từ cache. License thường được cấp ở process khác (webhook SePay chạy
+trong run_worker, request mua khác gunicorn worker) mà invalidate_entitlements chỉ xóa được cache của
+process đang chạy (LocMemCache), nên mọi lần từ chối đều đọc lại DB trước khi trả lời. Phần còn stale là
+license bị thu hồi ở process khác, giới hạn bởi ENTITLEMENT_CACHE_SECONDS (ngắn).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from apps.stock.models import Symbol
+
+from ..models import LicenseStatus, PayUserSymbolLicense
+
+ENTITLEMENT_CACHE_PREFIX = "seapay:entitlements:"
+EXPIRES_SOON_DAYS = 7
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_DAY_US = 86400 * 1_000_000
+
+Entitlement = Tuple[Optional[int], int, str, Optional[str]]
+
+
+def _cache_key(user_id) -> str:
+    return f"{ENTITLEMENT_CACHE_PREFIX}{user_id}"
+
+
+def invalidate_entitlements(user_ids: Iterable) -> None:
+    """Xóa ngay và xóa lại sau commit (reader đọc DB trước commit có thể đã ghi entry cũ vào cache)"""
+    keys = [_cache_key(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _to_us(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _iso(us: Optional[int]) -> Optional[str]:
+    return (_EPOCH + us * _MICROSECOND).isoformat() if us is not None else None
+
+
+def _grants(entry: Optional[Entitlement], now_us: int) -> bool:
+    return entry is not None and (entry[0] is None or entry[0] > now_us)
+
+
+class EntitlementService:
+    def get_entitlements(self, user_id, symbol_ids: Iterable[int] = ()) -> Dict[int, Entitlement]:
+        """
+        Entitlements của user; nạp lại từ DB nếu cache thiếu hoặc không cho quyền với symbol nào trong
+        symbol_ids (cache có thể là của process khác chưa thấy license mới).
+        """
+        key = _cache_key(user_id)
+        entitlements = cache.get(key)
+        if entitlements is not None:
+            now_us = _to_us(timezone.now())
+            if all(_grants(entitlements.get(symbol_id), now_us) for symbol_id in symbol_ids):
+                return entitlements
+        entitlements = self._load(user_id)
+        cache.set(key, entitlements, settings.ENTITLEMENT_CACHE_SECONDS)
+        return entitlements
+
+    @staticmethod
+    def _load(user_id) -> Dict[int, Entitlement]:
+        rows = (
+            PayUserSymbolLicense.objects.filter(user_id=user_id, status=LicenseStatus.ACTIVE)
+            .annotate(symbol_name=Subquery(Symbol.objects.filter(id=OuterRef("symbol_id")).values("name")[:1]))
+            .values_list("symbol_id", "end_at", "start_at", "license_id", "symbol_name")
+        )
+        entitlements: Dict[int, Entitlement] = {}
+        for symbol_id, end_at, start_at, license_id, symbol_name in rows:
+            end_us = _to_us(end_at) if end_at else None
+            current = entitlements.get(symbol_id)
+            # Nhiều license active cho một symbol: giữ license trọn đời hoặc hết hạn muộn nhất
+            if current is not None and (current[0] is None or (end_us is not None and end_us <= current[0])):
+                continue
+            entitlements[symbol_id] = (end_us, _to_us(start_at), str(license_id), symbol_name)
+        return entitlements
+
+    def check_access(self, user_id, symbol_id: int, entitlements: Optional[Dict[int, Entitlement]] = None) -> Dict:
+        """Cùng format với SymbolAccessCheckResponse; 0 query khi cache đã cho quyền"""
+        if entitlements is None:
+            entitlements = self.get_entitlements(user_id, [symbol_id])
+        entry = entitlements.get(symbol_id)
+        if entry is None:
+            return {"has_access": False, "symbol_id": symbol_id, "reason": "No active license found"}
+
+        end_us, start_us, license_id, symbol_name = entry
+        now = _to_us(timezone.now())
+        if end_us is not None and end_us <= now:
+            return {
+                "has_access": False,
+                "symbol_id": symbol_id,
+                "reason": "License expired",
+                "expired_at": _iso(end_us),
+            }
+
+        return {
+            "has_access": True,
+            "license_id": license_id,
+            "symbol_id": symbol_id,
+            "symbol_name": symbol_name,
+            "start_at": _iso(start_us),
+            "end_at": _iso(end_us),
+            "is_lifetime": end_us is None,
+            "expires_soon": end_us is not None and (end_us - now) // _DAY_US <= EXPIRES_SOON_DAYS,
+        }
+
+    def check_many(self, user_id, symbol_ids: List[int]) -> List[Dict]:
+        entitlements = self.get_entitlements(user_id, symbol_ids)
+        return [self.check_access(user_id, symbol_id, entitlements) for symbol_id in symbol_ids]
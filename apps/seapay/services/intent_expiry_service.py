@@ -0,0 +1,61 @@
+"""
+Sweeper hết hạn payment intent: trước đây intent chỉ chuyển EXPIRED khi webhook trễ tới (process_callback),
+nên intent chờ thanh toán tích tụ trong partial index uniq_pay_intents_pending_key mà mọi lần khớp webhook phải đi qua.
+Mỗi batch: lấy intent đang chờ đã quá expires_at (partial index idx_pay_intents_pending_exp, SKIP LOCKED),
+một UPDATE chuyển sang EXPIRED và một UPDATE cho các attempt (QR) đang chờ của chúng.
+Đơn symbol giữ pending_payment: user vẫn tạo intent mới qua /pay-sepay hoặc trả bằng ví.
+"""
+import logging
+from typing import Dict
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import PaymentStatus, PayPaymentAttempt, PayPaymentIntent
+
+logger = logging.getLogger(__name__)
+
+INTENT_EXPIRY_BATCH_SIZE = 1000
+PENDING_STATUSES = [PaymentStatus.REQUIRES_PAYMENT_METHOD, PaymentStatus.PROCESSING]
+
+
+class IntentExpiryService:
+    def expire_due(self, batch_size: int = INTENT_EXPIRY_BATCH_SIZE, now=None) -> Dict[str, int]:
+        """Expire tất cả intent đang chờ có expires_at <= now, theo batch. Returns: expired, attempts, batches"""
+        now = now or timezone.now()
+        stats = {"expired": 0, "attempts": 0, "batches": 0}
+        while True:
+            expired, attempts = self._expire_batch(batch_size, now)
+            if not expired:
+                break
+            stats["expired"] += expired
+            stats["attempts"] += attempts
+            stats["batches"] += 1
+            if expired < batch_size:
+                break
+
+        if stats["expired"]:
+            logger.info(f"Expired {stats['expired']} payment intents in {stats['batches']} batches")
+        return stats
+
+    @transaction.atomic
+    def _expire_batch(self, batch_size: int, now):
+        # Intent đang được webhook xử lý (đã lock) bị bỏ qua, lần quét sau sẽ thấy nếu vẫn còn chờ
+        intent_ids = list(
+            PayPaymentIntent.objects.select_for_update(skip_locked=True)
+            .filter(status__in=PENDING_STATUSES, expires_at__lte=now)
+            .order_by("expires_at")
+            .values_list("intent_id", flat=True)[:batch_size]
+        )
+        if not intent_ids:
+            return 0, 0
+
+        expired = PayPaymentIntent.objects.filter(
+            intent_id__in=intent_ids,
+            status__in=PENDING_STATUSES,
+        ).update(status=PaymentStatus.EXPIRED, updated_at=now)
+        attempts = PayPaymentAttempt.objects.filter(
+            intent_id__in=intent_ids,
+            status__in=PENDING_STATUSES,
+        ).update(status=PaymentStatus.EXPIRED)
+        return expired, attempts
@@ -0,0 +1,83 @@
+"""
+Sweeper hết hạn license: chạy định kỳ thay cho việc check_symbol_access tự save EXPIRED trong GET.
+Mỗi batch: lấy license active đã quá end_at (partial index idx_symbol_lic_active_end, SKIP LOCKED),
+một UPDATE ... WHERE end_at <= now chuyển sang EXPIRED, và ghi notification vào outbox bằng bulk.
+"""
+import logging
+from typing import Dict, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.notification.models import AppEventType
+from apps.notification.services.outbox_service import NotificationOutboxService
+from apps.stock.models import Symbol
+
+from ..models import LicenseStatus, PayUserSymbolLicense
+from .entitlement_service import invalidate_entitlements
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_BATCH_SIZE = 1000
+
+
+class LicenseExpiryService:
+    def __init__(self) -> None:
+        self.outbox_service = NotificationOutboxService()
+
+    def expire_due(self, batch_size: int = EXPIRY_BATCH_SIZE, now=None) -> Dict[str, int]:
+        """Expire tất cả license active có end_at <= now, theo batch. Returns: expired, batches"""
+        now = now or timezone.now()
+        expired = batches = 0
+        while True:
+            count = self._expire_batch(batch_size, now)
+            if not count:
+                break
+            expired += count
+            batches += 1
+            if count < batch_size:
+                break
+
+        if expired:
+            logger.info(f"Expired {expired} symbol licenses in {batches} batches")
+        return {"expired": expired, "batches": batches}
+
+    @transaction.atomic
+    def _expire_batch(self, batch_size: int, now) -> int:
+        due = list(
+            PayUserSymbolLicense.objects.select_for_update(skip_locked=True)
+            .filter(status=LicenseStatus.ACTIVE, end_at__lte=now)
+            .order_by("end_at")
+            .values_list("license_id", "user_id", "symbol_id", "end_at")[:batch_size]
+        )
+        if not due:
+            return 0
+
+        PayUserSymbolLicense.objects.filter(
+            license_id__in=[row[0] for row in due],
+            status=LicenseStatus.ACTIVE,
+            end_at__lte=now,
+        ).update(status=LicenseStatus.EXPIRED)
+        invalidate_entitlements(row[1] for row in due)
+
+        symbol_names: Dict[int, Optional[str]] = dict(
+            Symbol.objects.filter(id__in={row[2] for row in due}).values_list("id", "name")
+        )
+        self.outbox_service.add_many(
+            [
+                {
+                    "user_id": user_id,
+                    "event_type": AppEventType.LICENSE_EXPIRED,
+                    "subject_id": license_id,
+                    "payload": {
+                        "license_id": str(license_id),
+                        "symbol_id": symbol_id,
+                        "symbol": symbol_names.get(symbol_id),
+                        "expired_at": end_at.isoformat(),
+                        "message": f"Quyền truy cập {symbol_names.get(symbol_id) or symbol_id} đã hết hạn",
+                    },
+                }
+                for license_id, user_id, symbol_id, end_at in due
+            ]
+        )
+        return len(due)
@@ -0,0 +1,118 @@
+"""
+Cấp license cho đơn symbol đã thanh toán với số câu SQL cố định, bất kể đơn có bao nhiêu item:
+một query item, một query license active, một query subscription của các symbol trong đơn;
+tính gia hạn trong Python rồi ghi bằng bulk_create / bulk_update.
+"""
+from datetime import timedelta
+from typing import Dict, List
+
+from django.utils import timezone
+
+from ..models import LicenseStatus, PaySymbolOrder, PayUserSymbolLicense
+from .entitlement_service import invalidate_entitlements
+
+LICENSE_UPDATE_FIELDS = ["end_at", "order"]
+SUBSCRIPTION_UPDATE_FIELDS = ["cycle_days", "price", "payment_method", "last_order_id", "metadata", "updated_at"]
+
+
+class LicenseIssuanceService:
+    def issue_for_order(self, order: PaySymbolOrder) -> int:
+        """
+        Mỗi item: kéo dài license active của symbol (lấy end_at xa hơn, item trọn đời -> trọn đời),
+        không có thì cấp mới; tạo/cập nhật subscription auto-renew (mặc định PAUSED).
+        Returns: số item đã cấp.
+        """
+        from apps.setting.models import AutoRenewStatus, SymbolAutoRenewSubscription
+
+        items = list(order.items.all())
+        if not items:
+            return 0
+        now = timezone.now()
+        symbol_ids = {item.symbol_id for item in items}
+
+        licenses: Dict[int, PayUserSymbolLicense] = {
+            lic.symbol_id: lic
+            for lic in PayUserSymbolLicense.objects.filter(
+                user_id=order.user_id, symbol_id__in=symbol_ids, status=LicenseStatus.ACTIVE
+            ).order_by("start_at")
+        }
+        subscriptions: Dict[int, SymbolAutoRenewSubscription] = {
+            sub.symbol_id: sub
+            for sub in SymbolAutoRenewSubscription.objects.filter(
+                user_id=order.user_id, symbol_id__in=symbol_ids
+            ).order_by("created_at")
+        }
+
+        new_licenses: List[PayUserSymbolLicense] = []
+        touched_licenses: Dict = {}
+        new_subscriptions: List[SymbolAutoRenewSubscription] = []
+        touched_subscriptions: Dict = {}
+        new_ids = set()
+
+        for item in items:
+            end_at = now + timedelta(days=item.license_days) if item.license_days else None
+
+            license_obj = licenses.get(item.symbol_id)
+            if license_obj is None:
+                license_obj = PayUserSymbolLicense(
+                    user_id=order.user_id,
+                    symbol_id=item.symbol_id,
+                    order=order,
+                    status=LicenseStatus.ACTIVE,
+                    start_at=now,
+                    end_at=end_at,
+                )
+                new_licenses.append(license_obj)
+                new_ids.add(license_obj.license_id)
+                licenses[item.symbol_id] = license_obj
+            else:
+                if license_obj.end_at and end_at:
+                    license_obj.end_at = max(license_obj.end_at, end_at)
+                elif not end_at:
+                    license_obj.end_at = None
+                license_obj.order = order
+                if license_obj.license_id not in new_ids:
+                    touched_licenses[license_obj.license_id] = license_obj
+
+            cycle_days = item.license_days or 30  # Default to 30 if lifetime
+            subscription = subscriptions.get(item.symbol_id)
+            if subscription is None:
+                subscription = SymbolAutoRenewSubscription(
+                    user_id=order.user_id,
+                    symbol_id=item.symbol_id,
+                    status=AutoRenewStatus.PAUSED,  # Inactive by default
+                    cycle_days=cycle_days,
+                    price=item.price,
+                    payment_method=order.payment_method,
+                    last_order_id=order.order_id,
+                    metadata={
+                        "created_from_order_id": str(order.order_id),
+                        "initial_price": str(item.price),
+                        "initial_days": cycle_days,
+                    },
+                )
+                new_subscriptions.append(subscription)
+                new_ids.add(subscription.subscription_id)
+                subscriptions[item.symbol_id] = subscription
+            else:
+                subscription.cycle_days = cycle_days
+                subscription.price = item.price
+                subscription.payment_method = order.payment_method
+                subscription.last_order_id = order.order_id
+                subscription.metadata = {
+                    **(subscription.metadata or {}),
+                    "last_purchase_order_id": str(order.order_id),
+                    "last_purchase_price": str(item.price),
+                    "last_purchase_days": cycle_days,
+                }
+                subscription.updated_at = now
+                if subscription.subscription_id not in new_ids:
+                    touched_subscriptions[subscription.subscription_id] = subscription
+
+        PayUserSymbolLicense.objects.bulk_create(new_licenses)
+        PayUserSymbolLicense.objects.bulk_update(touched_licenses.values(), LICENSE_UPDATE_FIELDS)
+        SymbolAutoRenewSubscription.objects.bulk_create(new_subscriptions)
+        SymbolAutoRenewSubscription.objects.bulk_update(touched_subscriptions.values(), SUBSCRIPTION_UPDATE_FIELDS)
+        # bulk_* không phát post_save
+        invalidate_entitlements([order.user_id])
+        return len(items)
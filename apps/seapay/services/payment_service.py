@@ -6,6 +6,7 @@ from typing import Any, Dict, List, Optional
 
 import requests
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 from ninja.errors import HttpError
 
@@ -16,8 +17,11 @@ from apps.seapay.models import (
     PayPaymentIntent,
     PayWallet,
     PaymentStatus,
+    WalletTxType,
 )
 from apps.seapay.repositories.payment_repository import PaymentRepository
+from apps.seapay.services.license_issuance_service import LicenseIssuanceService
+from apps.seapay.services.wallet_service import WalletService
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -32,6 +36,8 @@ class PaymentService:
         http_client=requests,
     ) -> None:
         self.repository = repository or PaymentRepository()
+        self.wallet_service = WalletService()
+        self.license_issuance_service = LicenseIssuanceService()
         self._http_client = http_client
 
     def create_payment_intent(
@@ -99,8 +105,9 @@ class PaymentService:
         amount: Decimal,
         transfer_type: str,
         reference_code: str,
+        intent: Optional[PayPaymentIntent] = None,
     ) -> Dict[str, Any]:
-        """Process a callback payload received from SePay."""
+        """Process a callback payload received from SePay. intent: đã khớp sẵn thì bỏ qua lookup."""
 
         if not content:
             raise HttpError(400, "Missing content (order_code)")
@@ -111,7 +118,7 @@ class PaymentService:
                 "transfer_type": transfer_type,
             }
 
-        intent = self._find_payment_intent_by_order_code(content)
+        intent = intent or self._find_payment_intent_by_order_code(content)
         if not intent:
             raise HttpError(404, f"Payment intent not found for order_code: {content}")
 
@@ -141,17 +148,7 @@ class PaymentService:
         return self._process_successful_payment(intent, reference_code)
 
     def _find_payment_intent_by_order_code(self, content: str) -> Optional[PayPaymentIntent]:
-        content = content.strip()
-        intent = self.repository.get_payment_intent_by_order_code(content)
-        if intent:
-            return intent
-
-        if content.startswith("PAY") and len(content) > 11:
-            reformatted = f"PAY_{content[3:11]}_{content[11:]}"
-            intent = self.repository.get_payment_intent_by_order_code(reformatted)
-            if intent:
-                logger.debug("Resolved formatted order code %s -> %s", content, reformatted)
-        return intent
+        return self.repository.find_intent_by_transfer_content(content)
 
     def _process_successful_payment(
         self,
@@ -164,7 +161,15 @@ class PaymentService:
             wallet = self.repository.get_wallet_by_user(intent.user)
             if not wallet:
                 wallet, _ = self.repository.get_or_create_wallet(intent.user)
-            self.repository.update_wallet_balance(wallet, intent.amount)
+            payment = self._ensure_payment_record(str(intent.intent_id), intent.amount, reference_code)
+            self.wallet_service.credit(
+                wallet,
+                intent.amount,
+                WalletTxType.DEPOSIT,
+                note=f"Wallet topup via SePay - {intent.order_code}",
+                payment=payment,
+                metadata={"intent_id": str(intent.intent_id), "reference_code": reference_code},
+            )
             logger.info("Wallet %s credited with %s", wallet.id, intent.amount)
         elif intent.purpose in {IntentPurpose.ORDER_PAYMENT, IntentPurpose.SYMBOL_PURCHASE}:
             self._process_symbol_order_payment(intent)
@@ -226,6 +231,19 @@ class PaymentService:
         )
 
     def process_sepay_webhook(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self.apply_sepay_transfer(payload)
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.exception("Unhandled error processing SePay webhook: %s", exc)
+            return {"success": False, "message": str(exc)}
+
+    @transaction.atomic
+    def apply_sepay_transfer(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Áp dụng một giao dịch SePay: khớp intent, lock intent (SELECT FOR UPDATE) rồi mới đọc status
+        nên hai event cùng intent không thể cộng tiền hai lần. Lỗi nghiệp vụ trả dict success=False;
+        lỗi bất ngờ được raise để webhook processor thử lại.
+        """
         content = (payload or {}).get("content") or payload.get("referenceCode") or payload.get("orderCode")
         if not content:
             return {"success": False, "message": "Missing content"}
@@ -238,12 +256,12 @@ class PaymentService:
         transfer_type = payload.get("transferType", "")
         reference_code = payload.get("referenceCode") or payload.get("content") or ""
 
-        intent_lookup = None
-        if content and not content.startswith("PAY_"):
-            intent_lookup = PayPaymentIntent.objects.filter(reference_code=content).first()
-        if not intent_lookup and reference_code:
-            intent_lookup = PayPaymentIntent.objects.filter(reference_code=reference_code).first()
+        # Một lookup match_key cho mọi field có thể chứa mã chuyển khoản
+        intent_lookup = self.repository.find_intent_by_transfer_content(
+            payload.get("content"), payload.get("referenceCode"), payload.get("orderCode")
+        )
         if intent_lookup:
+            intent_lookup = PayPaymentIntent.objects.select_for_update().get(pk=intent_lookup.pk)
             content = intent_lookup.order_code
 
         try:
@@ -252,13 +270,11 @@ class PaymentService:
                 amount=amount,
                 transfer_type=transfer_type,
                 reference_code=reference_code,
+                intent=intent_lookup,
             )
         except HttpError as exc:
             detail = getattr(exc, "detail", str(exc))
             return {"success": False, "message": str(detail)}
-        except Exception as exc:  # pragma: no cover - defensive
-            logger.exception("Unhandled error processing SePay webhook: %s", exc)
-            return {"success": False, "message": str(exc)}
 
         payment = None
         intent_id = result.get("intent_id")
@@ -292,21 +308,7 @@ class PaymentService:
         logger.info("Symbol order %s marked as paid", order.order_id)
 
     def _create_symbol_licenses(self, order) -> None:
-        from apps.seapay.models import PayUserSymbolLicense
-
-        now = timezone.now()
-        for item in order.items.all():
-            end_at = None
-            if item.license_days:
-                end_at = now + timezone.timedelta(days=item.license_days)
-            PayUserSymbolLicense.objects.create(
-                user=order.user,
-                symbol_id=item.symbol_id,
-                order=order,
-                start_at=now,
-                end_at=end_at,
-                status="active",
-            )
+        self.license_issuance_service.issue_for_order(order)
 
     def _ensure_order_status_synced(self, intent: PayPaymentIntent) -> None:
         from apps.seapay.models import PaySymbolOrder
@@ -366,20 +368,23 @@ class PaymentService:
         search: Optional[str] = None,
         status: Optional[str] = None,
         purpose: Optional[str] = None,
+        cursor: Optional[str] = None,
     ) -> Dict[str, Any]:
         page = page or 1
         limit = limit or 10
-        total, items = self.repository.get_payment_intents_by_user(
+        total, items, next_cursor = self.repository.get_payment_intents_by_user(
             user,
             page,
             limit,
             search,
             status,
             purpose,
+            cursor,
         )
         return {
             "total": total,
             "results": items,
             "page": page,
             "page_size": limit,
+            "next_cursor": next_cursor,
         }
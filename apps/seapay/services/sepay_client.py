@@ -1,5 +1,5 @@
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from decimal import Decimal
 from django.conf import settings
 
@@ -11,6 +11,8 @@ class SepayClient:
         self.base_url = getattr(settings, 'SEPAY_BASE_URL', 'https://api.sepay.vn')
         self.api_key = getattr(settings, 'SEPAY_API_KEY', '')
         self.account_number = getattr(settings, 'SEPAY_ACCOUNT_NUMBER', '')
+        # Giao dịch trả về bởi mock get_bank_transactions khi không có api_key (dev/test)
+        self.mock_transactions: List[Dict[str, Any]] = []
         
     def create_qr_code(
         self, 
@@ -82,11 +84,12 @@ class SepayClient:
         self, 
         from_date: str, 
         to_date: str, 
-        limit: int = 100
+        limit: int = 100,
+        offset: int = 0
     ) -> Dict[str, Any]:
         """Lấy danh sách giao dịch ngân hàng"""
         if not self.api_key:
-            return self._get_mock_bank_transactions()
+            return self._get_mock_bank_transactions(limit, offset)
         
         url = f"{self.base_url}/api/v1/transactions"
         headers = {
@@ -97,7 +100,8 @@ class SepayClient:
         params = {
             'fromDate': from_date,
             'toDate': to_date,
-            'limit': limit
+            'limit': limit,
+            'offset': offset
         }
         
         try:
@@ -108,6 +112,26 @@ class SepayClient:
         except requests.RequestException as e:
             raise SepayAPIError(f"Failed to get bank transactions: {str(e)}")
     
+    def iter_bank_transactions(
+        self,
+        from_date: str,
+        to_date: str,
+        page_size: int = 100
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Duyệt lịch sử giao dịch theo trang (limit/offset), mỗi lần yield một trang"""
+        offset = 0
+        while True:
+            data = self.get_bank_transactions(from_date, to_date, limit=page_size, offset=offset)
+            if data.get('status') not in (None, 'success'):
+                raise SepayAPIError(f"SePay API error: {data.get('message', 'Unknown error')}")
+            page = data.get('data') or []
+            if page:
+                yield page
+            offset += len(page)
+            total = (data.get('pagination') or {}).get('total')
+            if len(page) < page_size or (total is not None and offset >= total):
+                return
+    
     def _get_mock_qr_data(self, amount: Decimal, content: str, bank_code: str) -> Dict[str, Any]:
         """Mock data cho development"""
         return {
@@ -131,15 +155,15 @@ class SepayClient:
             }
         }
     
-    def _get_mock_bank_transactions(self) -> Dict[str, Any]:
+    def _get_mock_bank_transactions(self, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
         """Mock bank transactions"""
         return {
             'status': 'success',
-            'data': [],
+            'data': self.mock_transactions[offset:offset + limit],
             'pagination': {
-                'total': 0,
-                'limit': 100,
-                'offset': 0
+                'total': len(self.mock_transactions),
+                'limit': limit,
+                'offset': offset
             }
         }
 
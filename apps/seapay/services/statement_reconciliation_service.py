@@ -0,0 +1,168 @@
+"""
+Đối soát sao kê: phát hiện giao dịch SePay mà webhook không tới (hoặc tới nhưng chưa ghi nhận).
+
+1. Kéo lịch sử giao dịch theo trang (SepayClient.iter_bank_transactions), bulk-load vào staging
+   pay_sepay_statement_lines theo run_id.
+2. Một câu SQL anti-join: dòng staging không có trong pay_sepay_webhook_events / pay_bank_transactions,
+   kèm cờ có intent đang chờ khớp match_key (hoặc reference_code).
+3. Chỉ các dòng thiếu và khớp intent được replay qua inbox webhook -> processor áp dụng như webhook
+   thật; dòng thiếu không khớp intent nào chỉ được báo cáo.
+"""
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import (
+    PayBankTransaction,
+    PaymentStatus,
+    PayPaymentIntent,
+    PaySepayStatementLine,
+    PaySepayWebhookEvent,
+)
+from ..utils.match_key import extract_match_keys
+from .sepay_client import SepayClient
+from .webhook_inbox_service import SepayWebhookInboxService
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_PAGE_SIZE = 100
+STATEMENT_INSERT_BATCH = 1000
+# SePay trả và nhận thời gian theo giờ ngân hàng Việt Nam
+SEPAY_TIMEZONE = ZoneInfo("Asia/Ho_Chi_Minh")
+SEPAY_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def statement_payload(tx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Giao dịch lịch sử -> payload dạng webhook. Nhận cả field kiểu webhook (transferAmount, content...)
+    lẫn kiểu API giao dịch (amount_in, transaction_content...). None nếu không phải tiền vào.
+    """
+    if "amount_in" in tx:
+        raw_amount = tx.get("amount_in")
+        transfer_type = "in"
+    else:
+        raw_amount = tx.get("transferAmount")
+        transfer_type = tx.get("transferType", "")
+    try:
+        amount = Decimal(str(raw_amount or 0))
+    except (InvalidOperation, ValueError):
+        return None
+    if transfer_type != "in" or amount <= 0 or not tx.get("id"):
+        return None
+
+    return {
+        "id": int(tx["id"]),
+        "gateway": tx.get("gateway") or tx.get("bank_brand_name") or "",
+        "transactionDate": tx.get("transactionDate") or tx.get("transaction_date") or "",
+        "accountNumber": tx.get("accountNumber") or tx.get("account_number") or "",
+        "code": tx.get("code"),
+        "content": tx.get("content") or tx.get("transaction_content") or "",
+        "transferType": "in",
+        "transferAmount": amount,
+        "referenceCode": tx.get("referenceCode") or tx.get("reference_number") or "",
+    }
+
+
+def _parse_transaction_date(value: str) -> Optional[datetime]:
+    parsed = parse_datetime(value) if value else None
+    if parsed and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, SEPAY_TIMEZONE)
+    return parsed
+
+
+class StatementReconciliationService:
+    def __init__(self, client: Optional[SepayClient] = None):
+        self.client = client or SepayClient()
+        self.inbox_service = SepayWebhookInboxService()
+
+    def reconcile(
+        self,
+        from_date: Optional[datetime] = None,
+        to_date: Optional[datetime] = None,
+        page_size: int = STATEMENT_PAGE_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Đối soát [from_date, to_date] (mặc định SEPAY_RECONCILE_LOOKBACK_HOURS gần nhất).
+        Returns: fetched, missing, replayed, unmatched (sepay_tx_id các giao dịch thiếu không khớp intent)
+        """
+        to_date = to_date or timezone.now()
+        from_date = from_date or to_date - timedelta(hours=settings.SEPAY_RECONCILE_LOOKBACK_HOURS)
+        run_id = uuid.uuid4()
+        try:
+            fetched = self._load_statement(run_id, from_date, to_date, page_size)
+            missing = list(self._missing_lines(run_id).values("sepay_tx_id", "payload", "has_intent"))
+        finally:
+            PaySepayStatementLine.objects.filter(run_id=run_id).delete()
+
+        replay = [line["payload"] for line in missing if line["has_intent"]]
+        unmatched = [line["sepay_tx_id"] for line in missing if not line["has_intent"]]
+        self.inbox_service.ingest_many(replay)
+
+        if replay:
+            logger.warning(f"Statement reconciliation replayed {len(replay)} missed SePay transactions")
+        if unmatched:
+            logger.warning(f"Statement reconciliation: {len(unmatched)} incoming transactions match no intent")
+        return {
+            "fetched": fetched,
+            "missing": len(missing),
+            "replayed": len(replay),
+            "unmatched": unmatched,
+        }
+
+    def _load_statement(self, run_id: uuid.UUID, from_date: datetime, to_date: datetime, page_size: int) -> int:
+        fetched = 0
+        batch: List[PaySepayStatementLine] = []
+        pages = self.client.iter_bank_transactions(
+            timezone.localtime(from_date, SEPAY_TIMEZONE).strftime(SEPAY_DATE_FORMAT),
+            timezone.localtime(to_date, SEPAY_TIMEZONE).strftime(SEPAY_DATE_FORMAT),
+            page_size=page_size,
+        )
+        for page in pages:
+            fetched += len(page)
+            for tx in page:
+                payload = statement_payload(tx)
+                if payload is None:
+                    continue
+                keys = extract_match_keys(payload["content"], payload["referenceCode"])
+                batch.append(
+                    PaySepayStatementLine(
+                        run_id=run_id,
+                        sepay_tx_id=payload["id"],
+                        transaction_date=_parse_transaction_date(payload["transactionDate"]),
+                        amount_in=payload["transferAmount"],
+                        content=payload["content"],
+                        reference_number=payload["referenceCode"][:100] or None,
+                        match_key=keys[0][:255] if keys else None,
+                        payload=json.loads(json.dumps(payload, cls=DjangoJSONEncoder)),
+                    )
+                )
+            if len(batch) >= STATEMENT_INSERT_BATCH:
+                PaySepayStatementLine.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            PaySepayStatementLine.objects.bulk_create(batch, ignore_conflicts=True)
+        return fetched
+
+    @staticmethod
+    def _missing_lines(run_id: uuid.UUID):
+        """Dòng staging chưa có event/bank transaction nào, annotate has_intent (anti-join trong SQL)"""
+        pending_intents = PayPaymentIntent.objects.filter(
+            status__in=[PaymentStatus.REQUIRES_PAYMENT_METHOD, PaymentStatus.PROCESSING]
+        ).filter(Q(match_key=OuterRef("match_key")) | Q(reference_code=OuterRef("reference_number")))
+        return (
+            PaySepayStatementLine.objects.filter(run_id=run_id)
+            .exclude(Exists(PaySepayWebhookEvent.objects.filter(sepay_tx_id=OuterRef("sepay_tx_id"))))
+            .exclude(Exists(PayBankTransaction.objects.filter(sepay_tx_id=OuterRef("sepay_tx_id"))))
+            .annotate(has_intent=Exists(pending_intents))
+            .order_by("transaction_date", "sepay_tx_id")
+        )
@@ -1,5 +1,4 @@
 import logging
-from datetime import timedelta
 from decimal import Decimal
 from typing import Dict, List, Optional
 
@@ -16,11 +15,14 @@ from ..models import (
     PaySymbolOrderItem,
     PayUserSymbolLicense,
     PayWallet,
-    PayWalletLedger,
     PaymentMethod,
     WalletTxType,
 )
+from ..utils.pagination import cached_count, keyset_page
+from .entitlement_service import EntitlementService
+from .license_issuance_service import LicenseIssuanceService
 from .payment_service import PaymentService
+from .wallet_service import InsufficientBalanceError, WalletService
 from apps.setting.services.subscription_service import SymbolAutoRenewService
 from apps.stock.models import Symbol
 
@@ -33,7 +35,10 @@ class SymbolPurchaseService:
 
     def __init__(self) -> None:
         self.payment_service = PaymentService()
+        self.wallet_service = WalletService()
         self.subscription_service = SymbolAutoRenewService()
+        self.entitlement_service = EntitlementService()
+        self.license_issuance_service = LicenseIssuanceService()
 
     def create_symbol_order(
         self,
@@ -123,7 +128,11 @@ class SymbolPurchaseService:
                 raise ValueError("User wallet not found. Please create a wallet first.")
 
             if wallet.balance >= total_amount:
-                return self._process_immediate_wallet_payment(order, wallet)
+                try:
+                    return self._process_immediate_wallet_payment(order, wallet)
+                except InsufficientBalanceError:
+                    # Ví bị trừ đồng thời giữa lúc kiểm tra và lúc debit
+                    wallet.refresh_from_db(fields=["balance"])
 
             # Không đủ tiền - trả về đơn pending để user chọn thanh toán bằng SePay
             shortage = total_amount - wallet.balance
@@ -171,19 +180,13 @@ class SymbolPurchaseService:
         wallet: PayWallet,
     ) -> PaySymbolOrder:
         with transaction.atomic():
-            ledger_entry = PayWalletLedger.objects.create(
-                wallet=wallet,
-                tx_type=WalletTxType.PURCHASE,
-                amount=order.total_amount,
-                is_credit=False,
-                balance_before=wallet.balance,
-                balance_after=wallet.balance - order.total_amount,
-                order_id=order.order_id,
+            self.wallet_service.debit(
+                wallet,
+                order.total_amount,
+                WalletTxType.PURCHASE,
                 note=f"Symbol purchase order {order.order_id}",
+                order=order,
             )
-            wallet.balance = ledger_entry.balance_after
-            wallet.save(update_fields=["balance"])
-
             order.status = OrderStatus.PAID
             order.save(update_fields=["status"])
 
@@ -249,31 +252,28 @@ class SymbolPurchaseService:
         if order.payment_method != PaymentMethod.WALLET:
             raise ValueError("Order payment method is not wallet")
 
-        wallet = PayWallet.objects.select_for_update().get(user=user)
+        # Kiểm tra sớm (không lock) để báo lỗi rõ; debit có điều kiện ở cuối mới là chốt chặn thật
+        wallet = PayWallet.objects.get(user=user)
         if wallet.balance < order.total_amount:
             raise ValueError(
                 f"Insufficient balance. Required: {order.total_amount}, Available: {wallet.balance}"
             )
 
-        ledger_entry = PayWalletLedger.objects.create(
-            wallet=wallet,
-            tx_type=WalletTxType.PURCHASE,
-            amount=order.total_amount,
-            is_credit=False,
-            balance_before=wallet.balance,
-            balance_after=wallet.balance - order.total_amount,
-            order_id=order.order_id,
-            note=f"Symbol purchase order {order.order_id}",
-        )
-        wallet.balance = ledger_entry.balance_after
-        wallet.save(update_fields=["balance"])
-
         order.status = OrderStatus.PAID
         order.save(update_fields=["status"])
 
         licenses_created = self._create_symbol_licenses(order)
         subscriptions = self.subscription_service.activate_for_order(order)
 
+        # Debit sau cùng: row lock của ví chỉ giữ từ UPDATE tới commit
+        self.wallet_service.debit(
+            wallet,
+            order.total_amount,
+            WalletTxType.PURCHASE,
+            note=f"Symbol purchase order {order.order_id}",
+            order=order,
+        )
+
         return {
             "success": True,
             "message": "Payment processed successfully",
@@ -362,9 +362,29 @@ class SymbolPurchaseService:
     @transaction.atomic
     def _process_topup_and_auto_payment(self, payment, order_id: str) -> Dict[str, object]:
         order = PaySymbolOrder.objects.select_for_update().get(order_id=order_id)
-        wallet = PayWallet.objects.select_for_update().get(user=order.user)
+        if order.status == OrderStatus.PAID:
+            return {"success": True, "message": "Order already processed", "order_id": str(order.order_id)}
+        wallet = PayWallet.objects.get(user=order.user)
 
-        if wallet.balance < order.total_amount:
+        try:
+            with transaction.atomic():
+                order.status = OrderStatus.PAID
+                order.save(update_fields=["status"])
+
+                licenses_created = self._create_symbol_licenses(order)
+                self.subscription_service.activate_for_order(order)
+
+                self.wallet_service.debit(
+                    wallet,
+                    order.total_amount,
+                    WalletTxType.PURCHASE,
+                    note=f"Auto-payment after top-up for order {order.order_id}",
+                    order=order,
+                )
+        except InsufficientBalanceError:
+            # Savepoint đã rollback: lấy lại status thật của order thay vì đoán
+            order.refresh_from_db(fields=["status"])
+            wallet.refresh_from_db(fields=["balance"])
             return {
                 "success": False,
                 "message": "Wallet balance still insufficient after top-up.",
@@ -373,25 +393,6 @@ class SymbolPurchaseService:
                 "current_balance": float(wallet.balance),
             }
 
-        ledger_entry = PayWalletLedger.objects.create(
-            wallet=wallet,
-            tx_type=WalletTxType.PURCHASE,
-            amount=order.total_amount,
-            is_credit=False,
-            balance_before=wallet.balance,
-            balance_after=wallet.balance - order.total_amount,
-            order_id=order.order_id,
-            note=f"Auto-payment after top-up for order {order.order_id}",
-        )
-        wallet.balance = ledger_entry.balance_after
-        wallet.save(update_fields=["balance"])
-
-        order.status = OrderStatus.PAID
-        order.save(update_fields=["status"])
-
-        licenses_created = self._create_symbol_licenses(order)
-        self.subscription_service.activate_for_order(order)
-
         return {
             "success": True,
             "message": "Top-up completed and order paid",
@@ -404,155 +405,33 @@ class SymbolPurchaseService:
         }
 
     def _create_symbol_licenses(self, order: PaySymbolOrder) -> int:
-        licenses_created = 0
-        now = timezone.now()
-
-        for item in order.items.all():
-            start_at = now
-            end_at = None
-            if item.license_days:
-                end_at = start_at + timedelta(days=item.license_days)
-
-            existing = PayUserSymbolLicense.objects.filter(
-                user=order.user,
-                symbol_id=item.symbol_id,
-                status=LicenseStatus.ACTIVE,
-            ).first()
-
-            if existing:
-                if existing.end_at and end_at:
-                    existing.end_at = max(existing.end_at, end_at)
-                elif not end_at:
-                    existing.end_at = None
-                existing.order = order
-                existing.save(update_fields=["end_at", "order"])
-                licenses_created += 1
-            else:
-                existing = PayUserSymbolLicense.objects.create(
-                    user=order.user,
-                    symbol_id=item.symbol_id,
-                    order=order,
-                    status=LicenseStatus.ACTIVE,
-                    start_at=start_at,
-                    end_at=end_at,
-                )
-                licenses_created += 1
+        return self.license_issuance_service.issue_for_order(order)
 
-            # Auto-create subscription entry (inactive by default)
-            self._ensure_subscription_for_license(
-                user=order.user,
-                symbol_id=item.symbol_id,
-                order=order,
-                item=item,
-            )
+    def check_symbol_access(self, user: User, symbol_id: int) -> Dict[str, object]:
+        # Chỉ đọc: chuyển status sang EXPIRED là việc của LicenseExpiryService (expire_licenses)
+        return self.entitlement_service.check_access(user.pk, symbol_id)
 
-        return licenses_created
+    def check_symbols_access(self, user: User, symbol_ids: List[int]) -> List[Dict[str, object]]:
+        return self.entitlement_service.check_many(user.pk, symbol_ids)
 
-    def _ensure_subscription_for_license(
+    def get_user_symbol_licenses(
         self,
         user: User,
-        symbol_id: int,
-        order: PaySymbolOrder,
-        item: PaySymbolOrderItem,
-    ) -> None:
-        """Create or update subscription entry for license (inactive by default)."""
-        from apps.setting.models import SymbolAutoRenewSubscription, AutoRenewStatus
-
-        # Determine cycle days and price from the order item
-        cycle_days = item.license_days or 30  # Default to 30 if lifetime
-        price = item.price
-
-        # Check if subscription already exists
-        subscription = SymbolAutoRenewSubscription.objects.filter(
-            user=user,
-            symbol_id=symbol_id,
-        ).first()
-
-        if subscription:
-            # Update existing subscription with latest order info
-            subscription.cycle_days = cycle_days
-            subscription.price = price
-            subscription.payment_method = order.payment_method
-            subscription.last_order = order
-            subscription.metadata = {
-                **(subscription.metadata or {}),
-                "last_purchase_order_id": str(order.order_id),
-                "last_purchase_price": str(price),
-                "last_purchase_days": cycle_days,
-            }
-            subscription.save(update_fields=["cycle_days", "price", "payment_method", "last_order", "metadata"])
-        else:
-            # Create new subscription (inactive by default)
-            SymbolAutoRenewSubscription.objects.create(
-                user=user,
-                symbol_id=symbol_id,
-                status=AutoRenewStatus.PAUSED,  # Inactive by default
-                cycle_days=cycle_days,
-                price=price,
-                payment_method=order.payment_method,
-                last_order=order,
-                metadata={
-                    "created_from_order_id": str(order.order_id),
-                    "initial_price": str(price),
-                    "initial_days": cycle_days,
-                },
-            )
-
-    def check_symbol_access(self, user: User, symbol_id: int) -> Dict[str, object]:
-        license_obj = PayUserSymbolLicense.objects.filter(
-            user=user,
-            symbol_id=symbol_id,
-            status=LicenseStatus.ACTIVE,
-        ).first()
-
-        if not license_obj:
-            return {"has_access": False, "reason": "No active license found"}
-
-        now = timezone.now()
-        if license_obj.end_at and license_obj.end_at <= now:
-            license_obj.status = LicenseStatus.EXPIRED
-            license_obj.save(update_fields=["status"])
-            return {
-                "has_access": False,
-                "reason": "License expired",
-                "expired_at": license_obj.end_at.isoformat(),
-            }
-
-        expires_soon = False
-        if license_obj.end_at:
-            expires_soon = (license_obj.end_at - now).days <= 7
-
-        # Lấy tên symbol
-        symbol_name = None
-        try:
-            symbol = Symbol.objects.get(id=symbol_id)
-            symbol_name = symbol.name
-        except Symbol.DoesNotExist:
-            pass
-
-        return {
-            "has_access": True,
-            "license_id": str(license_obj.license_id),
-            "symbol_id": symbol_id,
-            "symbol_name": symbol_name,
-            "start_at": license_obj.start_at.isoformat(),
-            "end_at": license_obj.end_at.isoformat() if license_obj.end_at else None,
-            "is_lifetime": license_obj.end_at is None,
-            "expires_soon": expires_soon,
-        }
-
-    def get_user_symbol_licenses(self, user: User, page: int = 1, limit: int = 20) -> Dict[str, object]:
+        page: int = 1,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, object]:
+        """Raises ValueError nếu cursor sai"""
         if page <= 0:
             page = 1
         if limit <= 0:
             limit = 20
 
-        offset = (page - 1) * limit
-        qs = PayUserSymbolLicense.objects.filter(user=user).select_related('order').order_by("-created_at")
-        total = qs.count()
+        qs = PayUserSymbolLicense.objects.filter(user=user)
+        licenses_list, next_cursor = keyset_page(qs.select_related('order'), limit, cursor, page)
+        total = cached_count(qs, "licenses", user.pk)
 
         # Lấy tất cả symbol_ids để query tên 1 lần
-        licenses_list = list(qs[offset : offset + limit])
         symbol_ids = {license_obj.symbol_id for license_obj in licenses_list if license_obj.symbol_id}
 
         symbol_names = {}
@@ -643,6 +522,7 @@ class SymbolPurchaseService:
             "page": page,
             "limit": limit,
             "total_pages": (total + limit - 1) // limit,
+            "next_cursor": next_cursor,
         }
 
     def get_order_history(
@@ -651,26 +531,17 @@ class SymbolPurchaseService:
         page: int = 1,
         limit: int = 20,
         status: Optional[str] = None,
+        cursor: Optional[str] = None,
     ) -> Dict[str, object]:
+        """Raises ValueError nếu cursor sai"""
         if page <= 0:
             page = 1
         if limit <= 0:
             limit = 20
 
-        if status is None:
-            status_filter = [OrderStatus.PAID]
-        else:
-            status_filter = [status]
-
-        qs = (
-            PaySymbolOrder.objects.filter(user=user, status__in=status_filter)
-            .order_by("-created_at")
-            .prefetch_related("items")
-        )
-        total = qs.count()
-
-        offset = (page - 1) * limit
-        orders = list(qs[offset : offset + limit])
+        qs = PaySymbolOrder.objects.filter(user=user, status=status or OrderStatus.PAID)
+        orders, next_cursor = keyset_page(qs.prefetch_related("items"), limit, cursor, page)
+        total = cached_count(qs, "orders", user.pk, status or OrderStatus.PAID)
 
         symbol_ids = {
             item.symbol_id
@@ -717,4 +588,5 @@ class SymbolPurchaseService:
             "page": page,
             "limit": limit,
             "total_pages": (total + limit - 1) // limit,
+            "next_cursor": next_cursor,
         }
@@ -0,0 +1,170 @@
+"""
+Checkpoint số dư ví theo sổ cái và đối soát nhanh.
+
+- create_checkpoints(): mỗi ví có ledger mới -> một PayWalletCheckpoint (cursor, balance, entry_count)
+  = checkpoint trước + các ledger sau cursor. Chỉ tính ledger cũ hơn CHECKPOINT_LAG_SECONDS vì
+  created_at được gán trước commit: transaction đang mở có thể commit ledger "cũ" sau checkpoint.
+- reconcile(): một câu SQL cho tất cả ví: checkpoint mới nhất + SUM(ledger sau cursor) so với
+  pay_wallets.balance, trả về các ví lệch.
+- history(): đọc sổ cái theo trang keyset (created_at, ledger_id); total lấy từ entry_count của
+  checkpoint + số ledger sau cursor thay vì COUNT(*) toàn bộ.
+"""
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from django.db.models import (
+    BigIntegerField,
+    Case,
+    Count,
+    DecimalField,
+    F,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import PayWallet, PayWalletCheckpoint, PayWalletLedger
+from ..utils.pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_LAG_SECONDS = 300
+CHECKPOINT_BATCH_SIZE = 1000
+LEDGER_PAGE_MAX = 100
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MONEY = DecimalField(max_digits=18, decimal_places=2)
+
+
+def _signed_amount():
+    return Case(When(is_credit=True, then=F("amount")), default=-F("amount"), output_field=_MONEY)
+
+
+def _latest_checkpoint(wallet_ref) -> QuerySet:
+    return PayWalletCheckpoint.objects.filter(wallet=wallet_ref).order_by("-ledger_created_at", "-ledger_id")
+
+
+def _entries_after_checkpoint(cutoff: Optional[datetime] = None) -> QuerySet:
+    """Ledger của ví ngoài (OuterRef) nằm sau cursor cp_at/cp_id đã annotate"""
+    entries = PayWalletLedger.objects.filter(wallet=OuterRef("pk")).filter(
+        Q(created_at__gt=OuterRef("cp_at")) | Q(created_at=OuterRef("cp_at"), ledger_id__gt=OuterRef("cp_id"))
+    )
+    if cutoff is not None:
+        entries = entries.filter(created_at__lte=cutoff)
+    return entries.order_by()
+
+
+def wallets_with_ledger_state(cutoff: Optional[datetime] = None) -> QuerySet:
+    """
+    PayWallet annotate: cp_* (checkpoint mới nhất), delta/new_entries (ledger sau checkpoint, tới
+    cutoff nếu có) và ledger_balance = cp_balance + delta. Tất cả là subquery tương quan, một câu SQL.
+    """
+    latest = _latest_checkpoint(OuterRef("pk"))
+    after = _entries_after_checkpoint(cutoff)
+    return PayWallet.objects.annotate(
+        cp_at=Coalesce(Subquery(latest.values("ledger_created_at")[:1]), Value(_EPOCH)),
+        cp_id=Subquery(latest.values("ledger_id")[:1]),
+        cp_balance=Coalesce(Subquery(latest.values("balance")[:1]), Value(Decimal("0")), output_field=_MONEY),
+        cp_count=Coalesce(Subquery(latest.values("entry_count")[:1]), Value(0), output_field=BigIntegerField()),
+    ).annotate(
+        delta=Coalesce(
+            Subquery(after.values("wallet").annotate(total=Sum(_signed_amount())).values("total")),
+            Value(Decimal("0")),
+            output_field=_MONEY,
+        ),
+        new_entries=Coalesce(
+            Subquery(after.values("wallet").annotate(n=Count("ledger_id")).values("n")),
+            Value(0),
+            output_field=BigIntegerField(),
+        ),
+    ).annotate(
+        ledger_balance=F("cp_balance") + F("delta"),
+    )
+
+
+class WalletLedgerService:
+    def create_checkpoints(
+        self,
+        cutoff: Optional[datetime] = None,
+        batch_size: int = CHECKPOINT_BATCH_SIZE,
+    ) -> Dict[str, int]:
+        """Checkpoint mọi ví có ledger mới tới cutoff (mặc định now - CHECKPOINT_LAG_SECONDS)"""
+        cutoff = cutoff or timezone.now() - timedelta(seconds=CHECKPOINT_LAG_SECONDS)
+        last = _entries_after_checkpoint(cutoff).order_by("-created_at", "-ledger_id")
+        wallets = (
+            wallets_with_ledger_state(cutoff)
+            .filter(new_entries__gt=0)
+            .annotate(
+                last_at=Subquery(last.values("created_at")[:1]),
+                last_id=Subquery(last.values("ledger_id")[:1]),
+            )
+            .values("pk", "ledger_balance", "cp_count", "new_entries", "last_at", "last_id")
+        )
+
+        created = 0
+        batch = []
+        for row in wallets.iterator(chunk_size=batch_size):
+            batch.append(
+                PayWalletCheckpoint(
+                    wallet_id=row["pk"],
+                    ledger_created_at=row["last_at"],
+                    ledger_id=row["last_id"],
+                    balance=row["ledger_balance"],
+                    entry_count=row["cp_count"] + row["new_entries"],
+                )
+            )
+            if len(batch) >= batch_size:
+                created += len(PayWalletCheckpoint.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(PayWalletCheckpoint.objects.bulk_create(batch))
+
+        if created:
+            logger.info(f"Created {created} wallet checkpoints up to {cutoff.isoformat()}")
+        return {"checkpoints": created}
+
+    def reconcile(self) -> Dict[str, Any]:
+        """So pay_wallets.balance với sổ cái cho mọi ví trong một câu SQL. Returns: checked, discrepancies"""
+        wallets = wallets_with_ledger_state()
+        checked = PayWallet.objects.count()
+        discrepancies = [
+            {
+                "wallet_id": str(row["pk"]),
+                "user_id": row["user_id"],
+                "balance": row["balance"],
+                "ledger_balance": row["ledger_balance"],
+                "difference": row["balance"] - row["ledger_balance"],
+            }
+            for row in wallets.exclude(balance=F("ledger_balance")).values(
+                "pk", "user_id", "balance", "ledger_balance"
+            )
+        ]
+        if discrepancies:
+            logger.warning(f"Wallet reconciliation: {len(discrepancies)}/{checked} wallets drift from ledger")
+        return {"checked": checked, "discrepancies": discrepancies}
+
+    def history(
+        self,
+        wallet: PayWallet,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Trang ledger mới nhất trước; cursor là next_cursor của trang trước. Raises ValueError nếu cursor sai"""
+        limit = max(1, min(limit, LEDGER_PAGE_MAX))
+        page, next_cursor = keyset_page(PayWalletLedger.objects.filter(wallet=wallet), limit, cursor)
+
+        state = wallets_with_ledger_state().filter(pk=wallet.pk).values("cp_count", "new_entries").first()
+        return {
+            "results": page,
+            "total": state["cp_count"] + state["new_entries"] if state else 0,
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }
@@ -7,10 +7,15 @@ from django.db import transaction
 from django.contrib.auth import get_user_model
 
 from apps.seapay.models import PayWallet, PayWalletLedger, WalletTxType
+from apps.seapay.repositories.wallet_repository import WalletRepository
 
 User = get_user_model()
 
 
+class InsufficientBalanceError(ValueError):
+    """Ví không đủ số dư cho debit (UPDATE có điều kiện không match row nào)"""
+
+
 class WalletService:
     """Utility helpers around PayWallet and its ledger."""
 
@@ -53,34 +58,7 @@ class WalletService:
     ) -> PayWalletLedger:
         if amount <= 0:
             raise ValueError("Credit amount must be positive")
-
-        if tx_type not in WalletTxType.values:
-            raise ValueError(f"Invalid tx_type: {tx_type}")
-
-        metadata = metadata or {}
-
-        with transaction.atomic():
-            wallet.refresh_from_db()
-            balance_before = wallet.balance
-            balance_after = balance_before + amount
-
-            ledger_entry = PayWalletLedger.objects.create(
-                wallet=wallet,
-                tx_type=tx_type,
-                amount=amount,
-                is_credit=True,
-                balance_before=balance_before,
-                balance_after=balance_after,
-                note=note,
-                order=order,
-                payment=payment,
-                metadata=metadata,
-            )
-
-            wallet.balance = balance_after
-            wallet.save(update_fields=["balance"])
-
-        return ledger_entry
+        return self._apply(wallet, amount, True, tx_type, note, order, payment, metadata)
 
     def debit(
         self,
@@ -94,36 +72,45 @@ class WalletService:
     ) -> PayWalletLedger:
         if amount <= 0:
             raise ValueError("Debit amount must be positive")
+        return self._apply(wallet, amount, False, tx_type, note, order, payment, metadata)
 
+    def _apply(
+        self,
+        wallet: PayWallet,
+        amount: Decimal,
+        is_credit: bool,
+        tx_type: str,
+        note: str,
+        order: Optional[Any],
+        payment: Optional[Any],
+        metadata: Optional[Dict[str, Any]],
+    ) -> PayWalletLedger:
+        """
+        Một UPDATE ... RETURNING balance rồi INSERT ledger trong cùng transaction: không đọc số dư
+        trước, không select_for_update, row lock chỉ giữ tới commit. Nếu caller đang trong transaction
+        dài thì nên gọi credit/debit ở cuối để lock của ví được giữ ngắn nhất.
+        """
         if tx_type not in WalletTxType.values:
             raise ValueError(f"Invalid tx_type: {tx_type}")
 
-        metadata = metadata or {}
-
+        amount = Decimal(amount)
         with transaction.atomic():
-            wallet.refresh_from_db()
-            if wallet.balance < amount:
-                raise ValueError("Insufficient balance")
-
-            balance_before = wallet.balance
-            balance_after = balance_before - amount
+            balance_after = WalletRepository.apply_balance_delta(wallet.pk, amount, is_credit)
+            if balance_after is None:
+                raise InsufficientBalanceError(f"Insufficient balance. Required: {amount}")
 
             ledger_entry = PayWalletLedger.objects.create(
                 wallet=wallet,
                 tx_type=tx_type,
                 amount=amount,
-                is_credit=False,
-                balance_before=balance_before,
+                is_credit=is_credit,
+                balance_before=balance_after - amount if is_credit else balance_after + amount,
                 balance_after=balance_after,
                 note=note,
                 order=order,
                 payment=payment,
-                metadata=metadata,
+                metadata=metadata or {},
             )
 
-            wallet.balance = balance_after
-            wallet.save(update_fields=["balance"])
-
+        wallet.balance = balance_after
         return ledger_entry
-
-
@@ -10,10 +10,11 @@ from django.contrib.auth import get_user_model
 from apps.seapay.models import (
     PayWallet, PayPaymentIntent, PayPaymentAttempt, PayPayment, 
     PayBankTransaction, PaySepayWebhookEvent, PayWalletLedger,
-    IntentPurpose, PaymentStatus
+    IntentPurpose, PaymentStatus, WalletTxType
 )
 from apps.seapay.services.sepay_client import SepayClient
 from apps.seapay.repositories.payment_repository import PaymentRepository
+from apps.seapay.services.wallet_service import WalletService
 
 User = get_user_model()
 
@@ -23,6 +24,7 @@ class WalletTopupService:
     def __init__(self):
         self.sepay_client = SepayClient()
         self.repository = PaymentRepository()
+        self.wallet_service = WalletService()
     
     def create_topup_intent(
         self, 
@@ -172,18 +174,14 @@ class WalletTopupService:
         wallet = self._get_or_create_wallet(payment.user)[0]
         
         with transaction.atomic():
-            ledger_entry = self._create_ledger_entry(
-                wallet=wallet,
-                tx_type='deposit',
-                amount=payment.amount,
-                is_credit=True,
+            ledger_entry = self.wallet_service.credit(
+                wallet,
+                payment.amount,
+                WalletTxType.DEPOSIT,
+                note=f"Wallet topup via SePay - {payment.provider_payment_id}",
                 payment=payment,
-                description=f"Wallet topup via SePay - {payment.provider_payment_id}"
             )
             
-            wallet.balance = ledger_entry.balance_after
-            wallet.save(update_fields=['balance', 'updated_at'])
-            
             intent.status = PaymentStatus.SUCCEEDED
             intent.save(update_fields=['status', 'updated_at'])
         
@@ -304,41 +302,10 @@ class WalletTopupService:
         return bank_tx
     
     def _find_intent_by_content(self, content: str, reference_code: str = None) -> Optional[PayPaymentIntent]:
-        # Try matching by reference_code first (preferred)
-        if reference_code:
-            try:
-                return PayPaymentIntent.objects.get(
-                    reference_code=reference_code,
-                    purpose=IntentPurpose.WALLET_TOPUP,
-                    status__in=[PaymentStatus.REQUIRES_PAYMENT_METHOD, PaymentStatus.PROCESSING]
-                )
-            except PayPaymentIntent.DoesNotExist:
-                pass
-
-        # Fallback to content matching
-        try:
-            return PayPaymentIntent.objects.get(
-                order_code=content,
-                purpose=IntentPurpose.WALLET_TOPUP,
-                status__in=[PaymentStatus.REQUIRES_PAYMENT_METHOD, PaymentStatus.PROCESSING]
-            )
-        except PayPaymentIntent.DoesNotExist:
-            if content.startswith('TOPUP') and '_' not in content:
-                if len(content) > 15:  # TOPUP + 10 timestamp + random
-                    timestamp_part = content[5:15] 
-                    random_part = content[15:]       
-                    legacy_format = f"TOPUP_{timestamp_part}_{random_part}"
-                    
-                    try:
-                        return PayPaymentIntent.objects.get(
-                            order_code=legacy_format,
-                            purpose=IntentPurpose.WALLET_TOPUP,
-                            status__in=[PaymentStatus.REQUIRES_PAYMENT_METHOD, PaymentStatus.PROCESSING]
-                        )
-                    except PayPaymentIntent.DoesNotExist:
-                        pass
-            
-            return None
+        intent = self.repository.find_intent_by_transfer_content(content, reference_code)
+        if intent and intent.purpose == IntentPurpose.WALLET_TOPUP and intent.is_pending():
+            return intent
+        return None
     
     def _create_payment(self, intent: PayPaymentIntent, bank_tx: PayBankTransaction, amount: Decimal) -> PayPayment:
         """Táº¡o payment record"""
@@ -356,37 +323,3 @@ class WalletTopupService:
             }
         )
         return payment
-    
-    def _create_ledger_entry(
-        self, 
-        wallet: PayWallet, 
-        tx_type: str, 
-        amount: Decimal, 
-        is_credit: bool,
-        payment: PayPayment = None,
-        description: str = ""
-    ) -> PayWalletLedger:
-        """Táº¡o ledger entry vÃ  tÃ­nh sá»‘ dÆ° má»›i"""
-        balance_before = wallet.balance
-        
-        if is_credit:
-            balance_after = balance_before + amount
-        else:
-            balance_after = balance_before - amount
-            
-        if balance_after < 0:
-            raise ValueError("Insufficient wallet balance")
-        
-        ledger_entry = PayWalletLedger.objects.create(
-            wallet=wallet,
-            tx_type=tx_type,
-            amount=amount,
-            is_credit=is_credit,
-            balance_before=balance_before,
-            balance_after=balance_after,
-            payment=payment,
-            note=description,
-            metadata={}
-        )
-        
-        return ledger_entry
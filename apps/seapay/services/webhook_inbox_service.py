@@ -0,0 +1,98 @@
+"""
+Pipeline webhook SePay: route chỉ ghi inbox (INSERT ... ON CONFLICT DO NOTHING) rồi ack ngay;
+worker claim event chưa xử lý theo thứ tự nhận (SKIP LOCKED) và áp dụng đúng một lần.
+
+Mỗi event một transaction: lock event -> lưu bank transaction -> PaymentService.apply_sepay_transfer
+(lock intent) -> đánh dấu processed. Lỗi bất ngờ rollback phần áp dụng, tăng attempts và để lần
+chạy sau thử lại tới WEBHOOK_MAX_ATTEMPTS.
+"""
+import logging
+from typing import Any, Dict, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.jobs.handlers import SEPAY_PROCESS_WEBHOOKS
+from apps.jobs.services import JobService
+
+from ..models import PayBankTransaction
+from ..repositories.webhook_repository import WebhookEventRepository
+from .payment_service import PaymentService
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_MAX_ATTEMPTS = 5
+WEBHOOK_BATCH_SIZE = 500
+
+
+class SepayWebhookInboxService:
+    def __init__(self):
+        self.repository = WebhookEventRepository()
+        self.payment_service = PaymentService()
+        self.job_service = JobService()
+
+    def ingest(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Ghi event vào inbox và enqueue processor (dedupe: một job processor đang chờ là đủ)"""
+        sepay_tx_id = payload.get("id")
+        if not sepay_tx_id:
+            raise ValueError("Missing sepay transaction id in webhook")
+
+        with transaction.atomic():
+            created = self.repository.insert_if_new(sepay_tx_id, payload)
+            if created:
+                self.job_service.enqueue(SEPAY_PROCESS_WEBHOOKS, dedupe_key=SEPAY_PROCESS_WEBHOOKS)
+        return {"accepted": created, "sepay_tx_id": sepay_tx_id}
+
+    def ingest_many(self, payloads: List[Dict[str, Any]]) -> None:
+        """Như ingest() cho một lô event (id đã có trong inbox bị bỏ qua), enqueue processor một lần"""
+        if not payloads:
+            return
+        with transaction.atomic():
+            self.repository.insert_many_if_new(payloads)
+            self.job_service.enqueue(SEPAY_PROCESS_WEBHOOKS, dedupe_key=SEPAY_PROCESS_WEBHOOKS)
+
+    def process_pending(self, limit: int = WEBHOOK_BATCH_SIZE) -> Dict[str, int]:
+        """Xử lý tối đa limit event. Returns: processed, failed"""
+        stats = {"processed": 0, "failed": 0}
+        for _ in range(limit):
+            outcome = self._process_next()
+            if outcome is None:
+                break
+            stats[outcome] += 1
+        if stats["processed"] or stats["failed"]:
+            logger.info(f"SePay webhooks: {stats['processed']} processed, {stats['failed']} failed")
+        return stats
+
+    def _process_next(self):
+        with transaction.atomic():
+            event = self.repository.lock_next_pending(WEBHOOK_MAX_ATTEMPTS)
+            if event is None:
+                return None
+
+            payload = event.payload or {}
+            try:
+                with transaction.atomic():
+                    bank_tx = self.repository.store_bank_transaction(event.sepay_tx_id, payload)
+                    result = self.payment_service.apply_sepay_transfer(payload)
+                    self._link_bank_transaction(bank_tx, result)
+            except Exception as exc:
+                logger.exception(f"SePay webhook {event.sepay_tx_id} failed: {exc}")
+                event.attempts += 1
+                event.process_error = str(exc)
+                event.save(update_fields=["attempts", "process_error"])
+                return "failed"
+
+            event.attempts += 1
+            event.processed = True
+            event.processed_at = timezone.now()
+            event.process_error = None if result.get("success") else result.get("message")
+            event.save(update_fields=["attempts", "processed", "processed_at", "process_error"])
+            return "processed"
+
+    @staticmethod
+    def _link_bank_transaction(bank_tx: PayBankTransaction, result: Dict[str, Any]) -> None:
+        if not result.get("intent_id"):
+            return
+        bank_tx.intent_id = result["intent_id"]
+        bank_tx.payment_id = result.get("payment_id")
+        bank_tx.save(update_fields=["intent", "payment"])
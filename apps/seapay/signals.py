@@ -0,0 +1,15 @@
+"""
+Xóa cache quyền truy cập symbol khi license được lưu/xóa qua ORM (create, save, admin).
+bulk_create / bulk_update / QuerySet.update không phát signal: các chỗ đó gọi invalidate_entitlements trực tiếp.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.seapay.models import PayUserSymbolLicense
+from apps.seapay.services.entitlement_service import invalidate_entitlements
+
+
+@receiver(post_save, sender=PayUserSymbolLicense)
+@receiver(post_delete, sender=PayUserSymbolLicense)
+def invalidate_license_entitlements(sender, instance, **kwargs):
+    invalidate_entitlements([instance.user_id])
@@ -0,0 +1,23 @@
+"""
+Cursor cho phân trang keyset theo (created_at, id): client nhận chuỗi opaque next_cursor và gửi lại
+để lấy trang tiếp theo, DB seek thẳng theo index thay vì OFFSET.
+"""
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, pk) -> str:
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Raises ValueError nếu cursor không hợp lệ (pk phải là UUID như các bảng seapay phân trang keyset)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), str(uuid.UUID(pk))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
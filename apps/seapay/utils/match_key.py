@@ -0,0 +1,33 @@
+"""
+match_key: order_code của intent đã chuẩn hóa (bỏ ký tự phân cách, viết hoa) để khớp nội dung
+chuyển khoản dù ngân hàng thêm/bỏ "_", khoảng trắng, đổi hoa thường hay chèn text khác quanh mã.
+"""
+import re
+from typing import List, Optional
+
+_SEPARATORS = re.compile(r"[^0-9A-Z]")
+
+# TOPUP{timestamp 10 số}{8 hex} (WalletTopupService) và PAY_{8 hex}_{timestamp} (PaymentService)
+_CODE_PATTERN = re.compile(
+    r"TOPUP[\W_]*\d{10}[\W_]*[0-9A-F]{8}"
+    r"|PAY[\W_]*[0-9A-F]{8}[\W_]*\d{10}"
+)
+
+
+def normalize_match_key(code: Optional[str]) -> str:
+    return _SEPARATORS.sub("", (code or "").upper())
+
+
+def extract_match_keys(*texts: Optional[str]) -> List[str]:
+    """Tất cả match_key ứng viên trong các đoạn text tự do (content, referenceCode...), một lượt regex"""
+    keys = []
+    for text in texts:
+        if not text:
+            continue
+        upper = text.upper()
+        keys.extend(normalize_match_key(match) for match in _CODE_PATTERN.findall(upper))
+        # Text chỉ gồm đúng mã (định dạng khác) vẫn khớp được sau khi chuẩn hóa
+        whole = normalize_match_key(upper)
+        if whole and len(whole) <= 64:
+            keys.append(whole)
+    return list(dict.fromkeys(keys))
@@ -0,0 +1,51 @@
+"""
+Phân trang lịch sử theo (created_at, pk) giảm dần: có cursor thì seek theo index (user, ..., created_at, pk)
+nên trang nào cũng tốn như trang đầu; total lấy từ COUNT(*) được cache ngắn (số gần đúng).
+"""
+import hashlib
+from typing import Any, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, QuerySet
+
+from .cursor import decode_cursor, encode_cursor
+
+COUNT_CACHE_PREFIX = "seapay:count:"
+
+
+def keyset_page(
+    queryset: QuerySet,
+    limit: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trang sắp theo (-created_at, -pk). Có cursor: seek sau cursor (page bị bỏ qua); không có: OFFSET theo
+    page như API cũ. next_cursor luôn trả về khi còn trang sau. Raises ValueError nếu cursor sai.
+    """
+    pk_name = queryset.model._meta.pk.name
+    queryset = queryset.order_by("-created_at", f"-{pk_name}")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, **{f"{pk_name}__lt": pk}))
+        offset = 0
+    else:
+        offset = (max(page, 1) - 1) * limit
+
+    rows = list(queryset[offset : offset + limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].pk) if has_more else None
+    return rows, next_cursor
+
+
+def cached_count(queryset: QuerySet, *key_parts: Any) -> int:
+    """COUNT(*) của queryset, cache PAGINATION_COUNT_CACHE_SECONDS theo key_parts (user, filter...)"""
+    raw = ":".join(str(part) for part in (queryset.model._meta.db_table, *key_parts))
+    key = COUNT_CACHE_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, settings.PAGINATION_COUNT_CACHE_SECONDS)
+    return total
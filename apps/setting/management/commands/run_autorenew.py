@@ -2,14 +2,15 @@
 Django management command to process auto-renew subscriptions.
 
 Usage:
-    python manage.py run_autorenew [--limit 50] [--verbose]
+    python manage.py run_autorenew [--limit N] [--chunk-size 200] [--workers 4] [--verbose]
 
-Setup cronjob:
+Chạy định kỳ bởi run_scheduler (schedule setting.autorenew); nếu vẫn dùng cron:
     */5 * * * * cd /path/to/project && python manage.py run_autorenew >> /var/log/autorenew.log 2>&1
 """
 
 import logging
 from django.core.management.base import BaseCommand
+from apps.setting.services.autorenew_billing import CHUNK_SIZE
 from apps.setting.services.subscription_service import SymbolAutoRenewService
 
 logger = logging.getLogger("app.autorenew")
@@ -22,8 +23,20 @@ class Command(BaseCommand):
         parser.add_argument(
             "--limit",
             type=int,
-            default=50,
-            help="Maximum number of subscriptions to process in one run (default: 50)",
+            default=None,
+            help="Maximum number of subscriptions to process in one run (default: all due)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help=f"Subscriptions claimed and billed per transaction (default: {CHUNK_SIZE})",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Parallel billing workers; safe because chunks are claimed with SKIP LOCKED (default: 1)",
         )
         parser.add_argument(
             "--verbose",
@@ -36,19 +49,28 @@ class Command(BaseCommand):
         verbose = options["verbose"]
 
         if verbose:
-            self.stdout.write(f"Starting auto-renew processing (limit={limit})...")
+            self.stdout.write(
+                f"Starting auto-renew processing (limit={limit}, chunk_size={options['chunk_size']}, "
+                f"workers={options['workers']})..."
+            )
 
         service = SymbolAutoRenewService()
 
         try:
-            result = service.run_due_subscriptions(limit=limit)
+            result = service.run_due_subscriptions(
+                limit=limit,
+                chunk_size=options["chunk_size"],
+                workers=options["workers"],
+            )
 
             self.stdout.write(
                 self.style.SUCCESS(
                     f"✓ Processed: {result['processed']} | "
                     f"Success: {result['success']} | "
                     f"Failed: {result['failed']} | "
-                    f"Skipped: {result['skipped']}"
+                    f"Skipped: {result['skipped']} | "
+                    f"Charged: {result['charged_amount']} | "
+                    f"{result['elapsed_seconds']}s"
                 )
             )
 
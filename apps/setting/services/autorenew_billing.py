@@ -0,0 +1,366 @@
+"""
+Billing engine cho auto-renew.
+
+- Claim subscriptions tới hạn theo chunk: SELECT ... FOR UPDATE SKIP LOCKED rồi dời next_billing_at
+  thêm CLAIM_LEASE_MINUTES, nên các worker chạy song song không lấy trùng; worker chết giữa chừng
+  thì chunk tự tới hạn lại sau lease (chưa trừ tiền vì charge + cập nhật subscription cùng transaction).
+- Đọc sẵn ví (khóa theo thứ tự pk), license active và symbol của cả chunk trong vài query.
+- Mỗi chunk một transaction: orders, items, ledger, licenses, attempts, outbox ghi bằng bulk_create,
+  license/subscription bằng bulk_update. Số dư ví vẫn chỉ đổi qua WalletRepository.apply_balance_delta
+  (một UPDATE có điều kiện mỗi ví, tổng tiền của ví trong chunk). Không đi qua create_symbol_order
+  từng subscription.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.notification.models import AppEventType
+from apps.notification.services.outbox_service import NotificationOutboxService
+from apps.seapay.repositories.wallet_repository import WalletRepository
+from apps.seapay.services.entitlement_service import invalidate_entitlements
+from apps.seapay.services.wallet_service import InsufficientBalanceError
+from apps.seapay.models import (
+    LicenseStatus,
+    OrderStatus,
+    PaymentMethod,
+    PaySymbolOrder,
+    PaySymbolOrderItem,
+    PayUserSymbolLicense,
+    PayWallet,
+    PayWalletLedger,
+    WalletTxType,
+)
+from apps.setting.models import (
+    AutoRenewAttemptStatus,
+    AutoRenewStatus,
+    SymbolAutoRenewAttempt,
+    SymbolAutoRenewSubscription,
+)
+from apps.stock.models import Symbol
+
+logger = logging.getLogger("app.autorenew")
+
+CHUNK_SIZE = 200
+CLAIM_LEASE_MINUTES = 15
+
+SUBSCRIPTION_UPDATE_FIELDS = [
+    "status",
+    "next_billing_at",
+    "last_attempt_at",
+    "last_success_at",
+    "consecutive_failures",
+    "last_order_id",
+    "current_license_id",
+    "updated_at",
+]
+
+
+@dataclass
+class AutoRenewMetrics:
+    processed: int = 0
+    success: int = 0
+    failed: int = 0
+    skipped: int = 0
+    cancelled: int = 0
+    charged_amount: Decimal = Decimal("0")
+    chunks: int = 0
+    chunk_errors: int = 0
+    elapsed_seconds: float = 0.0
+
+    def merge(self, other: "AutoRenewMetrics") -> None:
+        for f in fields(self):
+            if f.name != "elapsed_seconds":
+                setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["charged_amount"] = str(self.charged_amount)
+        data["elapsed_seconds"] = round(self.elapsed_seconds, 3)
+        return data
+
+
+class AutoRenewBillingRunner:
+    """Chạy billing cho các subscription tới hạn; `workers` > 1 chạy nhiều vòng claim song song."""
+
+    def __init__(self, subscription_service, chunk_size: int = CHUNK_SIZE):
+        self.subscription_service = subscription_service
+        self.chunk_size = chunk_size
+        self.outbox_service = NotificationOutboxService()
+
+    def run(self, max_subscriptions: Optional[int] = None, workers: int = 1) -> AutoRenewMetrics:
+        started = time.monotonic()
+        budget = _Budget(max_subscriptions)
+        metrics = AutoRenewMetrics()
+
+        if workers <= 1:
+            metrics.merge(self._worker_loop(budget))
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autorenew") as pool:
+                for worker_metrics in pool.map(lambda _: self._threaded_loop(budget), range(workers)):
+                    metrics.merge(worker_metrics)
+
+        metrics.elapsed_seconds = time.monotonic() - started
+        logger.info(f"Auto-renew run finished: {metrics.as_dict()}")
+        return metrics
+
+    def _threaded_loop(self, budget: "_Budget") -> AutoRenewMetrics:
+        try:
+            return self._worker_loop(budget)
+        finally:
+            connection.close()
+
+    def _worker_loop(self, budget: "_Budget") -> AutoRenewMetrics:
+        metrics = AutoRenewMetrics()
+        while True:
+            size = budget.take(self.chunk_size)
+            if not size:
+                break
+            now = timezone.now()
+            subscriptions = self.claim_due(size, now)
+            if not subscriptions:
+                break
+
+            chunk_started = time.monotonic()
+            try:
+                chunk_metrics = self.bill_chunk(subscriptions, now)
+            except Exception:
+                # Chunk rollback toàn bộ: subscriptions tới hạn lại khi hết lease
+                logger.exception(f"Auto-renew chunk of {len(subscriptions)} subscriptions failed")
+                chunk_metrics = AutoRenewMetrics(
+                    processed=len(subscriptions), failed=len(subscriptions), chunks=1, chunk_errors=1
+                )
+            metrics.merge(chunk_metrics)
+            logger.info(
+                f"Auto-renew chunk: {len(subscriptions)} subscriptions in "
+                f"{time.monotonic() - chunk_started:.2f}s "
+                f"(success={chunk_metrics.success}, failed={chunk_metrics.failed}, skipped={chunk_metrics.skipped})"
+            )
+            if len(subscriptions) < size:
+                break
+        return metrics
+
+    def claim_due(self, limit: int, now) -> List[SymbolAutoRenewSubscription]:
+        with transaction.atomic():
+            subscriptions = list(
+                SymbolAutoRenewSubscription.objects.select_for_update(skip_locked=True)
+                .filter(
+                    status=AutoRenewStatus.ACTIVE,
+                    next_billing_at__isnull=False,
+                    next_billing_at__lte=now,
+                )
+                .order_by("next_billing_at")[:limit]
+            )
+            if subscriptions:
+                SymbolAutoRenewSubscription.objects.filter(
+                    pk__in=[sub.pk for sub in subscriptions]
+                ).update(next_billing_at=now + timedelta(minutes=CLAIM_LEASE_MINUTES), last_attempt_at=now)
+        return subscriptions
+
+    @transaction.atomic
+    def bill_chunk(self, subscriptions: List[SymbolAutoRenewSubscription], now) -> AutoRenewMetrics:
+        metrics = AutoRenewMetrics(processed=len(subscriptions), chunks=1)
+        user_ids = {sub.user_id for sub in subscriptions}
+        symbol_ids = {sub.symbol_id for sub in subscriptions}
+
+        # Khóa ví theo pk để hai worker cùng chạm một user luôn lấy lock cùng thứ tự
+        wallets = {
+            wallet.user_id: wallet
+            for wallet in PayWallet.objects.select_for_update().filter(user_id__in=user_ids).order_by("pk")
+        }
+        licenses = {
+            (lic.user_id, lic.symbol_id): lic
+            for lic in PayUserSymbolLicense.objects.filter(
+                user_id__in=user_ids, symbol_id__in=symbol_ids, status=LicenseStatus.ACTIVE
+            ).order_by("start_at")
+        }
+        known_symbols = set(Symbol.objects.filter(id__in=symbol_ids).values_list("id", flat=True))
+
+        orders, items, ledger_entries, new_licenses, attempts, outbox = [], [], [], [], [], []
+        charged: Dict[Any, Decimal] = {}
+        touched_licenses: Dict[Any, PayUserSymbolLicense] = {}
+        new_license_ids = set()
+
+        for sub in subscriptions:
+            wallet = wallets.get(sub.user_id)
+            balance = wallet.balance if wallet else None
+            license_obj = licenses.get((sub.user_id, sub.symbol_id))
+
+            if sub.payment_method != PaymentMethod.WALLET:
+                attempts.append(
+                    SymbolAutoRenewAttempt(
+                        subscription=sub,
+                        status=AutoRenewAttemptStatus.SKIPPED,
+                        fail_reason="Auto-renew currently requires wallet payment",
+                        wallet_balance_snapshot=balance,
+                    )
+                )
+                sub.last_attempt_at = now
+                sub.next_billing_at = now + timedelta(minutes=sub.retry_interval_minutes)
+                metrics.skipped += 1
+                continue
+
+            if license_obj and license_obj.end_at is None:
+                # Đã có license trọn đời: không cần gia hạn nữa
+                sub.status = AutoRenewStatus.COMPLETED
+                sub.next_billing_at = None
+                sub.current_license_id = license_obj.license_id
+                metrics.skipped += 1
+                continue
+
+            if wallet is None or wallet.balance < sub.price:
+                reason = (
+                    "Wallet not found"
+                    if wallet is None
+                    else f"Insufficient balance: requires {sub.price}, has {wallet.balance}"
+                )
+                attempts.append(self.subscription_service._mark_cancelled(sub, reason, balance, now))
+                metrics.failed += 1
+                metrics.cancelled += 1
+                continue
+
+            if sub.symbol_id not in known_symbols:
+                attempts.append(self.subscription_service._mark_failed(sub, "Symbol not found", balance, now))
+                metrics.failed += 1
+                continue
+
+            order = PaySymbolOrder(
+                user_id=sub.user_id,
+                total_amount=sub.price,
+                status=OrderStatus.PAID,
+                payment_method=PaymentMethod.WALLET,
+                description=f"Auto-renew for symbol {sub.symbol_id}",
+            )
+            orders.append(order)
+            items.append(
+                PaySymbolOrderItem(
+                    order=order,
+                    symbol_id=sub.symbol_id,
+                    price=sub.price,
+                    license_days=sub.cycle_days,
+                    auto_renew=True,
+                    cycle_days_override=sub.cycle_days,
+                    auto_renew_price=sub.price,
+                )
+            )
+            ledger_entries.append(
+                PayWalletLedger(
+                    wallet=wallet,
+                    tx_type=WalletTxType.PURCHASE,
+                    amount=sub.price,
+                    is_credit=False,
+                    balance_before=wallet.balance,
+                    balance_after=wallet.balance - sub.price,
+                    order_id=order.order_id,
+                    note=f"Auto-renew order {order.order_id}",
+                )
+            )
+            wallet.balance -= sub.price
+            charged[wallet.pk] = charged.get(wallet.pk, Decimal("0")) + sub.price
+
+            # Giống _create_symbol_licenses: kéo dài license active, không có thì cấp mới
+            end_at = now + timedelta(days=sub.cycle_days)
+            if license_obj:
+                license_obj.end_at = max(license_obj.end_at, end_at)
+                license_obj.order_id = order.order_id
+                if license_obj.license_id not in new_license_ids:
+                    touched_licenses[license_obj.license_id] = license_obj
+            else:
+                license_obj = PayUserSymbolLicense(
+                    user_id=sub.user_id,
+                    symbol_id=sub.symbol_id,
+                    order_id=order.order_id,
+                    status=LicenseStatus.ACTIVE,
+                    start_at=now,
+                    end_at=end_at,
+                )
+                new_licenses.append(license_obj)
+                new_license_ids.add(license_obj.license_id)
+                licenses[(sub.user_id, sub.symbol_id)] = license_obj
+
+            attempts.append(
+                SymbolAutoRenewAttempt(
+                    subscription=sub,
+                    order_id=order.order_id,
+                    status=AutoRenewAttemptStatus.SUCCESS,
+                    charged_amount=sub.price,
+                    wallet_balance_snapshot=balance,
+                )
+            )
+            outbox.append(
+                {
+                    "user_id": sub.user_id,
+                    "event_type": AppEventType.PAYMENT_SUCCESS,
+                    "subject_id": order.order_id,
+                    "payload": {
+                        "order_id": str(order.order_id),
+                        "amount": str(sub.price),
+                        "transaction_id": str(order.order_id),
+                        "message": f"Gia hạn tự động đơn hàng #{str(order.order_id)[:8]} thành công với số tiền {sub.price} VNĐ",
+                    },
+                }
+            )
+
+            next_billing_at = license_obj.end_at - timedelta(hours=sub.grace_period_hours)
+            sub.status = AutoRenewStatus.ACTIVE
+            sub.next_billing_at = next_billing_at if next_billing_at > now else license_obj.end_at
+            sub.last_attempt_at = now
+            sub.last_success_at = now
+            sub.consecutive_failures = 0
+            sub.last_order_id = order.order_id
+            sub.current_license_id = license_obj.license_id
+            metrics.success += 1
+            metrics.charged_amount += sub.price
+
+        PaySymbolOrder.objects.bulk_create(orders)
+        PaySymbolOrderItem.objects.bulk_create(items)
+        PayWalletLedger.objects.bulk_create(ledger_entries)
+        PayUserSymbolLicense.objects.bulk_create(new_licenses)
+        self._debit_wallets(charged, wallets)
+        PayUserSymbolLicense.objects.bulk_update(touched_licenses.values(), ["end_at", "order_id"])
+        invalidate_entitlements(lic.user_id for lic in [*new_licenses, *touched_licenses.values()])
+        SymbolAutoRenewAttempt.objects.bulk_create(attempts)
+        for sub in subscriptions:
+            sub.updated_at = now
+        SymbolAutoRenewSubscription.objects.bulk_update(subscriptions, SUBSCRIPTION_UPDATE_FIELDS)
+        self.outbox_service.add_many(outbox)
+        return metrics
+
+
+    @staticmethod
+    def _debit_wallets(charged: Dict[Any, Decimal], wallets: Dict[Any, PayWallet]) -> None:
+        """
+        Trừ tổng tiền của chunk qua UPDATE có điều kiện, theo thứ tự pk như lúc khóa. Ví đã khóa nên
+        số dư sau phải khớp số dư tính trong chunk; lệch thì raise để rollback cả chunk.
+        """
+        expected = {wallet.pk: wallet.balance for wallet in wallets.values()}
+        for wallet_pk in sorted(charged):
+            balance_after = WalletRepository.apply_balance_delta(wallet_pk, charged[wallet_pk], is_credit=False)
+            if balance_after != expected[wallet_pk]:
+                raise InsufficientBalanceError(
+                    f"Wallet {wallet_pk} balance changed during auto-renew chunk: "
+                    f"expected {expected[wallet_pk]}, got {balance_after}"
+                )
+
+
+class _Budget:
+    """Số subscription còn được xử lý trong lần chạy, chia sẻ giữa các worker thread."""
+
+    def __init__(self, total: Optional[int]):
+        self.remaining = total
+        self._lock = threading.Lock()
+
+    def take(self, size: int) -> int:
+        if self.remaining is None:
+            return size
+        with self._lock:
+            taken = min(size, self.remaining)
+            self.remaining -= taken
+            return taken
@@ -64,7 +64,7 @@ class SymbolAutoRenewService:
                         "cycle_days": cycle_days,
                         "price": price,
                         "payment_method": order.payment_method,
-                        "last_order": order,
+                        "last_order_id": order.order_id,
                         "metadata": {**(subscription.metadata or {}), "last_enroll_order_id": str(order.order_id)},
                     }
                     if subscription.status != AutoRenewStatus.ACTIVE:
@@ -81,7 +81,7 @@ class SymbolAutoRenewService:
                         cycle_days=cycle_days,
                         price=price,
                         payment_method=order.payment_method,
-                        last_order=order,
+                        last_order_id=order.order_id,
                         metadata={
                             "created_from_order_id": str(order.order_id),
                             "initial_cycle_days": cycle_days,
@@ -127,7 +127,7 @@ class SymbolAutoRenewService:
                         cycle_days=cycle_days,
                         price=price,
                         payment_method=order.payment_method,
-                        last_order=order,
+                        last_order_id=order.order_id,
                         metadata={
                             "created_from_order_id": str(order.order_id),
                             "initial_cycle_days": cycle_days,
@@ -155,8 +155,8 @@ class SymbolAutoRenewService:
                 subscription.cycle_days = cycle_days
                 subscription.price = price
                 subscription.payment_method = order.payment_method
-                subscription.last_order = order
-                subscription.current_license = license_obj
+                subscription.last_order_id = order.order_id
+                subscription.current_license_id = license_obj.license_id if license_obj else None
                 subscription.next_billing_at = next_billing_at
                 subscription.status = status
                 subscription.last_success_at = now
@@ -167,8 +167,8 @@ class SymbolAutoRenewService:
                         "cycle_days",
                         "price",
                         "payment_method",
-                        "last_order",
-                        "current_license",
+                        "last_order_id",
+                        "current_license_id",
                         "next_billing_at",
                         "status",
                         "last_success_at",
@@ -178,10 +178,6 @@ class SymbolAutoRenewService:
                     ]
                 )
 
-                if license_obj and license_obj.subscription_id != subscription.subscription_id:
-                    license_obj.subscription = subscription
-                    license_obj.save(update_fields=["subscription"])
-
                 activated.append(subscription)
         return activated
 
@@ -189,7 +185,6 @@ class SymbolAutoRenewService:
         """List subscriptions for the given user with current status."""
         subs = (
             SymbolAutoRenewSubscription.objects.filter(user=user)
-            .select_related("current_license", "last_order")
             .order_by("-created_at")
         )
         return [self._serialize_subscription(sub) for sub in subs]
@@ -200,9 +195,15 @@ class SymbolAutoRenewService:
 
     def resume_subscription(self, subscription_id: str, user: User) -> Dict:
         subscription = self._set_status(subscription_id, user, AutoRenewStatus.ACTIVE)
-        if subscription.next_billing_at is None and subscription.current_license and subscription.current_license.end_at:
-            subscription.next_billing_at = subscription.current_license.end_at
-            subscription.save(update_fields=['next_billing_at'])
+        if subscription.next_billing_at is None and subscription.current_license_id:
+            license_end_at = (
+                PayUserSymbolLicense.objects.filter(license_id=subscription.current_license_id)
+                .values_list("end_at", flat=True)
+                .first()
+            )
+            if license_end_at:
+                subscription.next_billing_at = license_end_at
+                subscription.save(update_fields=['next_billing_at'])
 
         now = timezone.now()
         if subscription.payment_method == PaymentMethod.WALLET:
@@ -235,8 +236,8 @@ class SymbolAutoRenewService:
     def cancel_subscription(self, subscription_id: str, user: User) -> Dict:
         subscription = self._set_status(subscription_id, user, AutoRenewStatus.CANCELLED)
         subscription.next_billing_at = None
-        subscription.current_license = None
-        subscription.save(update_fields=['next_billing_at', 'current_license'])
+        subscription.current_license_id = None
+        subscription.save(update_fields=['next_billing_at', 'current_license_id'])
         return self._serialize_subscription(subscription)
     def get_subscription_attempts(self, subscription_id: str, user: User, limit: int = 20) -> List[Dict]:
         try:
@@ -263,116 +264,20 @@ class SymbolAutoRenewService:
             })
         return results
 
-    def run_due_subscriptions(self, limit: int = 50) -> Dict[str, int]:
-        """Execute auto-renew for subscriptions whose billing date is due."""
-        now = timezone.now()
-        due_subs = (
-            SymbolAutoRenewSubscription.objects.select_related("user")
-            .filter(
-                status=AutoRenewStatus.ACTIVE,
-                next_billing_at__isnull=False,
-                next_billing_at__lte=now,
-            )
-            .order_by("next_billing_at")[:limit]
-        )
-        processed = success = failed = skipped = 0
-        from apps.seapay.services.symbol_purchase_service import SymbolPurchaseService
-
-        purchase_service = SymbolPurchaseService()
-
-        for sub in due_subs:
-            processed += 1
-            with transaction.atomic():
-                sub = SymbolAutoRenewSubscription.objects.select_for_update().get(
-                    pk=sub.subscription_id
-                )
-                wallet_balance: Optional[Decimal] = None
-                try:
-                    wallet = PayWallet.objects.select_for_update().get(user=sub.user)
-                    wallet_balance = wallet.balance
-                except PayWallet.DoesNotExist:
-                    wallet = None
-
-                if sub.payment_method != PaymentMethod.WALLET:
-                    SymbolAutoRenewAttempt.objects.create(
-                        subscription=sub,
-                        status=AutoRenewAttemptStatus.SKIPPED,
-                        fail_reason="Auto-renew currently requires wallet payment",
-                        wallet_balance_snapshot=wallet_balance,
-                    )
-                    sub.last_attempt_at = now
-                    sub.next_billing_at = now + timedelta(minutes=sub.retry_interval_minutes)
-                    sub.save(update_fields=["last_attempt_at", "next_billing_at"])
-                    skipped += 1
-                    continue
-
-                if wallet is None:
-                    self._cancel_due_to_insufficient_funds(
-                        sub,
-                        reason="Wallet not found",
-                        wallet_balance=wallet_balance,
-                        timestamp=now,
-                    )
-                    failed += 1
-                    continue
-
-                if wallet.balance < sub.price:
-                    self._cancel_due_to_insufficient_funds(
-                        sub,
-                        reason=f"Insufficient balance: requires {sub.price}, has {wallet.balance}",
-                        wallet_balance=wallet.balance,
-                        timestamp=now,
-                    )
-                    failed += 1
-                    continue
-
-                try:
-                    order = purchase_service.create_symbol_order(
-                        user=sub.user,
-                        items=[
-                            {
-                                "symbol_id": sub.symbol_id,
-                                "price": sub.price,
-                                "license_days": sub.cycle_days,
-                                "auto_renew": True,
-                                "auto_renew_price": sub.price,
-                                "auto_renew_cycle_days": sub.cycle_days,
-                            }
-                        ],
-                        payment_method=PaymentMethod.WALLET,
-                        description=f"Auto-renew for symbol {sub.symbol_id}",
-                    )
-                    SymbolAutoRenewAttempt.objects.create(
-                        subscription=sub,
-                        order=order,
-                        status=AutoRenewAttemptStatus.SUCCESS,
-                        charged_amount=sub.price,
-                        wallet_balance_snapshot=wallet.balance,
-                    )
-                    success += 1
-                except Exception as exc:
-                    message = str(exc)
-                    if "insufficient" in message.lower():
-                        self._cancel_due_to_insufficient_funds(
-                            sub,
-                            reason=message,
-                            wallet_balance=wallet.balance if wallet else None,
-                            timestamp=now,
-                        )
-                    else:
-                        self._handle_failure(
-                            sub,
-                            reason=message,
-                            wallet_balance=wallet.balance if wallet else None,
-                            timestamp=now,
-                        )
-                    failed += 1
-        return {
-            "processed": processed,
-            "success": success,
-            "failed": failed,
-            "skipped": skipped,
-        }
+    def run_due_subscriptions(
+        self,
+        limit: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        workers: int = 1,
+    ) -> Dict[str, int]:
+        """
+        Execute auto-renew for subscriptions whose billing date is due (limit=None: tất cả).
+        Xem AutoRenewBillingRunner: claim theo chunk, trừ ví và ghi order/license theo batch.
+        """
+        from apps.setting.services.autorenew_billing import AutoRenewBillingRunner, CHUNK_SIZE
+
+        runner = AutoRenewBillingRunner(self, chunk_size=chunk_size or CHUNK_SIZE)
+        return runner.run(max_subscriptions=limit, workers=workers).as_dict()
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -432,16 +337,8 @@ class SymbolAutoRenewService:
         wallet_balance: Optional[Decimal],
         timestamp,
     ) -> None:
-        SymbolAutoRenewAttempt.objects.create(
-            subscription=subscription,
-            status=AutoRenewAttemptStatus.FAILED,
-            fail_reason=reason,
-            wallet_balance_snapshot=wallet_balance,
-        )
-        subscription.status = AutoRenewStatus.CANCELLED
-        subscription.next_billing_at = None
-        subscription.last_attempt_at = timestamp
-        subscription.consecutive_failures = 0
+        attempt = self._mark_cancelled(subscription, reason, wallet_balance, timestamp)
+        attempt.save()
         subscription.save(
             update_fields=[
                 "status",
@@ -459,12 +356,44 @@ class SymbolAutoRenewService:
         wallet_balance: Optional[Decimal],
         timestamp,
     ) -> None:
-        SymbolAutoRenewAttempt.objects.create(
+        attempt = self._mark_failed(subscription, reason, wallet_balance, timestamp)
+        attempt.save()
+        subscription.save(
+            update_fields=[
+                "consecutive_failures",
+                "last_attempt_at",
+                "status",
+                "next_billing_at",
+                "updated_at",
+            ]
+        )
+
+    # Các hàm _mark_* chỉ đổi instance và trả về attempt chưa lưu, để billing runner ghi theo batch
+    def _mark_cancelled(
+        self,
+        subscription: SymbolAutoRenewSubscription,
+        reason: str,
+        wallet_balance: Optional[Decimal],
+        timestamp,
+    ) -> SymbolAutoRenewAttempt:
+        subscription.status = AutoRenewStatus.CANCELLED
+        subscription.next_billing_at = None
+        subscription.last_attempt_at = timestamp
+        subscription.consecutive_failures = 0
+        return SymbolAutoRenewAttempt(
             subscription=subscription,
             status=AutoRenewAttemptStatus.FAILED,
             fail_reason=reason,
             wallet_balance_snapshot=wallet_balance,
         )
+
+    def _mark_failed(
+        self,
+        subscription: SymbolAutoRenewSubscription,
+        reason: str,
+        wallet_balance: Optional[Decimal],
+        timestamp,
+    ) -> SymbolAutoRenewAttempt:
         subscription.consecutive_failures += 1
         subscription.last_attempt_at = timestamp
         if subscription.consecutive_failures >= subscription.max_retry_attempts:
@@ -472,13 +401,9 @@ class SymbolAutoRenewService:
             subscription.next_billing_at = None
         else:
             subscription.next_billing_at = timestamp + timedelta(minutes=subscription.retry_interval_minutes)
-        subscription.save(
-            update_fields=[
-                "consecutive_failures",
-                "last_attempt_at",
-                "status",
-                "next_billing_at",
-                "updated_at",
-            ]
+        return SymbolAutoRenewAttempt(
+            subscription=subscription,
+            status=AutoRenewAttemptStatus.FAILED,
+            fail_reason=reason,
+            wallet_balance_snapshot=wallet_balance,
         )
-
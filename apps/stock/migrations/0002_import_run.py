@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("stock", "Stock"), ("financial", "Financial")],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="running",
+                        max_length=20,
+                    ),
+                ),
+                ("params", models.JSONField(blank=True, default=dict)),
+                ("total_symbols", models.IntegerField(default=0)),
+                ("processed_count", models.IntegerField(default=0)),
+                ("failed_count", models.IntegerField(default=0)),
+                ("last_symbol", models.CharField(blank=True, max_length=200, null=True)),
+                ("failed_symbols", models.JSONField(blank=True, default=list)),
+                ("stage_timings", models.JSONField(blank=True, default=dict)),
+                ("row_counts", models.JSONField(blank=True, default=dict)),
+                ("error", models.TextField(blank=True, null=True)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("checkpoint_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "stock_import_run",
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "-started_at"],
+                        name="idx_import_run_kind_started",
+                    )
+                ],
+            },
+        ),
+    ]
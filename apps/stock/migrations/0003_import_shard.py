@@ -0,0 +1,80 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock", "0002_import_run"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("total_symbols", models.IntegerField(default=0)),
+                ("processed_count", models.IntegerField(default=0)),
+                ("failed_count", models.IntegerField(default=0)),
+                ("last_symbol", models.CharField(blank=True, max_length=200, null=True)),
+                ("failed_symbols", models.JSONField(blank=True, default=list)),
+                ("stage_timings", models.JSONField(blank=True, default=dict)),
+                ("row_counts", models.JSONField(blank=True, default=dict)),
+                ("error", models.TextField(blank=True, null=True)),
+                ("checkpoint_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("shard_index", models.IntegerField()),
+                ("id_from", models.IntegerField()),
+                ("id_to", models.IntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("lease_owner", models.CharField(blank=True, max_length=100, null=True)),
+                ("lease_expires_at", models.DateTimeField(blank=True, null=True)),
+                ("attempts", models.IntegerField(default=0)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shards",
+                        to="stock.importrun",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "stock_import_shard",
+                "indexes": [
+                    models.Index(
+                        fields=["run", "status", "lease_expires_at"],
+                        name="idx_import_shard_claim",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run", "shard_index"),
+                        name="uniq_import_shard_run_index",
+                    )
+                ],
+            },
+        ),
+    ]
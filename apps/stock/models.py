@@ -109,4 +109,93 @@ class Officers(models.Model):
 class SubCompany(models.Model):
     parent = models.ForeignKey("Company", on_delete=models.CASCADE, related_name="subsidiaries")
     company_name = models.CharField(max_length=200)
-    sub_own_percent = models.FloatField(blank=True)
\ No newline at end of file
+    sub_own_percent = models.FloatField(blank=True)
+
+class ImportProgress(models.Model):
+    """
+    Cột tiến độ dùng chung cho ImportRun và ImportShard, để ImportRunTracker
+    checkpoint / resume được cả một run lẫn từng shard của run.
+    """
+
+    total_symbols = models.IntegerField(default=0)
+    processed_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    # Symbols xử lý theo thứ tự tên, checkpoint = tên symbol cuối cùng đã xong
+    last_symbol = models.CharField(max_length=200, null=True, blank=True)
+    failed_symbols = models.JSONField(default=list, blank=True)
+    stage_timings = models.JSONField(default=dict, blank=True)
+    row_counts = models.JSONField(default=dict, blank=True)
+    error = models.TextField(null=True, blank=True)
+    checkpoint_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+
+class ImportRun(ImportProgress):
+    """
+    Một lần chạy import dài (stock / financial): lưu tiến độ theo checkpoint,
+    thời gian từng stage theo bảng và tổng kết gọn để xem giữa chừng và resume sau crash.
+    Run chia shard (params.shard_count) thì tiến độ nằm ở các ImportShard.
+    """
+
+    class Kind(models.TextChoices):
+        STOCK = "stock", "Stock"
+        FINANCIAL = "financial", "Financial"
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RUNNING)
+    params = models.JSONField(default=dict, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "stock_import_run"
+        indexes = [
+            models.Index(fields=["kind", "-started_at"], name="idx_import_run_kind_started"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class ImportShard(ImportProgress):
+    """
+    Một khoảng symbol id của run chia shard. Worker process claim shard bằng lease
+    (lease_owner + lease_expires_at); process chết thì lease hết hạn và worker khác nhận lại
+    shard, chạy tiếp từ last_symbol.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    run = models.ForeignKey(ImportRun, on_delete=models.CASCADE, related_name="shards")
+    shard_index = models.IntegerField()
+    # Khoảng Symbol.id (bao gồm cả hai đầu)
+    id_from = models.IntegerField()
+    id_to = models.IntegerField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    lease_owner = models.CharField(max_length=100, null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "stock_import_shard"
+        constraints = [
+            models.UniqueConstraint(fields=["run", "shard_index"], name="uniq_import_shard_run_index"),
+        ]
+        indexes = [
+            models.Index(fields=["run", "status", "lease_expires_at"], name="idx_import_shard_claim"),
+        ]
+
+    def __str__(self):
+        return f"run #{self.run_id} shard {self.shard_index} ({self.status})"
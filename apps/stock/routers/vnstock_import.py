@@ -7,98 +7,138 @@ from ninja.errors import HttpError
 from ninja.pagination import paginate, PageNumberPagination
 from apps.stock.schemas import CompanyOut, SymbolList, SubCompanyOut, SymbolOutBasic
 from apps.stock.services.symbol_service import SymbolService
-from typing import List
-from apps.stock.services.vnstock_import_service import VnstockImportService
+from typing import List, Optional
+from apps.jobs.handlers import (
+    RESUMABLE_IMPORT_MAX_ATTEMPTS,
+    STOCK_IMPORT_ALL,
+    STOCK_IMPORT_SHARDED,
+    import_dedupe_key,
+)
+from apps.jobs.router import JobAcceptedOut, job_accepted
+from apps.jobs.services import JobService
+from apps.stock.services.import_run_service import get_run_summary, list_run_summaries
 from apps.stock.services.cache_service import VNStockCacheService
 from apps.stock.services.rate_limiter import get_rate_limiter
 
 router = Router(tags=["vnstock-import"])
 
 
-@router.post("/symbols/import_all")
-def import_all_symbols(request, exchange: str = "HSX", force_update: bool = False):
+def _enqueue_import(request, kind: str, payload: dict, dedupe_key: str, max_attempts: int = 1):
+    user_id = getattr(getattr(request, "user", None), "id", None)
+    job, created = JobService().enqueue(
+        kind, payload, dedupe_key=dedupe_key, max_attempts=max_attempts, created_by_id=user_id
+    )
+    return job_accepted(job, created)
+
+
+@router.post("/symbols/import_all", response={202: JobAcceptedOut})
+def import_all_symbols(request, exchange: str = "HSX", force_update: bool = False, resume_run_id: Optional[int] = None):
     """
-    Import ALL stock data (symbols, companies, industries, shareholders, officers, events, sub_companies)
-    for all symbols with detailed logging for each table.
+    Enqueue import ALL stock data (symbols, companies, industries, shareholders, officers, events, sub_companies)
+    and return the job id immediately; run `python manage.py run_worker` to process it.
 
     Query Parameters:
     - exchange (str): Exchange to import (HSX, HNX, UPCOM). Default: HSX
     - force_update (bool):
         - False (default): Resume mode - only import symbols missing data
         - True: Force update mode - re-import all symbols to get latest data
-    """
-    import time
+    - resume_run_id (int): Continue an unfinished run from its last checkpoint
 
-    try:
-        start_time = time.time()
-        service = SymbolService()
-        result = service.import_all_symbols(exchange=exchange, force_update=force_update)
-        processing_time = time.time() - start_time
-        result["processing_time"] = round(processing_time, 2)
+    Poll GET /api/jobs/{job_id} for status; progress.run_id points to GET /import/runs/{run_id}.
+    An import already queued/running for the same exchange is returned instead of a duplicate.
+    """
+    return _enqueue_import(
+        request,
+        STOCK_IMPORT_ALL,
+        {"exchange": exchange, "force_update": force_update, "resume_run_id": resume_run_id},
+        dedupe_key=import_dedupe_key(
+            STOCK_IMPORT_ALL, exchange, force_update=force_update, resume_run_id=resume_run_id
+        ),
+        max_attempts=RESUMABLE_IMPORT_MAX_ATTEMPTS,
+    )
+
+
+@router.post("/symbols/import_sharded", response={202: JobAcceptedOut})
+def import_all_symbols_sharded(
+    request, exchange: str = "HSX", force_update: bool = False, shards: int = 4, workers: Optional[int] = None
+):
+    """
+    Enqueue import ALL stock data chia theo shard (khoảng Symbol.id) để nhiều worker process chạy song song.
 
-        return result
+    Query Parameters:
+    - shards (int): Số shard (1-64). Default: 4
+    - workers (int): Số job worker enqueue cho run, mặc định bằng số shard
 
-    except Exception as e:
-        return {
-            "error": f"Import failed: {str(e)}",
-            "exchange": exchange,
-            "force_update": force_update
-        }
+    Job đầu tiên import danh sách symbols, tạo shard rồi enqueue các job import.shard_worker;
+    tiến độ từng shard ở GET /import/runs/{run_id}.
+    """
+    if not 1 <= shards <= 64:
+        raise HttpError(400, "shards must be between 1 and 64")
+    return _enqueue_import(
+        request,
+        STOCK_IMPORT_SHARDED,
+        {"exchange": exchange, "force_update": force_update, "shards": shards, "workers": workers},
+        dedupe_key=import_dedupe_key(STOCK_IMPORT_SHARDED, exchange, force_update=force_update),
+    )
 
 
-@router.post("/import/symbols")
+@router.post("/import/symbols", response={202: JobAcceptedOut})
 def import_symbols_from_vnstock(request, exchange: str = "HSX"):
-    """Import tất cả symbols từ vnstock theo exchange"""
-    service = VnstockImportService()
-    return service.import_all_symbols_from_vnstock(exchange)
+    """Enqueue import tất cả symbols từ vnstock theo exchange"""
+    return _enqueue_import(request, "stock.import_symbols", {"exchange": exchange}, f"stock.import_symbols:{exchange}")
 
 
-@router.post("/import/companies") 
+@router.post("/import/companies", response={202: JobAcceptedOut})
 def import_companies_for_symbols(request, exchange: str = "HSX"):
-    """Import company data cho tất cả symbols có trong database"""
-    service = VnstockImportService()
-    return service.import_companies_from_vnstock(exchange)
+    """Enqueue import company data cho tất cả symbols có trong database"""
+    return _enqueue_import(
+        request, "stock.import_companies", {"exchange": exchange}, f"stock.import_companies:{exchange}"
+    )
 
 
-@router.post("/import/industries")
+@router.post("/import/industries", response={202: JobAcceptedOut})
 def import_industries_for_symbols(request):
-    """Import industry data và tạo quan hệ với symbols"""
-    service = VnstockImportService()
-    return service.import_industries_for_symbols()
+    """Enqueue import industry data và tạo quan hệ với symbols"""
+    return _enqueue_import(request, "stock.import_industries", {}, "stock.import_industries")
 
 
-@router.post("/import/shareholders")
+@router.post("/import/shareholders", response={202: JobAcceptedOut})
 def import_shareholders_for_all_symbols(request):
-    """Import shareholders cho tất cả symbols có company"""
-    service = VnstockImportService()
-    return service.import_shareholders_for_all_symbols()
+    """Enqueue import shareholders cho tất cả symbols có company"""
+    return _enqueue_import(request, "stock.import_shareholders", {}, "stock.import_shareholders")
 
 
-@router.post("/import/officers")
+@router.post("/import/officers", response={202: JobAcceptedOut})
 def import_officers_for_all_symbols(request):
-    """Import officers cho tất cả symbols có company"""
-    service = VnstockImportService()
-    return service.import_officers_for_all_symbols()
+    """Enqueue import officers cho tất cả symbols có company"""
+    return _enqueue_import(request, "stock.import_officers", {}, "stock.import_officers")
 
 
-@router.post("/import/events")
+@router.post("/import/events", response={202: JobAcceptedOut})
 def import_events_for_all_symbols(request):
-    """Import events cho tất cả symbols có company"""
-    service = VnstockImportService()
-    return service.import_events_for_all_symbols()
+    """Enqueue import events cho tất cả symbols có company"""
+    return _enqueue_import(request, "stock.import_events", {}, "stock.import_events")
 
 
-@router.post("/import/sub_companies")
+@router.post("/import/sub_companies", response={202: JobAcceptedOut})
 def import_sub_companies_for_all_symbols(request):
-    """Import sub companies (subsidiaries) cho tất cả symbols có company"""
-    service = VnstockImportService()
-    results = service.import_sub_companies_for_all_symbols()
-    total_sub_companies = sum(r.get('sub_companies_count', 0) for r in results)
-    return {
-        "symbols_processed": len(results),
-        "total_sub_companies": total_sub_companies,
-        "results": results
-    }
+    """Enqueue import sub companies (subsidiaries) cho tất cả symbols có company"""
+    return _enqueue_import(request, "stock.import_sub_companies", {}, "stock.import_sub_companies")
+
+@router.get("/import/runs")
+def list_import_runs(request, kind: Optional[str] = None, limit: int = 20):
+    """Danh sách các lần import gần nhất (stock / financial) với tiến độ và thời gian từng stage"""
+    return list_run_summaries(kind=kind, limit=min(max(limit, 1), 100))
+
+
+@router.get("/import/runs/{run_id}")
+def get_import_run(request, run_id: int):
+    """Tiến độ của một lần import, đọc được cả khi import đang chạy"""
+    summary = get_run_summary(run_id)
+    if summary is None:
+        raise HttpError(404, f"Import run {run_id} not found")
+    return summary
+
 
 @router.get("/symbols/{symbol}")
 def get_symbol_with_all_relations(request, symbol: int):
@@ -0,0 +1,248 @@
+"""
+Theo dõi một lần import dài: thời gian từng stage (fetch / map / write) theo bảng,
+checkpoint tiến độ định kỳ vào ImportRun (hoặc ImportShard) và resume từ checkpoint cuối sau khi crash.
+"""
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.stock.models import ImportProgress, ImportRun, ImportShard
+
+MAX_FAILED_SYMBOLS = 500
+MAX_ERROR_LENGTH = 300
+
+
+class ImportRunTracker:
+    """
+    Gom số liệu trong bộ nhớ và chỉ ghi xuống DB mỗi `checkpoint_every` symbol
+    hoặc `checkpoint_seconds` giây, để tracking không thành chi phí chính của import.
+    `run` là ImportRun hoặc một ImportShard của run chia shard.
+    """
+
+    def __init__(
+        self,
+        run: ImportProgress,
+        checkpoint_every: int = 25,
+        checkpoint_seconds: float = 30.0,
+        on_checkpoint: Optional[Callable[[ImportProgress], None]] = None,
+    ):
+        self.run = run
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.on_checkpoint = on_checkpoint
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    @classmethod
+    def start(cls, kind: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> "ImportRunTracker":
+        run = ImportRun.objects.create(kind=kind, params=params or {})
+        return cls(run, **kwargs)
+
+    @classmethod
+    def resume(cls, run_id: int, kind: str, stale_seconds: Optional[int] = None, **kwargs) -> "ImportRunTracker":
+        """
+        Mở lại một run chưa xong (failed, hoặc running nhưng checkpoint cuối cũ hơn `stale_seconds`
+        vì process crash) để chạy tiếp từ checkpoint. Nhận run bằng UPDATE có điều kiện và đóng dấu
+        checkpoint_at, nên run đang chạy ở process khác hoặc hai lần resume cùng lúc không chạy trùng.
+        """
+        stale_seconds = settings.IMPORT_RUN_STALE_SECONDS if stale_seconds is None else stale_seconds
+        run = ImportRun.objects.filter(pk=run_id, kind=kind).first()
+        if run is None:
+            raise ValueError(f"Import run {run_id} ({kind}) not found")
+        if run.status == ImportRun.Status.SUCCEEDED:
+            raise ValueError(f"Import run {run_id} already succeeded")
+        if run.params.get("shard_count"):
+            raise ValueError(f"Import run {run_id} is sharded; its shards resume through shard workers")
+
+        now = timezone.now()
+        stale = Q(status=ImportRun.Status.RUNNING, last_seen__lt=now - timedelta(seconds=stale_seconds))
+        claimed = (
+            ImportRun.objects.annotate(last_seen=Coalesce("checkpoint_at", "started_at"))
+            .filter(Q(status=ImportRun.Status.FAILED) | stale, pk=run.pk)
+            .update(status=ImportRun.Status.RUNNING, error=None, finished_at=None, checkpoint_at=now)
+        )
+        if not claimed:
+            raise ValueError(f"Import run {run_id} is still running (last checkpoint under {stale_seconds}s ago)")
+        run.refresh_from_db()
+        return cls(run, **kwargs)
+
+    @classmethod
+    def start_or_resume(
+        cls, kind: str, params: Optional[Dict[str, Any]] = None, resume_run_id: Optional[int] = None, **kwargs
+    ) -> "ImportRunTracker":
+        if resume_run_id:
+            return cls.resume(resume_run_id, kind, **kwargs)
+        return cls.start(kind, params, **kwargs)
+
+    # ------------------------------------------------------------ progress
+    def pending(self, symbols: Iterable) -> List:
+        """
+        Lọc các symbol còn phải xử lý. Symbols được xử lý theo thứ tự tên nên mọi symbol
+        có tên <= last_symbol đã xong ở lần chạy trước.
+        """
+        symbols = sorted(symbols, key=lambda s: s.name)
+        if not self.run.total_symbols:
+            self.run.total_symbols = len(symbols)
+            self.run.save(update_fields=["total_symbols"])
+        if self.run.last_symbol:
+            symbols = [s for s in symbols if s.name > self.run.last_symbol]
+        return symbols
+
+    @contextmanager
+    def stage(self, stage: str, table: str = "all"):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            tables = self.run.stage_timings.setdefault(stage, {})
+            tables[table] = tables.get(table, 0.0) + elapsed
+
+    def add_rows(self, table: str, count: int) -> None:
+        if count:
+            self.run.row_counts[table] = self.run.row_counts.get(table, 0) + count
+
+    def symbol_done(self, symbol_name: str, ok: bool = True, error: Optional[str] = None) -> None:
+        self.run.processed_count += 1
+        self.run.last_symbol = symbol_name
+        if not ok:
+            self.run.failed_count += 1
+            if len(self.run.failed_symbols) < MAX_FAILED_SYMBOLS:
+                self.run.failed_symbols.append(
+                    {"symbol": symbol_name, "error": (error or "")[:MAX_ERROR_LENGTH]}
+                )
+
+        self._since_checkpoint += 1
+        if (
+            self._since_checkpoint >= self.checkpoint_every
+            or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds
+        ):
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        self.run.checkpoint_at = timezone.now()
+        self.run.save(
+            update_fields=[
+                "processed_count",
+                "failed_count",
+                "last_symbol",
+                "failed_symbols",
+                "stage_timings",
+                "row_counts",
+                "checkpoint_at",
+            ]
+        )
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        if self.on_checkpoint:
+            self.on_checkpoint(self.run)
+
+    def finish(self, error: Optional[str] = None) -> ImportProgress:
+        self.run.status = self.run.Status.FAILED if error else self.run.Status.SUCCEEDED
+        self.run.error = error
+        self.run.finished_at = timezone.now()
+        self.checkpoint()
+        self.run.save(update_fields=["status", "error", "finished_at"])
+        return self.run
+
+    def summary(self) -> Dict[str, Any]:
+        return summarize_run(self.run)
+
+
+def merge_progress(rows: Iterable[ImportProgress]) -> Dict[str, Any]:
+    """Cộng dồn tiến độ của các shard thành số liệu của cả run."""
+    totals: Dict[str, Any] = {
+        "total_symbols": 0,
+        "processed_count": 0,
+        "failed_count": 0,
+        "failed_symbols": [],
+        "row_counts": {},
+        "stage_timings": {},
+    }
+    for row in rows:
+        totals["total_symbols"] += row.total_symbols
+        totals["processed_count"] += row.processed_count
+        totals["failed_count"] += row.failed_count
+        totals["failed_symbols"].extend(row.failed_symbols[: MAX_FAILED_SYMBOLS - len(totals["failed_symbols"])])
+        for table, count in row.row_counts.items():
+            totals["row_counts"][table] = totals["row_counts"].get(table, 0) + count
+        for stage, tables in row.stage_timings.items():
+            merged = totals["stage_timings"].setdefault(stage, {})
+            for table, seconds in tables.items():
+                merged[table] = merged.get(table, 0.0) + seconds
+    return totals
+
+
+def summarize_shard(shard: ImportShard) -> Dict[str, Any]:
+    return {
+        "shard_index": shard.shard_index,
+        "status": shard.status,
+        "id_from": shard.id_from,
+        "id_to": shard.id_to,
+        "total_symbols": shard.total_symbols,
+        "processed": shard.processed_count,
+        "failed": shard.failed_count,
+        "last_symbol": shard.last_symbol,
+        "lease_owner": shard.lease_owner,
+        "lease_expires_at": shard.lease_expires_at,
+        "attempts": shard.attempts,
+        "error": shard.error,
+    }
+
+
+def summarize_run(run: ImportRun) -> Dict[str, Any]:
+    """Tổng kết gọn của một run, dùng cho response API thay vì danh sách dict theo symbol."""
+    end = run.finished_at or timezone.now()
+    progress: Dict[str, Any] = {
+        field: getattr(run, field)
+        for field in ("total_symbols", "processed_count", "failed_count", "failed_symbols", "row_counts", "stage_timings")
+    }
+    shards = None
+    if run.params.get("shard_count"):
+        # Run chia shard: tiến độ nằm ở từng shard, đọc lúc summarize thay vì để các worker cùng ghi một row
+        shards = list(run.shards.all())
+        progress = merge_progress(shards)
+        progress["row_counts"] = {**run.row_counts, **progress["row_counts"]}
+
+    summary = {
+        "run_id": run.pk,
+        "kind": run.kind,
+        "status": run.status,
+        "params": run.params,
+        "total_symbols": progress["total_symbols"],
+        "processed": progress["processed_count"],
+        "failed": progress["failed_count"],
+        "last_symbol": run.last_symbol,
+        "failed_symbols": progress["failed_symbols"],
+        "row_counts": progress["row_counts"],
+        "stage_timings": {
+            stage: {table: round(seconds, 3) for table, seconds in tables.items()}
+            for stage, tables in progress["stage_timings"].items()
+        },
+        "error": run.error,
+        "started_at": run.started_at,
+        "checkpoint_at": run.checkpoint_at,
+        "finished_at": run.finished_at,
+        "elapsed_seconds": round((end - run.started_at).total_seconds(), 2) if run.started_at else None,
+    }
+    if shards is not None:
+        summary["shards"] = [summarize_shard(shard) for shard in sorted(shards, key=lambda s: s.shard_index)]
+    return summary
+
+
+def get_run_summary(run_id: int) -> Optional[Dict[str, Any]]:
+    run = ImportRun.objects.filter(pk=run_id).first()
+    return summarize_run(run) if run else None
+
+
+def list_run_summaries(kind: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    runs = ImportRun.objects.prefetch_related("shards").order_by("-started_at", "-id")
+    if kind:
+        runs = runs.filter(kind=kind)
+    return [summarize_run(run) for run in runs[:limit]]
@@ -0,0 +1,250 @@
+"""
+Import chia shard: Symbol.id được chia thành các khoảng (ImportShard). Mỗi worker process claim
+một shard bằng lease, import và checkpoint tiến độ vào chính row của shard đó, nên các shard
+commit độc lập và không tranh nhau ghi row ImportRun. Process chết thì lease hết hạn và
+worker khác nhận lại shard, chạy tiếp từ last_symbol.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.stock.models import ImportRun, ImportShard
+from apps.stock.services.import_run_service import ImportRunTracker, merge_progress
+
+logger = logging.getLogger("app.import")
+
+UNFINISHED_SHARD_STATUSES = (ImportShard.Status.PENDING, ImportShard.Status.RUNNING)
+SHARD_POLL_SECONDS = 5.0
+
+
+class ShardLeaseLost(Exception):
+    """Lease của shard đã hết hạn và worker khác đã nhận shard."""
+
+
+def split_id_ranges(ids: Iterable[int], shard_count: int) -> List[Tuple[int, int]]:
+    """Chia các id thành tối đa `shard_count` khoảng liên tiếp có số symbol gần bằng nhau."""
+    ids = sorted(ids)
+    if not ids:
+        return []
+    shard_count = max(1, min(shard_count, len(ids)))
+    size, extra = divmod(len(ids), shard_count)
+    ranges, start = [], 0
+    for index in range(shard_count):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append((ids[start], ids[end - 1]))
+        start = end
+    return ranges
+
+
+def plan_shards(kind: str, params: Dict[str, Any], symbol_ids: Iterable[int], shard_count: int) -> ImportRun:
+    """Tạo ImportRun cha và các shard pending; run không có symbol nào thì xong ngay."""
+    ranges = split_id_ranges(symbol_ids, shard_count)
+    with transaction.atomic():
+        run = ImportRun.objects.create(kind=kind, params={**params, "shard_count": len(ranges)})
+        ImportShard.objects.bulk_create(
+            [
+                ImportShard(run=run, shard_index=index, id_from=id_from, id_to=id_to)
+                for index, (id_from, id_to) in enumerate(ranges)
+            ]
+        )
+    if not ranges:
+        run.status = ImportRun.Status.SUCCEEDED
+        run.finished_at = timezone.now()
+        run.save(update_fields=["status", "finished_at"])
+    return run
+
+
+def claim_shard(
+    run_id: int, owner: str, lease_seconds: Optional[int] = None, max_attempts: Optional[int] = None
+) -> Optional[ImportShard]:
+    """
+    Claim shard pending hoặc shard running đã hết lease (worker cũ chết). Giống claim_next_job:
+    SKIP LOCKED để các worker không chờ nhau, UPDATE có điều kiện để không claim trùng.
+    """
+    lease_seconds = lease_seconds or settings.IMPORT_SHARD_LEASE_SECONDS
+    max_attempts = max_attempts or settings.IMPORT_SHARD_MAX_ATTEMPTS
+    now = timezone.now()
+    expired = Q(status=ImportShard.Status.RUNNING, lease_expires_at__lt=now)
+
+    # Shard làm chết worker quá nhiều lần thì dừng hẳn thay vì chuyển vòng quanh các worker
+    ImportShard.objects.filter(expired, run_id=run_id, attempts__gte=max_attempts).update(
+        status=ImportShard.Status.FAILED,
+        error=f"Lease expired {max_attempts} times",
+        lease_owner=None,
+        lease_expires_at=None,
+        finished_at=now,
+    )
+
+    claimable = Q(status=ImportShard.Status.PENDING) | (expired & Q(attempts__lt=max_attempts))
+    with transaction.atomic():
+        shard = (
+            ImportShard.objects.filter(claimable, run_id=run_id)
+            .select_for_update(skip_locked=True)
+            .order_by("shard_index")
+            .first()
+        )
+        if shard is None:
+            return None
+        claimed = ImportShard.objects.filter(claimable, pk=shard.pk).update(
+            status=ImportShard.Status.RUNNING,
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=F("attempts") + 1,
+            started_at=shard.started_at or now,
+        )
+    if not claimed:
+        return None
+    shard.refresh_from_db()
+    return shard
+
+
+def renew_lease(shard_id: int, owner: str, lease_seconds: int) -> bool:
+    """Gia hạn lease; False nếu shard không còn thuộc worker này."""
+    return bool(
+        ImportShard.objects.filter(pk=shard_id, status=ImportShard.Status.RUNNING, lease_owner=owner).update(
+            lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds)
+        )
+    )
+
+
+def finalize_run(run_id: int) -> Optional[ImportRun]:
+    """Khi mọi shard đã xong: cộng dồn tiến độ vào run cha và đóng run (chỉ một worker làm được)."""
+    if ImportShard.objects.filter(run_id=run_id, status__in=UNFINISHED_SHARD_STATUSES).exists():
+        return None
+    run = ImportRun.objects.get(pk=run_id)
+    if run.status != ImportRun.Status.RUNNING:
+        return run
+
+    shards = list(run.shards.order_by("shard_index"))
+    totals = merge_progress(shards)
+    failed = [shard.shard_index for shard in shards if shard.status == ImportShard.Status.FAILED]
+    now = timezone.now()
+    ImportRun.objects.filter(pk=run_id, status=ImportRun.Status.RUNNING).update(
+        status=ImportRun.Status.FAILED if failed else ImportRun.Status.SUCCEEDED,
+        error=f"Shards failed: {failed}" if failed else None,
+        total_symbols=totals["total_symbols"],
+        processed_count=totals["processed_count"],
+        failed_count=totals["failed_count"],
+        failed_symbols=totals["failed_symbols"],
+        stage_timings=totals["stage_timings"],
+        row_counts={**run.row_counts, **totals["row_counts"]},
+        checkpoint_at=now,
+        finished_at=now,
+    )
+    run.refresh_from_db()
+    return run
+
+
+class _LeaseHeartbeat(threading.Thread):
+    """
+    Gia hạn lease theo chu kỳ, độc lập với tiến độ symbol: một symbol chờ rate limiter/backoff
+    lâu hơn lease vẫn giữ shard. Mất lease thì đặt `lost` và dừng.
+    """
+
+    def __init__(self, shard_id: int, owner: str, lease_seconds: float):
+        super().__init__(daemon=True)
+        self.shard_id = shard_id
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(self.lease_seconds / 3):
+                if not renew_lease(self.shard_id, self.owner, self.lease_seconds):
+                    self.lost = True
+                    break
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class ShardTracker(ImportRunTracker):
+    """
+    Kiểm tra (và gia hạn) lease trước mỗi checkpoint. Mất lease thì raise ShardLeaseLost trước khi
+    ghi gì, để worker chậm không ghi đè tiến độ của worker đã nhận lại shard.
+    """
+
+    def __init__(self, shard: ImportShard, owner: str, lease_seconds: int, **kwargs):
+        kwargs.setdefault("checkpoint_seconds", lease_seconds / 4)
+        super().__init__(shard, **kwargs)
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+
+    def checkpoint(self) -> None:
+        if not renew_lease(self.run.pk, self.owner, self.lease_seconds):
+            raise ShardLeaseLost(f"Lost lease on shard {self.run.shard_index} of run {self.run.run_id}")
+        super().checkpoint()
+
+
+class ShardWorker:
+    """
+    Vòng lặp của một worker: claim shard -> import -> claim tiếp. Khi không còn shard để claim
+    nhưng run chưa xong thì chờ, để nhận lại shard của worker chết khi lease hết hạn.
+    """
+
+    def __init__(
+        self,
+        run_id: int,
+        owner: str,
+        process_shard: Callable[[ImportShard, ImportRunTracker], None],
+        lease_seconds: Optional[int] = None,
+        poll_seconds: float = SHARD_POLL_SECONDS,
+        on_checkpoint: Optional[Callable[[ImportShard], None]] = None,
+    ):
+        self.run_id = run_id
+        self.owner = owner
+        self.process_shard = process_shard
+        self.lease_seconds = lease_seconds or settings.IMPORT_SHARD_LEASE_SECONDS
+        self.poll_seconds = poll_seconds
+        self.on_checkpoint = on_checkpoint
+
+    def run(self) -> Dict[str, Any]:
+        processed: List[int] = []
+        while True:
+            shard = claim_shard(self.run_id, self.owner, self.lease_seconds)
+            if shard is None:
+                if not ImportShard.objects.filter(
+                    run_id=self.run_id, status__in=UNFINISHED_SHARD_STATUSES
+                ).exists():
+                    break
+                time.sleep(self.poll_seconds)
+                continue
+            self._run_shard(shard)
+            processed.append(shard.shard_index)
+
+        run = finalize_run(self.run_id)
+        return {"run_id": self.run_id, "shards_processed": processed, "run_status": run.status if run else None}
+
+    def _run_shard(self, shard: ImportShard) -> None:
+        tracker = ShardTracker(shard, self.owner, self.lease_seconds, on_checkpoint=self.on_checkpoint)
+        heartbeat = _LeaseHeartbeat(shard.pk, self.owner, self.lease_seconds)
+        heartbeat.start()
+        logger.info(f"Run {self.run_id} shard {shard.shard_index} claimed by {self.owner}, attempt {shard.attempts}")
+        try:
+            try:
+                self.process_shard(shard, tracker)
+            except ShardLeaseLost:
+                raise
+            except Exception as e:
+                logger.error(f"Run {self.run_id} shard {shard.shard_index} failed: {e}")
+                tracker.finish(error=f"Shard aborted: {e!r}")
+            else:
+                tracker.finish()
+        except ShardLeaseLost as e:
+            logger.warning(str(e))
+            return
+        finally:
+            heartbeat.stop()
+            heartbeat.join(timeout=5)
+        ImportShard.objects.filter(pk=shard.pk, lease_owner=self.owner).update(lease_owner=None, lease_expires_at=None)
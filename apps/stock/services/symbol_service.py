@@ -1,12 +1,12 @@
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from django.http import Http404
 import pandas as pd
 from django.shortcuts import get_object_or_404
 from vnstock import Listing
 from ninja.errors import HttpError
 from apps.stock.clients.vnstock_client import VNStockClient
-from apps.stock.models import Symbol, Events
+from apps.stock.models import ImportRun, ImportShard, Symbol, Events
 from apps.stock.repositories import repositories as repo
 from apps.stock.services.mappers import DataMappers
 from apps.stock.services.industry_resolver import IndustryResolver
@@ -14,6 +14,8 @@ from apps.stock.services.company_processor import CompanyProcessor
 from apps.stock.services.payload_builder import PayloadBuilder
 from apps.stock.services.fetch_service import FetchService
 from apps.stock.services.cache_service import VNStockCacheService
+from apps.stock.services.import_run_service import ImportRunTracker
+from apps.stock.services.import_shard_service import plan_shards
 from apps.stock.utils.safe import (
     safe_str,
     to_datetime,
@@ -72,214 +74,176 @@ class SymbolService:
         return DataMappers.map_officers(df)
     
     
-    def import_all_symbols(self, exchange: str = "HSX", force_update: bool = False) -> Dict[str, Any]:
+    def import_all_symbols(
+        self,
+        exchange: str = "HSX",
+        force_update: bool = False,
+        resume_run_id: Optional[int] = None,
+        checkpoint_every: int = 25,
+        on_checkpoint: Optional[Callable[[ImportRun], None]] = None,
+    ) -> Dict[str, Any]:
         """
         Import ALL stock data (symbols, companies, industries, shareholders, officers, events, sub_companies)
-        for all symbols with detailed logging for each table.
+        for all symbols, tracked by an ImportRun.
 
         Args:
             exchange: Exchange to import (HSX, HNX, UPCOM). Default: HSX
             force_update: If False (default), skip symbols that already have data.
                          If True, re-import all symbols (to get latest data from vnstock).
-        """
-        from apps.stock.models import ShareHolder, Officers, Events, SubCompany
+            resume_run_id: Continue an unfinished ImportRun from its last checkpoint.
+            checkpoint_every: Persist progress every N symbols.
+            on_checkpoint: Called with the ImportRun after each checkpoint (job progress).
 
+        Returns a compact summary (counts, failed symbols, per-stage timings) instead of
+        one dict per symbol; the same data is readable mid-run from the ImportRun row.
+        """
+        tracker = ImportRunTracker.start_or_resume(
+            ImportRun.Kind.STOCK,
+            params={"exchange": exchange, "force_update": force_update},
+            resume_run_id=resume_run_id,
+            checkpoint_every=checkpoint_every,
+            on_checkpoint=on_checkpoint,
+        )
+        exchange = tracker.run.params.get("exchange", exchange)
+        force_update = tracker.run.params.get("force_update", force_update)
         mode_text = "FORCE UPDATE MODE" if force_update else "RESUME MODE"
+        print(f"STOCK IMPORT run={tracker.run.pk} - {mode_text} - Exchange: {exchange}")
 
-        result = {
+        try:
+            # Step 1: Import Symbols from vnstock (bỏ qua khi resume, danh sách đã có từ lần trước)
+            if not tracker.run.last_symbol:
+                with tracker.stage("fetch", "symbols"):
+                    symbols_imported = self._import_symbols_from_vnstock(exchange)
+                tracker.add_rows("symbols", symbols_imported)
+
+            # Step 2-7: Process each symbol with all data
+            self._import_symbols_tracked(Symbol.objects.all(), force_update, tracker)
+        except BaseException as e:
+            tracker.finish(error=f"Run aborted: {e!r}")
+            raise
+
+        tracker.finish()
+        summary = tracker.summary()
+        row_counts = summary["row_counts"]
+        print(f"STOCK IMPORT run={tracker.run.pk} done: {summary['processed']} processed, {summary['failed']} failed")
+
+        return {
+            **summary,
             "exchange": exchange,
             "mode": mode_text,
-            "total_symbols": 0,
-            "symbols_processed": 0,
-            "symbols_failed": 0,
-            "total_companies": 0,
-            "total_industries": 0,
-            "total_shareholders": 0,
-            "total_officers": 0,
-            "total_events": 0,
-            "total_sub_companies": 0,
-            "errors": [],
-            "details": []
+            "symbols_processed": summary["processed"] - summary["failed"],
+            "symbols_failed": summary["failed"],
+            "total_companies": row_counts.get("company", 0),
+            "total_industries": row_counts.get("industries", 0),
+            "total_shareholders": row_counts.get("shareholders", 0),
+            "total_officers": row_counts.get("officers", 0),
+            "total_events": row_counts.get("events", 0),
+            "total_sub_companies": row_counts.get("sub_companies", 0),
         }
 
-        print(f"\n{'='*60}")
-        print(f"STOCK IMPORT - {mode_text}")
-        print(f"Exchange: {exchange}")
-        print(f"{'='*60}\n")
-
-        try:
-            # Step 1: Import Symbols from vnstock
-            print(f"[1/7] → Importing Symbols from {exchange}...", end=" ")
-            symbols_imported = self._import_symbols_from_vnstock(exchange)
-            result["total_symbols"] = symbols_imported
-            print(f"✓ SUCCESS ({symbols_imported} symbols)")
-
-            # Get symbols to process
-            symbols = Symbol.objects.all().order_by('name')
-
-            if not force_update:
-                symbols_to_process = []
-                for symbol in symbols:
-                    has_company = hasattr(symbol, 'company') and symbol.company is not None
-                    has_shareholders = has_company and ShareHolder.objects.filter(company=symbol.company).exists()
-                    has_officers = has_company and Officers.objects.filter(company=symbol.company).exists()
-                    has_events = has_company and Events.objects.filter(company=symbol.company).exists()
-                    has_subs = has_company and SubCompany.objects.filter(parent=symbol.company).exists()
-
-                    # Process if missing any data
-                    if not (has_company and has_shareholders and has_officers and has_events and has_subs):
-                        symbols_to_process.append(symbol)
-
-                symbols = symbols_to_process
-                print(f"  ℹ Resume mode: {len(symbols)} symbols need processing\n")
-            else:
-                symbols = list(symbols)
-                print(f"  ℹ Force update: Processing all {len(symbols)} symbols\n")
+    def plan_sharded_import(self, exchange: str = "HSX", force_update: bool = False, shard_count: int = 4) -> ImportRun:
+        """
+        Import danh sách symbols một lần rồi chia Symbol.id thành `shard_count` khoảng;
+        các worker process claim từng shard qua lease (xem import_shard_service).
+        """
+        symbols_imported = self._import_symbols_from_vnstock(exchange)
+        run = plan_shards(
+            ImportRun.Kind.STOCK,
+            {"exchange": exchange, "force_update": force_update},
+            Symbol.objects.values_list("id", flat=True),
+            shard_count,
+        )
+        run.row_counts = {"symbols": symbols_imported}
+        run.save(update_fields=["row_counts"])
+        return run
 
-            # Step 2-7: Process each symbol with all data
-            total_symbols = len(symbols)
-            for idx, symbol in enumerate(symbols, 1):
-                symbol_detail = {
-                    "symbol": symbol.name,
-                    "success": False,
-                    "company": False,
-                    "industries": 0,
-                    "shareholders": 0,
-                    "officers": 0,
-                    "events": 0,
-                    "sub_companies": 0,
-                    "errors": []
-                }
+    def import_symbol_shard(self, shard: ImportShard, tracker: ImportRunTracker) -> None:
+        """Import đủ bundle cho các symbol trong khoảng id của shard; tracker ghi tiến độ vào shard."""
+        symbols = Symbol.objects.filter(id__gte=shard.id_from, id__lte=shard.id_to)
+        self._import_symbols_tracked(symbols, shard.run.params.get("force_update", False), tracker)
 
-                try:
-                    # Fetch bundle data
-                    bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
-                    if not ok or not bundle:
-                        print(f"\n[{idx}/{total_symbols}] {symbol.name}")
-                        print(f"  ⊘ SKIPPED: No bundle data")
-                        symbol_detail["errors"].append("No bundle data")
-                        result["symbols_failed"] += 1
-                        continue
+    def _import_symbols_tracked(self, symbols, force_update: bool, tracker: ImportRunTracker) -> None:
+        from apps.stock.models import ShareHolder, Officers, Events, SubCompany
 
-                    # Get overview data
-                    overview_df = bundle.get("overview_df_TCBS")
-                    if overview_df is None or overview_df.empty:
-                        overview_df = bundle.get("overview_df_VCI")
-                    if overview_df is None or overview_df.empty:
-                        print(f"\n[{idx}/{total_symbols}] {symbol.name}")
-                        print(f"  ⊘ SKIPPED: No overview data")
-                        symbol_detail["errors"].append("No overview data")
-                        result["symbols_failed"] += 1
-                        continue
+        symbols = symbols.select_related('company').order_by('name')
 
-                    print(f"\nSuccessfully fetched data for {symbol.name}")
-
-                    data = overview_df.iloc[0]
-
-                    # Import Company
-                    company = self.company_processor.process_company_data(bundle, data)
-                    symbol.company = company
-                    symbol.save()
-                    symbol_detail["company"] = True
-                    result["total_companies"] += 1
-
-                    # Import Industries
-                    industries = self.industry_resolver.resolve_symbol_industries(bundle, symbol.name)
-                    for industry in industries:
-                        repo.upsert_symbol_industry(symbol, industry)
-                    symbol_detail["industries"] = len(industries)
-                    result["total_industries"] += len(industries)
-
-                    # Import Shareholders
-                    print(f"  → Importing Shareholders...", end=" ", flush=True)
-                    shareholders_df = bundle.get("shareholders_df")
-                    if shareholders_df is not None and not shareholders_df.empty:
-                        shareholder_rows = DataMappers.map_shareholders(shareholders_df)
-                        repo.upsert_shareholders(company, shareholder_rows)
-                        symbol_detail["shareholders"] = len(shareholder_rows)
-                        result["total_shareholders"] += len(shareholder_rows)
-                        print(f"✓ SUCCESS ({len(shareholder_rows)} records)")
-                    else:
-                        print(f"⊘ SKIPPED (no data)")
-
-                    # Import Officers
-                    print(f"  → Importing Officers...", end=" ", flush=True)
-                    officers_df = bundle.get("officers_df")
-                    if officers_df is not None and not officers_df.empty:
-                        officer_rows = DataMappers.map_officers(officers_df)
-                        repo.upsert_officers(company, officer_rows)
-                        symbol_detail["officers"] = len(officer_rows)
-                        result["total_officers"] += len(officer_rows)
-                        print(f"✓ SUCCESS ({len(officer_rows)} records)")
-                    else:
-                        print(f"⊘ SKIPPED (no data)")
-
-                    # Import Events
-                    print(f"  → Importing Events...", end=" ", flush=True)
-                    events_df = bundle.get("events_df")
-                    if events_df is not None and not events_df.empty:
-                        event_rows = DataMappers.map_events(events_df)
-                        repo.upsert_events(company, event_rows)
-                        symbol_detail["events"] = len(event_rows)
-                        result["total_events"] += len(event_rows)
-                        print(f"✓ SUCCESS ({len(event_rows)} records)")
-                    else:
-                        print(f"⊘ SKIPPED (no data)")
-
-                    # Import Sub Companies
-                    print(f"  → Importing Sub Companies...", end=" ", flush=True)
-                    subsidiaries_df = bundle.get("subsidiaries")
-                    if subsidiaries_df is not None and not subsidiaries_df.empty:
-                        sub_company_rows = DataMappers.map_sub_company(subsidiaries_df)
-                        repo.upsert_sub_company(sub_company_rows, company)
-                        symbol_detail["sub_companies"] = len(sub_company_rows)
-                        result["total_sub_companies"] += len(sub_company_rows)
-                        print(f"✓ SUCCESS ({len(sub_company_rows)} records)")
-                    else:
-                        print(f"⊘ SKIPPED (no data)")
-
-                    symbol_detail["success"] = True
-                    result["symbols_processed"] += 1
-                    print(f"  ✓ COMPLETED: All tables imported successfully")
+        if not force_update:
+            symbols_to_process = []
+            for symbol in symbols:
+                has_company = symbol.company is not None
+                has_shareholders = has_company and ShareHolder.objects.filter(company=symbol.company).exists()
+                has_officers = has_company and Officers.objects.filter(company=symbol.company).exists()
+                has_events = has_company and Events.objects.filter(company=symbol.company).exists()
+                has_subs = has_company and SubCompany.objects.filter(parent=symbol.company).exists()
 
-                except Exception as e:
-                    error_msg = f"Import error: {str(e)}"
-                    symbol_detail["errors"].append(error_msg)
-                    result["symbols_failed"] += 1
-                    print(f"  ✗ FAILED: {error_msg}")
+                # Process if missing any data
+                if not (has_company and has_shareholders and has_officers and has_events and has_subs):
+                    symbols_to_process.append(symbol)
 
-                finally:
-                    result["details"].append(symbol_detail)
-                    ensure_django_connection_closed()
-                    reset_queries()
+            symbols = symbols_to_process
 
-                    if self.per_symbol_sleep > 0:
+        for symbol in tracker.pending(symbols):
+            error_msg = None
+            try:
+                error_msg = self._import_symbol_bundle(symbol, tracker)
+            except Exception as e:
+                error_msg = f"Import error: {str(e)}"
+            finally:
+                tracker.symbol_done(symbol.name, ok=error_msg is None, error=error_msg)
+                ensure_django_connection_closed()
+                reset_queries()
+
+                if self.per_symbol_sleep > 0:
+                    with tracker.stage("sleep"):
                         time.sleep(self.per_symbol_sleep)
 
-            # Final summary
-            print(f"\n{'='*60}")
-            print(f"STOCK IMPORT COMPLETE SUMMARY")
-            print(f"{'='*60}")
-            print(f"Mode:                 {mode_text}")
-            print(f"Exchange:             {exchange}")
-            print(f"Total Symbols:        {result['total_symbols']}")
-            print(f"Processed:            {result['symbols_processed']}")
-            print(f"Failed:               {result['symbols_failed']}")
-            print(f"Companies:            {result['total_companies']} records")
-            print(f"Industries:           {result['total_industries']} mappings")
-            print(f"Shareholders:         {result['total_shareholders']} records")
-            print(f"Officers:             {result['total_officers']} records")
-            print(f"Events:               {result['total_events']} records")
-            print(f"Sub Companies:        {result['total_sub_companies']} records")
-            print(f"{'='*60}\n")
-
-            return result
-
-        except Exception as e:
-            error_msg = f"Import failed: {str(e)}"
-            result["errors"].append(error_msg)
-            print(f"\n✗ IMPORT FAILED: {error_msg}")
-            return result
+    def _import_symbol_bundle(self, symbol: Symbol, tracker: ImportRunTracker) -> Optional[str]:
+        """Import company + các bảng liên quan của một symbol; trả về lý do nếu bỏ qua."""
+        with tracker.stage("fetch", "company_bundle"):
+            bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
+        if not ok or not bundle:
+            return "No bundle data"
+
+        # Get overview data
+        overview_df = bundle.get("overview_df_TCBS")
+        if overview_df is None or overview_df.empty:
+            overview_df = bundle.get("overview_df_VCI")
+        if overview_df is None or overview_df.empty:
+            return "No overview data"
+
+        with tracker.stage("write", "company"):
+            company = self.company_processor.process_company_data(bundle, overview_df.iloc[0])
+            symbol.company = company
+            symbol.save()
+        tracker.add_rows("company", 1)
+
+        with tracker.stage("map", "industries"):
+            industries = self.industry_resolver.resolve_symbol_industries(bundle, symbol.name)
+        with tracker.stage("write", "industries"):
+            for industry in industries:
+                repo.upsert_symbol_industry(symbol, industry)
+        tracker.add_rows("industries", len(industries))
+
+        related_tables = (
+            ("shareholders", "shareholders_df", DataMappers.map_shareholders,
+             lambda rows: repo.upsert_shareholders(company, rows)),
+            ("officers", "officers_df", DataMappers.map_officers,
+             lambda rows: repo.upsert_officers(company, rows)),
+            ("events", "events_df", DataMappers.map_events,
+             lambda rows: repo.upsert_events(company, rows)),
+            ("sub_companies", "subsidiaries", DataMappers.map_sub_company,
+             lambda rows: repo.upsert_sub_company(rows, company)),
+        )
+        for table, bundle_key, mapper, upsert in related_tables:
+            df = bundle.get(bundle_key)
+            if df is None or df.empty:
+                continue
+            with tracker.stage("map", table):
+                rows = mapper(df)
+            with tracker.stage("write", table):
+                upsert(rows)
+            tracker.add_rows(table, len(rows))
+        return None
 
     def _import_symbols_from_vnstock(self, exchange: str = "HSX") -> int:
         """Import symbols from vnstock and return count"""
@@ -0,0 +1,228 @@
+import contextlib
+import io
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.calculate.models import BalanceSheet, Ratio
+from apps.calculate.services.financial_service import CalculateService
+from apps.calculate.vnstock import VNStock
+from apps.jobs.handlers import STOCK_IMPORT_SHARDED
+from apps.jobs.models import JobStatus
+from apps.jobs.services import JobService
+from apps.stock.models import ImportRun, ImportShard, ShareHolder, Symbol
+from apps.stock.services.import_run_service import ImportRunTracker, get_run_summary
+from apps.stock.services.import_shard_service import (
+    ShardLeaseLost,
+    ShardTracker,
+    ShardWorker,
+    claim_shard,
+    split_id_ranges,
+)
+from apps.stock.services.symbol_service import SymbolService
+from apps.stock.services.vnstock_import_service import VnstockImportService
+from core.benchmark.fake_vnstock import FakeProviderConfig, FakeVnstockProvider
+from core.benchmark.pipeline import SLEEP_BACKOFF, SleepRecorder
+
+
+class TestImportPipelineWithFakeProvider(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sleeps = SleepRecorder(scale=0)
+
+    def _run(self, provider, call):
+        with provider.install(), self.sleeps.install(), contextlib.redirect_stdout(io.StringIO()):
+            return call()
+
+    def test_stock_and_financial_import(self):
+        provider = FakeVnstockProvider(FakeProviderConfig(symbols=3, years=2, quarters=2))
+
+        stock_result = self._run(
+            provider, lambda: VnstockImportService(per_symbol_sleep=0).import_all_complete("HSX", force_update=True)
+        )
+        financial_result = self._run(
+            provider,
+            lambda: CalculateService(vnstock_client=VNStock(), sleep_between_symbols=0).import_all_complete(
+                force_update=True
+            ),
+        )
+
+        self.assertEqual(stock_result["symbols_processed"], 3)
+        self.assertEqual(Symbol.objects.count(), 3)
+        self.assertEqual(ShareHolder.objects.count(), 15)
+        self.assertEqual(financial_result["successful_symbols"], 3)
+        self.assertEqual(BalanceSheet.objects.count(), 12)
+        self.assertEqual(Ratio.objects.count(), 12)
+
+    def test_rate_limits_are_retried_with_backoff(self):
+        provider = FakeVnstockProvider(FakeProviderConfig(symbols=5, years=1, quarters=1, rate_limit_rate=0.3))
+
+        self._run(provider, lambda: VnstockImportService(per_symbol_sleep=0).import_all_complete("HSX", True))
+
+        self.assertGreater(provider.stats.rate_limits, 0)
+        self.assertGreater(self.sleeps.requested[SLEEP_BACKOFF], 0)
+
+    def test_provider_is_deterministic(self):
+        first = FakeVnstockProvider(FakeProviderConfig(symbols=2))
+        second = FakeVnstockProvider(FakeProviderConfig(symbols=2))
+
+        self.assertTrue(first.shareholders("AAA").equals(second.shareholders("AAA")))
+        self.assertTrue(first.statement("AAB", "ratio").equals(second.statement("AAB", "ratio")))
+
+
+class TestImportRunTracking(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sleeps = SleepRecorder(scale=0)
+        self.provider = FakeVnstockProvider(FakeProviderConfig(symbols=4, years=1, quarters=2))
+
+    def _run(self, call):
+        with self.provider.install(), self.sleeps.install(), contextlib.redirect_stdout(io.StringIO()):
+            return call()
+
+    def test_stock_import_records_run_with_stage_timings(self):
+        result = self._run(lambda: SymbolService(per_symbol_sleep=0).import_all_symbols("HSX", force_update=True))
+
+        run = ImportRun.objects.get(pk=result["run_id"])
+        self.assertEqual(run.kind, ImportRun.Kind.STOCK)
+        self.assertEqual(run.status, ImportRun.Status.SUCCEEDED)
+        self.assertEqual((run.total_symbols, run.processed_count, run.failed_count), (4, 4, 0))
+        self.assertEqual(run.last_symbol, "AAD")
+        self.assertEqual(run.row_counts["shareholders"], 20)
+        self.assertIn("company_bundle", run.stage_timings["fetch"])
+        self.assertIn("officers", run.stage_timings["write"])
+        self.assertNotIn("details", result)
+
+    def test_financial_import_resumes_from_checkpoint(self):
+        self._run(lambda: VnstockImportService(per_symbol_sleep=0).import_all_symbols_from_vnstock("HSX"))
+        crashed = ImportRun.objects.create(
+            kind=ImportRun.Kind.FINANCIAL,
+            params={"force_update": True},
+            total_symbols=4,
+            processed_count=2,
+            last_symbol="AAB",
+            checkpoint_at=timezone.now() - timedelta(hours=1),
+        )
+
+        result = self._run(
+            lambda: CalculateService(vnstock_client=VNStock(), sleep_between_symbols=0).import_all_complete(
+                resume_run_id=crashed.pk
+            )
+        )
+
+        crashed.refresh_from_db()
+        self.assertEqual(crashed.status, ImportRun.Status.SUCCEEDED)
+        self.assertEqual(crashed.processed_count, 4)
+        self.assertEqual(result["row_counts"]["balance_sheet"], 4)
+        self.assertEqual(set(BalanceSheet.objects.values_list("symbol__name", flat=True)), {"AAC", "AAD"})
+        self.assertIn("balance_sheet", result["stage_timings"]["map"])
+
+
+    def test_resume_rejects_run_still_running_elsewhere(self):
+        live = ImportRun.objects.create(kind=ImportRun.Kind.FINANCIAL, checkpoint_at=timezone.now())
+
+        with self.assertRaises(ValueError):
+            ImportRunTracker.resume(live.pk, ImportRun.Kind.FINANCIAL, stale_seconds=300)
+
+        ImportRun.objects.filter(pk=live.pk).update(checkpoint_at=timezone.now() - timedelta(seconds=301))
+        tracker = ImportRunTracker.resume(live.pk, ImportRun.Kind.FINANCIAL, stale_seconds=300)
+        self.assertGreater(tracker.run.checkpoint_at, timezone.now() - timedelta(seconds=5))
+        # Lần resume thứ hai thấy checkpoint vừa đóng dấu nên bị từ chối
+        with self.assertRaises(ValueError):
+            ImportRunTracker.resume(live.pk, ImportRun.Kind.FINANCIAL, stale_seconds=300)
+
+
+class TestShardedImport(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sleeps = SleepRecorder(scale=0)
+        self.provider = FakeVnstockProvider(FakeProviderConfig(symbols=5, years=1, quarters=1))
+
+    def _run(self, call):
+        with self.provider.install(), self.sleeps.install(), contextlib.redirect_stdout(io.StringIO()):
+            return call()
+
+    def _plan_financial(self, shards):
+        self._run(lambda: VnstockImportService(per_symbol_sleep=0).import_all_symbols_from_vnstock("HSX"))
+        return CalculateService(vnstock_client=VNStock()).plan_sharded_import(force_update=True, shard_count=shards)
+
+    def test_split_id_ranges(self):
+        self.assertEqual(split_id_ranges([5, 1, 2, 9, 7], 2), [(1, 5), (7, 9)])
+        self.assertEqual(split_id_ranges([1, 2], 4), [(1, 1), (2, 2)])
+        self.assertEqual(split_id_ranges([], 4), [])
+
+    def test_workers_process_all_shards_and_finalize_run(self):
+        run = self._plan_financial(shards=3)
+        process = CalculateService(vnstock_client=VNStock(), sleep_between_symbols=0).import_financial_shard
+
+        result = self._run(lambda: ShardWorker(run.pk, "worker-a", process).run())
+
+        run.refresh_from_db()
+        self.assertEqual(result["shards_processed"], [0, 1, 2])
+        self.assertEqual(run.status, ImportRun.Status.SUCCEEDED)
+        self.assertEqual((run.total_symbols, run.processed_count), (5, 5))
+        self.assertEqual(BalanceSheet.objects.count(), 5)
+        summary = get_run_summary(run.pk)
+        self.assertEqual([shard["status"] for shard in summary["shards"]], ["succeeded"] * 3)
+        self.assertEqual(summary["row_counts"]["balance_sheet"], 5)
+
+    def test_expired_lease_is_reassigned(self):
+        run = self._plan_financial(shards=1)
+        dead = claim_shard(run.pk, "worker-dead", lease_seconds=60)
+        self.assertIsNone(claim_shard(run.pk, "worker-b", lease_seconds=60))
+
+        ImportShard.objects.filter(pk=dead.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        taken = claim_shard(run.pk, "worker-b", lease_seconds=60)
+        self.assertEqual((taken.pk, taken.attempts, taken.lease_owner), (dead.pk, 2, "worker-b"))
+
+        # Worker cũ sống lại: checkpoint tiếp theo phải dừng thay vì ghi đè tiến độ
+        with self.assertRaises(ShardLeaseLost):
+            ShardTracker(dead, "worker-dead", lease_seconds=60).checkpoint()
+
+    def test_lease_held_while_symbol_blocks(self):
+        run = self._plan_financial(shards=1)
+        process = CalculateService(vnstock_client=VNStock(), sleep_between_symbols=0).import_financial_shard
+        stolen = []
+
+        def slow_shard(shard, tracker):
+            # Một symbol chờ rate limiter lâu hơn cả lease
+            time.sleep(0.5)
+            stolen.append(claim_shard(run.pk, "worker-b", lease_seconds=60))
+            process(shard, tracker)
+
+        self._run(lambda: ShardWorker(run.pk, "worker-a", slow_shard, lease_seconds=0.3).run())
+
+        run.refresh_from_db()
+        self.assertEqual(stolen, [None])
+        self.assertEqual(run.status, ImportRun.Status.SUCCEEDED)
+        self.assertEqual(run.shards.get().attempts, 1)
+
+    def test_shard_fails_after_max_attempts(self):
+        run = self._plan_financial(shards=1)
+        shard = claim_shard(run.pk, "worker-dead", lease_seconds=60, max_attempts=1)
+        ImportShard.objects.filter(pk=shard.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertIsNone(claim_shard(run.pk, "worker-b", lease_seconds=60, max_attempts=1))
+        shard.refresh_from_db()
+        self.assertEqual(shard.status, ImportShard.Status.FAILED)
+
+    def test_sharded_stock_import_through_job_queue(self):
+        service = JobService()
+        service.enqueue(STOCK_IMPORT_SHARDED, {"exchange": "HSX", "force_update": True, "shards": 2})
+
+        jobs = []
+        while True:
+            job = self._run(lambda: service.run_next("worker-a"))
+            if job is None:
+                break
+            jobs.append(job)
+
+        self.assertTrue(all(job.status == JobStatus.SUCCEEDED for job in jobs))
+        run = ImportRun.objects.get(pk=jobs[0].result["run_id"])
+        self.assertEqual(len(jobs), 3)
+        self.assertEqual(run.status, ImportRun.Status.SUCCEEDED)
+        self.assertEqual(run.processed_count, 5)
+        self.assertEqual(ShareHolder.objects.count(), 25)
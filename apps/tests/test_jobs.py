@@ -0,0 +1,201 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from apps.jobs import repositories as repo
+from apps.jobs.models import Job, JobStatus, ScheduledRun, ScheduledRunStatus
+from apps.jobs.registry import register
+from apps.jobs.scheduler import Scheduler
+from apps.jobs.schedules import Schedule
+from apps.jobs.services import JobService
+from core.jwt_auth import create_tokens
+
+
+@register("test.echo")
+def _echo(ctx):
+    ctx.progress(force=True, step="done")
+    return {"echo": ctx.payload.get("value")}
+
+
+@register("test.boom")
+def _boom(ctx):
+    raise RuntimeError("boom")
+
+
+class JobQueueTestCase(TestCase):
+    """Test enqueue / claim / retry của DB job queue"""
+
+    def setUp(self):
+        self.service = JobService()
+
+    def test_dedupe_key_returns_active_job(self):
+        job, created = self.service.enqueue("test.echo", {"value": 1}, dedupe_key="echo")
+        again, created_again = self.service.enqueue("test.echo", {"value": 2}, dedupe_key="echo")
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job.pk, again.pk)
+
+        # Job đã xong thì cho phép enqueue lại cùng key
+        self.service.run_next("w1")
+        _, created_after = self.service.enqueue("test.echo", {}, dedupe_key="echo")
+        self.assertTrue(created_after)
+
+    def test_unknown_kind_rejected(self):
+        with self.assertRaises(ValueError):
+            self.service.enqueue("test.missing")
+
+    def test_claim_is_exclusive(self):
+        self.service.enqueue("test.echo")
+        first = repo.claim_next_job("w1")
+        second = repo.claim_next_job("w2")
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertEqual(first.locked_by, "w1")
+        self.assertEqual(first.attempts, 1)
+
+    def test_run_next_success(self):
+        job, _ = self.service.enqueue("test.echo", {"value": "hi"})
+        done = self.service.run_next("w1")
+        self.assertEqual(done.pk, job.pk)
+        self.assertEqual(done.status, JobStatus.SUCCEEDED)
+        self.assertEqual(done.result, {"echo": "hi"})
+        self.assertEqual(done.progress, {"step": "done"})
+        self.assertIsNone(self.service.run_next("w1"))
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        job, _ = self.service.enqueue("test.boom", max_attempts=2)
+        self.service.run_next("w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn("boom", job.error)
+        # Chưa đến hạn retry
+        self.assertIsNone(self.service.run_next("w1"))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.service.run_next("w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_requeue_stale_jobs(self):
+        job, _ = self.service.enqueue("test.echo", max_attempts=2)
+        repo.claim_next_job("dead-worker")
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(repo.requeue_stale_jobs(300), {"requeued": 1, "failed": 0})
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+        self.assertIsNone(job.locked_by)
+        # Worker cũ không còn ghi được kết quả
+        self.assertFalse(repo.mark_succeeded(job.pk, "dead-worker", {}))
+
+        # Lần chạy thứ hai cũng làm sập worker: hết lượt thì failed, không requeue mãi
+        repo.claim_next_job("dead-worker-2")
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(repo.requeue_stale_jobs(300), {"requeued": 0, "failed": 1})
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+
+
+class SchedulerTestCase(TestCase):
+    """Test run_scheduler: mỗi slot chạy một lần, jitter, overlap và lịch sử chạy"""
+
+    def test_slot_fires_once_and_records_history(self):
+        calls = []
+        schedule = Schedule("test.tick", lambda: calls.append(1) or {"n": len(calls)}, every_seconds=60)
+        slot_start = timezone.now().replace(second=0, microsecond=0)
+
+        runs = Scheduler([schedule], owner="a", inline=True).tick(slot_start + timedelta(seconds=10))
+        # Instance khác (hoặc sau restart) không fire lại cùng slot
+        self.assertEqual(Scheduler([schedule], owner="b", inline=True).tick(slot_start + timedelta(seconds=20)), [])
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(calls, [1])
+
+        run = ScheduledRun.objects.get(name="test.tick")
+        self.assertEqual(run.scheduled_for, slot_start)
+        self.assertEqual(run.status, ScheduledRunStatus.SUCCEEDED)
+        self.assertEqual(run.result, {"n": 1})
+        self.assertIsNotNone(run.duration_ms)
+
+        Scheduler([schedule], owner="a", inline=True).tick(slot_start + timedelta(seconds=70))
+        self.assertEqual(len(calls), 2)
+
+    def test_jitter_and_overlap(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        schedule = Schedule("test.jitter", fail, every_seconds=3600, jitter_seconds=600)
+        scheduler = Scheduler([schedule], owner="a", inline=True)
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        self.assertEqual(scheduler.tick(hour), [])
+        [run] = scheduler.tick(hour + timedelta(seconds=601))
+        self.assertEqual(run.status, ScheduledRunStatus.FAILED)
+        self.assertIn("boom", run.error)
+
+        # Run trước còn RUNNING thì slot mới bị bỏ qua
+        ScheduledRun.objects.filter(pk=run.pk).update(status=ScheduledRunStatus.RUNNING)
+        self.assertEqual(scheduler.tick(hour + timedelta(hours=1, minutes=11)), [])
+
+
+@override_settings(JWT_SECRET="test-secret", JWT_ALGORITHM="HS256")
+class JobAPITestCase(TestCase):
+    """Test endpoint import trả 202 + job id và GET /api/jobs/{id} (chỉ staff)"""
+
+    def setUp(self):
+        self.client = Client()
+        staff = get_user_model().objects.create_user(
+            username="jobstaff", email="jobstaff@example.com", password="x", is_staff=True
+        )
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {create_tokens(staff.id)[0]}"}
+
+    def test_import_all_enqueues_job(self):
+        response = self.client.post("/api/stocks/symbols/import_all?exchange=HNX")
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertTrue(data["created"])
+        self.assertEqual(data["kind"], "stock.import_all")
+
+        job = Job.objects.get(pk=data["job_id"])
+        self.assertEqual(job.payload["exchange"], "HNX")
+        self.assertEqual(job.dedupe_key, "stock.import_all:HNX")
+        # Worker chết giữa chừng thì job còn lượt để requeue và resume run
+        self.assertGreater(job.max_attempts, 1)
+
+        duplicate = self.client.post("/api/stocks/symbols/import_all?exchange=HNX").json()
+        self.assertEqual(duplicate["job_id"], data["job_id"])
+        self.assertFalse(duplicate["created"])
+        forced = self.client.post("/api/stocks/symbols/import_all?exchange=HNX&force_update=true").json()
+        self.assertTrue(forced["created"])
+
+        status = self.client.get(data["status_url"], **self.auth_headers)
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(status.json()["status"], JobStatus.QUEUED)
+
+    def test_calculate_force_update_not_merged_into_queued_job(self):
+        first = self.client.post("/api/calculate/import/all-complete").json()
+        forced = self.client.post("/api/calculate/import/all-complete?force_update=true").json()
+        self.assertTrue(forced["created"])
+        self.assertNotEqual(forced["job_id"], first["job_id"])
+        self.assertTrue(Job.objects.get(pk=forced["job_id"]).payload["force_update"])
+        again = self.client.post("/api/calculate/import/all-complete?force_update=true").json()
+        self.assertEqual(again["job_id"], forced["job_id"])
+
+    def test_job_not_found(self):
+        self.assertEqual(self.client.get("/api/jobs/999999", **self.auth_headers).status_code, 404)
+
+    def test_jobs_require_staff(self):
+        job, _ = JobService().enqueue("test.echo", {"secret": "payload"})
+        self.assertEqual(self.client.get(f"/api/jobs/{job.pk}").status_code, 401)
+        self.assertEqual(self.client.get("/api/jobs/").status_code, 401)
+
+        user = get_user_model().objects.create_user(username="jobuser", email="jobuser@example.com", password="x")
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {create_tokens(user.id)[0]}"}
+        self.assertEqual(self.client.get(f"/api/jobs/{job.pk}", **headers).status_code, 403)
+        self.assertEqual(self.client.get("/api/jobs/", **headers).status_code, 403)
+        self.assertEqual(len(self.client.get("/api/jobs/", **self.auth_headers).json()), 1)
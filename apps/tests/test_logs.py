@@ -0,0 +1,142 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from apps.logs.models import LogEntry
+from apps.logs.router import LogIngestThrottle
+from apps.logs.utils import context_user_id
+from core.jwt_auth import create_tokens
+
+User = get_user_model()
+
+
+@override_settings(JWT_SECRET="test-secret", JWT_ALGORITHM="HS256")
+class LogSearchAPITestCase(TestCase):
+    """Test GET /api/logs/logs/search"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username="logstaff",
+            email="logstaff@example.com",
+            password="staffpass123",
+            is_staff=True,
+        )
+        self.client = Client()
+        token = create_tokens(self.staff.id)[0]
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+        base = timezone.now() - timedelta(hours=1)
+        for i in range(5):
+            entry = LogEntry.objects.create(
+                level="info" if i % 2 == 0 else "error",
+                channel="search-test",
+                message=f"log {i}",
+                context={"user_id": str(7 if i < 3 else 8)},
+                user_id=7 if i < 3 else 8,
+            )
+            # auto_now_add bỏ qua giá trị truyền vào, đặt lại created_at sau khi tạo
+            LogEntry.objects.filter(pk=entry.pk).update(created_at=base + timedelta(minutes=i))
+
+    def test_keyset_pagination_walks_all_rows(self):
+        """Test cursor pages are newest first and never overlap"""
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2, "channel": "search-test"}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get("/api/logs/logs/search", params, **self.auth_headers)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen.extend(row["message"] for row in data["results"])
+            cursor = data["next_cursor"]
+            if not data["has_more"]:
+                break
+
+        self.assertEqual(seen, ["log 4", "log 3", "log 2", "log 1", "log 0"])
+
+    def test_filters(self):
+        """Test user_id and level filters"""
+        response = self.client.get(
+            "/api/logs/logs/search", {"user_id": 7, "level": "INFO", "channel": "search-test"}, **self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        messages = [row["message"] for row in response.json()["results"]]
+        self.assertEqual(messages, ["log 2", "log 0"])
+
+    def test_non_staff_forbidden(self):
+        """Test search requires a staff account"""
+        user = User.objects.create_user(username="plain", email="plain@example.com", password="x")
+        token = create_tokens(user.id)[0]
+        response = self.client.get("/api/logs/logs/search", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 403)
+
+    def test_context_user_id(self):
+        """Test user_id extraction from log context"""
+        self.assertEqual(context_user_id({"user_id": "12"}), 12)
+        self.assertEqual(context_user_id({"user_id": 3}), 3)
+        self.assertIsNone(context_user_id({"user_id": "abc"}))
+        self.assertIsNone(context_user_id(None))
+
+
+class LogBatchAPITestCase(TestCase):
+    """Test POST /api/logs/logs/batch"""
+
+    url = "/api/logs/logs/batch"
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def _records(self, count):
+        return [
+            {"level": "INFO", "channel": "frontend", "message": f"event {i}", "context": {"page": "home"}}
+            for i in range(count)
+        ]
+
+    def test_json_array(self):
+        """Test JSON array body is written in one batch"""
+        response = self.client.post(self.url, json.dumps(self._records(3)), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["accepted"], 3)
+        self.assertEqual(LogEntry.objects.filter(channel="frontend", level="info").count(), 3)
+
+    def test_ndjson(self):
+        """Test NDJSON body, blank lines ignored"""
+        body = "\n".join(json.dumps(r) for r in self._records(2)) + "\n\n"
+        response = self.client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(LogEntry.objects.filter(channel="frontend").count(), 2)
+
+    def test_invalid_record_rejects_whole_batch(self):
+        """Test one bad record rejects the batch and reports every error"""
+        records = self._records(3)
+        records[1]["level"] = "verbose"
+        del records[2]["message"]
+        response = self.client.post(self.url, json.dumps(records), content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.json()["errors"]], [1, 2])
+        self.assertFalse(LogEntry.objects.filter(channel="frontend").exists())
+
+    @override_settings(LOG_BATCH_MAX_RECORDS=2)
+    def test_batch_too_large(self):
+        """Test batch size limit"""
+        response = self.client.post(self.url, json.dumps(self._records(3)), content_type="application/json")
+        self.assertEqual(response.status_code, 413)
+
+    def test_throttle_ignores_spoofed_forwarded_for(self):
+        """Test anonymous ingest is keyed by REMOTE_ADDR, not a client-supplied X-Forwarded-For"""
+        factory = RequestFactory()
+        throttle = LogIngestThrottle()
+        keys = {
+            throttle.get_cache_key(
+                factory.post(self.url, REMOTE_ADDR="10.0.0.5", HTTP_X_FORWARDED_FOR=f"203.0.113.{i}")
+            )
+            for i in range(3)
+        }
+        self.assertEqual(len(keys), 1)
+        self.assertIn("10.0.0.5", keys.pop())
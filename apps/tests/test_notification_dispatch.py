@@ -0,0 +1,348 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.jobs.models import Job, JobStatus
+from apps.jobs.services import JobService
+from apps.notification.models import (
+    DeliveryStatus,
+    NotificationChannel,
+    NotificationDelivery,
+    NotificationEvent,
+    NotificationOutbox,
+    UserEndpoint,
+    WebhookLog,
+)
+from apps.notification.services.async_dispatcher import AsyncDeliveryDispatcher, ChannelLimits
+from apps.notification.services.delivery_service import DeliveryService
+from apps.notification.services.notification_utils import send_symbol_signal_to_subscribers
+from apps.notification.services.outbox_service import NotificationOutboxService
+from apps.seapay.models import OrderStatus, PaySymbolOrder, PayUserSymbolLicense
+from apps.stock.models import Symbol
+
+User = get_user_model()
+
+
+class _StubProviderHandler(BaseHTTPRequestHandler):
+    """Giả lập Telegram (/bot<token>/sendMessage) và Zalo (/message/cs)"""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests.append((time.monotonic(), self.path, body))
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        if self.path.endswith("/sendMessage"):
+            ok = not body["chat_id"].startswith("bad")
+            data = {"ok": True, "result": {}} if ok else {"ok": False, "description": "chat not found"}
+        else:
+            data = {"error": 0, "message": "Success"}
+        payload = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AsyncDispatcherTestCase(TestCase):
+    """Test AsyncDeliveryDispatcher với HTTP server stub"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubProviderHandler)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.settings_override = override_settings(
+            TELEGRAM_BOT_TOKEN="test-token",
+            TELEGRAM_API_BASE_URL=base,
+            ZALO_OA_ACCESS_TOKEN="test-zalo",
+            ZALO_API_BASE_URL=base,
+            BACKTEST_WEBHOOK_URL=f"{base}/backtest",
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.delay = 0.02
+        self.user = User.objects.create_user(username="notify", email="notify@example.com", password="pass12345")
+        self.event = NotificationEvent.objects.create(
+            user=self.user, event_type="symbol_signal", payload={"symbol": "VNM", "signal_type": "buy"}
+        )
+
+    def _deliveries(self, channel, addresses):
+        deliveries = []
+        for address in addresses:
+            endpoint = UserEndpoint.objects.create(user=self.user, channel=channel, address=address, verified=True)
+            deliveries.append(
+                NotificationDelivery.objects.create(event=self.event, endpoint=endpoint, channel=channel)
+            )
+        return deliveries
+
+    def test_send_pending_deliveries(self):
+        telegram = self._deliveries(NotificationChannel.TELEGRAM, [f"chat-{i}" for i in range(6)] + ["bad"])
+        self._deliveries(NotificationChannel.ZALO, ["zalo-1", "zalo-2"])
+
+        sent = DeliveryService().send_pending_deliveries(limit=100)
+
+        self.assertEqual(sent, 8)
+        self.assertEqual(len(self.server.requests), 9)
+        self.assertEqual(NotificationDelivery.objects.filter(status=DeliveryStatus.SENT).count(), 8)
+        failed = NotificationDelivery.objects.get(pk=telegram[-1].pk)
+        self.assertEqual(failed.status, DeliveryStatus.FAILED)
+        self.assertEqual(failed.error_message, "chat not found")
+        self.assertTrue(NotificationDelivery.objects.get(pk=telegram[0].pk).response_raw["ok"])
+        # Đã claim hết, lần chạy sau không gửi lại
+        self.assertEqual(DeliveryService().send_pending_deliveries(limit=100), 0)
+
+    def test_concurrency_and_rate_limit_per_channel(self):
+        deliveries = self._deliveries(NotificationChannel.TELEGRAM, [f"chat-{i}" for i in range(10)])
+        limits = {NotificationChannel.TELEGRAM: ChannelLimits(concurrency=2, per_second=20)}
+
+        result = AsyncDeliveryDispatcher(limits=limits).dispatch(deliveries)
+
+        self.assertEqual(result.by_channel, {"telegram": {"sent": 10, "failed": 0}})
+        self.assertLessEqual(self.server.max_in_flight, 2)
+        times = [t for t, _, _ in self.server.requests]
+        # 10 request ở 20/s: request cuối cách request đầu ít nhất ~9 * 50ms
+        self.assertGreaterEqual(max(times) - min(times), 0.4)
+
+    def _make_due(self, deliveries):
+        NotificationDelivery.objects.filter(pk__in=[d.pk for d in deliveries]).update(
+            status=DeliveryStatus.FAILED, attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    @override_settings(NOTIFICATION_RETRY_MAX_ATTEMPTS=3, NOTIFICATION_RETRY_BASE_SECONDS=30)
+    def test_failed_delivery_backs_off_then_dead_letters(self):
+        [delivery] = self._deliveries(NotificationChannel.TELEGRAM, ["bad"])
+
+        DeliveryService().send_pending_deliveries()
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), (DeliveryStatus.FAILED, 1))
+        delay = (delivery.next_attempt_at - timezone.now()).total_seconds()
+        self.assertTrue(10 < delay <= 30)
+        # Chưa tới hạn thì không retry
+        self.assertEqual(DeliveryService().retry_failed_deliveries(), 0)
+        self.assertEqual(len(self.server.requests), 1)
+
+        for expected_status in (DeliveryStatus.FAILED, DeliveryStatus.DEAD):
+            NotificationDelivery.objects.filter(pk=delivery.pk).update(next_attempt_at=timezone.now())
+            DeliveryService().retry_failed_deliveries()
+            delivery.refresh_from_db()
+            self.assertEqual(delivery.status, expected_status)
+        self.assertEqual(delivery.attempts, 3)
+        self.assertIsNone(delivery.next_attempt_at)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_send_delivery_failures_are_scheduled_for_retry(self):
+        [no_handler] = self._deliveries(NotificationChannel.TELEGRAM, ["chat-1"])
+        NotificationDelivery.objects.filter(pk=no_handler.pk).update(channel="sms")
+        [crashing] = self._deliveries(NotificationChannel.TELEGRAM, ["chat-2"])
+
+        with patch("apps.notification.services.handlers.TelegramHandler.send", side_effect=RuntimeError("boom")):
+            self.assertFalse(DeliveryService().send_delivery(crashing.pk))
+        self.assertFalse(DeliveryService().send_delivery(no_handler.pk))
+
+        for delivery, error in ((no_handler, "No handler for channel sms"), (crashing, "boom")):
+            delivery.refresh_from_db()
+            self.assertEqual((delivery.status, delivery.attempts, delivery.error_message), (DeliveryStatus.FAILED, 1, error))
+            self.assertIsNotNone(delivery.next_attempt_at)
+
+    def test_retry_probes_one_delivery_per_endpoint(self):
+        [first] = self._deliveries(NotificationChannel.TELEGRAM, ["chat-1"])
+        extra = [
+            NotificationDelivery.objects.create(event=self.event, endpoint=first.endpoint, channel=first.channel)
+            for _ in range(2)
+        ]
+        self._make_due([first] + extra)
+
+        self.assertEqual(DeliveryService().retry_failed_deliveries(), 1)
+        self.assertEqual(len(self.server.requests), 1)
+        deferred = NotificationDelivery.objects.filter(status=DeliveryStatus.FAILED)
+        self.assertEqual(deferred.count(), 2)
+        self.assertTrue(all(d.next_attempt_at > timezone.now() and d.attempts == 1 for d in deferred))
+
+    @override_settings(NOTIFICATION_RETRY_BASE_SECONDS=300)
+    def test_failed_probe_backs_off_whole_endpoint(self):
+        [probe] = self._deliveries(NotificationChannel.TELEGRAM, ["bad-1"])
+        extra = [
+            NotificationDelivery.objects.create(event=self.event, endpoint=probe.endpoint, channel=probe.channel)
+            for _ in range(2)
+        ]
+        self._make_due([probe] + extra)
+
+        self.assertEqual(DeliveryService().retry_failed_deliveries(), 0)
+        probe.refresh_from_db()
+        self.assertGreater(probe.next_attempt_at, timezone.now() + timedelta(seconds=200))
+        for delivery in NotificationDelivery.objects.filter(pk__in=[d.pk for d in extra]):
+            self.assertEqual((delivery.attempts, delivery.next_attempt_at), (1, probe.next_attempt_at))
+        # Lần schedule sau không probe lại endpoint
+        DeliveryService().retry_failed_deliveries()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_retry_opens_circuit_for_failing_channel(self):
+        failing = self._deliveries(NotificationChannel.TELEGRAM, [f"bad-{i}" for i in range(12)])
+        healthy = self._deliveries(NotificationChannel.TELEGRAM, [f"chat-{i}" for i in range(3)])
+        zalo = self._deliveries(NotificationChannel.ZALO, ["zalo-1"])
+        self._make_due(failing + healthy + zalo)
+        NotificationDelivery.objects.filter(pk__in=[d.pk for d in healthy + zalo]).update(
+            next_attempt_at=timezone.now()
+        )
+
+        sent = DeliveryService().retry_failed_deliveries(limit=100, batch_size=12)
+
+        # Batch đầu toàn lỗi -> circuit telegram mở, chỉ zalo còn được gửi
+        self.assertEqual(sent, 1)
+        self.assertEqual(len(self.server.requests), 13)
+        for delivery in NotificationDelivery.objects.filter(pk__in=[d.pk for d in healthy]):
+            self.assertEqual((delivery.status, delivery.attempts), (DeliveryStatus.FAILED, 1))
+            self.assertGreater(delivery.next_attempt_at, timezone.now() + timedelta(seconds=200))
+
+    @override_settings(NOTIFICATION_SENDING_STALE_SECONDS=600)
+    def test_reap_returns_stale_sending_to_retry(self):
+        stale, fresh = self._deliveries(NotificationChannel.TELEGRAM, ["chat-1", "chat-2"])
+        # Dispatcher claim rồi chết trước khi gửi
+        claimed = DeliveryService().delivery_repo.claim_pending_deliveries(limit=100)
+        self.assertEqual(len(claimed), 2)
+        NotificationDelivery.objects.filter(pk=stale.pk).update(
+            claimed_at=timezone.now() - timedelta(seconds=601)
+        )
+
+        self.assertEqual(DeliveryService().reap_stale_sending(), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, DeliveryStatus.FAILED)
+        self.assertLessEqual(stale.next_attempt_at, timezone.now())
+        self.assertEqual(fresh.status, DeliveryStatus.SENDING)
+
+        self.assertEqual(DeliveryService().retry_failed_deliveries(), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.attempts), (DeliveryStatus.SENT, 1))
+
+    def test_tradingview_webhook_defers_fanout_to_worker(self):
+        symbol = Symbol.objects.create(name="VNM", exchange="HSX")
+        PayUserSymbolLicense.objects.create(user=self.user, symbol_id=symbol.id)
+        UserEndpoint.objects.create(
+            user=self.user, channel=NotificationChannel.TELEGRAM, address="chat-1", verified=True
+        )
+        body = {
+            "Type": "BUY",
+            "TransId": 1,
+            "Action": "Open",
+            "botName": "bot",
+            "Symbol": "vnm",
+            "Price": 61.5,
+            "CheckDate": 1700000000000,
+        }
+
+        response = Client().post("/api/notifications/webhook/tradingview", body, content_type="application/json")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(NotificationDelivery.objects.exists())
+        self.assertEqual(Job.objects.filter(status=JobStatus.QUEUED).count(), 2)
+
+        fanout = JobService().run_next("worker-a")
+        backtest = JobService().run_next("worker-a")
+
+        self.assertEqual(fanout.kind, "notification.signal_fanout")
+        self.assertEqual((fanout.status, backtest.status), (JobStatus.SUCCEEDED, JobStatus.SUCCEEDED))
+        self.assertEqual(NotificationDelivery.objects.get().status, DeliveryStatus.SENT)
+        log = WebhookLog.objects.get(webhook_id=response.json()["webhook_id"])
+        self.assertEqual(log.users_notified, 1)
+        self.assertEqual(self.server.requests[-1][1], "/backtest")
+        self.assertEqual(self.server.requests[-1][2]["trans_id"], 1)
+
+    def test_signal_fanout_uses_bounded_queries(self):
+        symbol = Symbol.objects.create(name="HPG", exchange="HSX")
+        users = User.objects.bulk_create(
+            [User(username=f"sub-{i}", email=f"sub-{i}@example.com") for i in range(40)]
+        )
+        PayUserSymbolLicense.objects.bulk_create(
+            [PayUserSymbolLicense(user=user, symbol_id=symbol.id) for user in users]
+        )
+        UserEndpoint.objects.bulk_create(
+            [
+                UserEndpoint(user=user, channel=NotificationChannel.TELEGRAM, address=f"chat-{i}", verified=True)
+                for i, user in enumerate(users[:-2])
+            ]
+            + [UserEndpoint(user=users[-2], channel=NotificationChannel.TELEGRAM, address="bad-38", verified=True)]
+            + [UserEndpoint(user=users[0], channel=NotificationChannel.ZALO, address="zalo-0", verified=False)]
+        )
+        self.server.delay = 0
+
+        with CaptureQueriesContext(connection) as queries:
+            result = send_symbol_signal_to_subscribers(
+                symbol_id=symbol.id, symbol_name="HPG", signal_type="buy", price="25.1", timestamp="2026-10-19 09:15:00"
+            )
+
+        # Số query không phụ thuộc số subscriber
+        self.assertLessEqual(len(queries), 12)
+        self.assertEqual(result["total_users"], 40)
+        self.assertEqual(result["deliveries_sent"], 38)
+        # User cuối không có endpoint nên không tính vào sent/failed
+        self.assertEqual((result["sent_count"], result["failed_count"]), (38, 1))
+        self.assertEqual(NotificationEvent.objects.filter(event_type="symbol_signal", processed=True).count(), 40)
+        self.assertEqual(NotificationDelivery.objects.filter(status=DeliveryStatus.SENT).count(), 38)
+        self.assertEqual(len(self.server.requests), 39)
+
+
+class NotificationOutboxTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", email="buyer@example.com", password="pass12345")
+        UserEndpoint.objects.create(user=self.user, channel=NotificationChannel.TELEGRAM, address="chat-1", verified=True)
+
+    def test_order_signal_writes_outbox_and_relays_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            order = PaySymbolOrder.objects.create(user=self.user, total_amount=100000)
+            # Trong transaction chỉ có outbox, chưa có event/delivery
+            self.assertEqual(NotificationOutbox.objects.filter(processed_at__isnull=True).count(), 1)
+            self.assertFalse(NotificationEvent.objects.exists())
+
+        for callback in callbacks:
+            callback()
+
+        event = NotificationEvent.objects.get()
+        self.assertEqual((event.event_type, event.subject_id, event.processed), ("order_created", order.order_id, True))
+        self.assertEqual(NotificationDelivery.objects.get().status, DeliveryStatus.QUEUED)
+        self.assertFalse(NotificationOutbox.objects.filter(processed_at__isnull=True).exists())
+
+    def test_relay_batches_pending_entries(self):
+        for _ in range(5):
+            order = PaySymbolOrder.objects.create(user=self.user, total_amount=100000)
+        order.status = OrderStatus.PAID
+        order.save()
+
+        service = NotificationOutboxService()
+        self.assertEqual(service.relay(limit=4), 4)
+        self.assertEqual(service.relay_all(batch_size=4), 2)
+        self.assertEqual(NotificationEvent.objects.filter(event_type="payment_success").count(), 1)
+        self.assertEqual(NotificationDelivery.objects.count(), 6)
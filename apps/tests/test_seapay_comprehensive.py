@@ -4,16 +4,27 @@ from unittest.mock import patch, MagicMock
 import json
 import uuid
 
-from django.test import TestCase, Client
+import threading
+import time
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
 from django.urls import reverse
 
 from apps.seapay.models import (
     PayWallet,
     PayWalletLedger,
+    PayWalletCheckpoint,
     PayPaymentIntent,
+    PayPaymentAttempt,
     PayPayment,
+    PayBankTransaction,
+    PaySepayStatementLine,
+    PaySepayWebhookEvent,
     PaySymbolOrder,
     PaySymbolOrderItem,
     PaySymbolLicense,
@@ -24,9 +35,17 @@ from apps.seapay.models import (
     WalletTxType,
     LicenseStatus
 )
+from apps.seapay.repositories.payment_repository import PaymentRepository
 from apps.seapay.services.symbol_purchase_service import SymbolPurchaseService
-from apps.seapay.services.wallet_service import WalletService
+from apps.seapay.services.wallet_ledger_service import WalletLedgerService
+from apps.seapay.services.wallet_service import InsufficientBalanceError, WalletService
+from apps.seapay.services.intent_expiry_service import IntentExpiryService
+from apps.seapay.services.license_issuance_service import LicenseIssuanceService
 from apps.seapay.services.payment_service import PaymentService
+from apps.seapay.services.sepay_client import SepayClient
+from apps.seapay.services.statement_reconciliation_service import StatementReconciliationService
+from apps.seapay.services.webhook_inbox_service import SepayWebhookInboxService
+from apps.seapay.utils.cursor import encode_cursor
 from apps.stock.models import Symbol
 from apps.setting.models import (
     SymbolAutoRenewSubscription,
@@ -34,6 +53,7 @@ from apps.setting.models import (
     AutoRenewStatus,
     AutoRenewAttemptStatus,
 )
+from core.benchmark.payments import PaymentStressConfig, PaymentStressHarness
 
 User = get_user_model()
 
@@ -356,6 +376,41 @@ class SeaPaySymbolPurchaseTestCase(TestCase):
         self.assertTrue(access_info['has_access'])
         self.assertEqual(access_info['license_id'], str(license_obj.license_id))
         self.assertFalse(access_info['is_lifetime'])
+
+    def test_license_expiry_sweeper(self):
+        """check_symbol_access chỉ đọc; sweeper expire theo batch và ghi outbox"""
+        from apps.notification.models import NotificationOutbox
+        from apps.seapay.services.license_expiry_service import LicenseExpiryService
+
+        now = timezone.now()
+        expired = [
+            PaySymbolLicense.objects.create(
+                user=self.user, symbol_id=self.symbol.id, status=LicenseStatus.ACTIVE,
+                start_at=now - timedelta(days=40 + i), end_at=now - timedelta(days=i + 1),
+            )
+            for i in range(3)
+        ]
+        lifetime = PaySymbolLicense.objects.create(
+            user=self.user, symbol_id=self.symbol.id + 1, status=LicenseStatus.ACTIVE, is_lifetime=True
+        )
+
+        access_info = self.purchase_service.check_symbol_access(user=self.user, symbol_id=self.symbol.id)
+        self.assertEqual(access_info['reason'], "License expired")
+        self.assertEqual(PaySymbolLicense.objects.filter(status=LicenseStatus.EXPIRED).count(), 0)
+
+        result = LicenseExpiryService().expire_due(batch_size=2)
+
+        self.assertEqual(result, {"expired": 3, "batches": 2})
+        self.assertEqual(
+            set(PaySymbolLicense.objects.filter(status=LicenseStatus.EXPIRED).values_list('license_id', flat=True)),
+            {lic.license_id for lic in expired},
+        )
+        lifetime.refresh_from_db()
+        self.assertEqual(lifetime.status, LicenseStatus.ACTIVE)
+        outbox = NotificationOutbox.objects.filter(event_type='license_expired')
+        self.assertEqual(outbox.count(), 3)
+        self.assertEqual(outbox.first().payload['symbol'], self.symbol.name)
+        self.assertEqual(LicenseExpiryService().expire_due(), {"expired": 0, "batches": 0})
     
     def test_auto_renew_subscription_creation(self):
         """Test auto-renew subscription creation during purchase"""
@@ -471,6 +526,63 @@ class SeaPayAutoRenewTestCase(TestCase):
         self.assertEqual(attempt.status, AutoRenewAttemptStatus.FAILED)
         self.assertIn("Insufficient", attempt.error_message)
 
+    def test_auto_renew_batch_runner(self):
+        """Billing theo chunk: số query không tăng theo số subscription, license được gia hạn"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.notification.models import NotificationOutbox
+        from apps.setting.services.subscription_service import SymbolAutoRenewService
+
+        due = timezone.now() - timedelta(minutes=5)
+        symbols = [Symbol.objects.create(name=f"AR{i}", exchange="HSX") for i in range(6)]
+        license_end = timezone.now() + timedelta(hours=6)
+        PaySymbolLicense.objects.create(
+            user=self.user, symbol_id=symbols[0].id, status=LicenseStatus.ACTIVE, end_at=license_end
+        )
+        for symbol in symbols:
+            SymbolAutoRenewSubscription.objects.create(
+                user=self.user,
+                symbol_id=symbol.id,
+                status=AutoRenewStatus.ACTIVE,
+                price=Decimal('40000'),
+                cycle_days=30,
+                payment_method=PaymentMethod.WALLET,
+                next_billing_at=due,
+            )
+        poor = User.objects.create_user(username="poor", email="poor@example.com", password="poorpass123")
+        PayWallet.objects.create(user=poor, balance=Decimal('1000'), currency='VND', status='active')
+        poor_sub = SymbolAutoRenewSubscription.objects.create(
+            user=poor, symbol_id=symbols[0].id, status=AutoRenewStatus.ACTIVE,
+            price=Decimal('40000'), payment_method=PaymentMethod.WALLET, next_billing_at=due,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            result = SymbolAutoRenewService().run_due_subscriptions(chunk_size=4)
+
+        self.assertEqual((result['processed'], result['success'], result['failed']), (7, 6, 1))
+        self.assertEqual(result['chunks'], 2)
+        self.assertEqual(result['charged_amount'], '240000.00')
+        self.assertLess(len(queries), 50)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('60000'))
+        ledger = list(PayWalletLedger.objects.filter(wallet=self.wallet).order_by('balance_before'))
+        self.assertEqual(len(ledger), 6)
+        self.assertEqual(ledger[0].balance_after, Decimal('60000'))
+
+        extended = PaySymbolLicense.objects.get(user=self.user, symbol_id=symbols[0].id)
+        self.assertGreater(extended.end_at, timezone.now() + timedelta(days=29))
+        self.assertEqual(PaySymbolLicense.objects.filter(user=self.user, status=LicenseStatus.ACTIVE).count(), 6)
+        sub = SymbolAutoRenewSubscription.objects.get(user=self.user, symbol_id=symbols[0].id)
+        self.assertEqual(sub.current_license_id, extended.license_id)
+        self.assertGreater(sub.next_billing_at, timezone.now() + timedelta(days=29))
+        poor_sub.refresh_from_db()
+        self.assertEqual(poor_sub.status, AutoRenewStatus.CANCELLED)
+        self.assertEqual(NotificationOutbox.objects.filter(event_type='payment_success').count(), 6)
+
+        # Không còn gì tới hạn
+        self.assertEqual(SymbolAutoRenewService().run_due_subscriptions()['processed'], 0)
+
 
 class SeaPayAPITestCase(TestCase):
     """Test SeaPay API endpoints"""
@@ -640,6 +752,10 @@ class SeaPayWebhookTestCase(TestCase):
         )
         
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], 'Received')
+        
+        # Route chỉ ghi inbox; processor áp dụng giao dịch
+        SepayWebhookInboxService().process_pending()
         
         # Check intent updated
         intent.refresh_from_db()
@@ -681,8 +797,51 @@ class SeaPayWebhookTestCase(TestCase):
         # Should still return 200 but not process again
         self.assertEqual(response.status_code, 200)
         
-        data = response.json()
-        self.assertIn('already processed', data['message'].lower())
+        result = PaymentService().apply_sepay_transfer(webhook_payload)
+        self.assertIn('already processed', result['message'].lower())
+        self.assertFalse(PayWalletLedger.objects.filter(wallet__user=self.user).exists())
+    
+    def test_webhook_retries_ingested_and_applied_once(self):
+        """SePay gửi lại cùng id: một event trong inbox, ví chỉ được cộng một lần"""
+        PayPaymentIntent.objects.create(
+            user=self.user,
+            purpose='wallet_topup',
+            amount=Decimal('70000'),
+            status=IntentStatus.PENDING,
+            order_code='TOPUP1760000000ABCDEF01',
+            expires_at=timezone.now() + timedelta(hours=1)
+        )
+        webhook_payload = {
+            'id': 77777,
+            'gateway': 'BIDV',
+            'transactionDate': '2025-09-25 16:00:00',
+            'accountNumber': '12345678',
+            'content': 'MBVCB.123 TOPUP1760000000ABCDEF01 chuyen tien',
+            'transferType': 'in',
+            'transferAmount': 70000,
+            'referenceCode': 'FT25268001'
+        }
+        
+        messages = [
+            self.client.post(
+                '/api/sepay/webhook/', data=json.dumps(webhook_payload), content_type='application/json'
+            ).json()['message']
+            for _ in range(3)
+        ]
+        self.assertEqual(messages, ['Received', 'Duplicate', 'Duplicate'])
+        self.assertEqual(PaySepayWebhookEvent.objects.filter(sepay_tx_id=77777).count(), 1)
+        
+        service = SepayWebhookInboxService()
+        self.assertEqual(service.process_pending(), {'processed': 1, 'failed': 0})
+        self.assertEqual(service.process_pending(), {'processed': 0, 'failed': 0})
+        
+        event = PaySepayWebhookEvent.objects.get(sepay_tx_id=77777)
+        self.assertTrue(event.processed)
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(PayWallet.objects.get(user=self.user).balance, Decimal('70000'))
+        self.assertEqual(PayWalletLedger.objects.filter(wallet__user=self.user).count(), 1)
+        bank_tx = PayBankTransaction.objects.get(sepay_tx_id=77777)
+        self.assertIsNotNone(bank_tx.payment_id)
 
 
 class SeaPayErrorHandlingTestCase(TestCase):
@@ -767,6 +926,414 @@ class SeaPayErrorHandlingTestCase(TestCase):
         self.assertIn('expired', result['message'].lower())
 
 
+class PaymentIntentMatchKeyTestCase(TestCase):
+    """Khớp nội dung chuyển khoản với intent bằng một lookup match_key"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="matcher", email="matcher@example.com", password="x")
+        self.repository = PaymentRepository()
+
+    def _intent(self, order_code, status=PaymentStatus.REQUIRES_PAYMENT_METHOD):
+        return PayPaymentIntent.objects.create(
+            user=self.user,
+            purpose="wallet_topup",
+            amount=Decimal("100000"),
+            status=status,
+            order_code=order_code,
+        )
+
+    def test_match_any_format_in_one_query(self):
+        topup = self._intent("TOPUP1728216000ABCD1234")
+        pay = self._intent("PAY_1A2B3C4D_1728216000")
+        self.assertEqual(topup.match_key, "TOPUP1728216000ABCD1234")
+        self.assertEqual(pay.match_key, "PAY1A2B3C4D1728216000")
+
+        cases = {
+            "TOPUP1728216000ABCD1234": topup,
+            "MBVCB.123 topup_1728216000_abcd1234 FT24290": topup,
+            "PAY1A2B3C4D1728216000": pay,
+            "CT DEN: PAY 1A2B3C4D 1728216000 chuyen tien": pay,
+        }
+        for content, expected in cases.items():
+            with self.assertNumQueries(1):
+                self.assertEqual(self.repository.find_intent_by_transfer_content(content), expected, content)
+        self.assertIsNone(self.repository.find_intent_by_transfer_content("khong co ma"))
+
+    def test_pending_intent_preferred_and_unique(self):
+        self._intent("PAY_1A2B3C4D_1728216000", status=PaymentStatus.SUCCEEDED)
+        pending = self._intent("PAY1A2B3C4D1728216000")
+        self.assertEqual(self.repository.find_intent_by_transfer_content("PAY_1A2B3C4D_1728216000"), pending)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self._intent("pay-1a2b3c4d-1728216000")
+
+
+class EntitlementCacheTestCase(TestCase):
+    """Quyền truy cập symbol đọc từ cache theo user, xóa cache khi license đổi"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="viewer", email="viewer@example.com", password="x")
+        self.symbols = [Symbol.objects.create(name=name, exchange="HSX") for name in ("FPT", "VNM", "HPG")]
+        self.service = SymbolPurchaseService()
+
+    def test_warm_checks_cost_no_queries(self):
+        now = timezone.now()
+        PaySymbolLicense.objects.create(
+            user=self.user, symbol_id=self.symbols[0].id, start_at=now, end_at=now + timedelta(days=3)
+        )
+        PaySymbolLicense.objects.create(user=self.user, symbol_id=self.symbols[1].id, is_lifetime=True)
+
+        with self.assertNumQueries(1):
+            first = self.service.check_symbol_access(self.user, self.symbols[0].id)
+        self.assertTrue(first["has_access"])
+        self.assertTrue(first["expires_soon"])
+        self.assertEqual(first["symbol_name"], "FPT")
+
+        with self.assertNumQueries(0):
+            results = self.service.check_symbols_access(self.user, [symbol.id for symbol in self.symbols[:2]])
+        self.assertEqual([r["has_access"] for r in results], [True, True])
+        self.assertTrue(results[1]["is_lifetime"])
+
+        # Từ chối không dùng cache: đọc lại DB
+        with self.assertNumQueries(1):
+            results = self.service.check_symbols_access(self.user, [symbol.id for symbol in self.symbols])
+        self.assertEqual([r["has_access"] for r in results], [True, True, False])
+
+    def test_license_issued_elsewhere_visible_immediately(self):
+        symbol_id = self.symbols[2].id
+        self.assertFalse(self.service.check_symbol_access(self.user, symbol_id)["has_access"])
+
+        # Như license được cấp ở process khác (webhook worker): cache của process này không bị xóa
+        PaySymbolLicense.objects.bulk_create(
+            [PaySymbolLicense(user=self.user, symbol_id=symbol_id, start_at=timezone.now(), is_lifetime=True)]
+        )
+        self.assertTrue(self.service.check_symbol_access(self.user, symbol_id)["has_access"])
+
+    def test_cache_invalidated_on_license_changes(self):
+        symbol_id = self.symbols[2].id
+        self.assertFalse(self.service.check_symbol_access(self.user, symbol_id)["has_access"])
+
+        license_obj = PaySymbolLicense.objects.create(
+            user=self.user, symbol_id=symbol_id, end_at=timezone.now() + timedelta(days=30)
+        )
+        self.assertTrue(self.service.check_symbol_access(self.user, symbol_id)["has_access"])
+
+        # Sweeper dùng QuerySet.update, tự gọi invalidate_entitlements
+        from apps.seapay.services.license_expiry_service import LicenseExpiryService
+
+        LicenseExpiryService().expire_due(now=license_obj.end_at)
+        access = self.service.check_symbol_access(self.user, symbol_id)
+        self.assertEqual(access["reason"], "No active license found")
+
+
+class BulkLicenseIssuanceTestCase(TestCase):
+    """Cấp license cho đơn nhiều symbol với số câu SQL cố định"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="bundle", email="bundle@example.com", password="x")
+
+    def _order(self, symbol_ids, license_days=30):
+        order = PaySymbolOrder.objects.create(
+            user=self.user,
+            total_amount=Decimal("1000") * len(symbol_ids),
+            status=OrderStatus.PAID,
+            payment_method=PaymentMethod.WALLET,
+        )
+        PaySymbolOrderItem.objects.bulk_create(
+            [
+                PaySymbolOrderItem(order=order, symbol_id=symbol_id, price=Decimal("1000"), license_days=license_days)
+                for symbol_id in symbol_ids
+            ]
+        )
+        return order
+
+    def test_bundle_order_constant_statements(self):
+        now = timezone.now()
+        # Đã có license active cho symbol 1..10 (hết hạn sau 60 ngày) và subscription cho symbol 1..5
+        existing = {
+            symbol_id: PaySymbolLicense.objects.create(
+                user=self.user, symbol_id=symbol_id, start_at=now, end_at=now + timedelta(days=60)
+            )
+            for symbol_id in range(1, 11)
+        }
+        for symbol_id in range(1, 6):
+            SymbolAutoRenewSubscription.objects.create(
+                user=self.user, symbol_id=symbol_id, status=AutoRenewStatus.PAUSED, price=Decimal("500")
+            )
+        order = self._order(range(1, 51))
+
+        # items, licenses, subscriptions + bulk_create/bulk_update cho license và subscription
+        with self.assertNumQueries(7):
+            issued = LicenseIssuanceService().issue_for_order(order)
+
+        self.assertEqual(issued, 50)
+        licenses = PaySymbolLicense.objects.filter(user=self.user, status=LicenseStatus.ACTIVE)
+        self.assertEqual(licenses.count(), 50)
+        self.assertEqual(licenses.get(symbol_id=1).end_at, existing[1].end_at)
+        self.assertEqual(licenses.filter(order=order).count(), 50)
+        subscriptions = SymbolAutoRenewSubscription.objects.filter(user=self.user)
+        self.assertEqual(subscriptions.count(), 50)
+        self.assertEqual(subscriptions.get(symbol_id=1).price, Decimal("1000"))
+
+        # Mua lại trọn đời: license được chuyển thành trọn đời, không tạo thêm
+        LicenseIssuanceService().issue_for_order(self._order([1, 2], license_days=None))
+        self.assertEqual(PaySymbolLicense.objects.filter(user=self.user).count(), 50)
+        self.assertIsNone(PaySymbolLicense.objects.get(user=self.user, symbol_id=2).end_at)
+
+
+class IntentExpirySweeperTestCase(TestCase):
+    """Sweeper chuyển intent quá hạn sang EXPIRED theo batch"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="sweeper", email="sweeper@example.com", password="x")
+        now = timezone.now()
+        self.expired = [
+            PayPaymentIntent.objects.create(
+                user=self.user,
+                purpose="wallet_topup",
+                amount=Decimal("10000"),
+                order_code=f"TOPUP17600000{i:02d}AAAA00{i:02d}",
+                expires_at=now - timedelta(minutes=i + 1),
+            )
+            for i in range(5)
+        ]
+        self.live = PayPaymentIntent.objects.create(
+            user=self.user,
+            purpose="wallet_topup",
+            amount=Decimal("10000"),
+            order_code="TOPUP1760000099AAAA0099",
+            expires_at=now + timedelta(hours=1),
+        )
+        self.attempt = PayPaymentAttempt.objects.create(intent=self.expired[0], expires_at=now)
+
+    def test_expire_due_in_batches(self):
+        # Mỗi batch: savepoint, select, update intent, update attempt, release
+        with self.assertNumQueries(3 * 5):
+            result = IntentExpiryService().expire_due(batch_size=2)
+
+        self.assertEqual(result, {"expired": 5, "attempts": 1, "batches": 3})
+        statuses = dict(PayPaymentIntent.objects.values_list("intent_id", "status"))
+        self.assertTrue(all(statuses[intent.intent_id] == PaymentStatus.EXPIRED for intent in self.expired))
+        self.assertEqual(statuses[self.live.intent_id], PaymentStatus.REQUIRES_PAYMENT_METHOD)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, PaymentStatus.EXPIRED)
+
+        # Lần quét sau không còn gì
+        self.assertEqual(IntentExpiryService().expire_due(), {"expired": 0, "attempts": 0, "batches": 0})
+
+
+class HistoryKeysetPaginationTestCase(TestCase):
+    """Lịch sử đơn phân trang theo cursor (created_at, order_id)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="history", email="history@example.com", password="x")
+        PaySymbolOrder.objects.bulk_create(
+            [
+                PaySymbolOrder(user=self.user, total_amount=Decimal("1000"), status=OrderStatus.PAID)
+                for _ in range(25)
+            ]
+        )
+        # Một nửa trùng created_at: thứ tự phải ổn định nhờ order_id
+        PaySymbolOrder.objects.filter(
+            order_id__in=list(PaySymbolOrder.objects.values_list("order_id", flat=True)[:12])
+        ).update(created_at=timezone.now() - timedelta(days=1))
+
+    def test_cursor_walk_covers_all_orders_once(self):
+        service = SymbolPurchaseService()
+        seen, cursor, pages = [], None, 0
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                result = service.get_order_history(self.user, limit=10, cursor=cursor)
+            if pages:
+                # Trang sau: query seek + prefetch items, total lấy từ cache
+                self.assertEqual(len(queries), 2)
+            seen += [row["order_id"] for row in result["results"]]
+            self.assertEqual(result["total"], 25)
+            pages += 1
+            cursor = result["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(set(seen), {str(pk) for pk in PaySymbolOrder.objects.values_list("order_id", flat=True)})
+        # page cũ (OFFSET) cho cùng thứ tự
+        legacy = service.get_order_history(self.user, page=2, limit=10)
+        self.assertEqual([row["order_id"] for row in legacy["results"]], seen[10:20])
+
+        with self.assertRaises(ValueError):
+            service.get_order_history(self.user, cursor="not-a-cursor")
+        # Cursor đúng định dạng nhưng pk không phải UUID: vẫn là ValueError (400), không phải ValidationError (500)
+        with self.assertRaises(ValueError):
+            service.get_order_history(self.user, cursor=encode_cursor(timezone.now(), "not-a-uuid"))
+
+
+class StatementReconciliationTestCase(TestCase):
+    """Đối soát lịch sử giao dịch SePay (mock client) với inbox webhook"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="statement", email="statement@example.com", password="x")
+        for order_code in ("TOPUP1760000001AAAA0001", "TOPUP1760000002AAAA0002"):
+            PayPaymentIntent.objects.create(
+                user=self.user,
+                purpose="wallet_topup",
+                amount=Decimal("50000"),
+                status=PaymentStatus.REQUIRES_PAYMENT_METHOD,
+                order_code=order_code,
+                expires_at=timezone.now() + timedelta(hours=1),
+            )
+        self.client = SepayClient()
+        self.client.mock_transactions = [
+            {"id": 5001, "transferType": "in", "transferAmount": 50000, "content": "TOPUP1760000001AAAA0001"},
+            {"id": 5002, "transferType": "in", "transferAmount": 50000,
+             "content": "CT DEN:0123 topup 1760000002 aaaa0002", "referenceCode": "FT5002"},
+            {"id": 5003, "amount_in": "20000", "transaction_content": "chuyen nham", "reference_number": "FT5003"},
+            {"id": 5004, "transferType": "out", "transferAmount": 10000, "content": "phi"},
+        ]
+
+    def test_only_missing_transactions_replayed(self):
+        # 5001 đã tới qua webhook
+        SepayWebhookInboxService().ingest(dict(self.client.mock_transactions[0], referenceCode="FT5001"))
+
+        result = StatementReconciliationService(self.client).reconcile(page_size=3)
+
+        self.assertEqual(result, {"fetched": 4, "missing": 2, "replayed": 1, "unmatched": [5003]})
+        self.assertFalse(PaySepayStatementLine.objects.exists())
+        self.assertTrue(PaySepayWebhookEvent.objects.filter(sepay_tx_id=5002, processed=False).exists())
+
+        self.assertEqual(SepayWebhookInboxService().process_pending(), {"processed": 2, "failed": 0})
+        self.assertEqual(PayWallet.objects.get(user=self.user).balance, Decimal("100000"))
+
+        # Chạy lại: mọi giao dịch đã ghi nhận, không replay gì thêm
+        result = StatementReconciliationService(self.client).reconcile()
+        self.assertEqual(result["replayed"], 0)
+        self.assertEqual(result["unmatched"], [5003])
+
+
+class WalletLedgerCheckpointTestCase(TestCase):
+    """Checkpoint số dư theo ledger, đối soát hàng loạt và phân trang keyset của sổ cái"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="ledger", email="ledger@example.com", password="x")
+        self.wallet_service = WalletService()
+        self.ledger_service = WalletLedgerService()
+        self.wallet = self.wallet_service.get_or_create_wallet(self.user)
+        for amount in ("100", "250", "50"):
+            self.wallet_service.credit(self.wallet, Decimal(amount), WalletTxType.DEPOSIT)
+        self.wallet_service.debit(self.wallet, Decimal("120"), WalletTxType.PURCHASE)
+
+    def test_checkpoint_and_reconcile(self):
+        self.assertEqual(self.ledger_service.create_checkpoints(cutoff=timezone.now()), {"checkpoints": 1})
+        checkpoint = PayWalletCheckpoint.objects.get(wallet=self.wallet)
+        self.assertEqual(checkpoint.balance, Decimal("280"))
+        self.assertEqual(checkpoint.entry_count, 4)
+        # Không có ledger mới thì không tạo checkpoint mới
+        self.assertEqual(self.ledger_service.create_checkpoints(cutoff=timezone.now()), {"checkpoints": 0})
+
+        self.wallet_service.credit(self.wallet, Decimal("20"), WalletTxType.DEPOSIT)
+        self.assertEqual(self.ledger_service.reconcile()["discrepancies"], [])
+
+        PayWallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal("999"))
+        [drift] = self.ledger_service.reconcile()["discrepancies"]
+        self.assertEqual(drift["ledger_balance"], Decimal("300"))
+        self.assertEqual(drift["difference"], Decimal("699"))
+
+    def test_ledger_history_keyset_pages(self):
+        self.ledger_service.create_checkpoints(cutoff=timezone.now())
+        self.wallet_service.credit(self.wallet, Decimal("20"), WalletTxType.DEPOSIT)
+
+        seen, cursor = [], None
+        while True:
+            page = self.ledger_service.history(self.wallet, limit=2, cursor=cursor)
+            self.assertEqual(page["total"], 5)
+            seen.extend(entry.ledger_id for entry in page["results"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        with self.assertRaises(ValueError):
+            self.ledger_service.history(self.wallet, cursor="not-a-cursor")
+
+
+class WalletConcurrencyTestCase(TransactionTestCase):
+    """Stress test: nhiều thread credit/debit cùng một ví không mất update, không âm số dư"""
+
+    THREADS = 8
+    OPS_PER_THREAD = 25
+
+    def test_concurrent_credit_debit_no_lost_updates(self):
+        user = User.objects.create_user(username="stress", email="stress@example.com", password="x")
+        wallet = WalletService().get_or_create_wallet(user)
+        succeeded = {"credit": 0, "debit": 0, "rejected": 0}
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def worker(index):
+            service = WalletService()
+            start.wait()
+            try:
+                for op in range(self.OPS_PER_THREAD):
+                    is_credit = (index + op) % 2 == 0
+                    while True:
+                        try:
+                            if is_credit:
+                                service.credit(PayWallet(pk=wallet.pk), Decimal("100"), WalletTxType.DEPOSIT)
+                                outcome = "credit"
+                            else:
+                                service.debit(PayWallet(pk=wallet.pk), Decimal("150"), WalletTxType.PURCHASE)
+                                outcome = "debit"
+                        except InsufficientBalanceError:
+                            outcome = "rejected"
+                        except OperationalError:
+                            # SQLite test DB serialize writer bằng lỗi "locked": thử lại
+                            time.sleep(0.001)
+                            continue
+                        break
+                    with lock:
+                        succeeded[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        wallet.refresh_from_db()
+        expected = Decimal("100") * succeeded["credit"] - Decimal("150") * succeeded["debit"]
+        self.assertEqual(sum(succeeded.values()), self.THREADS * self.OPS_PER_THREAD)
+        self.assertEqual(wallet.balance, expected)
+        self.assertGreaterEqual(wallet.balance, 0)
+
+        entries = list(PayWalletLedger.objects.filter(wallet=wallet))
+        self.assertEqual(len(entries), succeeded["credit"] + succeeded["debit"])
+        # Ledger là nguồn sự thật: tổng biến động khớp số dư, mỗi dòng có before/after nhất quán
+        self.assertEqual(sum(e.amount if e.is_credit else -e.amount for e in entries), wallet.balance)
+        self.assertTrue(all(e.balance_after >= 0 for e in entries))
+
+
+
+class PaymentStressHarnessTestCase(TransactionTestCase):
+    """Harness benchmark_payments: trộn đủ loại thao tác và bất biến sổ cái giữ được (1 thread trên SQLite)"""
+
+    def test_mixed_operations_keep_ledger_invariants(self):
+        cache.clear()
+        harness = PaymentStressHarness(PaymentStressConfig(users=3, symbols=5, threads=1, operations=60))
+        harness.seed()
+        report = harness.run()
+
+        self.assertEqual(report["invariants"], {"ok": True, "violations": [], "violation_count": 0})
+        self.assertEqual(report["operations"], 60)
+        self.assertEqual(report["errors"], {})
+        self.assertTrue(all(row["count"] for row in report["by_operation"].values()))
+        self.assertGreater(report["outcomes"].get("duplicate_webhook:deduped", 0), 0)
+        self.assertIsNone(report["deadlocks"])
+
+
 # Run all tests
 if __name__ == '__main__':
     import unittest
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     "apps.seapay",
     "apps.logs.apps.LogsConfig",
     "apps.notification.apps.NotificationConfig",
+    "apps.jobs.apps.JobsConfig",
     "core",
 ]
 
@@ -128,7 +129,9 @@ NINJA_PAGINATION_PER_PAGE = 20
 NINJA_MAX_PER_PAGE_SIZE = 100
 NINJA_PAGINATION_MAX_LIMIT = 100
 NINJA_NUM_PROXIES = 0
-NINJA_DEFAULT_THROTTLE_RATES = {}
+NINJA_DEFAULT_THROTTLE_RATES = {
+    "log_ingest": os.getenv("LOG_INGEST_THROTTLE_RATE", "60/m"),
+}
 NINJA_FIX_REQUEST_FILES_METHODS = ['PUT', 'PATCH']
 
 # Google OAuth (configure via .env)
@@ -143,6 +146,45 @@ JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
 JWT_ACCESS_TTL_MIN = int(os.getenv("JWT_ACCESS_TTL_MIN", "60"))
 JWT_REFRESH_TTL_DAYS = int(os.getenv("JWT_REFRESH_TTL_DAYS", "30"))
 
+# Số record tối đa cho một request POST /logs/logs/batch
+LOG_BATCH_MAX_RECORDS = int(os.getenv("LOG_BATCH_MAX_RECORDS", "500"))
+
+# Job queue (apps.jobs): job running quá số giây này không heartbeat sẽ bị trả lại hàng đợi
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+
+# Scheduler (run_scheduler): chu kỳ kiểm tra lịch và các schedule bị tắt (tên, phân cách dấu phẩy)
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "5"))
+SCHEDULER_DISABLED = [name.strip() for name in os.getenv("SCHEDULER_DISABLED", "").split(",") if name.strip()]
+
+# Đối soát sao kê SePay (seapay.reconcile_statement): số giờ lịch sử giao dịch được kéo về mỗi lần chạy
+SEPAY_RECONCILE_LOOKBACK_HOURS = int(os.getenv("SEPAY_RECONCILE_LOOKBACK_HOURS", "48"))
+
+# Cache quyền truy cập symbol theo user (seapay entitlement): thời gian sống tối đa của một entry (giây).
+# Chỉ kết quả có quyền dùng cache; đây là độ trễ tối đa khi license bị thu hồi ở process khác
+ENTITLEMENT_CACHE_SECONDS = int(os.getenv("ENTITLEMENT_CACHE_SECONDS", "60"))
+
+# Phân trang lịch sử (order / license / payment intent): thời gian cache tổng số bản ghi (giây)
+PAGINATION_COUNT_CACHE_SECONDS = int(os.getenv("PAGINATION_COUNT_CACHE_SECONDS", "60"))
+
+# Resume một ImportRun đang running chỉ khi checkpoint cuối đã cũ hơn số giây này (process cũ coi như đã chết).
+# Mặc định bằng JOB_STALE_SECONDS: job import được requeue lúc đó thì resume được ngay
+IMPORT_RUN_STALE_SECONDS = int(os.getenv("IMPORT_RUN_STALE_SECONDS", str(JOB_STALE_SECONDS)))
+
+# Import chia shard: lease của một shard, hết hạn mà không gia hạn thì worker khác nhận lại
+IMPORT_SHARD_LEASE_SECONDS = int(os.getenv("IMPORT_SHARD_LEASE_SECONDS", "120"))
+IMPORT_SHARD_MAX_ATTEMPTS = int(os.getenv("IMPORT_SHARD_MAX_ATTEMPTS", "3"))
+
+# Tín hiệu TradingView được forward sang backtest qua job notification.backtest_forward (có retry)
+BACKTEST_WEBHOOK_URL = os.getenv("BACKTEST_WEBHOOK_URL", "https://backtest.togogo.vn/api/v10/BackTest/wh")
+
+# Retry notification deliveries: backoff lũy thừa có jitter, quá số lần thì chuyển dead letter
+NOTIFICATION_RETRY_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_RETRY_MAX_ATTEMPTS", "6"))
+NOTIFICATION_RETRY_BASE_SECONDS = int(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", "30"))
+NOTIFICATION_RETRY_MAX_DELAY_SECONDS = int(os.getenv("NOTIFICATION_RETRY_MAX_DELAY_SECONDS", "3600"))
+# Delivery ở sending quá lâu (dispatcher chết giữa chừng) thì bị trả về failed để retry
+NOTIFICATION_SENDING_STALE_SECONDS = int(os.getenv("NOTIFICATION_SENDING_STALE_SECONDS", "600"))
+
 
 LOGGING = {
     "version": 1,
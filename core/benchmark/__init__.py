@@ -0,0 +1,4 @@
+"""
+Bộ benchmark offline: seed dữ liệu giả lập và đo latency / số query của các endpoint chính.
+Chạy qua management command `benchmark_api`.
+"""
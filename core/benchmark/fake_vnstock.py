@@ -0,0 +1,362 @@
+"""
+Fake vnstock provider có tính tất định để benchmark pipeline import mà không gọi mạng.
+
+Cung cấp các bề mặt `Listing`, `Company`, `Finance` (và VCI explorer dùng cho shareholders)
+mà `VNStockClient`, `VnstockImportService`, `FetchService` và `calculate.vnstock.VNStock` sử dụng.
+Có thể cấu hình latency, tỉ lệ lỗi và tỉ lệ rate-limit (raise SystemExit như vnstock thật).
+"""
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+from unittest import mock
+
+import pandas as pd
+
+from core.benchmark.seed import _symbol_name
+
+# Giữ tham chiếu gốc để latency giả lập không bị tính vào các wrapper đo sleep
+_real_sleep = time.sleep
+
+ICB_INDUSTRIES = 40
+
+
+@dataclass
+class FakeProviderConfig:
+    symbols: int = 1600
+    exchange: str = "HSX"
+    years: int = 10
+    quarters: int = 4
+    shareholders: int = 5
+    officers: int = 4
+    events: int = 3
+    subsidiaries: int = 2
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    seed: int = 42
+
+
+@dataclass
+class FakeProviderStats:
+    calls: int = 0
+    errors: int = 0
+    rate_limits: int = 0
+    latency_seconds: float = 0.0
+    calls_by_method: Dict[str, int] = field(default_factory=dict)
+
+
+class _KeyRecorder(dict):
+    """Ghi lại mọi key mà mapper đọc để sinh đúng cột DataFrame."""
+
+    def __init__(self):
+        super().__init__()
+        self.keys: List[Any] = []
+
+    def get(self, key, default=None):
+        self.keys.append(key)
+        return 1
+
+
+def _mapper_columns(mapper_name: str) -> List[Any]:
+    from apps.calculate.services.financial_service import CalculateService
+
+    recorder = _KeyRecorder()
+    getattr(CalculateService, mapper_name)(None, None, recorder)
+    return recorder.keys
+
+
+class FakeVnstockProvider:
+    """
+    Sinh dữ liệu theo (seed, symbol, method) nên cùng cấu hình luôn trả về cùng dữ liệu.
+    Lỗi và rate-limit được quyết định bởi một RNG riêng theo thứ tự call.
+    """
+
+    def __init__(self, config: FakeProviderConfig):
+        self.config = config
+        self.stats = FakeProviderStats()
+        self.symbols = [_symbol_name(i) for i in range(config.symbols)]
+        self._fault_rng = random.Random(f"{config.seed}:faults")
+        self._lock = threading.Lock()
+        self._statement_columns: Dict[str, List[Any]] = {}
+
+    # ------------------------------------------------------------------ hooks
+    def _call(self, method: str, symbol: str = "") -> random.Random:
+        """
+        Áp latency + fault injection cho một call, trả về RNG tất định cho dữ liệu.
+        Chỉ inject lỗi cho call theo mã: call listing toàn sàn không có retry trong service,
+        lỗi ở đó sẽ dừng cả lần import trước khi đo được gì.
+        """
+        cfg = self.config
+        with self._lock:
+            self.stats.calls += 1
+            self.stats.calls_by_method[method] = self.stats.calls_by_method.get(method, 0) + 1
+            roll_rate_limit = self._fault_rng.random()
+            roll_error = self._fault_rng.random()
+            jitter = self._fault_rng.uniform(-1, 1) * cfg.latency_jitter_ms
+
+        delay = max(0.0, (cfg.latency_ms + jitter) / 1000)
+        if delay:
+            _real_sleep(delay)
+            with self._lock:
+                self.stats.latency_seconds += delay
+
+        if not symbol:
+            return random.Random(f"{cfg.seed}::{method}")
+        if roll_rate_limit < cfg.rate_limit_rate:
+            with self._lock:
+                self.stats.rate_limits += 1
+            raise SystemExit("Bạn đã gửi quá nhiều request tới máy chủ. Vui lòng thử lại sau 36 giây.")
+        if roll_error < cfg.error_rate:
+            with self._lock:
+                self.stats.errors += 1
+            raise ConnectionError(f"Injected provider error for {method} {symbol}")
+
+        return random.Random(f"{cfg.seed}:{symbol}:{method}")
+
+    # --------------------------------------------------------------- datasets
+    def symbols_by_exchange(self) -> pd.DataFrame:
+        self._call("listing.symbols_by_exchange")
+        return pd.DataFrame(
+            {"symbol": self.symbols, "exchange": [self.config.exchange] * len(self.symbols), "type": "STOCK"}
+        )
+
+    def industries_icb(self) -> pd.DataFrame:
+        self._call("listing.industries_icb")
+        return pd.DataFrame(
+            {
+                "icb_code": [str(8000 + i) for i in range(ICB_INDUSTRIES)],
+                "icb_name": [f"Fake Industry {i}" for i in range(ICB_INDUSTRIES)],
+                "level": [1 + i % 4 for i in range(ICB_INDUSTRIES)],
+            }
+        )
+
+    def symbols_by_industries(self) -> pd.DataFrame:
+        self._call("listing.symbols_by_industries")
+        return pd.DataFrame(
+            {
+                "symbol": self.symbols,
+                "icb_code1": [str(8000 + i % ICB_INDUSTRIES) for i in range(len(self.symbols))],
+                "icb_code2": [str(8000 + (i * 7) % ICB_INDUSTRIES) for i in range(len(self.symbols))],
+            }
+        )
+
+    def overview(self, symbol: str, source: str) -> pd.DataFrame:
+        rng = self._call(f"company.overview.{source}", symbol)
+        return pd.DataFrame(
+            [
+                {
+                    "symbol": symbol,
+                    "issue_share": rng.randint(10**6, 10**9),
+                    "outstanding_share": rng.randint(10**6, 10**9),
+                    "foreign_percent": round(rng.uniform(0, 0.49), 4),
+                    "established_year": rng.randint(1990, 2020),
+                    "no_employees": rng.randint(10, 20000),
+                    "stock_rating": round(rng.uniform(1, 5), 1),
+                    "website": f"https://{symbol.lower()}.example.com",
+                    "delta_in_week": round(rng.uniform(-0.1, 0.1), 4),
+                    "delta_in_month": round(rng.uniform(-0.2, 0.2), 4),
+                    "delta_in_year": round(rng.uniform(-0.5, 0.5), 4),
+                    "company_profile": f"{symbol} fake profile",
+                    "history": f"{symbol} fake history",
+                    "financial_ratio_issue_share": rng.randint(10**6, 10**9),
+                    "charter_capital": rng.randint(10**9, 10**12),
+                }
+            ]
+        )
+
+    def profile(self, symbol: str) -> pd.DataFrame:
+        self._call("company.profile", symbol)
+        return pd.DataFrame([{"symbol": symbol, "company_name": f"Fake Company {symbol}"}])
+
+    def shareholders(self, symbol: str) -> pd.DataFrame:
+        rng = self._call("company.shareholders", symbol)
+        return pd.DataFrame(
+            [
+                {
+                    "share_holder": f"Holder {j} {symbol}",
+                    "quantity": rng.randint(1000, 10**8),
+                    "share_own_percent": round(rng.uniform(0, 20), 4),
+                    "update_date": "2024-12-31",
+                }
+                for j in range(self.config.shareholders)
+            ]
+        )
+
+    def officers(self, symbol: str) -> pd.DataFrame:
+        rng = self._call("company.officers", symbol)
+        return pd.DataFrame(
+            [
+                {
+                    "officer_name": f"Officer {j} {symbol}",
+                    "officer_position": "Director",
+                    "position_short_name": "DIR",
+                    "officer_owner_percent": round(rng.uniform(0, 5), 4),
+                }
+                for j in range(self.config.officers)
+            ]
+        )
+
+    def events(self, symbol: str) -> pd.DataFrame:
+        self._call("company.events", symbol)
+        return pd.DataFrame(
+            [
+                {
+                    "event_title": f"Event {j} {symbol}",
+                    "public_date": f"2024-{1 + j % 12:02d}-15",
+                    "issue_date": f"2024-{1 + j % 12:02d}-20",
+                    "source_url": f"https://events.example.com/{symbol}/{j}",
+                }
+                for j in range(self.config.events)
+            ]
+        )
+
+    def subsidiaries(self, symbol: str) -> pd.DataFrame:
+        rng = self._call("company.subsidiaries", symbol)
+        return pd.DataFrame(
+            [
+                {"sub_company_name": f"Sub {j} {symbol}", "sub_own_percent": round(rng.uniform(10, 100), 2)}
+                for j in range(self.config.subsidiaries)
+            ]
+        )
+
+    def news(self, symbol: str) -> pd.DataFrame:
+        self._call("company.news", symbol)
+        return pd.DataFrame()
+
+    def statement(self, symbol: str, kind: str) -> pd.DataFrame:
+        mapper_by_kind = {
+            "balance_sheet": "_map_balance_sheet_data",
+            "income_statement": "_map_income_statement_data",
+            "cash_flow": "_map_cash_flow_data",
+            "ratio": "_map_ratio_data",
+        }
+        if kind not in self._statement_columns:
+            self._statement_columns[kind] = _mapper_columns(mapper_by_kind[kind])
+        columns = self._statement_columns[kind]
+
+        rng = self._call(f"finance.{kind}", symbol)
+        current_year = 2025
+        rows = []
+        for year in range(current_year - self.config.years, current_year):
+            for quarter in range(1, self.config.quarters + 1):
+                row = {}
+                for col in columns:
+                    name = col[1] if isinstance(col, tuple) else col
+                    if name == "yearReport":
+                        row[col] = year
+                    elif name == "lengthReport":
+                        row[col] = quarter
+                    else:
+                        row[col] = rng.randint(-5_000_000, 50_000_000)
+                rows.append(row)
+        return pd.DataFrame(rows, columns=columns)
+
+    # ------------------------------------------------------------ vnstock API
+    def listing_class(self):
+        provider = self
+
+        class Listing:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def symbols_by_exchange(self, *args, **kwargs):
+                return provider.symbols_by_exchange()
+
+            def industries_icb(self, *args, **kwargs):
+                return provider.industries_icb()
+
+            def symbols_by_industries(self, *args, **kwargs):
+                return provider.symbols_by_industries()
+
+        return Listing
+
+    def company_class(self):
+        provider = self
+
+        class Company:
+            def __init__(self, symbol: str = "", source: str = "TCBS", *args, **kwargs):
+                self.symbol = symbol.upper()
+                self.source = source
+
+            def overview(self):
+                return provider.overview(self.symbol, self.source)
+
+            def profile(self):
+                return provider.profile(self.symbol)
+
+            def shareholders(self):
+                return provider.shareholders(self.symbol)
+
+            def officers(self, *args, **kwargs):
+                return provider.officers(self.symbol)
+
+            def events(self):
+                return provider.events(self.symbol)
+
+            def subsidiaries(self, *args, **kwargs):
+                return provider.subsidiaries(self.symbol)
+
+            def news(self, *args, **kwargs):
+                return provider.news(self.symbol)
+
+        return Company
+
+    def finance_class(self):
+        provider = self
+
+        class Finance:
+            def __init__(self, symbol: str = "", source: str = "VCI", *args, **kwargs):
+                self.symbol = symbol.upper()
+
+            def balance_sheet(self, *args, **kwargs):
+                return provider.statement(self.symbol, "balance_sheet")
+
+            def income_statement(self, *args, **kwargs):
+                return provider.statement(self.symbol, "income_statement")
+
+            def cash_flow(self, *args, **kwargs):
+                return provider.statement(self.symbol, "cash_flow")
+
+            def ratio(self, *args, **kwargs):
+                return provider.statement(self.symbol, "ratio")
+
+        return Finance
+
+    def explorer_company_class(self):
+        provider = self
+
+        class VCIExplorerCompany:
+            def __init__(self, symbol: str = "", *args, **kwargs):
+                self.symbol = symbol.upper()
+                self.raw_data = None
+
+            def _process_data(self, raw_data, key):
+                return provider.shareholders(self.symbol)
+
+        return VCIExplorerCompany
+
+    @contextmanager
+    def install(self):
+        """Thay các class vnstock ở mọi module đang import trực tiếp chúng."""
+        listing_cls = self.listing_class()
+        company_cls = self.company_class()
+        finance_cls = self.finance_class()
+        targets = {
+            "apps.stock.clients.vnstock_client.Listing": listing_cls,
+            "apps.stock.clients.vnstock_client.VNCompany": company_cls,
+            "apps.stock.clients.vnstock_client.VCIExplorerCompany": self.explorer_company_class(),
+            "apps.stock.services.vnstock_import_service.Listing": listing_cls,
+            "apps.stock.services.vnstock_import_service.Company": company_cls,
+            "apps.stock.services.fetch_service.VNCompany": company_cls,
+            "apps.calculate.vnstock.Listing": listing_cls,
+            "apps.calculate.vnstock.Company": company_cls,
+            "apps.calculate.vnstock.Finance": finance_cls,
+        }
+        with ExitStack() as stack:
+            for target, replacement in targets.items():
+                stack.enter_context(mock.patch(target, replacement))
+            yield self
@@ -0,0 +1,400 @@
+"""
+Stress harness cho đường tiền seapay: nhiều thread trộn webhook nạp tiền, webhook gửi lại (trùng),
+mua symbol bằng ví và auto-renew trên một nhóm ví nhỏ để tạo tranh chấp lock, rồi kiểm tra bất biến sổ cái.
+Lock wait và deadlock lấy từ pg_stat_activity / pg_stat_database nên chỉ có số liệu trên PostgreSQL.
+"""
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from apps.seapay.models import (
+    IntentPurpose,
+    PaymentMethod,
+    PaymentStatus,
+    PayPaymentIntent,
+    PaySepayWebhookEvent,
+    PayWallet,
+    PayWalletLedger,
+    WalletTxType,
+)
+from apps.seapay.services.payment_service import PaymentService
+from apps.seapay.services.symbol_purchase_service import SymbolPurchaseService
+from apps.seapay.services.wallet_ledger_service import WalletLedgerService
+from apps.seapay.services.webhook_inbox_service import SepayWebhookInboxService
+from apps.setting.models import AutoRenewStatus, SymbolAutoRenewSubscription
+from apps.setting.services.subscription_service import SymbolAutoRenewService
+from apps.stock.models import Symbol
+
+from .runner import percentile
+
+User = get_user_model()
+
+OP_TOPUP = "topup_webhook"
+OP_DUPLICATE = "duplicate_webhook"
+OP_PURCHASE = "wallet_purchase"
+OP_AUTORENEW = "autorenew"
+DEADLOCK_SQLSTATE = "40P01"
+DEADLOCK_RETRIES = 3
+
+
+@dataclass
+class PaymentStressConfig:
+    users: int = 20
+    symbols: int = 50
+    threads: int = 16
+    operations: int = 2000
+    topup_weight: int = 4
+    duplicate_weight: int = 2
+    purchase_weight: int = 3
+    autorenew_weight: int = 1
+    topup_amount: Decimal = Decimal("100000")
+    symbol_price: Decimal = Decimal("30000")
+    # Số event inbox mỗi thread tự xử lý sau khi ingest (như worker chạy song song với route)
+    process_batch: int = 5
+    autorenew_batch: int = 5
+    lock_sample_ms: int = 20
+    seed: int = 42
+
+
+@dataclass
+class OperationStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, wall: float) -> Dict[str, Any]:
+        return {
+            "count": len(self.latencies_ms),
+            "errors": self.errors,
+            "ops_per_sec": round(len(self.latencies_ms) / wall, 2) if wall else 0.0,
+            "p50_ms": round(percentile(self.latencies_ms, 50), 3),
+            "p95_ms": round(percentile(self.latencies_ms, 95), 3),
+            "p99_ms": round(percentile(self.latencies_ms, 99), 3),
+        }
+
+
+def is_deadlock(exc: BaseException) -> bool:
+    cause = exc.__cause__
+    return DEADLOCK_SQLSTATE in (getattr(cause, "sqlstate", None), getattr(cause, "pgcode", None))
+
+
+class LockWaitSampler:
+    """
+    Thread riêng đếm session đang chờ lock (pg_stat_activity.wait_event_type = 'Lock') mỗi `interval`;
+    tổng số mẫu * interval ~ tổng thời gian chờ lock của mọi session. Không làm gì ngoài PostgreSQL.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.waiter_seconds = 0.0
+        self.max_waiters = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if connection.vendor != "postgresql":
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            with connection.cursor() as cursor:
+                while not self._stop.wait(self.interval):
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+                    )
+                    waiters = cursor.fetchone()[0]
+                    self.waiter_seconds += waiters * self.interval
+                    self.max_waiters = max(self.max_waiters, waiters)
+        finally:
+            connection.close()
+
+
+def server_deadlocks() -> Optional[int]:
+    """Bộ đếm deadlock của database hiện tại (PostgreSQL), None với backend khác"""
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()")
+        return cursor.fetchone()[0]
+
+
+class PaymentStressHarness:
+    def __init__(self, config: PaymentStressConfig):
+        self.config = config
+        self.user_ids: List[int] = []
+        self.symbol_ids: List[int] = []
+        self.sent_payloads: List[Dict[str, Any]] = []
+        self.stats: Dict[str, OperationStats] = {
+            name: OperationStats() for name in (OP_TOPUP, OP_DUPLICATE, OP_PURCHASE, OP_AUTORENEW)
+        }
+        self.error_types: Dict[str, int] = {}
+        self.outcomes: Dict[str, int] = {}
+        self.deadlock_retries = 0
+        self._lock = threading.Lock()
+        self._tx_ids = count(9_000_000_001)
+        self._ops = count()
+
+    # ------------------------------------------------------------------
+    # Seed
+    # ------------------------------------------------------------------
+    def seed(self) -> None:
+        """Ví bắt đầu từ 0 và chỉ đổi qua các thao tác, để chuỗi balance_before/after kiểm được từ đầu"""
+        password = make_password(None)
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [
+                    User(username=f"stress_pay_{i}", email=f"stress_pay_{i}@example.com", password=password)
+                    for i in range(self.config.users)
+                ]
+            )
+            users = list(User.objects.filter(username__startswith="stress_pay_").order_by("id"))
+            PayWallet.objects.bulk_create([PayWallet(user=user, balance=Decimal("0")) for user in users])
+            Symbol.objects.bulk_create(
+                [Symbol(name=f"STRESS{i}", exchange="HSX") for i in range(self.config.symbols)]
+            )
+        self.user_ids = [user.id for user in users]
+        self.symbol_ids = list(Symbol.objects.filter(name__startswith="STRESS").values_list("id", flat=True))
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+    def run(self) -> Dict[str, Any]:
+        config = self.config
+        sampler = LockWaitSampler(config.lock_sample_ms / 1000)
+        deadlocks_before = server_deadlocks()
+        start = threading.Barrier(config.threads)
+        threads = [
+            threading.Thread(target=self._worker, args=(index, start), name=f"stress-{index}")
+            for index in range(config.threads)
+        ]
+
+        sampler.start()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        sampler.stop()
+
+        # Xả inbox: event còn lại do processor của thread khác đang giữ lúc thread kết thúc
+        inbox = SepayWebhookInboxService()
+        while sum(inbox.process_pending().values()):
+            pass
+
+        deadlocks_after = server_deadlocks()
+        operations = sum(len(stats.latencies_ms) for stats in self.stats.values())
+        return {
+            "meta": {
+                **{key: str(value) if isinstance(value, Decimal) else value for key, value in asdict(config).items()},
+                "vendor": connection.vendor,
+            },
+            "wall_seconds": round(wall, 3),
+            "operations": operations,
+            "ops_per_sec": round(operations / wall, 2) if wall else 0.0,
+            "by_operation": {name: stats.summary(wall) for name, stats in self.stats.items()},
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "errors": dict(sorted(self.error_types.items())),
+            "deadlock_retries": self.deadlock_retries,
+            "deadlocks": deadlocks_after - deadlocks_before if deadlocks_before is not None else None,
+            "lock_wait_seconds": round(sampler.waiter_seconds, 3) if sampler.active else None,
+            "max_lock_waiters": sampler.max_waiters if sampler.active else None,
+            "invariants": self.check_invariants(),
+        }
+
+    def _worker(self, index: int, start: threading.Barrier) -> None:
+        rng = random.Random(self.config.seed + index)
+        ops = {
+            OP_TOPUP: self._topup,
+            OP_DUPLICATE: self._duplicate,
+            OP_PURCHASE: self._purchase,
+            OP_AUTORENEW: self._autorenew,
+        }
+        weights = [
+            self.config.topup_weight,
+            self.config.duplicate_weight,
+            self.config.purchase_weight,
+            self.config.autorenew_weight,
+        ]
+        try:
+            start.wait()
+            while next(self._ops) < self.config.operations:
+                name = rng.choices(list(ops), weights)[0]
+                self._timed(name, ops[name], rng)
+        finally:
+            connection.close()
+
+    def _timed(self, name: str, op: Callable[[random.Random], str], rng: random.Random) -> None:
+        """Deadlock được retry như client thật (tối đa DEADLOCK_RETRIES), lỗi khác chỉ được đếm"""
+        stats = self.stats[name]
+        for attempt in range(DEADLOCK_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                outcome = op(rng)
+            except DatabaseError as exc:
+                if is_deadlock(exc) and attempt < DEADLOCK_RETRIES:
+                    with self._lock:
+                        self.deadlock_retries += 1
+                    continue
+                self._record(stats, started, error=exc)
+            except Exception as exc:
+                self._record(stats, started, error=exc)
+            else:
+                self._record(stats, started, outcome=f"{name}:{outcome}")
+            return
+
+    def _record(self, stats: OperationStats, started: float, outcome: str = "", error: Exception = None) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats.latencies_ms.append(elapsed_ms)
+            if error is not None:
+                stats.errors += 1
+                key = type(error).__name__
+                self.error_types[key] = self.error_types.get(key, 0) + 1
+            else:
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+    def _topup(self, rng: random.Random) -> str:
+        """Route webhook: tạo intent nạp ví, SePay báo chuyển khoản, inbox ingest rồi processor chạy"""
+        user = User(pk=rng.choice(self.user_ids))
+        intent = PaymentService().create_payment_intent(
+            user=user, purpose=IntentPurpose.WALLET_TOPUP, amount=self.config.topup_amount
+        )
+        tx_id = next(self._tx_ids)
+        payload = {
+            "id": tx_id,
+            "gateway": "STRESS",
+            "transactionDate": timezone.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "accountNumber": "0000000000",
+            "content": intent.order_code,
+            "transferType": "in",
+            "transferAmount": int(self.config.topup_amount),
+            "referenceCode": f"FT{tx_id}",
+        }
+        inbox = SepayWebhookInboxService()
+        inbox.ingest(payload)
+        with self._lock:
+            self.sent_payloads.append(payload)
+        inbox.process_pending(limit=self.config.process_batch)
+        return "sent"
+
+    def _duplicate(self, rng: random.Random) -> str:
+        """
+        SePay gửi lại một webhook đã gửi: qua inbox (phải bị dedupe) và áp dụng thẳng như callback cũ,
+        có thể đua với processor đang xử lý chính event đó. Không được cộng tiền lần hai.
+        """
+        with self._lock:
+            payload = rng.choice(self.sent_payloads) if self.sent_payloads else None
+        if payload is None:
+            return "skipped"
+        accepted = SepayWebhookInboxService().ingest(payload)["accepted"]
+        PaymentService().process_sepay_webhook(payload)
+        return "accepted" if accepted else "deduped"
+
+    def _purchase(self, rng: random.Random) -> str:
+        user = User.objects.get(pk=rng.choice(self.user_ids))
+        result = SymbolPurchaseService().create_symbol_order(
+            user,
+            [
+                {
+                    "symbol_id": rng.choice(self.symbol_ids),
+                    "price": self.config.symbol_price,
+                    "license_days": 30,
+                    "auto_renew": True,
+                }
+            ],
+            PaymentMethod.WALLET,
+        )
+        return "insufficient" if isinstance(result, dict) and result.get("insufficient_balance") else "paid"
+
+    def _autorenew(self, rng: random.Random) -> str:
+        """Cho vài subscription active tới hạn (giả lập thời gian trôi) rồi chạy billing như scheduler"""
+        due = list(
+            SymbolAutoRenewSubscription.objects.filter(
+                user_id__in=rng.sample(self.user_ids, min(len(self.user_ids), self.config.autorenew_batch)),
+                status=AutoRenewStatus.ACTIVE,
+            ).values_list("pk", flat=True)[: self.config.autorenew_batch]
+        )
+        if due:
+            SymbolAutoRenewSubscription.objects.filter(pk__in=due).update(next_billing_at=timezone.now())
+        result = SymbolAutoRenewService().run_due_subscriptions(
+            limit=self.config.autorenew_batch, chunk_size=self.config.autorenew_batch
+        )
+        return "charged" if result["success"] else "idle"
+
+    # ------------------------------------------------------------------
+    # Invariants
+    # ------------------------------------------------------------------
+    def check_invariants(self) -> Dict[str, Any]:
+        violations: List[str] = []
+
+        # 1. Số dư ví = tổng sổ cái
+        for row in WalletLedgerService().reconcile()["discrepancies"]:
+            violations.append(f"wallet {row['wallet_id']}: balance {row['balance']} != ledger {row['ledger_balance']}")
+
+        # 2. Không cộng tiền trùng: mỗi intent nạp ví đúng một bút toán, tổng nạp = tổng intent succeeded
+        deposits = PayWalletLedger.objects.filter(tx_type=WalletTxType.DEPOSIT)
+        for row in deposits.values("metadata__intent_id").annotate(n=Count("pk")).filter(n__gt=1):
+            violations.append(f"intent {row['metadata__intent_id']} credited {row['n']} times")
+        succeeded = PayPaymentIntent.objects.filter(purpose=IntentPurpose.WALLET_TOPUP, status=PaymentStatus.SUCCEEDED)
+        credited = deposits.aggregate(total=Sum("amount"))["total"] or Decimal("0")
+        expected = succeeded.aggregate(total=Sum("amount"))["total"] or Decimal("0")
+        if credited != expected:
+            violations.append(f"deposits {credited} != succeeded top-up intents {expected}")
+        sent = len({payload["id"] for payload in self.sent_payloads})
+        if succeeded.count() != sent:
+            violations.append(f"{sent} top-up transfers sent but {succeeded.count()} intents succeeded")
+        pending_events = PaySepayWebhookEvent.objects.filter(processed=False).count()
+        if pending_events:
+            violations.append(f"{pending_events} webhook events left unprocessed")
+
+        # 3. Chuỗi balance_before/after: mỗi dòng đổi đúng amount, và (không phụ thuộc thứ tự created_at
+        #    trùng nhau) multiset balance_before = {0} + multiset balance_after - {số dư cuối}
+        balances = dict(PayWallet.objects.filter(user_id__in=self.user_ids).values_list("pk", "balance"))
+        chains: Dict[Any, Dict[str, List[Decimal]]] = {}
+        rows = PayWalletLedger.objects.filter(wallet_id__in=balances).values_list(
+            "wallet_id", "amount", "is_credit", "balance_before", "balance_after"
+        )
+        for wallet_id, amount, is_credit, before, after in rows:
+            if after - before != (amount if is_credit else -amount):
+                violations.append(f"wallet {wallet_id}: entry {before} -> {after} does not move {amount}")
+            if after < 0:
+                violations.append(f"wallet {wallet_id}: negative balance_after {after}")
+            chain = chains.setdefault(wallet_id, {"before": [], "after": []})
+            chain["before"].append(before)
+            chain["after"].append(after)
+        for wallet_id, balance in balances.items():
+            chain = chains.get(wallet_id, {"before": [], "after": []})
+            starts = sorted([Decimal("0"), *chain["after"]])
+            if balance not in starts:
+                violations.append(f"wallet {wallet_id}: final balance {balance} is not the end of its ledger chain")
+                continue
+            starts.remove(balance)
+            if sorted(chain["before"]) != starts:
+                violations.append(f"wallet {wallet_id}: balance_before/after chain is broken")
+
+        return {"ok": not violations, "violations": violations[:50], "violation_count": len(violations)}
@@ -0,0 +1,169 @@
+"""
+Đo pipeline import (VnstockImportService, CalculateService) trên fake provider:
+thời gian DB, thời gian chờ rate limiter, thời gian sleep/backoff và số dòng ghi được.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable
+from unittest import mock
+
+from django.db import connection
+
+from apps.stock.services import rate_limiter
+
+SLEEP_RATE_LIMITER = "rate_limiter"
+SLEEP_BACKOFF = "backoff"
+
+
+class QueryTimer:
+    """execute_wrapper cộng dồn thời gian và số query của connection hiện tại."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class SleepRecorder:
+    """
+    Thay `time.sleep` để ghi lại thời gian service *muốn* ngủ, tách riêng phần của
+    rate limiter và phần backoff/sleep khác; chỉ ngủ thật `scale` lần thời gian đó.
+    Rate limiter nhận một đồng hồ ảo cộng thêm phần sleep bị nén để cửa sổ
+    calls/phút vẫn trôi như khi chạy thật.
+    """
+
+    def __init__(self, scale: float = 0.0):
+        self.scale = scale
+        self.requested: Dict[str, float] = {SLEEP_RATE_LIMITER: 0.0, SLEEP_BACKOFF: 0.0}
+        self.actual = 0.0
+        self._skipped = 0.0
+        self._lock = threading.Lock()
+        self._real_sleep = time.sleep
+        self._real_time = time.time
+
+    def _sleep(self, bucket: str, seconds: float) -> None:
+        seconds = max(seconds, 0.0)
+        scaled = seconds * self.scale
+        with self._lock:
+            self.requested[bucket] += seconds
+            self._skipped += seconds - scaled
+        if scaled:
+            started = time.perf_counter()
+            self._real_sleep(scaled)
+            self.actual += time.perf_counter() - started
+
+    def virtual_time(self) -> float:
+        return self._real_time() + self._skipped
+
+    @contextmanager
+    def install(self):
+        limiter_time = SimpleNamespace(
+            time=self.virtual_time,
+            sleep=lambda seconds: self._sleep(SLEEP_RATE_LIMITER, seconds),
+        )
+        with mock.patch("time.sleep", lambda seconds: self._sleep(SLEEP_BACKOFF, seconds)), mock.patch.object(
+            rate_limiter, "time", limiter_time
+        ):
+            yield self
+
+
+@dataclass
+class PhaseResult:
+    name: str
+    symbols: int = 0
+    wall_seconds: float = 0.0
+    db_seconds: float = 0.0
+    db_queries: int = 0
+    sleep_requested: Dict[str, float] = field(default_factory=dict)
+    sleep_actual_seconds: float = 0.0
+    provider_calls: int = 0
+    provider_latency_seconds: float = 0.0
+    provider_errors: int = 0
+    provider_rate_limits: int = 0
+    rows_written: Dict[str, int] = field(default_factory=dict)
+    service_result: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        wall = self.wall_seconds or 1e-9
+        total_rows = sum(self.rows_written.values())
+        limiter_wait = self.sleep_requested.get(SLEEP_RATE_LIMITER, 0.0)
+        backoff = self.sleep_requested.get(SLEEP_BACKOFF, 0.0)
+        # Thời gian "thật" nếu các sleep không bị nén: wall - sleep thật + sleep được yêu cầu
+        projected = wall - self.sleep_actual_seconds + limiter_wait + backoff
+        return {
+            "symbols": self.symbols,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "projected_seconds": round(projected, 3),
+            "symbols_per_sec": round(self.symbols / wall, 2),
+            "rows_written": self.rows_written,
+            "rows_per_sec": round(total_rows / wall, 2),
+            "db_seconds": round(self.db_seconds, 3),
+            "db_queries": self.db_queries,
+            "db_share": round(self.db_seconds / wall, 4),
+            "provider_calls": self.provider_calls,
+            "provider_latency_seconds": round(self.provider_latency_seconds, 3),
+            "provider_errors": self.provider_errors,
+            "provider_rate_limits": self.provider_rate_limits,
+            "rate_limiter_wait_seconds": round(limiter_wait, 3),
+            "rate_limiter_share": round(limiter_wait / projected, 4) if projected else 0.0,
+            "backoff_sleep_seconds": round(backoff, 3),
+            "backoff_share": round(backoff / projected, 4) if projected else 0.0,
+        }
+
+
+def table_counts(models: Iterable) -> Dict[str, int]:
+    return {model._meta.db_table: model.objects.count() for model in models}
+
+
+def run_phase(
+    name: str,
+    call: Callable[[], Dict[str, Any]],
+    provider,
+    sleep_recorder: SleepRecorder,
+    models: Iterable,
+    symbols: int,
+) -> PhaseResult:
+    """Chạy một phase import và trừ counters trước/sau để ra số liệu riêng của phase."""
+    models = list(models)
+    before_rows = table_counts(models)
+    before_sleep = dict(sleep_recorder.requested)
+    before_actual = sleep_recorder.actual
+    before_stats = (
+        provider.stats.calls,
+        provider.stats.latency_seconds,
+        provider.stats.errors,
+        provider.stats.rate_limits,
+    )
+
+    timer = QueryTimer()
+    started = time.perf_counter()
+    with connection.execute_wrapper(timer):
+        service_result = call() or {}
+    wall = time.perf_counter() - started
+
+    after_rows = table_counts(models)
+    return PhaseResult(
+        name=name,
+        symbols=symbols,
+        wall_seconds=wall,
+        db_seconds=timer.seconds,
+        db_queries=timer.queries,
+        sleep_requested={k: sleep_recorder.requested[k] - before_sleep.get(k, 0.0) for k in sleep_recorder.requested},
+        sleep_actual_seconds=sleep_recorder.actual - before_actual,
+        provider_calls=provider.stats.calls - before_stats[0],
+        provider_latency_seconds=provider.stats.latency_seconds - before_stats[1],
+        provider_errors=provider.stats.errors - before_stats[2],
+        provider_rate_limits=provider.stats.rate_limits - before_stats[3],
+        rows_written={table: after_rows[table] - before_rows[table] for table in after_rows},
+        service_result={k: v for k, v in service_result.items() if not isinstance(v, (list, dict))},
+    )
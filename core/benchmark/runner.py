@@ -0,0 +1,148 @@
+"""
+Đo latency và số query cho từng endpoint qua Django test client,
+tính p50/p95/p99 và so sánh với baseline JSON.
+"""
+import json
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+import requests
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile theo nearest-rank; danh sách rỗng trả về 0."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class EndpointStats:
+    name: str
+    latencies_ms: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    errors: int = 0
+    status_codes: Dict[int, int] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": len(self.latencies_ms),
+            "errors": self.errors,
+            "p50_ms": round(percentile(self.latencies_ms, 50), 3),
+            "p95_ms": round(percentile(self.latencies_ms, 95), 3),
+            "p99_ms": round(percentile(self.latencies_ms, 99), 3),
+            "mean_ms": round(sum(self.latencies_ms) / len(self.latencies_ms), 3) if self.latencies_ms else 0.0,
+            "queries_p50": percentile(self.queries, 50),
+            "queries_max": max(self.queries) if self.queries else 0,
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+        }
+
+
+class EndpointBenchmark:
+    """
+    Chạy từng kịch bản `iterations` lần (sau `warmup` lần bỏ qua),
+    mỗi lần đo thời gian và đếm query bằng CaptureQueriesContext.
+    """
+
+    def __init__(self, iterations: int = 50, warmup: int = 3):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.results: Dict[str, EndpointStats] = {}
+
+    def run(self, name: str, call: Callable[[int], Any], expected_status: int = 200) -> EndpointStats:
+        stats = EndpointStats(name=name)
+        for i in range(self.warmup):
+            call(i)
+
+        for i in range(self.iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = call(self.warmup + i)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+
+            stats.latencies_ms.append(elapsed_ms)
+            stats.queries.append(len(ctx.captured_queries))
+            status = getattr(response, "status_code", 200)
+            stats.status_codes[status] = stats.status_codes.get(status, 0) + 1
+            if status != expected_status:
+                stats.errors += 1
+
+        self.results[name] = stats
+        return stats
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.summary() for name, stats in self.results.items()}
+
+
+def compare_with_baseline(
+    current: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    latency_tolerance: float = 0.2,
+) -> List[str]:
+    """
+    So sánh với baseline: p95 tăng quá `latency_tolerance` (tỉ lệ) hoặc
+    số query tối đa tăng đều bị tính là regression.
+    """
+    regressions = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + latency_tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now["queries_max"] > before["queries_max"]:
+            regressions.append(f"{name}: queries {before['queries_max']} -> {now['queries_max']}")
+    return regressions
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path: str, report: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+
+
+def _offline_request(session, method, url, *args, **kwargs) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = b'{"ok": true, "result": {"message_id": 1}}'
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+@contextmanager
+def offline_http():
+    """Chặn mọi HTTP ra ngoài qua `requests` (backtest, Telegram...) và trả về 200."""
+    with mock.patch.object(requests.sessions.Session, "request", _offline_request):
+        yield
+
+
+@contextmanager
+def throwaway_database():
+    """Tạo test DB riêng cho benchmark và luôn huỷ nó khi xong."""
+    setup_test_environment()
+    old_db_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    try:
+        yield connection.settings_dict["NAME"]
+    finally:
+        connection.creation.destroy_test_db(old_db_name, verbosity=0, keepdb=False)
+        teardown_test_environment()
@@ -0,0 +1,278 @@
+"""
+Seed một thị trường giả lập (deterministic theo seed) để benchmark.
+Tất cả ghi bằng bulk_create để seed 1.600 mã trong vài chục giây.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import models, transaction
+from django.utils import timezone
+
+from apps.calculate.models import BalanceSheet, CashFlow, IncomeStatement, Ratio
+from apps.logs.models import LogEntry
+from apps.notification.models import NotificationChannel, UserEndpoint
+from apps.seapay.models import LicenseStatus, PayUserSymbolLicense, PayWallet
+from apps.stock.models import Company, Events, Industry, News, ShareHolder, Symbol
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+EXCHANGES = ("HSX", "HNX", "UPCOM")
+STATEMENT_MODELS = (CashFlow, IncomeStatement, BalanceSheet, Ratio)
+LOG_LEVELS = ("info", "info", "info", "warning", "error")
+LOG_CHANNELS = ("web", "payment", "app", "queue")
+
+
+@dataclass
+class SeedConfig:
+    symbols: int = 1600
+    years: int = 10
+    quarters: int = 4
+    users: int = 200
+    licenses_per_user: int = 5
+    hot_symbol_subscribers: int = 50
+    shareholders_per_company: int = 5
+    news_per_company: int = 3
+    events_per_company: int = 3
+    logs: int = 20000
+    seed: int = 42
+
+
+@dataclass
+class SeedResult:
+    symbol_ids: List[int] = field(default_factory=list)
+    hot_symbol_name: str = ""
+    user_ids: List[int] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def _symbol_name(index: int) -> str:
+    """Sinh mã 3-4 ký tự duy nhất: AAA, AAB, ..."""
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    chars = []
+    value = index
+    for _ in range(3):
+        chars.append(letters[value % 26])
+        value //= 26
+    name = "".join(reversed(chars))
+    return name if value == 0 else f"{letters[value % 26]}{name}"
+
+
+def _random_statement_values(model, rng: random.Random) -> Dict[str, object]:
+    """Điền giá trị ngẫu nhiên cho mọi cột số (nullable) của báo cáo tài chính."""
+    values = {}
+    for f in model._meta.concrete_fields:
+        if f.name in ("id", "year_report", "length_report") or not f.null:
+            continue
+        if isinstance(f, models.BigIntegerField):
+            values[f.name] = rng.randint(-5_000_000, 50_000_000)
+        elif isinstance(f, models.DecimalField):
+            values[f.name] = Decimal(str(round(rng.uniform(-100, 100), 4)))
+        elif isinstance(f, models.FloatField):
+            values[f.name] = round(rng.uniform(-50, 50), 3)
+    return values
+
+
+def _seed_market(config: SeedConfig, rng: random.Random, result: SeedResult) -> List[Symbol]:
+    industries = Industry.objects.bulk_create(
+        [Industry(id=900000 + i, name=f"Bench Industry {i}", level=1 + i % 4) for i in range(40)],
+        ignore_conflicts=True,
+    )
+
+    Company.objects.bulk_create(
+        [
+            Company(
+                company_name=f"Bench Company {_symbol_name(i)}",
+                company_profile="Synthetic company for benchmarking",
+                issue_share=rng.randint(10**6, 10**9),
+                charter_capital=rng.randint(10**9, 10**12),
+                outstanding_share=float(rng.randint(10**6, 10**9)),
+                foreign_percent=round(rng.uniform(0, 0.49), 4),
+                established_year=rng.randint(1990, 2020),
+                no_employees=rng.randint(10, 20000),
+                website=f"https://{_symbol_name(i).lower()}.example.com",
+            )
+            for i in range(config.symbols)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    companies = list(Company.objects.filter(company_name__startswith="Bench Company ").order_by("id"))
+
+    Symbol.objects.bulk_create(
+        [
+            Symbol(name=_symbol_name(i), exchange=EXCHANGES[i % len(EXCHANGES)], company=companies[i])
+            for i in range(config.symbols)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    symbols = list(Symbol.objects.filter(company__in=companies).order_by("id"))
+
+    symbol_industries = Symbol.industries.through
+    symbol_industries.objects.bulk_create(
+        [
+            symbol_industries(symbol_id=symbol.id, industry_id=industries[i % len(industries)].id)
+            for i, symbol in enumerate(symbols)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    now = timezone.now()
+    shareholders, news, events = [], [], []
+    for company in companies:
+        for j in range(config.shareholders_per_company):
+            shareholders.append(
+                ShareHolder(
+                    share_holder=f"Holder {j} of {company.id}",
+                    quantity=rng.randint(1000, 10**8),
+                    share_own_percent=Decimal(str(round(rng.uniform(0, 20), 4))),
+                    update_date=now.date(),
+                    company=company,
+                )
+            )
+        for j in range(config.news_per_company):
+            news.append(
+                News(
+                    title=f"News {j} for {company.company_name}",
+                    public_date=int((now - timedelta(days=j)).timestamp()),
+                    price_change_pct=Decimal(str(round(rng.uniform(-7, 7), 2))),
+                    company=company,
+                )
+            )
+        for j in range(config.events_per_company):
+            events.append(
+                Events(
+                    event_title=f"Event {j} for {company.company_name}",
+                    public_date=now - timedelta(days=30 * j),
+                    company=company,
+                )
+            )
+    ShareHolder.objects.bulk_create(shareholders, batch_size=BATCH_SIZE)
+    News.objects.bulk_create(news, batch_size=BATCH_SIZE)
+    Events.objects.bulk_create(events, batch_size=BATCH_SIZE)
+
+    result.counts.update(
+        companies=len(companies),
+        symbols=len(symbols),
+        shareholders=len(shareholders),
+        news=len(news),
+        events=len(events),
+    )
+    return symbols
+
+
+def _seed_financials(config: SeedConfig, rng: random.Random, symbols: List[Symbol], result: SeedResult) -> None:
+    current_year = timezone.now().year
+    for model in STATEMENT_MODELS:
+        rows = []
+        total = 0
+        for symbol in symbols:
+            for year in range(current_year - config.years, current_year):
+                for quarter in range(1, config.quarters + 1):
+                    rows.append(
+                        model(
+                            symbol_id=symbol.id,
+                            year_report=year,
+                            length_report=quarter,
+                            **_random_statement_values(model, rng),
+                        )
+                    )
+            if len(rows) >= BATCH_SIZE:
+                model.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+                total += len(rows)
+                rows = []
+        if rows:
+            model.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            total += len(rows)
+        result.counts[model._meta.db_table] = total
+
+
+def _seed_billing(config: SeedConfig, rng: random.Random, symbols: List[Symbol], result: SeedResult) -> None:
+    password = make_password(None)
+    User.objects.bulk_create(
+        [
+            User(username=f"bench_user_{i}", email=f"bench_user_{i}@example.com", password=password)
+            for i in range(config.users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    users = list(User.objects.filter(username__startswith="bench_user_").order_by("id"))
+    result.user_ids = [user.id for user in users]
+
+    PayWallet.objects.bulk_create(
+        [PayWallet(user=user, balance=Decimal("1000000000000.00")) for user in users],
+        batch_size=BATCH_SIZE,
+    )
+    UserEndpoint.objects.bulk_create(
+        [
+            UserEndpoint(
+                user=user,
+                channel=NotificationChannel.TELEGRAM,
+                address=str(100000 + user.id),
+                is_primary=True,
+                verified=True,
+            )
+            for user in users
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    now = timezone.now()
+    hot_symbol = symbols[0]
+    licenses = []
+    for index, user in enumerate(users):
+        picked = {hot_symbol.id} if index < config.hot_symbol_subscribers else set()
+        while len(picked) < config.licenses_per_user:
+            picked.add(rng.choice(symbols).id)
+        for symbol_id in picked:
+            licenses.append(
+                PayUserSymbolLicense(
+                    user=user,
+                    symbol_id=symbol_id,
+                    status=LicenseStatus.ACTIVE,
+                    start_at=now - timedelta(days=rng.randint(1, 20)),
+                    end_at=now + timedelta(days=rng.randint(5, 60)),
+                )
+            )
+    PayUserSymbolLicense.objects.bulk_create(licenses, batch_size=BATCH_SIZE)
+
+    result.hot_symbol_name = hot_symbol.name
+    result.counts.update(users=len(users), wallets=len(users), licenses=len(licenses))
+
+
+def _seed_logs(config: SeedConfig, rng: random.Random, result: SeedResult) -> None:
+    environment = "benchmark"
+    rows = []
+    for i in range(config.logs):
+        user_id = rng.choice(result.user_ids) if result.user_ids and i % 3 else None
+        rows.append(
+            LogEntry(
+                level=rng.choice(LOG_LEVELS),
+                channel=rng.choice(LOG_CHANNELS),
+                message=f"Client request /api/stocks/symbols/{i % max(len(result.symbol_ids), 1)}",
+                context={"user_id": user_id, "path": "/api/stocks/symbols/"},
+                environment=environment,
+                user_id=user_id,
+            )
+        )
+    LogEntry.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    result.counts["logs"] = len(rows)
+
+
+def seed_market(config: SeedConfig) -> SeedResult:
+    """Seed toàn bộ dữ liệu benchmark và trả về các id cần cho kịch bản."""
+    rng = random.Random(config.seed)
+    result = SeedResult()
+
+    with transaction.atomic():
+        symbols = _seed_market(config, rng, result)
+        result.symbol_ids = [symbol.id for symbol in symbols]
+        _seed_financials(config, rng, symbols, result)
+        _seed_billing(config, rng, symbols, result)
+        _seed_logs(config, rng, result)
+
+    return result
@@ -0,0 +1,184 @@
+"""
+Management command benchmark các endpoint chính trên dữ liệu giả lập
+Chạy: python manage.py benchmark_api --output benchmark_baseline.json
+      python manage.py benchmark_api --compare benchmark_baseline.json
+"""
+import contextlib
+import io
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from core.benchmark.runner import (
+    EndpointBenchmark,
+    compare_with_baseline,
+    load_baseline,
+    offline_http,
+    save_baseline,
+    throwaway_database,
+)
+from core.benchmark.seed import SeedConfig, seed_market
+from core.jwt_auth import create_tokens
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic market in a throwaway database and benchmark hot API endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', type=int, default=1600, help='Number of symbols to seed (default: 1600)')
+        parser.add_argument('--years', type=int, default=10, help='Years of financial statements per symbol')
+        parser.add_argument('--quarters', type=int, default=4, help='Reports per year per statement')
+        parser.add_argument('--users', type=int, default=200, help='Users with wallets and licenses')
+        parser.add_argument('--logs', type=int, default=20000, help='Log rows to seed')
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per endpoint')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for deterministic data')
+        parser.add_argument('--output', type=str, default=None, help='Write the JSON report/baseline here')
+        parser.add_argument('--compare', type=str, default=None, help='Baseline JSON to compare against')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed p95 increase ratio before flagging a regression (default: 0.2)'
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error when a regression is detected'
+        )
+
+    def handle(self, *args, **options):
+        config = SeedConfig(
+            symbols=options['symbols'],
+            years=options['years'],
+            quarters=options['quarters'],
+            users=options['users'],
+            logs=options['logs'],
+            seed=options['seed'],
+        )
+
+        with throwaway_database(), override_settings(
+            JWT_SECRET=settings.JWT_SECRET or 'benchmark-secret',
+            JWT_ALGORITHM=settings.JWT_ALGORITHM or 'HS256',
+            TELEGRAM_BOT_TOKEN=getattr(settings, 'TELEGRAM_BOT_TOKEN', None) or 'benchmark-token',
+        ):
+            report = self._run(config, options)
+
+        self._print_report(report['endpoints'])
+
+        if options['output']:
+            save_baseline(options['output'], report)
+            self.stdout.write(self.style.SUCCESS(f"Saved report to {options['output']}"))
+
+        if options['compare']:
+            baseline = load_baseline(options['compare'])
+            if baseline is None:
+                raise CommandError(f"Baseline not found: {options['compare']}")
+            regressions = compare_with_baseline(
+                report['endpoints'], baseline.get('endpoints', {}), options['tolerance']
+            )
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+            else:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(f'REGRESSION {line}'))
+                if options['fail_on_regression']:
+                    raise CommandError(f'{len(regressions)} regression(s) detected')
+
+    def _run(self, config: SeedConfig, options) -> dict:
+        self.stdout.write(f'Seeding {config.symbols} symbols into {connection.settings_dict["NAME"]}...')
+        started = time.perf_counter()
+        seeded = seed_market(config)
+        seed_seconds = time.perf_counter() - started
+        self.stdout.write(f'Seeded in {seed_seconds:.1f}s: {json.dumps(seeded.counts)}')
+
+        client = Client()
+        symbol_ids = seeded.symbol_ids
+        user_tokens = [create_tokens(user_id)[0] for user_id in seeded.user_ids]
+
+        def symbol_id_at(i):
+            return symbol_ids[(i * 7919) % len(symbol_ids)]
+
+        def auth_at(i):
+            return {'HTTP_AUTHORIZATION': f'Bearer {user_tokens[i % len(user_tokens)]}'}
+
+        def tradingview_payload(i):
+            return {
+                'Type': 'BUY' if i % 2 == 0 else 'SELL',
+                'TransId': 1000 + i,
+                'Action': 'Open',
+                'botName': 'benchmark-bot',
+                'Symbol': seeded.hot_symbol_name,
+                'Price': 25.5,
+                'CheckDate': int(time.time() * 1000),
+            }
+
+        def wallet_order(i):
+            return {
+                'items': [{'symbol_id': symbol_id_at(i + 1), 'price': '100000', 'license_days': 30}],
+                'payment_method': 'wallet',
+            }
+
+        scenarios = [
+            ('stocks_symbol_detail', lambda i: client.get(f'/api/stocks/symbols/{symbol_id_at(i)}')),
+            ('stocks_stats', lambda i: client.get('/api/stocks/stats')),
+            ('calculate_cashflows', lambda i: client.get(f'/api/calculate/cashflows/{symbol_id_at(i)}')),
+            ('calculate_incomes', lambda i: client.get(f'/api/calculate/incomes/{symbol_id_at(i)}')),
+            ('calculate_balances', lambda i: client.get(f'/api/calculate/balances/{symbol_id_at(i)}')),
+            ('calculate_ratios', lambda i: client.get(f'/api/calculate/ratios/{symbol_id_at(i)}')),
+            ('sepay_symbol_licenses', lambda i: client.get('/api/sepay/symbol/licenses', **auth_at(i))),
+            (
+                'tradingview_webhook',
+                lambda i: client.post(
+                    '/api/notifications/webhook/tradingview',
+                    json.dumps(tradingview_payload(i)),
+                    content_type='application/json',
+                ),
+            ),
+            (
+                'wallet_payment',
+                lambda i: client.post(
+                    '/api/sepay/symbol/orders/',
+                    json.dumps(wallet_order(i)),
+                    content_type='application/json',
+                    **auth_at(i),
+                ),
+            ),
+        ]
+
+        # Webhook chỉ enqueue job fan-out nên trả 202 Accepted
+        expected_statuses = {'tradingview_webhook': 202}
+
+        bench = EndpointBenchmark(iterations=options['iterations'], warmup=options['warmup'])
+        # Endpoint in/print rất nhiều ra stdout; gom lại để báo cáo dễ đọc
+        with offline_http(), contextlib.redirect_stdout(io.StringIO()):
+            for name, call in scenarios:
+                bench.run(name, call, expected_status=expected_statuses.get(name, 200))
+
+        return {
+            'meta': {
+                'vendor': connection.vendor,
+                'seed_seconds': round(seed_seconds, 2),
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'seed_config': config.__dict__,
+                'seed_counts': seeded.counts,
+            },
+            'endpoints': bench.report(),
+        }
+
+    def _print_report(self, endpoints: dict) -> None:
+        header = f"{'endpoint':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}{'errors':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in endpoints.items():
+            line = (
+                f"{name:<26}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+                f"{row['queries_max']:>10}{row['errors']:>8}"
+            )
+            style = self.style.ERROR if row['errors'] else self.style.SUCCESS
+            self.stdout.write(style(line))
@@ -0,0 +1,164 @@
+"""
+Management command benchmark pipeline import trên fake vnstock provider (không gọi mạng)
+Chạy: python manage.py benchmark_import --symbols 1600 --output import_baseline.json
+      python manage.py benchmark_import --symbols 200 --latency-ms 50 --rate-limit-rate 0.01
+"""
+import contextlib
+import io
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from apps.calculate.models import BalanceSheet, CashFlow, IncomeStatement, Ratio
+from apps.calculate.services.financial_service import CalculateService
+from apps.calculate.vnstock import VNStock
+from apps.stock.models import Company, Events, Industry, Officers, ShareHolder, SubCompany, Symbol
+from apps.stock.services import rate_limiter
+from apps.stock.services.vnstock_import_service import VnstockImportService
+from core.benchmark.fake_vnstock import FakeProviderConfig, FakeVnstockProvider
+from core.benchmark.pipeline import SleepRecorder, run_phase
+from core.benchmark.runner import save_baseline, throwaway_database
+
+STOCK_MODELS = (Symbol, Company, Industry, Symbol.industries.through, ShareHolder, Officers, Events, SubCompany)
+FINANCIAL_MODELS = (BalanceSheet, IncomeStatement, CashFlow, Ratio)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the vnstock import pipeline against a deterministic fake provider'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', type=int, default=1600, help='Symbols served by the fake provider')
+        parser.add_argument('--exchange', type=str, default='HSX', help='Exchange to import (default: HSX)')
+        parser.add_argument('--years', type=int, default=10, help='Years of financial statements per symbol')
+        parser.add_argument('--quarters', type=int, default=4, help='Reports per year per statement')
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Simulated latency per provider call')
+        parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random +/- jitter on the latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Probability a provider call raises')
+        parser.add_argument(
+            '--rate-limit-rate',
+            type=float,
+            default=0.0,
+            help='Probability a provider call raises SystemExit like vnstock rate limiting'
+        )
+        parser.add_argument('--calls-per-minute', type=int, default=30, help='Rate limiter calls per minute')
+        parser.add_argument('--calls-per-hour', type=int, default=500, help='Rate limiter calls per hour')
+        parser.add_argument('--min-interval', type=float, default=2.5, help='Rate limiter minimum interval (s)')
+        parser.add_argument('--per-symbol-sleep', type=float, default=0.5, help='VnstockImportService per_symbol_sleep')
+        parser.add_argument('--sleep-between-symbols', type=float, default=1, help='CalculateService sleep (s)')
+        parser.add_argument(
+            '--sleep-scale',
+            type=float,
+            default=0.0,
+            help='Fraction of requested sleeps actually slept; the rest is only accounted (default: 0)'
+        )
+        parser.add_argument('--skip-financials', action='store_true', help='Only run the stock import phase')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for deterministic data')
+        parser.add_argument('--output', type=str, default=None, help='Write the JSON report here')
+
+    def handle(self, *args, **options):
+        config = FakeProviderConfig(
+            symbols=options['symbols'],
+            exchange=options['exchange'],
+            years=options['years'],
+            quarters=options['quarters'],
+            latency_ms=options['latency_ms'],
+            latency_jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            seed=options['seed'],
+        )
+
+        with throwaway_database():
+            report = self._run(config, options)
+
+        self._print_report(report['phases'])
+
+        if options['output']:
+            save_baseline(options['output'], report)
+            self.stdout.write(self.style.SUCCESS(f"Saved report to {options['output']}"))
+
+    def _run(self, config: FakeProviderConfig, options) -> dict:
+        provider = FakeVnstockProvider(config)
+        sleeps = SleepRecorder(scale=options['sleep_scale'])
+        limiter = rate_limiter.VNStockRateLimiter(
+            calls_per_minute=options['calls_per_minute'],
+            calls_per_hour=options['calls_per_hour'],
+            min_interval=options['min_interval'],
+        )
+        cache.clear()
+        phases = {}
+
+        self.stdout.write(f'Importing {config.symbols} fake symbols...')
+        # Service in/print rất nhiều ra stdout; gom lại để báo cáo dễ đọc
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(provider.install())
+            stack.enter_context(sleeps.install())
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            # Global limiter mới để mỗi lần chạy bắt đầu với cửa sổ trống
+            stack.enter_context(_swap_global_rate_limiter(limiter))
+
+            stock_service = VnstockImportService(per_symbol_sleep=options['per_symbol_sleep'])
+            phases['stock_import'] = run_phase(
+                'stock_import',
+                lambda: stock_service.import_all_complete(exchange=config.exchange, force_update=True),
+                provider,
+                sleeps,
+                STOCK_MODELS,
+                config.symbols,
+            )
+
+            if not options['skip_financials']:
+                financial_service = CalculateService(
+                    vnstock_client=VNStock(max_retries=5, wait_seconds=60),
+                    sleep_between_symbols=options['sleep_between_symbols'],
+                )
+                phases['financial_import'] = run_phase(
+                    'financial_import',
+                    lambda: financial_service.import_all_complete(force_update=True),
+                    provider,
+                    sleeps,
+                    FINANCIAL_MODELS,
+                    Symbol.objects.count(),
+                )
+
+        return {
+            'meta': {
+                'provider_config': config.__dict__,
+                'rate_limiter': {
+                    'calls_per_minute': options['calls_per_minute'],
+                    'calls_per_hour': options['calls_per_hour'],
+                    'min_interval': options['min_interval'],
+                },
+                'sleep_scale': options['sleep_scale'],
+                'provider_calls_by_method': provider.stats.calls_by_method,
+            },
+            'phases': {name: {**phase.summary(), 'service_result': phase.service_result} for name, phase in phases.items()},
+        }
+
+    def _print_report(self, phases: dict) -> None:
+        header = (
+            f"{'phase':<18}{'wall s':>9}{'proj s':>10}{'sym/s':>9}{'rows/s':>10}"
+            f"{'db %':>7}{'limit %':>9}{'sleep %':>9}{'errors':>8}{'429s':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in phases.items():
+            line = (
+                f"{name:<18}{row['wall_seconds']:>9.2f}{row['projected_seconds']:>10.1f}"
+                f"{row['symbols_per_sec']:>9.2f}{row['rows_per_sec']:>10.1f}"
+                f"{row['db_share'] * 100:>7.1f}{row['rate_limiter_share'] * 100:>9.1f}"
+                f"{row['backoff_share'] * 100:>9.1f}{row['provider_errors']:>8}{row['provider_rate_limits']:>6}"
+            )
+            self.stdout.write(self.style.SUCCESS(line))
+            self.stdout.write(f"  rows: {json.dumps(row['rows_written'])}")
+
+
+@contextlib.contextmanager
+def _swap_global_rate_limiter(limiter):
+    previous = rate_limiter._global_rate_limiter
+    rate_limiter._global_rate_limiter = limiter
+    try:
+        yield limiter
+    finally:
+        rate_limiter._global_rate_limiter = previous